@@ -0,0 +1,573 @@
+"""Analize reda vožnje: flota u službi po seriji VV (NumPy), zauzetost stanica, bilans depoa i prenos kašnjenja."""
+from red_voznje import MINUTA_U_DANU, np
+
+
+def _proveri_numpy():
+    if np is None:
+        raise ValueError("Za analize reda vožnje potreban je paket numpy (pip install numpy).")
+
+
+# --- FLOTA U SLUŽBI ---
+
+class KrivaFlote:
+    """Broj vozila u vožnji i na čekanju u svakom minutu dana, po seriji VV.
+
+    Svaki turnus je jedno vozilo; vozilo je u vožnji kada vozi bar jedan voz njegovog turnusa.
+    """
+
+    def __init__(self, serije, vozila, u_voznji):
+        self.serije = serije  # serije VV, sortirane
+        self.vozila = vozila  # serija -> broj turnusa (vozila)
+        self.u_voznji = u_voznji  # serija -> niz od 1440 brojeva (vozila u vožnji u minutu)
+
+    def na_cekanju(self, serija):
+        return self.vozila[serija] - self.u_voznji[serija]
+
+    def vrh(self, serija):
+        """(najveći broj vozila u vožnji, prvi minut u kome je dostignut)."""
+        minut = int(np.argmax(self.u_voznji[serija]))
+        return int(self.u_voznji[serija][minut]), minut
+
+    def sazetak(self):
+        """Redovi za tabelu: (serija, vozila, vrh, minut vrha, najmanje u vožnji, prosečno u vožnji)."""
+        redovi = []
+        for serija in self.serije:
+            vrh, minut = self.vrh(serija)
+            u_voznji = self.u_voznji[serija]
+            redovi.append((serija, self.vozila[serija], vrh, minut, int(u_voznji.min()), float(u_voznji.mean())))
+        return redovi
+
+    def redovi(self):
+        """Redovi za izvoz, minut po minut: dict sa kolonama izvoz.KOLONE_FLOTE."""
+        for serija in self.serije:
+            u_voznji = self.u_voznji[serija].tolist()
+            vozila = self.vozila[serija]
+            for minut, broj in enumerate(u_voznji):
+                yield {"serija_vv": serija, "minut": minut, "vreme": f"{minut // 60:02d}:{minut % 60:02d}",
+                       "vozila": vozila, "u_voznji": broj, "na_cekanju": vozila - broj}
+
+
+def kriva_flote(conn, red_voznje, sekcije=None, serije_vv=None, dani=None):
+    """Računa KrivuFlote za sve turnuse (ili samo za izabrane sekcije i serije VV).
+
+    Za svaki turnus se pravi niz promena (+1 na polasku, -1 na dolasku voza) i kumulativni
+    zbir daje broj vozova turnusa u vožnji po minutu. Prelazni voz se deli na ponoći:
+    [polazak, 24:00) i [00:00, dolazak). Vozovi kojih nema u bazi se preskaču.
+    Sa maskom `dani` (npr. kalendar.Period.maska_tipa("S")) računaju se samo vozovi koji
+    tih dana saobraćaju, a vozilo je samo turnus koji tada ima bar jedan voz.
+    """
+    _proveri_numpy()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, COALESCE(serija_vv, ''), COALESCE(sekcija, '') FROM turnusi ORDER BY id")
+    turnusi = [(turnus_id, serija) for turnus_id, serija, sekcija in cursor
+               if (serije_vv is None or serija in serije_vv) and (sekcije is None or sekcija in sekcije)]
+    redni = {turnus_id: i for i, (turnus_id, _) in enumerate(turnusi)}
+    cursor.execute("SELECT turnus_id, broj_voza FROM turnus_vozovi")
+    veze = [(redni[turnus_id], broj) for turnus_id, broj in cursor if turnus_id in redni]
+
+    idx = red_voznje.indeksi([broj for _, broj in veze])
+    turnus = np.fromiter((t for t, _ in veze), dtype=np.int64, count=len(veze))
+    postoji = idx >= 0
+    idx, turnus = idx[postoji], turnus[postoji]
+    if dani is not None:
+        saobraca = red_voznje.saobracaju(idx, dani)
+        idx, turnus = idx[saobraca], turnus[saobraca]
+    polazak = red_voznje.polazak[idx].astype(np.int64)
+    dolazak = red_voznje.dolazak[idx].astype(np.int64)
+    prelazni = red_voznje.prelazni(idx)
+
+    # Promene po turnusu i minutu; kolona 1440 prima kraj intervala koji traje do ponoći
+    promene = np.zeros((len(turnusi), MINUTA_U_DANU + 1), dtype=np.int32)
+    np.add.at(promene, (turnus, polazak), 1)
+    np.add.at(promene, (turnus, np.where(prelazni, MINUTA_U_DANU, dolazak)), -1)
+    np.add.at(promene, (turnus[prelazni], 0), 1)
+    np.add.at(promene, (turnus[prelazni], dolazak[prelazni]), -1)
+    u_voznji = np.cumsum(promene, axis=1)[:, :MINUTA_U_DANU] > 0
+
+    serija_turnusa = np.array([serija for _, serija in turnusi], dtype=object)
+    if dani is not None:
+        ima_vozove = np.zeros(len(turnusi), dtype=bool)
+        ima_vozove[turnus] = True
+        serija_turnusa, u_voznji = serija_turnusa[ima_vozove], u_voznji[ima_vozove]
+    serije = sorted(set(serija_turnusa.tolist()))
+    vozila = {}
+    po_seriji = {}
+    for serija in serije:
+        izabrani = serija_turnusa == serija
+        vozila[serija] = int(izabrani.sum())
+        po_seriji[serija] = u_voznji[izabrani].sum(axis=0).astype(np.int32)
+    return KrivaFlote(serije, vozila, po_seriji)
+
+
+# --- ZAUZETOST STANICA ---
+
+# Boravak vozila u stanici između dolaska jednog i polaska sledećeg voza istog turnusa:
+# (stanica, turnus_id, dolazni voz, dolazak_min, odlazni voz, polazak_min, trajanje u minutima)
+VELICINA_IN_LISTE = 500
+
+
+def turnusi_vozova(cursor, brojevi):
+    """Id-jevi turnusa u kojima se pojavljuje bar jedan od navedenih vozova."""
+    brojevi = list(brojevi)
+    turnusi = set()
+    for i in range(0, len(brojevi), VELICINA_IN_LISTE):
+        deo = brojevi[i:i + VELICINA_IN_LISTE]
+        cursor.execute(f"SELECT DISTINCT turnus_id FROM turnus_vozovi WHERE broj_voza IN ({','.join('?' * len(deo))})",
+                       deo)
+        turnusi.update(turnus_id for turnus_id, in cursor)
+    return turnusi
+
+
+def uticaj_izmene_voza(cursor, broj_voza):
+    """Turnusi na koje utiče brisanje ili promena broja voza: lista (id, naziv, redosled voza).
+
+    Jedno traženje po indeksu idx_turnus_vozovi_voz, pa je odgovor trenutan i na velikoj bazi.
+    """
+    return cursor.execute("""
+        SELECT t.id, t.naziv, tv.redosled
+        FROM turnus_vozovi tv
+        JOIN turnusi t ON t.id = tv.turnus_id
+        WHERE tv.broj_voza = ?
+        ORDER BY t.naziv
+    """, (broj_voza,)).fetchall()
+
+
+def ukloni_vozove_iz_turnusa(cursor, brojevi):
+    """Uklanja vozove iz turnusa pre brisanja vozova (strani ključ ne dozvoljava brisanje voza
+    koji je u turnusu); vraća id-jeve izmenjenih turnusa. Ostali vozovi zadržavaju redosled."""
+    brojevi = list(brojevi)
+    turnusi = turnusi_vozova(cursor, brojevi)
+    cursor.executemany("DELETE FROM turnus_vozovi WHERE broj_voza = ?", [(broj,) for broj in brojevi])
+    return turnusi
+
+
+def _boravci_jednog_turnusa(turnus_id, vozovi):
+    """Boravci između uzastopnih vozova; posle poslednjeg voza vozilo čeka prvi voz sledećeg dana.
+
+    Par čije se stanice ne nastavljaju (neispravan turnus) se preskače.
+    """
+    boravci = []
+    for i, (broj, _, krajnja, _, dolazak) in enumerate(vozovi):
+        sledeci, pocetna, _, polazak, _ = vozovi[(i + 1) % len(vozovi)]
+        if krajnja == pocetna:
+            boravci.append((krajnja, turnus_id, broj, dolazak, sledeci, polazak, (polazak - dolazak) % MINUTA_U_DANU))
+    return boravci
+
+
+def boravci_turnusa(cursor, turnus_ids=None):
+    """Rečnik turnus_id -> lista boravaka (za sve turnuse ili samo navedene).
+
+    Navedeni turnusi koji više ne postoje dobijaju praznu listu, pa se uklanjaju iz keša.
+    """
+    sql = """
+        SELECT tv.turnus_id, v.broj_voza, v.pocetna_stanica, v.krajnja_stanica, v.polazak_min, v.dolazak_min
+        FROM turnus_vozovi tv
+        JOIN vozovi v ON v.broj_voza = tv.broj_voza
+    """
+    if turnus_ids is None:
+        delovi = [None]
+    else:
+        turnus_ids = list(turnus_ids)
+        delovi = [turnus_ids[i:i + VELICINA_IN_LISTE] for i in range(0, len(turnus_ids), VELICINA_IN_LISTE)]
+    vozovi_turnusa = {turnus_id: [] for turnus_id in turnus_ids or ()}
+    for deo in delovi:
+        if deo is None:
+            cursor.execute(sql + " ORDER BY tv.turnus_id, tv.redosled")
+        else:
+            cursor.execute(sql + f" WHERE tv.turnus_id IN ({','.join('?' * len(deo))})"
+                                 " ORDER BY tv.turnus_id, tv.redosled", deo)
+        for turnus_id, *voz in cursor:
+            vozovi_turnusa.setdefault(turnus_id, []).append(voz)
+    return {turnus_id: _boravci_jednog_turnusa(turnus_id, vozovi) if vozovi else []
+            for turnus_id, vozovi in vozovi_turnusa.items()}
+
+
+def profil_stanice(boravci):
+    """Broj vozila u stanici tokom dana, prolazom kroz sortirane događaje (O(n log n)).
+
+    Boravak koji prelazi ponoć deli se na [dolazak, 24:00) i [00:00, polazak).
+    Vraća rečnik sa promenama [(minut, broj vozila od tog minuta)], vrhom i zbirom boravaka.
+    """
+    dogadjaji = []
+    u_ponoc = 0
+    najduzi = 0
+    ukupno = 0
+    for _, _, _, dolazak, _, _, trajanje in boravci:
+        if not trajanje:
+            continue
+        najduzi = max(najduzi, trajanje)
+        ukupno += trajanje
+        kraj = dolazak + trajanje
+        dogadjaji.append((dolazak, 1))
+        if kraj <= MINUTA_U_DANU:
+            dogadjaji.append((kraj, -1))
+        else:
+            u_ponoc += 1
+            dogadjaji.append((kraj - MINUTA_U_DANU, -1))
+    # Odlazak pre dolaska u istom minutu: vozilo koje odlazi ne deli mesto sa onim koje stiže
+    dogadjaji.sort()
+
+    broj = vrh = u_ponoc
+    minut_vrha = 0
+    promene = [(0, u_ponoc)]
+    for i, (minut, promena) in enumerate(dogadjaji):
+        broj += promena
+        if i + 1 < len(dogadjaji) and dogadjaji[i + 1][0] == minut:
+            continue
+        if minut == promene[-1][0]:
+            promene[-1] = (minut, broj)
+        elif broj != promene[-1][1]:
+            promene.append((minut, broj))
+        if broj > vrh:
+            vrh, minut_vrha = broj, minut
+    return {"boravaka": len(boravci), "vrh": vrh, "minut_vrha": minut_vrha, "u_ponoc": u_ponoc,
+            "najduzi": najduzi, "prosecan": ukupno / len(boravci) if boravci else 0.0, "promene": promene}
+
+
+class ZauzetostStanica:
+    """Keš boravaka po stanici; posle izmene se ponovo računaju samo dotaknute stanice."""
+
+    def __init__(self):
+        self._turnusi = None  # turnus_id -> lista boravaka
+        self._po_stanici = {}  # stanica -> {turnus_id: lista boravaka}
+        self._profili = {}  # stanica -> profil_stanice
+
+    def ucitana(self):
+        return self._turnusi is not None
+
+    def ponisti(self):
+        self._turnusi = None
+        self._po_stanici = {}
+        self._profili = {}
+
+    def postavi(self, boravci):
+        """Puni keš boravcima svih turnusa (rezultat boravci_turnusa bez filtera)."""
+        self.ponisti()
+        self._turnusi = {}
+        self.azuriraj(boravci)
+
+    def azuriraj(self, boravci):
+        """Zamenjuje boravke navedenih turnusa i vraća skup stanica čiji se profil promenio."""
+        dotaknute = set()
+        for turnus_id, novi in boravci.items():
+            for boravak in self._turnusi.pop(turnus_id, []):
+                stanica = boravak[0]
+                dotaknute.add(stanica)
+                turnusi_stanice = self._po_stanici.get(stanica)
+                if turnusi_stanice is not None:
+                    turnusi_stanice.pop(turnus_id, None)
+                    if not turnusi_stanice:
+                        del self._po_stanici[stanica]
+            if novi:
+                self._turnusi[turnus_id] = novi
+            for boravak in novi:
+                dotaknute.add(boravak[0])
+                self._po_stanici.setdefault(boravak[0], {}).setdefault(turnus_id, []).append(boravak)
+        for stanica in dotaknute:
+            self._profili.pop(stanica, None)
+        return dotaknute
+
+    def stanice(self):
+        return sorted(self._po_stanici)
+
+    def boravci(self, stanica):
+        """Boravci u stanici poređani po vremenu dolaska."""
+        boravci = [b for lista in self._po_stanici.get(stanica, {}).values() for b in lista]
+        return sorted(boravci, key=lambda b: (b[3], b[2], b[1], b[4]))
+
+    def profil(self, stanica):
+        profil = self._profili.get(stanica)
+        if profil is None:
+            profil = self._profili[stanica] = profil_stanice(self.boravci(stanica))
+        return profil
+
+
+# --- BILANS DEPOA ---
+
+def krajevi_turnusa(cursor, turnus_ids=None):
+    """Rečnik turnus_id -> (serija_vv, početna stanica prvog voza, krajnja stanica poslednjeg voza).
+
+    Jedan zbirni prolaz kroz turnus_vozovi (najmanji i najveći redosled po turnusu). Navedeni
+    turnusi koji više ne postoje ili nemaju vozove dobijaju None, pa se uklanjaju iz keša.
+    """
+    sql = """
+        WITH granice AS (
+            SELECT turnus_id, MIN(redosled) AS prvi, MAX(redosled) AS poslednji
+            FROM turnus_vozovi {uslov}
+            GROUP BY turnus_id
+        )
+        SELECT g.turnus_id, COALESCE(t.serija_vv, ''), vp.pocetna_stanica, vk.krajnja_stanica
+        FROM granice g
+        JOIN turnusi t ON t.id = g.turnus_id
+        JOIN turnus_vozovi tp ON tp.turnus_id = g.turnus_id AND tp.redosled = g.prvi
+        JOIN vozovi vp ON vp.broj_voza = tp.broj_voza
+        JOIN turnus_vozovi tk ON tk.turnus_id = g.turnus_id AND tk.redosled = g.poslednji
+        JOIN vozovi vk ON vk.broj_voza = tk.broj_voza
+    """
+    if turnus_ids is None:
+        cursor.execute(sql.format(uslov=""))
+        return {turnus_id: tuple(kraj) for turnus_id, *kraj in cursor}
+    turnus_ids = list(turnus_ids)
+    krajevi = dict.fromkeys(turnus_ids)
+    for i in range(0, len(turnus_ids), VELICINA_IN_LISTE):
+        deo = turnus_ids[i:i + VELICINA_IN_LISTE]
+        cursor.execute(sql.format(uslov=f"WHERE turnus_id IN ({','.join('?' * len(deo))})"), deo)
+        krajevi.update((turnus_id, tuple(kraj)) for turnus_id, *kraj in cursor)
+    return krajevi
+
+
+class BilansDepoa:
+    """Koliko vozila svake serije počinje i završava dan u kojoj stanici.
+
+    Vozilo turnusa završava dan u krajnjoj stanici poslednjeg voza, a sutra mu treba vozilo
+    u početnoj stanici prvog voza. Stanica sa više završetaka nego početaka ima višak vozila,
+    a sa manje manjak (ujutru prazan depo). Keš se posle izmene ažurira samo za dotaknute turnuse.
+    """
+
+    def __init__(self):
+        self._krajevi = None  # turnus_id -> (serija_vv, pocetna, krajnja)
+        self._stanje = {}  # (serija_vv, stanica) -> [pocinje, zavrsava]
+
+    def ucitana(self):
+        return self._krajevi is not None
+
+    def ponisti(self):
+        self._krajevi = None
+        self._stanje = {}
+
+    def postavi(self, krajevi):
+        """Puni keš krajevima svih turnusa (rezultat krajevi_turnusa bez filtera)."""
+        self.ponisti()
+        self._krajevi = {}
+        self.azuriraj(krajevi)
+
+    def _promeni(self, kraj, znak):
+        serija, pocetna, krajnja = kraj
+        for kljuc, indeks in (((serija, pocetna), 0), ((serija, krajnja), 1)):
+            stanje = self._stanje.setdefault(kljuc, [0, 0])
+            stanje[indeks] += znak
+            if stanje == [0, 0]:
+                del self._stanje[kljuc]
+
+    def azuriraj(self, krajevi):
+        """Zamenjuje krajeve navedenih turnusa (None uklanja turnus iz bilansa)."""
+        for turnus_id, kraj in krajevi.items():
+            stari = self._krajevi.pop(turnus_id, None)
+            if stari is not None:
+                self._promeni(stari, -1)
+            if kraj is not None:
+                self._krajevi[turnus_id] = kraj
+                self._promeni(kraj, 1)
+
+    def redovi(self, samo_neuravnotezene=False):
+        """Redovi (serija_vv, stanica, pocinje, zavrsava, bilans) poređani po seriji i stanici.
+
+        Bilans je završava - pocinje: pozitivan je višak, a negativan manjak vozila u stanici.
+        """
+        redovi = []
+        for (serija, stanica), (pocinje, zavrsava) in sorted(self._stanje.items()):
+            if not samo_neuravnotezene or pocinje != zavrsava:
+                redovi.append((serija, stanica, pocinje, zavrsava, zavrsava - pocinje))
+        return redovi
+
+    def nezatvoreni_turnusi(self):
+        """Turnusi čiji poslednji voz ne završava u stanici iz koje polazi prvi voz."""
+        return sorted(turnus_id for turnus_id, (_, pocetna, krajnja) in self._krajevi.items()
+                      if pocetna != krajnja)
+
+
+# --- STATISTIKA TURNUSA ---
+
+# Kolone tabele statistika_turnusa (pored turnus_id), vremena su u minutima
+KOLONE_STATISTIKE = ["broj_vozova", "voznja_min", "cekanje_min", "najkraci_obrt_min", "najduze_cekanje_min",
+                     "iskoriscenost"]
+
+
+def statistika_turnusa(vozovi):
+    """Obrt i čekanje vozila u jednom turnusu; `vozovi` su (polazak_min, dolazak_min) u redosledu.
+
+    Čekanje je vreme od dolaska voza do polaska sledećeg (posle poslednjeg voza: do prvog voza
+    sledećeg dana), najkraći obrt je najkraće takvo čekanje, a iskorišćenost je udeo vožnje
+    u ukupnom vremenu obrta vozila.
+    """
+    voznja = 0
+    cekanja = []
+    for i, (polazak, dolazak) in enumerate(vozovi):
+        voznja += (dolazak - polazak) % MINUTA_U_DANU
+        cekanja.append((vozovi[(i + 1) % len(vozovi)][0] - dolazak) % MINUTA_U_DANU)
+    cekanje = sum(cekanja)
+    ukupno = voznja + cekanje
+    return {"broj_vozova": len(vozovi), "voznja_min": voznja, "cekanje_min": cekanje,
+            "najkraci_obrt_min": min(cekanja), "najduze_cekanje_min": max(cekanja),
+            "iskoriscenost": round(100.0 * voznja / ukupno, 1) if ukupno else 0.0}
+
+
+def osvezi_statistiku_turnusa(cursor, turnus_ids=None):
+    """Ponovo računa red tabele statistika_turnusa za navedene turnuse (None: za sve).
+
+    Poziva se u istoj transakciji kao izmena turnusa ili voza. Turnus bez ijednog
+    postojećeg voza nema red u tabeli.
+    """
+    sql = """
+        SELECT tv.turnus_id, v.polazak_min, v.dolazak_min
+        FROM turnus_vozovi tv
+        JOIN vozovi v ON v.broj_voza = tv.broj_voza
+    """
+    if turnus_ids is None:
+        cursor.execute("DELETE FROM statistika_turnusa")
+        delovi = [None]
+    else:
+        turnus_ids = list(turnus_ids)
+        delovi = [turnus_ids[i:i + VELICINA_IN_LISTE] for i in range(0, len(turnus_ids), VELICINA_IN_LISTE)]
+    for deo in delovi:
+        vozovi_turnusa = {}
+        if deo is None:
+            cursor.execute(sql + " ORDER BY tv.turnus_id, tv.redosled")
+        else:
+            uslov = f"IN ({','.join('?' * len(deo))})"
+            cursor.execute(f"DELETE FROM statistika_turnusa WHERE turnus_id {uslov}", deo)
+            cursor.execute(sql + f" WHERE tv.turnus_id {uslov} ORDER BY tv.turnus_id, tv.redosled", deo)
+        for turnus_id, polazak, dolazak in cursor.fetchall():
+            vozovi_turnusa.setdefault(turnus_id, []).append((polazak, dolazak))
+        cursor.executemany(f"""
+            INSERT INTO statistika_turnusa (turnus_id, {', '.join(KOLONE_STATISTIKE)})
+            VALUES (?, {', '.join('?' * len(KOLONE_STATISTIKE))})
+        """, [(turnus_id, *(statistika[k] for k in KOLONE_STATISTIKE))
+              for turnus_id, statistika in ((t, statistika_turnusa(v)) for t, v in vozovi_turnusa.items())])
+
+
+# --- PRENOS KAŠNJENJA ---
+
+class MrezaTurnusa:
+    """Vozovi svih turnusa u matricama [turnus, redni broj voza] za simulaciju kašnjenja.
+
+    `rezerva[t, j]` je vreme koje posle voza j ostaje do polaska voza j + 1 iznad najkraćeg
+    obrta (pravila obrta); ono upija kašnjenje dolaska pre nego što se prenese dalje.
+    """
+
+    def __init__(self, turnusi, brojevi, rezerva, vazi):
+        self.turnusi = turnusi  # [(turnus_id, naziv, serija_vv)]
+        self.brojevi = brojevi  # lista brojeva vozova po turnusu
+        self.rezerva = rezerva  # int32 [turnus, voz]
+        self.vazi = vazi  # bool [turnus, voz]: na tom mestu postoji voz
+
+    def __len__(self):
+        return len(self.turnusi)
+
+    @classmethod
+    def iz_baze(cls, conn, red_voznje, pravila=None):
+        _proveri_numpy()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT t.id, t.naziv, COALESCE(t.serija_vv, ''), tv.broj_voza
+            FROM turnusi t
+            JOIN turnus_vozovi tv ON tv.turnus_id = t.id
+            ORDER BY t.id, tv.redosled
+        """)
+        turnusi, brojevi = [], []
+        for turnus_id, naziv, serija_vv, broj in cursor:
+            if broj not in red_voznje.indeks:
+                continue
+            if not turnusi or turnusi[-1][0] != turnus_id:
+                turnusi.append((turnus_id, naziv, serija_vv))
+                brojevi.append([])
+            brojevi[-1].append(broj)
+
+        duzina = max((len(b) for b in brojevi), default=0)
+        idx = np.full((len(turnusi), duzina), -1, dtype=np.int64)
+        for t, b in enumerate(brojevi):
+            idx[t, :len(b)] = red_voznje.indeksi(b)
+        vazi = idx >= 0
+        rezerva = np.zeros(idx.shape, dtype=np.int32)
+        if duzina > 1:
+            a, b = np.where(vazi, idx, 0)[:, :-1], np.where(vazi, idx, 0)[:, 1:]
+            razmak = red_voznje.polazak[b] - red_voznje.dolazak_korigovan[a]
+            if pravila:
+                serije_vv = list(dict.fromkeys(serija_vv for _, _, serija_vv in turnusi))
+                redni = {serija_vv: i for i, serija_vv in enumerate(serije_vv)}
+                serija_turnusa = np.array([redni[s] for _, _, s in turnusi], dtype=np.int64)
+                minimumi = red_voznje.minimumi_obrta(pravila, serije_vv)
+                razmak = razmak - minimumi[serija_turnusa[:, None], red_voznje.krajnja[a]]
+            # Preklopljeni vozovi (neispravan turnus) nemaju rezervu, ali je ne oduzimaju
+            rezerva[:, :-1] = np.maximum(razmak, 0) * vazi[:, 1:]
+        return cls(turnusi, brojevi, rezerva, vazi)
+
+    def propagiraj(self, primarna):
+        """Kašnjenja polaska i dolaska za primarna kašnjenja `primarna` [..., turnus, voz] (minuti).
+
+        Voz kasni na polasku koliko je prethodni voz turnusa zakasnio na dolasku preko
+        rezerve, a na dolasku još i za svoje primarno kašnjenje.
+        """
+        polazak = np.zeros(primarna.shape, dtype=np.float64)
+        dolazak = np.zeros(primarna.shape, dtype=np.float64)
+        for j in range(self.vazi.shape[1]):
+            if j:
+                polazak[..., j] = np.maximum(dolazak[..., j - 1] - self.rezerva[:, j - 1], 0) * self.vazi[:, j]
+            dolazak[..., j] = polazak[..., j] + primarna[..., j] * self.vazi[:, j]
+        return polazak, dolazak
+
+
+def prenos_kasnjenja(mreza, primarna):
+    """Šta-ako: `primarna` je rečnik broj voza -> minuti kašnjenja.
+
+    Vraća za svaki turnus sa bar jednim zakasnelim vozom rečnik sa listom
+    (broj, primarno, kašnjenje polaska, kašnjenje dolaska) i ukupnim prenetim kašnjenjem.
+    """
+    matrica = np.zeros(mreza.vazi.shape, dtype=np.float64)
+    pogodjeni = []
+    for t, brojevi in enumerate(mreza.brojevi):
+        for j, broj in enumerate(brojevi):
+            if broj in primarna:
+                matrica[t, j] = primarna[broj]
+                if not pogodjeni or pogodjeni[-1] != t:
+                    pogodjeni.append(t)
+    polazak, dolazak = mreza.propagiraj(matrica)
+    rezultat = []
+    for t in pogodjeni:
+        turnus_id, naziv, serija_vv = mreza.turnusi[t]
+        vozovi = [(broj, int(matrica[t, j]), int(polazak[t, j]), int(dolazak[t, j]))
+                  for j, broj in enumerate(mreza.brojevi[t])]
+        rezultat.append({"turnus_id": turnus_id, "naziv": naziv, "serija_vv": serija_vv, "vozovi": vozovi,
+                         "preneseno": int(polazak[t].sum())})
+    return rezultat
+
+
+# Najviše vrednosti u jednoj matrici uzoraka (paket uzoraka x turnusi x vozovi)
+MAX_VREDNOSTI_PAKETA = 2_000_000
+
+
+def monte_karlo_kasnjenja(mreza, uzoraka=1000, verovatnoca=0.2, srednje_kasnjenje=10.0, seme=1):
+    """Simulira `uzoraka` dana: svaki voz sa verovatnoćom `verovatnoca` dobija primarno
+    kašnjenje (eksponencijalno, srednja vrednost `srednje_kasnjenje` minuta).
+
+    Svi turnusi i ceo paket uzoraka računaju se odjednom (NumPy). Za svaki turnus vraća
+    prosečno primarno i preneto kašnjenje po danu, verovatnoću da se kašnjenje prenese na
+    sledeći voz i ocenu robusnosti 0-100 (udeo primarnog u ukupnom kašnjenju; 100 = ništa
+    se ne prenosi), poređano od najmanje robusnog.
+    """
+    rng = np.random.default_rng(seme)
+    oblik = mreza.vazi.shape
+    primarno = np.zeros(oblik[0])
+    preneseno = np.zeros(oblik[0])
+    dana_sa_prenosom = np.zeros(oblik[0])
+    velicina_paketa = max(1, MAX_VREDNOSTI_PAKETA // max(1, oblik[0] * oblik[1]))
+    for pocetak in range(0, uzoraka, velicina_paketa):
+        broj = min(velicina_paketa, uzoraka - pocetak)
+        kasni = rng.random((broj, *oblik)) < verovatnoca
+        matrica = np.where(kasni, rng.exponential(srednje_kasnjenje, (broj, *oblik)), 0.0) * mreza.vazi
+        polazak, _ = mreza.propagiraj(matrica)
+        primarno += matrica.sum(axis=(0, 2))
+        preneseno += polazak.sum(axis=(0, 2))
+        dana_sa_prenosom += (polazak > 0).any(axis=2).sum(axis=0)
+
+    ukupno = primarno + preneseno
+    robusnost = np.where(ukupno > 0, 100.0 * primarno / np.where(ukupno > 0, ukupno, 1), 100.0)
+    rezultat = []
+    for t, (turnus_id, naziv, serija_vv) in enumerate(mreza.turnusi):
+        rezultat.append({"turnus_id": turnus_id, "naziv": naziv, "serija_vv": serija_vv,
+                         "vozova": len(mreza.brojevi[t]), "primarno": float(primarno[t] / uzoraka),
+                         "preneseno": float(preneseno[t] / uzoraka),
+                         "verovatnoca_prenosa": float(100.0 * dana_sa_prenosom[t] / uzoraka),
+                         "robusnost": float(robusnost[t])})
+    rezultat.sort(key=lambda r: (r["robusnost"], r["naziv"]))
+    return rezultat
@@ -0,0 +1,498 @@
+import json
+import os
+import sqlite3
+
+import analiza
+import dijagnostika
+
+# Definiši putanju do baze
+DB_PATH = "data/baza.db"
+
+# Koliko dugo (sekundi) veza čeka da druga veza ili drugi korisnik iste baze otpusti zaključavanje
+CEKANJE_ZAKLJUCANE_BAZE = 10.0
+
+# WAL (čitanje ne čeka pisanje) se uključuje samo na zahtev (TURNUSI_WAL=1) i samo za bazu na
+# lokalnom disku. WAL koristi deljenu memoriju, pa svi korisnici moraju da rade na istom računaru:
+# SQLite ne može da primeti da bazu otvara i drugi računar, a WAL u deljenom mrežnom folderu nije
+# podržan i može da ošteti bazu. Baza koju koristi više računara zato ostaje na podrazumevanom
+# dnevniku (rollback journal) i čeka na zaključavanje (CEKANJE_ZAKLJUCANE_BAZE). Mrežni folder se
+# prepoznaje po UNC putanji, mrežnom disku (Windows) ili tipu sistema fajlova (/proc/mounts);
+# na ostalim sistemima TURNUSI_WAL ne sme da se uključi za bazu u deljenom folderu.
+WAL = os.environ.get("TURNUSI_WAL", "").strip().lower() not in ("", "0", "ne")
+
+# Tipovi mrežnih sistema fajlova iz /proc/mounts
+MREZNI_SISTEMI_FAJLOVA = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "fuse.sshfs",
+                          "fuse.glusterfs"}
+
+
+class SukobIzmene(ValueError):
+    """Red je posle učitavanja izmenjen ili obrisan drugim putem (npr. drugi korisnik iste baze)."""
+
+
+def otvori_vezu(putanja=None, **kwargs):
+    """Otvara novu vezu ka bazi (svaka nit mora imati svoju vezu)."""
+    if dijagnostika.UKLJUCENO:
+        kwargs.setdefault("factory", dijagnostika.ProfilisanaVeza)
+    kwargs.setdefault("timeout", CEKANJE_ZAKLJUCANE_BAZE)
+    conn = sqlite3.connect(putanja or DB_PATH, **kwargs)
+    # SQLite strane ključeve podrazumevano ne proverava; uključuje se za svaku vezu
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def baza_zauzeta(greska):
+    """Da li je greška posledica zaključane baze (SQLITE_BUSY / SQLITE_LOCKED)."""
+    if not isinstance(greska, sqlite3.OperationalError):
+        return False
+    kod = getattr(greska, 'sqlite_errorcode', None)
+    if kod is not None:
+        return kod & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(greska) or "busy" in str(greska)
+
+
+# Verzija šeme baze (PRAGMA user_version); povećava se uz svaku promenu tabela
+VERZIJA_SEME = 12
+
+# Tabela za vozove. Minuti od ponoći i oznaka prelaznog voza (dolazak posle ponoći) su
+# izračunate kolone, da bi pretraga po stanici i vremenu mogla da koristi indeks.
+# Dani saobraćanja su bitmaska dana perioda reda vožnje (kalendar.py); NULL je svaki dan.
+# verzija_reda se povećava pri svakoj izmeni reda (okidač), pa čuvanje može da proveri da red
+# posle učitavanja nije izmenio neko drugi.
+SQL_TABELE_VOZOVI = '''
+    CREATE TABLE IF NOT EXISTS {naziv} (
+        broj_voza TEXT PRIMARY KEY,
+        pocetna_stanica TEXT,
+        krajnja_stanica TEXT,
+        sat_polaska INTEGER,
+        minut_polaska INTEGER,
+        sat_dolaska INTEGER,
+        minut_dolaska INTEGER,
+        status TEXT,
+        sekcija TEXT,
+        serija_vozila TEXT,
+        polazak_min INTEGER GENERATED ALWAYS AS (sat_polaska * 60 + minut_polaska) STORED,
+        dolazak_min INTEGER GENERATED ALWAYS AS (sat_dolaska * 60 + minut_dolaska) STORED,
+        prelazni INTEGER GENERATED ALWAYS AS (
+            sat_dolaska * 60 + minut_dolaska < sat_polaska * 60 + minut_polaska) STORED,
+        dani BLOB,
+        verzija_reda INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+# Veze turnusa i vozova. Promena broja voza se prenosi i u turnuse (ON UPDATE CASCADE), a voz
+# koji je u nekom turnusu ne može da se obriše dok se iz njega ne ukloni.
+SQL_TABELE_TURNUS_VOZOVI = '''
+    CREATE TABLE IF NOT EXISTS {naziv} (
+        turnus_id INTEGER,
+        broj_voza TEXT,
+        redosled INTEGER,
+        PRIMARY KEY (turnus_id, broj_voza),
+        FOREIGN KEY (turnus_id) REFERENCES turnusi(id),
+        FOREIGN KEY (broj_voza) REFERENCES vozovi(broj_voza) ON UPDATE CASCADE
+    )
+'''
+
+# Vozovi uvezeni iz GTFS feed-a (gtfs.py) sa otiskom reda putovanja koje ih daje. Otisak NULL
+# znači da putovanja više nema u feed-u (ili je dobilo drugi broj), a voz je zadržan: voz i dalje
+# važi kao GTFS voz, pa ga putovanje koje se vrati u feed ponovo menja.
+SQL_TABELE_GTFS_PUTOVANJA = '''
+    CREATE TABLE IF NOT EXISTS {naziv} (
+        broj_voza TEXT PRIMARY KEY,
+        trip_id TEXT,
+        otisak TEXT
+    )
+'''
+
+# Obične (ne izračunate) kolone tabele vozovi
+KOLONE_VOZOVI = [
+    "broj_voza", "pocetna_stanica", "krajnja_stanica", "sat_polaska", "minut_polaska",
+    "sat_dolaska", "minut_dolaska", "status", "sekcija", "serija_vozila", "dani",
+]
+
+# Red tabele u dnevniku izmena (dnevnik.py): (polje, SQL izraz nad redom {r}). Turnus se navodi
+# nazivom, jer se id turnusa razlikuje od kopije do kopije, a dani (BLOB) heksadecimalno.
+KOLONE_DNEVNIKA = {
+    "vozovi": [(k, "CASE WHEN {r}.dani IS NULL THEN NULL ELSE hex({r}.dani) END" if k == "dani" else "{r}." + k)
+               for k in KOLONE_VOZOVI],
+    "turnusi": [("naziv", "{r}.naziv"), ("sekcija", "{r}.sekcija"), ("serija_vv", "{r}.serija_vv")],
+    "turnus_vozovi": [("turnus", "(SELECT naziv FROM turnusi WHERE id = {r}.turnus_id)"),
+                      ("broj_voza", "{r}.broj_voza"), ("redosled", "{r}.redosled")],
+}
+
+
+def json_reda_dnevnika(tabela, r):
+    """SQL izraz koji red tabele (alias, NEW ili OLD) daje kao JSON objekat dnevnika."""
+    return "json_object(" + ", ".join(f"'{polje}', {izraz.format(r=r)}"
+                                      for polje, izraz in KOLONE_DNEVNIKA[tabela]) + ")"
+
+
+def napravi_tabele(cursor):
+    """Pravi tabele aplikacije ako ne postoje i ažurira šemu starije baze."""
+    if not cursor.connection.in_transaction:
+        _postavi_dnevnik(cursor)
+    # Tabele se pri ažuriranju šeme prave ponovo (DROP TABLE), pa se strani ključevi tada ne
+    # proveravaju; PRAGMA nema dejstva unutar transakcije, zato se menja pre SAVEPOINT-a
+    kljucevi = cursor.execute("PRAGMA foreign_keys").fetchone()[0]
+    if kljucevi:
+        cursor.execute("PRAGMA foreign_keys = OFF")
+    try:
+        _napravi_tabele(cursor)
+    finally:
+        if kljucevi:
+            cursor.execute("PRAGMA foreign_keys = ON")
+
+
+def mrezna_putanja(putanja):
+    """Da li je fajl u deljenom mrežnom folderu (UNC putanja, mrežni disk ili mrežni sistem fajlova)."""
+    putanja = os.path.abspath(putanja)
+    if putanja.startswith(("\\\\", "//")):
+        return True
+    if os.name == "nt":
+        import ctypes
+        DRIVE_REMOTE = 4
+        return ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(putanja)[0] + "\\") == DRIVE_REMOTE
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            montirano = [red.split()[1:3] for red in f]
+    except OSError:
+        return False
+    putanja = os.path.realpath(putanja)
+    # Sistem fajlova sa najdužom tačkom montiranja koja sadrži putanju
+    tip, duzina = None, -1
+    for tacka, tip_tacke in montirano:
+        tacka = tacka.replace("\\040", " ")
+        if (putanja == tacka or putanja.startswith(tacka.rstrip("/") + "/")) and len(tacka) > duzina:
+            tip, duzina = tip_tacke, len(tacka)
+    return tip in MREZNI_SISTEMI_FAJLOVA
+
+
+def _postavi_dnevnik(cursor):
+    """WAL za lokalnu bazu ako je uključen (WAL), a inače podrazumevani dnevnik.
+
+    Režim se pamti u samoj bazi, pa se baza koja je ranije prebačena u WAL vraća na
+    podrazumevani dnevnik kada WAL nije uključen ili je baza u mrežnom folderu.
+    """
+    putanja = cursor.execute("PRAGMA database_list").fetchone()[2]
+    if not putanja:
+        return  # baza u memoriji
+    trenutni = cursor.execute("PRAGMA journal_mode").fetchone()[0].lower()
+    if WAL and not mrezna_putanja(putanja):
+        zeljeni = "wal"
+    elif trenutni == "wal":
+        zeljeni = "delete"
+    else:
+        return
+    if trenutni == zeljeni:
+        return
+    try:
+        cursor.execute(f"PRAGMA journal_mode = {zeljeni}")
+    except sqlite3.OperationalError as e:
+        # Promena traži da bazu niko drugi nema otvorenu; pokušava se pri sledećem pokretanju
+        if not baza_zauzeta(e):
+            raise
+
+
+def _napravi_tabele(cursor):
+    cursor.execute("SAVEPOINT sema")
+    try:
+        cursor.execute(SQL_TABELE_VOZOVI.format(naziv="vozovi"))
+
+        # Tabela za turnuse
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS turnusi (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                naziv TEXT UNIQUE,
+                sekcija TEXT,
+                serija_vv TEXT,
+                verzija_reda INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Tabela za veze između turnusa i voza
+        cursor.execute(SQL_TABELE_TURNUS_VOZOVI.format(naziv="turnus_vozovi"))
+
+        # Izračunata statistika obrta po turnusu; osvežava se pri svakom upisu turnusa ili voza
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS statistika_turnusa (
+                turnus_id INTEGER PRIMARY KEY,
+                broj_vozova INTEGER,
+                voznja_min INTEGER,
+                cekanje_min INTEGER,
+                najkraci_obrt_min INTEGER,
+                najduze_cekanje_min INTEGER,
+                iskoriscenost REAL,
+                FOREIGN KEY (turnus_id) REFERENCES turnusi(id)
+            )
+        ''')
+
+        # Najkraći obrt po stanici i seriji; prazna stanica ili serija znači "bilo koja"
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pravila_obrta (
+                stanica TEXT NOT NULL DEFAULT '',
+                serija TEXT NOT NULL DEFAULT '',
+                minimum_min INTEGER NOT NULL,
+                PRIMARY KEY (stanica, serija)
+            )
+        ''')
+
+        # Period reda vožnje na koji se odnose maske dana vozova (najviše jedan red)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS period_reda_voznje (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                pocetak TEXT NOT NULL,
+                broj_dana INTEGER NOT NULL
+            )
+        ''')
+
+        # Verzije reda vožnje (verzije.py): svaka verzija čuva samo razlike prema roditelju,
+        # a sadržaj reda se čuva jednom po otisku i deli između verzija
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS verzije (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                naziv TEXT UNIQUE NOT NULL,
+                godina TEXT,
+                roditelj_id INTEGER,
+                napravljena TEXT,
+                sacuvana TEXT,
+                period_pocetak TEXT,
+                period_broj_dana INTEGER,
+                FOREIGN KEY (roditelj_id) REFERENCES verzije(id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS aktivna_verzija (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                verzija_id INTEGER NOT NULL,
+                FOREIGN KEY (verzija_id) REFERENCES verzije(id)
+            )
+        ''')
+        for tabela in ("verzije_vozova", "verzije_turnusa"):
+            # kljuc je broj voza ili naziv turnusa; otisak NULL znači da ga u verziji nema
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {tabela} (
+                    verzija_id INTEGER,
+                    kljuc TEXT,
+                    otisak TEXT,
+                    PRIMARY KEY (verzija_id, kljuc),
+                    FOREIGN KEY (verzija_id) REFERENCES verzije(id)
+                ) WITHOUT ROWID
+            ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sadrzaj_voza (
+                otisak TEXT PRIMARY KEY,
+                broj_voza TEXT,
+                pocetna_stanica TEXT,
+                krajnja_stanica TEXT,
+                sat_polaska INTEGER,
+                minut_polaska INTEGER,
+                sat_dolaska INTEGER,
+                minut_dolaska INTEGER,
+                status TEXT,
+                sekcija TEXT,
+                serija_vozila TEXT,
+                dani BLOB
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sadrzaj_turnusa (
+                otisak TEXT PRIMARY KEY,
+                naziv TEXT,
+                sekcija TEXT,
+                serija_vv TEXT,
+                vozovi TEXT
+            ) WITHOUT ROWID
+        ''')
+        # Vozovi sačuvanog sadržaja turnusa, da razlika verzija nađe turnuse promenjenog voza po indeksu
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vozovi_sadrzaja_turnusa (
+                broj_voza TEXT,
+                otisak TEXT,
+                PRIMARY KEY (broj_voza, otisak)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute(SQL_TABELE_GTFS_PUTOVANJA.format(naziv="gtfs_putovanja"))
+
+        # Keš provere turnusa: rezultat važi dok se otisak provere (validacija.otisak_provere) ne promeni
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS provera_turnusa (
+                turnus_id INTEGER PRIMARY KEY,
+                otisak TEXT,
+                vrsta TEXT,
+                greske TEXT,
+                FOREIGN KEY (turnus_id) REFERENCES turnusi(id)
+            )
+        ''')
+        # Zavisnost voz -> turnusi (analiza.turnusi_vozova) bez prolaska kroz celu tabelu veza
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_turnus_vozovi_voz ON turnus_vozovi (broj_voza)")
+
+        # Dnevnik izdanja knjige turnusa (stampa.py): koji list je odštampan u kom izdanju
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS izdanja_stampe (
+                id INTEGER PRIMARY KEY,
+                datum TEXT,
+                vrsta TEXT,
+                broj_strana INTEGER
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stranice_izdanja (
+                izdanje_id INTEGER,
+                strana INTEGER,
+                turnus TEXT,
+                otisak TEXT,
+                PRIMARY KEY (izdanje_id, strana),
+                FOREIGN KEY (izdanje_id) REFERENCES izdanja_stampe(id)
+            )
+        ''')
+
+        # Dnevnik izmena za sinhronizaciju kopija (dnevnik.py); samo se dopunjuje. izvor je oznaka
+        # kopije čija je izmena primenjena uvozom segmenta, a NULL za sopstvene izmene.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS dnevnik_izmena (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                vreme TEXT,
+                tabela TEXT,
+                radnja TEXT,
+                staro TEXT,
+                novo TEXT,
+                izvor TEXT
+            )
+        ''')
+        # Kopija čiji se segment upravo primenjuje (van uvoza je tabela prazna); čitaju je okidači
+        cursor.execute("CREATE TABLE IF NOT EXISTS primena_dnevnika (kopija TEXT)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS kopija (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                oznaka TEXT,
+                poslednji_izvoz INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS primljeni_dnevnici (
+                kopija TEXT PRIMARY KEY,
+                poslednji INTEGER NOT NULL
+            )
+        ''')
+
+        verzija = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if verzija < 1:
+            _dodaj_minute_vozovima(cursor)
+        if verzija < 2:
+            # Verzija 2: statistika za turnuse koji su već u bazi
+            analiza.osvezi_statistiku_turnusa(cursor)
+        if verzija < 4:
+            # Verzija 4: dani saobraćanja (postojeći vozovi saobraćaju svakog dana)
+            kolone = [red[1] for red in cursor.execute("PRAGMA table_xinfo(vozovi)")]
+            if "dani" not in kolone:
+                cursor.execute("ALTER TABLE vozovi ADD COLUMN dani BLOB")
+        if verzija < 8:
+            _kaskada_broja_voza(cursor)
+        if verzija < 10:
+            # Verzija 10: verzija reda za proveru istovremenih izmena
+            for tabela in ("vozovi", "turnusi"):
+                kolone = [red[1] for red in cursor.execute(f"PRAGMA table_xinfo({tabela})")]
+                if "verzija_reda" not in kolone:
+                    cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN verzija_reda INTEGER NOT NULL DEFAULT 0")
+        if verzija < 11:
+            # Verzija 11: vozovi već sačuvanog sadržaja turnusa
+            cursor.executemany(
+                "INSERT OR IGNORE INTO vozovi_sadrzaja_turnusa (broj_voza, otisak) VALUES (?, ?)",
+                [(broj, otisak) for otisak, vozovi in cursor.execute(
+                    "SELECT otisak, vozovi FROM sadrzaj_turnusa").fetchall() for broj in json.loads(vozovi)])
+        if verzija < 12:
+            _gtfs_putovanja_po_broju_voza(cursor)
+        # Okidači se prave posle ažuriranja šeme, jer ponovo napravljena tabela gubi svoje okidače
+        _napravi_okidace_dnevnika(cursor)
+        _napravi_okidace_verzije_reda(cursor)
+        cursor.execute(f"PRAGMA user_version = {VERZIJA_SEME}")
+    except BaseException:
+        cursor.execute("ROLLBACK TO sema")
+        cursor.execute("RELEASE sema")
+        raise
+    cursor.execute("RELEASE sema")
+
+
+def _dodaj_minute_vozovima(cursor):
+    """Verzija 1: izračunate kolone polazak_min/dolazak_min/prelazni i indeksi po stanici i vremenu.
+
+    STORED kolona ne može da se doda sa ALTER TABLE, pa se tabela starije baze pravi ponovo.
+    """
+    kolone = [red[1] for red in cursor.execute("PRAGMA table_xinfo(vozovi)")]
+    if "polazak_min" not in kolone:
+        lista = ", ".join(k for k in KOLONE_VOZOVI if k in kolone)
+        cursor.execute(SQL_TABELE_VOZOVI.format(naziv="vozovi_nova"))
+        cursor.execute(f"INSERT INTO vozovi_nova ({lista}) SELECT {lista} FROM vozovi")
+        cursor.execute("DROP TABLE vozovi")
+        cursor.execute("ALTER TABLE vozovi_nova RENAME TO vozovi")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vozovi_polazak ON vozovi (pocetna_stanica, polazak_min)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vozovi_dolazak ON vozovi (krajnja_stanica, dolazak_min)")
+
+
+def _kaskada_broja_voza(cursor):
+    """Verzija 8: promena broja voza se prenosi u turnus_vozovi (ON UPDATE CASCADE).
+
+    Akcija stranog ključa ne može da se doda postojećoj tabeli, pa se tabela pravi ponovo.
+    """
+    akcije = [red[5] for red in cursor.execute("PRAGMA foreign_key_list(turnus_vozovi)") if red[2] == "vozovi"]
+    if akcije != ["CASCADE"]:
+        cursor.execute(SQL_TABELE_TURNUS_VOZOVI.format(naziv="turnus_vozovi_nova"))
+        cursor.execute("INSERT INTO turnus_vozovi_nova (turnus_id, broj_voza, redosled) "
+                       "SELECT turnus_id, broj_voza, redosled FROM turnus_vozovi")
+        cursor.execute("DROP TABLE turnus_vozovi")
+        cursor.execute("ALTER TABLE turnus_vozovi_nova RENAME TO turnus_vozovi")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_turnus_vozovi_voz ON turnus_vozovi (broj_voza)")
+
+
+def _gtfs_putovanja_po_broju_voza(cursor):
+    """Verzija 12: gtfs_putovanja (ranije pravljena pri uvozu, sa ključem trip_id) dobija ključ broj_voza."""
+    kljuc = [red[1] for red in cursor.execute("PRAGMA table_info(gtfs_putovanja)") if red[5]]
+    if kljuc != ["broj_voza"]:
+        cursor.execute(SQL_TABELE_GTFS_PUTOVANJA.format(naziv="gtfs_putovanja_nova"))
+        cursor.execute("INSERT OR REPLACE INTO gtfs_putovanja_nova (broj_voza, trip_id, otisak) "
+                       "SELECT broj_voza, trip_id, otisak FROM gtfs_putovanja")
+        cursor.execute("DROP TABLE gtfs_putovanja")
+        cursor.execute("ALTER TABLE gtfs_putovanja_nova RENAME TO gtfs_putovanja")
+
+
+def _napravi_okidace_dnevnika(cursor):
+    """Okidači koji svaki upis, izmenu i brisanje u vozovima i turnusima beleže u dnevnik_izmena.
+
+    Izmena koja ne menja nijedno polje (npr. ponovni uvoz istog reda) se ne beleži.
+    """
+    izvor = "(SELECT kopija FROM primena_dnevnika)"
+    for tabela in KOLONE_DNEVNIKA:
+        staro, novo = json_reda_dnevnika(tabela, "OLD"), json_reda_dnevnika(tabela, "NEW")
+        for dogadjaj, radnja, uslov, vrednosti in (("INSERT", "I", "", f"NULL, {novo}"),
+                                                   ("UPDATE", "U", f"WHEN {staro} IS NOT {novo}", f"{staro}, {novo}"),
+                                                   ("DELETE", "D", "", f"{staro}, NULL")):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS dnevnik_{tabela}_{radnja.lower()} AFTER {dogadjaj} ON {tabela} {uslov}
+                BEGIN
+                    INSERT INTO dnevnik_izmena (vreme, tabela, radnja, staro, novo, izvor)
+                    VALUES (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'), '{tabela}', '{radnja}', {vrednosti}, {izvor});
+                END
+            ''')
+
+
+def _napravi_okidace_verzije_reda(cursor):
+    """Okidači koji povećavaju verzija_reda voza ili turnusa pri svakoj izmeni, bez obzira ko je i
+    kojim putem menja (forma, uvoz, GTFS, verzije, dnevnik). Turnus menja i svaka izmena njegovih
+    vozova u turnus_vozovi, uključujući promenu broja voza prenetu stranim ključem."""
+    for tabela, kljuc in (("vozovi", "broj_voza"), ("turnusi", "id")):
+        # Unutrašnji UPDATE ne pokreće isti okidač ponovo (recursive_triggers je isključen)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS verzija_{tabela} AFTER UPDATE ON {tabela}
+            WHEN NEW.verzija_reda = OLD.verzija_reda
+            BEGIN
+                UPDATE {tabela} SET verzija_reda = OLD.verzija_reda + 1 WHERE {kljuc} = NEW.{kljuc};
+            END
+        ''')
+    for dogadjaj, redovi in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+        uslov = " OR ".join(f"id = {r}.turnus_id" for r in redovi)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS verzija_turnus_vozovi_{dogadjaj.lower()} AFTER {dogadjaj} ON turnus_vozovi
+            BEGIN
+                UPDATE turnusi SET verzija_reda = verzija_reda + 1 WHERE {uslov};
+            END
+        ''')
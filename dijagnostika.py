@@ -0,0 +1,166 @@
+"""Merenje trajanja upita, učitavanja i crtanja tokom rada aplikacije.
+
+Uključuje se promenljivom okruženja TURNUSI_PROFIL:
+    TURNUSI_PROFIL=1      merenja se upisuju u data/profil.log (fajl se rotira)
+    TURNUSI_PROFIL=panel  isto, uz panel sa poslednjim merenjima na dnu prozora
+Dodatno: TURNUSI_PROFIL_LOG (putanja loga), TURNUSI_PROFIL_ZASTOJ_MS (prag zastoja GUI niti, 200).
+
+Kada je isključeno, veze ka bazi su obične sqlite3 veze, a ostale funkcije se odmah vraćaju.
+"""
+import contextlib
+import logging
+import logging.handlers
+import os
+import sqlite3
+import time
+
+REZIM = os.environ.get("TURNUSI_PROFIL", "").strip().lower()
+UKLJUCENO = REZIM not in ("", "0", "ne")
+PANEL = REZIM == "panel"
+LOG_PUTANJA = os.environ.get("TURNUSI_PROFIL_LOG", os.path.join("data", "profil.log"))
+PRAG_ZASTOJA_MS = int(os.environ.get("TURNUSI_PROFIL_ZASTOJ_MS", "200"))
+# Interval kojim se proverava da li GUI nit odgovara
+INTERVAL_NADZORA_MS = 50
+
+log = logging.getLogger("turnusi")
+
+# Poslednje merenje po vrsti ('sql', 'ucitavanje', 'tabela', 'grafik', 'pisanje', 'zastoj'):
+# (opis, ms, broj stavki)
+poslednje = {}
+
+
+def podesi_logovanje():
+    """Poruke aplikacije idu na konzolu, a merenja (ako su uključena) u rotirajući log fajl."""
+    log.setLevel(logging.DEBUG if UKLJUCENO else logging.INFO)
+    konzola = logging.StreamHandler()
+    konzola.setLevel(logging.INFO)
+    log.addHandler(konzola)
+    if UKLJUCENO:
+        os.makedirs(os.path.dirname(LOG_PUTANJA) or ".", exist_ok=True)
+        fajl = logging.handlers.RotatingFileHandler(LOG_PUTANJA, maxBytes=5 * 1024 * 1024, backupCount=3,
+                                                    encoding="utf-8")
+        fajl.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(levelname)s %(message)s"))
+        log.addHandler(fajl)
+        log.info("Merenje uključeno, log: %s", LOG_PUTANJA)
+
+
+def zabelezi(vrsta, opis, ms, broj=None):
+    """Pamti poslednje merenje date vrste i upisuje ga u log."""
+    poslednje[vrsta] = (opis, ms, broj)
+    if broj is None:
+        log.debug("%s %.1f ms: %s", vrsta, ms, opis)
+    else:
+        log.debug("%s %.1f ms, %d stavki: %s", vrsta, ms, broj, opis)
+
+
+@contextlib.contextmanager
+def meri(vrsta, opis, broj=None):
+    """Meri trajanje bloka (npr. petlje koja pravi redove tabele)."""
+    if not UKLJUCENO:
+        yield
+        return
+    pocetak = time.perf_counter()
+    try:
+        yield
+    finally:
+        zabelezi(vrsta, opis, (time.perf_counter() - pocetak) * 1000, broj)
+
+
+def pocetak():
+    """Vreme početka merenja ili None ako je merenje isključeno."""
+    return time.perf_counter() if UKLJUCENO else None
+
+
+def proteklo_ms(vreme_pocetka):
+    return (time.perf_counter() - vreme_pocetka) * 1000
+
+
+# --- MERENJE UPITA ---
+
+def _skrati(sql):
+    return " ".join(sql.split())[:300]
+
+
+class ProfilisaniKursor(sqlite3.Cursor):
+    """Kursor koji meri trajanje svakog upita (bez čitanja redova, to meri petlja koja ih čita)."""
+
+    def execute(self, sql, parametri=()):
+        pocetak = time.perf_counter()
+        try:
+            return super().execute(sql, parametri)
+        finally:
+            zabelezi("sql", _skrati(sql), (time.perf_counter() - pocetak) * 1000)
+
+    def executemany(self, sql, parametri):
+        pocetak = time.perf_counter()
+        try:
+            return super().executemany(sql, parametri)
+        finally:
+            zabelezi("sql", _skrati(sql), (time.perf_counter() - pocetak) * 1000, max(self.rowcount, 0))
+
+
+class ProfilisanaVeza(sqlite3.Connection):
+    """Veza čiji kursori mere upite; koristi se samo kada je merenje uključeno."""
+
+    def cursor(self, factory=ProfilisaniKursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametri=()):
+        return self.cursor().execute(sql, parametri)
+
+    def executemany(self, sql, parametri):
+        return self.cursor().executemany(sql, parametri)
+
+
+# --- GUI: ZASTOJI I PANEL ---
+
+def pokreni_nadzor_petlje(roditelj):
+    """Periodično proverava da li GUI nit kasni i beleži zastoje duže od praga."""
+    if not UKLJUCENO:
+        return None
+    from PyQt6.QtCore import QTimer
+
+    tajmer = QTimer(roditelj)
+    prethodni = [time.perf_counter()]
+
+    def provera():
+        sada = time.perf_counter()
+        kasnjenje = (sada - prethodni[0]) * 1000 - INTERVAL_NADZORA_MS
+        prethodni[0] = sada
+        if kasnjenje > PRAG_ZASTOJA_MS:
+            poslednje["zastoj"] = ("GUI nit", kasnjenje, None)
+            log.warning("Zastoj GUI niti: %.0f ms", kasnjenje)
+
+    tajmer.timeout.connect(provera)
+    tajmer.start(INTERVAL_NADZORA_MS)
+    return tajmer
+
+
+def tekst_panela():
+    """Kratak prikaz poslednjih merenja za panel na dnu prozora."""
+    delovi = []
+    for vrsta, naslov in (("sql", "Upit"), ("ucitavanje", "Učitavanje"), ("tabela", "Tabela"),
+                          ("grafik", "Grafik"), ("pisanje", "Upis"), ("zastoj", "Zastoj")):
+        if vrsta in poslednje:
+            opis, ms, broj = poslednje[vrsta]
+            if vrsta in ("sql", "zastoj"):
+                delovi.append(f"{naslov}: {ms:.1f} ms")
+            else:
+                stavke = f", {broj} stavki" if broj is not None else ""
+                delovi.append(f"{naslov} {opis}: {ms:.0f} ms{stavke}")
+    return " | ".join(delovi)
+
+
+def napravi_panel():
+    """Labela sa poslednjim merenjima (osvežava se dva puta u sekundi) ili None."""
+    if not PANEL:
+        return None
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QLabel
+
+    panel = QLabel()
+    panel.setStyleSheet("padding: 2px 6px; color: #444; background-color: #f4f4f4; font-family: monospace;")
+    tajmer = QTimer(panel)
+    tajmer.timeout.connect(lambda: panel.setText(tekst_panela()))
+    tajmer.start(500)
+    return panel
@@ -0,0 +1,308 @@
+"""Dnevnik izmena za sinhronizaciju kopija baze između depoa.
+
+Okidači (baza._napravi_okidace_dnevnika) beleže u tabelu dnevnik_izmena svaki upis, izmenu i
+brisanje u tabelama vozovi, turnusi i turnus_vozovi, sa starim i novim stanjem reda kao JSON.
+Dnevnik se samo dopunjuje.
+
+Svaka kopija ima svoju oznaku (npr. naziv depoa) i izvozi segment sopstvenih izmena posle
+poslednjeg izvoza; ostale kopije ga primenjuju. Primenjuje se samo ono što kopija još nije
+primila od te oznake, a red se menja samo ako je u stanju u kome ga je izmena zatekla u izvornoj
+kopiji. Inače je to sukob: izmena se preskače i prijavljuje. Izmene primljene uvozom se u
+dnevniku vode pod oznakom izvora i ne izvoze se ponovo.
+
+Iz dnevnika se čita i šta su promenili drugi korisnici iste baze (radnici.PracenjeIzmena), da bi
+otvoreni prozor osvežio samo te redove.
+"""
+import gzip
+import json
+import sqlite3
+
+from analiza import osvezi_statistiku_turnusa, turnusi_vozova
+from baza import KOLONE_DNEVNIKA, json_reda_dnevnika
+
+FORMAT_SEGMENTA = 1
+
+# Polja reda koja ga određuju u svakoj kopiji
+KLJUCEVI = {
+    "vozovi": ("broj_voza",),
+    "turnusi": ("naziv",),
+    "turnus_vozovi": ("turnus", "broj_voza"),
+}
+
+# Uslov za red tabele x sa datim ključem
+_USLOVI = {
+    "vozovi": "x.broj_voza = ?",
+    "turnusi": "x.naziv = ?",
+    "turnus_vozovi": "x.turnus_id = (SELECT id FROM turnusi WHERE naziv = ?) AND x.broj_voza = ?",
+}
+
+RADNJE = {"I": "upis", "U": "izmena", "D": "brisanje"}
+
+# Najviše izmena koje pracenje_izmena() razvrstava po redovima; preko toga se osvežava sve
+MAX_PRACENIH_IZMENA = 500
+
+
+class IzvestajSinhronizacije:
+    """Rezultat primene segmenta dnevnika."""
+
+    def __init__(self, kopija):
+        self.kopija = kopija
+        self.primenjeno = 0
+        self.vec_primenjeno = 0  # izmene koje su već bile primenjene ili primljene
+        self.sukobi = []  # (id izmene, vreme, tabela, radnja, ključ, razlog)
+        self.vozovi = set()  # dotaknuti vozovi i turnusi (za osvežavanje prikaza)
+        self.turnusi = set()
+
+    def sazetak(self):
+        return (f"Kopija: {self.kopija}\n"
+                f"Primenjenih izmena: {self.primenjeno}\n"
+                f"Već primenjenih: {self.vec_primenjeno}\n"
+                f"Sukoba (preskočeno): {len(self.sukobi)}")
+
+
+# --- OZNAKA KOPIJE ---
+
+def oznaka_kopije(cursor):
+    red = cursor.execute("SELECT oznaka FROM kopija WHERE id = 1").fetchone()
+    return red[0] if red else None
+
+
+def postavi_oznaku(cursor, oznaka):
+    oznaka = oznaka.strip()
+    if not oznaka:
+        raise ValueError("Oznaka kopije ne može biti prazna.")
+    cursor.execute("INSERT INTO kopija (id, oznaka) VALUES (1, ?) ON CONFLICT(id) DO UPDATE SET oznaka = excluded.oznaka",
+                   (oznaka,))
+
+
+def stanje_dnevnika(cursor):
+    """(broj izmena u dnevniku, broj sopstvenih neizvezenih, [(kopija, poslednja primljena izmena)])."""
+    ukupno = cursor.execute("SELECT COUNT(*) FROM dnevnik_izmena").fetchone()[0]
+    red = cursor.execute("SELECT poslednji_izvoz FROM kopija WHERE id = 1").fetchone()
+    neizvezeno = cursor.execute("SELECT COUNT(*) FROM dnevnik_izmena WHERE id > ? AND izvor IS NULL",
+                                (red[0] if red else 0,)).fetchone()[0]
+    primljeno = cursor.execute("SELECT kopija, poslednji FROM primljeni_dnevnici ORDER BY kopija").fetchall()
+    return ukupno, neizvezeno, primljeno
+
+
+def poslednja_izmena(cursor):
+    """Id poslednje izmene u dnevniku (0 ako je prazan)."""
+    return cursor.execute("SELECT COALESCE(MAX(id), 0) FROM dnevnik_izmena").fetchone()[0]
+
+
+def izmene_posle(cursor, poslednja, preskoci=(), najvise=MAX_PRACENIH_IZMENA):
+    """Redovi izmenjeni posle izmene `poslednja`: (poslednja izmena, brojevi vozova, nazivi turnusa).
+
+    Izmene sa id u nekom od opsega (od, do] iz `preskoci` (sopstveni upisi) se ne računaju.
+    Umesto skupova vraća None, None kada je izmena više od `najvise` ili je dnevnik u međuvremenu
+    obrisan, pa treba osvežiti sve.
+    """
+    najnovija = poslednja_izmena(cursor)
+    if najnovija < poslednja:
+        return najnovija, None, None
+    preskoci = [(od, do) for od, do in preskoci if do > poslednja]
+    uslov = "".join(" AND id NOT BETWEEN ? AND ?" for _ in preskoci)
+    cursor.execute(f"SELECT tabela, staro, novo FROM dnevnik_izmena WHERE id > ?{uslov} ORDER BY id LIMIT ?",
+                   [poslednja] + [g for od, do in preskoci for g in (od + 1, do)] + [najvise + 1])
+    redovi = cursor.fetchall()
+    if len(redovi) > najvise:
+        return najnovija, None, None
+    vozovi, turnusi = set(), set()
+    for tabela, staro, novo in redovi:
+        for red in (staro, novo):
+            if red is None:
+                continue
+            red = json.loads(red)
+            if tabela == "vozovi":
+                vozovi.add(red["broj_voza"])
+            else:
+                turnusi.add(red["naziv" if tabela == "turnusi" else "turnus"])
+    turnusi.discard(None)
+    return najnovija, vozovi, turnusi
+
+
+# --- IZVOZ ---
+
+def izvezi_segment(cursor, putanja, od_pocetka=False):
+    """Upisuje u fajl (JSON, gzip) sopstvene izmene posle poslednjeg izvoza (ili sve);
+    vraća broj izvezenih izmena (0: nema novih izmena, fajl se ne pravi)."""
+    oznaka = oznaka_kopije(cursor)
+    if not oznaka:
+        raise ValueError("Kopija nema oznaku; unesite oznaku (npr. naziv depoa) pre izvoza.")
+    poslednji = cursor.execute("SELECT poslednji_izvoz FROM kopija WHERE id = 1").fetchone()[0]
+    od = 1 if od_pocetka else poslednji + 1
+    cursor.execute("""SELECT id, vreme, tabela, radnja, staro, novo FROM dnevnik_izmena
+                      WHERE id >= ? AND izvor IS NULL ORDER BY id""", (od,))
+    izmene = [[id_izmene, vreme, tabela, radnja, json.loads(staro) if staro else None,
+               json.loads(novo) if novo else None]
+              for id_izmene, vreme, tabela, radnja, staro, novo in cursor]
+    if not izmene:
+        return 0
+    do = izmene[-1][0]
+    segment = {"format": FORMAT_SEGMENTA, "kopija": oznaka, "od": od, "do": do, "izmene": izmene}
+    with gzip.open(putanja, "wt", encoding="utf-8") as f:
+        json.dump(segment, f, ensure_ascii=False, separators=(",", ":"))
+    cursor.execute("UPDATE kopija SET poslednji_izvoz = ? WHERE id = 1", (max(poslednji, do),))
+    return len(izmene)
+
+
+def ucitaj_segment(putanja):
+    """Čita segment iz fajla; neispravan fajl podiže ValueError."""
+    try:
+        with gzip.open(putanja, "rt", encoding="utf-8") as f:
+            segment = json.load(f)
+    except (OSError, EOFError, json.JSONDecodeError) as e:
+        raise ValueError(f"Fajl nije segment dnevnika izmena: {e}")
+    if not isinstance(segment, dict) or segment.get("format") != FORMAT_SEGMENTA:
+        raise ValueError("Nepoznat format segmenta dnevnika izmena.")
+    return segment
+
+
+# --- PRIMENA ---
+
+def _trenutni_red(cursor, tabela, red):
+    """Red tabele sa ključem reda `red` kao rečnik dnevnika ili None."""
+    nadjen = cursor.execute(f"SELECT {json_reda_dnevnika(tabela, 'x')} FROM {tabela} x WHERE {_USLOVI[tabela]}",
+                            [red[k] for k in KLJUCEVI[tabela]]).fetchone()
+    return json.loads(nadjen[0]) if nadjen else None
+
+
+def _vrednosti(tabela, red):
+    vrednosti = [red[polje] for polje, _ in KOLONE_DNEVNIKA[tabela]]
+    if tabela == "vozovi" and red["dani"] is not None:
+        vrednosti[-1] = bytes.fromhex(red["dani"])
+    return vrednosti
+
+
+def _upisi(cursor, tabela, staro, novo):
+    """Izvršava izmenu reda iz dnevnika (staro None: upis, novo None: brisanje)."""
+    kolone = [polje for polje, _ in KOLONE_DNEVNIKA[tabela]]
+    if tabela == "turnus_vozovi":
+        for red in (staro, novo):
+            if red is not None and not cursor.execute("SELECT 1 FROM turnusi WHERE naziv = ?", (red["turnus"],)).fetchone():
+                raise ValueError(f"Turnus {red['turnus']} ne postoji.")
+        kolone[0] = "turnus_id"
+        kolone_sql = ["(SELECT id FROM turnusi WHERE naziv = ?)"] + ["?"] * (len(kolone) - 1)
+    else:
+        kolone_sql = ["?"] * len(kolone)
+    uslov = _USLOVI[tabela].replace("x.", "")
+    kljuc = [staro[k] for k in KLJUCEVI[tabela]] if staro else None
+    if staro is None:
+        cursor.execute(f"INSERT INTO {tabela} ({', '.join(kolone)}) VALUES ({', '.join(kolone_sql)})",
+                       _vrednosti(tabela, novo))
+    elif novo is None:
+        if tabela == "turnusi":
+            # Statistika i keš provere nisu u dnevniku, ali sprečavaju brisanje turnusa (strani ključ)
+            for pomocna in ("statistika_turnusa", "provera_turnusa"):
+                cursor.execute(f"DELETE FROM {pomocna} WHERE turnus_id = (SELECT id FROM turnusi WHERE naziv = ?)",
+                               kljuc)
+        cursor.execute(f"DELETE FROM {tabela} WHERE {uslov}", kljuc)
+    else:
+        izmena = ", ".join(f"{k} = {v}" for k, v in zip(kolone, kolone_sql))
+        cursor.execute(f"UPDATE {tabela} SET {izmena} WHERE {uslov}", _vrednosti(tabela, novo) + kljuc)
+
+
+def _primeni_izmenu(cursor, tabela, staro, novo):
+    """Primenjuje jednu izmenu; vraća "primenjena", "vec" (ishod je već u bazi) ili razlog sukoba.
+    Upis koji baza odbije (npr. strani ključ) podiže izuzetak i ništa ne menja."""
+    trenutno = _trenutni_red(cursor, tabela, staro or novo)
+    if trenutno == staro:
+        cursor.execute("SAVEPOINT izmena_dnevnika")
+        try:
+            _upisi(cursor, tabela, staro, novo)
+        except BaseException:
+            cursor.execute("ROLLBACK TO izmena_dnevnika")
+            cursor.execute("RELEASE izmena_dnevnika")
+            raise
+        cursor.execute("RELEASE izmena_dnevnika")
+        return "primenjena"
+    if (novo is None and trenutno is None) or (novo is not None and _trenutni_red(cursor, tabela, novo) == novo):
+        return "vec"
+    if trenutno is None:
+        return "Red ne postoji."
+    return "Red već postoji." if staro is None else "Red je u međuvremenu izmenjen u ovoj kopiji."
+
+
+def _zabelezi(cursor, izvestaj, izmena, ishod):
+    id_izmene, vreme, tabela, radnja, staro, novo = izmena
+    if ishod == "vec":
+        izvestaj.vec_primenjeno += 1
+        return
+    if ishod != "primenjena":
+        kljuc = ", ".join(str((staro or novo)[k]) for k in KLJUCEVI[tabela])
+        izvestaj.sukobi.append((id_izmene, vreme, tabela, RADNJE[radnja], kljuc, ishod))
+        return
+    izvestaj.primenjeno += 1
+    for red in (staro, novo):
+        if red is None:
+            continue
+        if tabela == "vozovi":
+            izvestaj.vozovi.add(red["broj_voza"])
+            continue
+        turnus_id = cursor.execute("SELECT id FROM turnusi WHERE naziv = ?",
+                                   (red["naziv" if tabela == "turnusi" else "turnus"],)).fetchone()
+        if turnus_id:
+            izvestaj.turnusi.add(turnus_id[0])
+
+
+def _ponovi_odlozene(cursor, izvestaj, odlozene):
+    """Ponovo pokušava odložene izmene; vraća one koje baza i dalje odbija."""
+    ostale = []
+    for izmena in odlozene:
+        try:
+            ishod = _primeni_izmenu(cursor, izmena[2], izmena[4], izmena[5])
+        except (sqlite3.IntegrityError, ValueError):
+            ostale.append(izmena)
+            continue
+        _zabelezi(cursor, izvestaj, izmena, ishod)
+    return ostale
+
+
+def primeni_segment(cursor, segment):
+    """Primenjuje izmene segmenta koje kopija još nije primila; vraća IzvestajSinhronizacije.
+
+    Red se menja samo ako je u stanju u kome ga je izmena zatekla, inače je izmena sukob.
+    Izmena čiji je ishod već u bazi se samo broji. Izmena koju baza odbije zbog stranog ključa
+    (npr. veza turnusa koju je promena broja voza izmenila, a koja je u dnevniku pre same
+    promene broja) čeka i ponovo se pokušava posle svake sledeće primenjene izmene; ako ni na
+    kraju segmenta ne prođe, sukob je.
+    """
+    kopija = segment["kopija"]
+    if kopija == oznaka_kopije(cursor):
+        raise ValueError(f"Segment je izvezen iz ove kopije ({kopija}).")
+    red = cursor.execute("SELECT poslednji FROM primljeni_dnevnici WHERE kopija = ?", (kopija,)).fetchone()
+    poslednji = red[0] if red else 0
+    if segment["od"] > poslednji + 1:
+        raise ValueError(f"Nedostaju izmene kopije {kopija}: primljene su do {poslednji}, "
+                         f"a segment počinje od {segment['od']}. Uvezite prethodni segment.")
+
+    izvestaj = IzvestajSinhronizacije(kopija)
+    odlozene = []
+    cursor.execute("INSERT INTO primena_dnevnika (kopija) VALUES (?)", (kopija,))
+    try:
+        for izmena in segment["izmene"]:
+            if izmena[0] <= poslednji:
+                izvestaj.vec_primenjeno += 1
+                continue
+            try:
+                ishod = _primeni_izmenu(cursor, izmena[2], izmena[4], izmena[5])
+            except (sqlite3.IntegrityError, ValueError):
+                odlozene.append(izmena)
+                continue
+            _zabelezi(cursor, izvestaj, izmena, ishod)
+            if ishod == "primenjena" and odlozene:
+                odlozene = _ponovi_odlozene(cursor, izvestaj, odlozene)
+        for izmena in odlozene:
+            try:
+                ishod = _primeni_izmenu(cursor, izmena[2], izmena[4], izmena[5])
+            except (sqlite3.IntegrityError, ValueError) as e:
+                ishod = str(e)
+            _zabelezi(cursor, izvestaj, izmena, ishod)
+    finally:
+        cursor.execute("DELETE FROM primena_dnevnika")
+    cursor.execute("""INSERT INTO primljeni_dnevnici (kopija, poslednji) VALUES (?, ?)
+                      ON CONFLICT(kopija) DO UPDATE SET poslednji = MAX(poslednji, excluded.poslednji)""",
+                   (kopija, segment["do"]))
+    izvestaj.turnusi |= turnusi_vozova(cursor, izvestaj.vozovi)
+    osvezi_statistiku_turnusa(cursor, izvestaj.turnusi)
+    return izvestaj
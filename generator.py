@@ -0,0 +1,160 @@
+import argparse
+import os
+import random
+import sqlite3
+import string
+
+import analiza
+from baza import napravi_tabele
+from uvoz import SQL_UPISA_VOZA
+
+# Veličine za merenje: (broj vozova, broj turnusa)
+SCENARIJI = {
+    "mala": (1000, 100),
+    "srednja": (10000, 1000),
+    "velika": (50000, 5000),
+}
+
+SEKCIJE = ["NS", "BG", "KV", "NI", "SU", "ZR"]
+SERIJE = ["413", "412", "711", "444", "461", "441"]
+# Statusi sa približnim udelom u stvarnom redu vožnje
+STATUSI = ["R"] * 14 + ["L", "RE", "S", "V"]
+
+DAN = 24 * 60
+
+
+def _stanice(rng, broj):
+    """Pravi jedinstvene šifre stanica od 2-3 slova."""
+    stanice = set()
+    while len(stanice) < broj:
+        stanice.add("".join(rng.choice(string.ascii_uppercase) for _ in range(rng.choice((2, 3)))))
+    return sorted(stanice)
+
+
+def _voz(broj, pocetna, krajnja, polazak, dolazak, serija, sekcija, status):
+    """Red tabele vozovi; vremena su u minutima od ponoći (dolazak može preći u sledeći dan).
+    Generisani vozovi saobraćaju svakog dana (dani = NULL)."""
+    polazak %= DAN
+    dolazak %= DAN
+    return (broj, pocetna, krajnja, polazak // 60, polazak % 60, dolazak // 60, dolazak % 60,
+            serija, status, sekcija, None)
+
+
+def _lanac(rng, stanice, duzina, udeo_prelaznih):
+    """Niz vožnji jednog turnusa: (pocetna, krajnja, polazak, dolazak) u minutima.
+
+    Svaka vožnja kreće iz stanice u koju je prethodna stigla, posle kraćeg zadržavanja.
+    Poslednja vožnja je sa verovatnoćom `udeo_prelaznih` prelazna: kreće uveče i stiže
+    posle ponoći, ali pre polaska prve vožnje turnusa (kao što provera turnusa zahteva).
+    """
+    stanica = rng.choice(stanice)
+    prvi_polazak = rng.randint(3 * 60, 8 * 60)
+    vreme = prvi_polazak
+    prelazni = rng.random() < udeo_prelaznih
+    voznje = []
+    for k in range(duzina):
+        sledeca = rng.choice(stanice)
+        while sledeca == stanica:
+            sledeca = rng.choice(stanice)
+        if prelazni and k == duzina - 1:
+            polazak = max(vreme, rng.randint(21 * 60, 23 * 60 + 30))
+            dolazak = DAN + rng.randint(5, prvi_polazak - 10)
+            if polazak >= DAN or dolazak <= polazak:
+                break
+        else:
+            polazak = vreme
+            dolazak = polazak + rng.randint(20, 150)
+            if dolazak >= DAN - 1:
+                break
+        voznje.append((stanica, sledeca, polazak, dolazak))
+        stanica = sledeca
+        vreme = dolazak + rng.randint(10, 90)
+    return voznje
+
+
+def generisi_bazu(putanja, broj_vozova, broj_turnusa, seme=1, udeo_prelaznih=0.3, udeo_neispravnih=0.02):
+    """Pravi bazu kompatibilnu sa data/baza.db popunjenu sintetičkim redom vožnje.
+
+    Vozovi koji ne pripadaju nijednom turnusu dobijaju slučajna vremena (i oni mogu biti
+    prelazni). Mali udeo turnusa (`udeo_neispravnih`) ima zamenjena dva susedna voza, da bi
+    provera turnusa imala i greške za prijavu. Isti `seme` uvek daje istu bazu.
+    Vraća (broj vozova, broj turnusa) koliko je zaista upisano.
+    """
+    rng = random.Random(seme)
+    stanice = _stanice(rng, max(20, broj_vozova // 100))
+    # Prosečan turnus ima ~8 vozova, ali ne više nego što vozova ima
+    prosek = max(1, min(8, broj_vozova // max(1, broj_turnusa)))
+
+    vozovi = []
+    turnusi = []
+    turnus_vozovi = []
+    sledeci_broj = 10000
+    for turnus_id in range(1, broj_turnusa + 1):
+        preostalo = broj_vozova - len(vozovi)
+        if preostalo <= 0:
+            break
+        sekcija = rng.choice(SEKCIJE)
+        serija = rng.choice(SERIJE)
+        duzina = min(preostalo, rng.randint(max(1, prosek - 2), prosek + 2))
+        brojevi = []
+        for pocetna, krajnja, polazak, dolazak in _lanac(rng, stanice, duzina, udeo_prelaznih):
+            broj = str(sledeci_broj)
+            sledeci_broj += 1
+            vozovi.append(_voz(broj, pocetna, krajnja, polazak, dolazak, serija, sekcija, rng.choice(STATUSI)))
+            brojevi.append(broj)
+        if len(brojevi) > 1 and rng.random() < udeo_neispravnih:
+            k = rng.randrange(len(brojevi) - 1)
+            brojevi[k], brojevi[k + 1] = brojevi[k + 1], brojevi[k]
+        turnusi.append((turnus_id, f"{sekcija}-{turnus_id:04d}", sekcija, serija))
+        turnus_vozovi.extend((turnus_id, broj, redosled) for redosled, broj in enumerate(brojevi, 1))
+
+    # Ostali vozovi (van turnusa)
+    while len(vozovi) < broj_vozova:
+        pocetna, krajnja = rng.sample(stanice, 2)
+        polazak = rng.randint(0, DAN - 1)
+        if rng.random() < udeo_prelaznih / 3:
+            dolazak = DAN + rng.randint(0, min(polazak, 6 * 60))
+            polazak = max(polazak, 20 * 60)
+        else:
+            dolazak = min(polazak + rng.randint(20, 240), DAN - 1)
+        vozovi.append(_voz(str(sledeci_broj), pocetna, krajnja, polazak, dolazak,
+                           rng.choice(SERIJE), rng.choice(SEKCIJE), rng.choice(STATUSI)))
+        sledeci_broj += 1
+
+    os.makedirs(os.path.dirname(putanja) or ".", exist_ok=True)
+    conn = sqlite3.connect(putanja)
+    try:
+        cursor = conn.cursor()
+        napravi_tabele(cursor)
+        cursor.executemany(SQL_UPISA_VOZA, vozovi)
+        cursor.executemany("INSERT INTO turnusi (id, naziv, sekcija, serija_vv) VALUES (?, ?, ?, ?)", turnusi)
+        cursor.executemany("INSERT INTO turnus_vozovi (turnus_id, broj_voza, redosled) VALUES (?, ?, ?)",
+                           turnus_vozovi)
+        analiza.osvezi_statistiku_turnusa(cursor)
+        # Generisana baza je početno stanje, a ne izmena koju treba sinhronizovati sa drugim kopijama
+        cursor.execute("DELETE FROM dnevnik_izmena")
+        conn.commit()
+    finally:
+        conn.close()
+    return len(vozovi), len(turnusi)
+
+
+# --- POKRETANJE IZ KOMANDNE LINIJE ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pravi sintetičku bazu vozova i turnusa za merenje performansi.")
+    parser.add_argument("putanja", help="putanja nove baze (npr. /tmp/merenje/data/baza.db)")
+    parser.add_argument("--scenario", choices=SCENARIJI, default="mala")
+    parser.add_argument("--vozova", type=int, help="broj vozova (umesto scenarija)")
+    parser.add_argument("--turnusa", type=int, help="broj turnusa (umesto scenarija)")
+    parser.add_argument("--seme", type=int, default=1)
+    parser.add_argument("--prepisi", action="store_true", help="prepiši postojeću bazu")
+    args = parser.parse_args()
+
+    if os.path.exists(args.putanja):
+        if not args.prepisi:
+            parser.error(f"{args.putanja} već postoji (koristi --prepisi).")
+        os.remove(args.putanja)
+    broj_vozova, broj_turnusa = SCENARIJI[args.scenario]
+    upisano = generisi_bazu(args.putanja, args.vozova or broj_vozova, args.turnusa or broj_turnusa, args.seme)
+    print(f"{args.putanja}: {upisano[0]} vozova, {upisano[1]} turnusa")
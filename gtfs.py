@@ -0,0 +1,279 @@
+import csv
+import io
+import itertools
+import json
+import os
+import zipfile
+
+import analiza
+from uvoz import SQL_UPISA_VOZA
+from validacija import proveri_podatke_voza
+
+# Broj redova stop_times.txt koji se obrađuju u jednom delu
+VELICINA_DELA = 100000
+
+# Podrazumevane vrednosti kada mapiranje ne navodi seriju/sekciju/status za rutu
+PODRAZUMEVANO = {"serija": "", "sekcija": "", "status": "R"}
+
+
+class IzvestajGtfs:
+    """Rezultat uvoza GTFS feed-a."""
+
+    def __init__(self):
+        self.putovanja = 0
+        self.novi = 0
+        self.izmenjeni = 0
+        self.nepromenjeni = 0
+        self.uklonjeni = []  # brojevi vozova kojih više nema u feed-u
+        self.skraceni_turnusi = 0  # turnusi iz kojih su uklonjeni obrisani vozovi
+        self.rucni = []  # ručno uneti vozovi sa istim brojem kao putovanje iz feed-a (nisu prepisani)
+        self.greske = []  # (trip_id, broj voza, poruka)
+
+    def sazetak(self):
+        return (f"Putovanja u feed-u: {self.putovanja}\n"
+                f"Novih vozova: {self.novi}\n"
+                f"Izmenjenih vozova: {self.izmenjeni}\n"
+                f"Nepromenjenih: {self.nepromenjeni}\n"
+                f"Vozova kojih više nema u feed-u: {len(self.uklonjeni)}\n"
+                f"Turnusa iz kojih su uklonjeni obrisani vozovi: {self.skraceni_turnusi}\n"
+                f"Ručno unetih vozova sa istim brojem (nisu prepisani): {len(self.rucni)}\n"
+                f"Putovanja sa greškom: {len(self.greske)}")
+
+
+# --- ČITANJE FEED-A ---
+
+class FeedGtfs:
+    """Pristup fajlovima GTFS feed-a iz direktorijuma ili ZIP arhive."""
+
+    def __init__(self, putanja):
+        self.putanja = putanja
+        self.zip = zipfile.ZipFile(putanja) if zipfile.is_zipfile(putanja) else None
+
+    def postoji(self, naziv):
+        if self.zip:
+            return naziv in self.zip.namelist()
+        return os.path.exists(os.path.join(self.putanja, naziv))
+
+    def redovi(self, naziv):
+        """Vraća csv.DictReader nad fajlom; fajl se čita red po red."""
+        if self.zip:
+            f = io.TextIOWrapper(self.zip.open(naziv), encoding="utf-8-sig", newline="")
+        else:
+            f = open(os.path.join(self.putanja, naziv), encoding="utf-8-sig", newline="")
+        with f:
+            yield from csv.DictReader(f)
+
+    def zatvori(self):
+        if self.zip:
+            self.zip.close()
+
+
+def ucitaj_mapiranje(putanja):
+    """Učitava JSON fajl mapiranja.
+
+    Primer:
+        {"stanice": {"stop_id": "NS"},
+         "rute": {"route_id ili route_short_name": {"serija": "413", "sekcija": "NS", "status": "R"}},
+         "podrazumevano": {"serija": "413", "sekcija": "NS", "status": "R"}}
+    """
+    if not putanja:
+        return {}
+    with open(putanja, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _vreme(tekst):
+    """GTFS vreme (hh:mm:ss, sati mogu biti ≥ 24) pretvara u (sat, minut) u okviru dana."""
+    delovi = (tekst or "").strip().split(":")
+    if len(delovi) < 2:
+        raise ValueError(f"Neispravno vreme '{tekst}'.")
+    return int(delovi[0]) % 24, int(delovi[1])
+
+
+def procitaj_feed(putanja, mapiranje=None, javi_napredak=None, velicina_dela=VELICINA_DELA):
+    """Izvodi redove tabele vozovi iz GTFS feed-a.
+
+    stop_times.txt se čita u delovima i za svako putovanje se pamti samo prva i
+    poslednja stanica, pa memorija zavisi od broja putovanja, a ne od veličine fajla.
+    Vraća (vozovi, greske): vozovi je rečnik trip_id -> red spreman za upis.
+    """
+    mapiranje = mapiranje or {}
+    stanice_map = mapiranje.get("stanice", {})
+    rute_map = mapiranje.get("rute", {})
+    podrazumevano = {**PODRAZUMEVANO, **mapiranje.get("podrazumevano", {})}
+
+    feed = FeedGtfs(putanja)
+    try:
+        rute = {}
+        if feed.postoji("routes.txt"):
+            for red in feed.redovi("routes.txt"):
+                rute[red["route_id"]] = red.get("route_short_name", "")
+
+        stop_kodovi = {}
+        if feed.postoji("stops.txt"):
+            for red in feed.redovi("stops.txt"):
+                if red.get("stop_code"):
+                    stop_kodovi[red["stop_id"]] = red["stop_code"]
+
+        putovanja = {}  # trip_id -> (broj voza, route_id)
+        for red in feed.redovi("trips.txt"):
+            putovanja[red["trip_id"]] = ((red.get("trip_short_name") or "").strip().upper(), red["route_id"])
+
+        # trip_id -> [seq, stop_id, vreme] za prvu i poslednju stanicu
+        prve = {}
+        poslednje = {}
+        procitano = 0
+        citac = feed.redovi("stop_times.txt")
+        while True:
+            deo = list(itertools.islice(citac, velicina_dela))
+            if not deo:
+                break
+            for red in deo:
+                trip_id = red["trip_id"]
+                if trip_id not in putovanja:
+                    continue
+                seq = int(red["stop_sequence"])
+                prva = prve.get(trip_id)
+                if prva is None or seq < prva[0]:
+                    prve[trip_id] = (seq, red["stop_id"], red.get("departure_time") or red.get("arrival_time"))
+                poslednja = poslednje.get(trip_id)
+                if poslednja is None or seq > poslednja[0]:
+                    poslednje[trip_id] = (seq, red["stop_id"], red.get("arrival_time") or red.get("departure_time"))
+            procitano += len(deo)
+            if javi_napredak:
+                javi_napredak(procitano)
+    finally:
+        feed.zatvori()
+
+    vozovi = {}
+    greske = []
+    for trip_id, (broj, route_id) in putovanja.items():
+        if trip_id not in prve:
+            greske.append((trip_id, broj, "Putovanje nema nijedno stajanje u stop_times.txt."))
+            continue
+        _, stop_p, vreme_p = prve[trip_id]
+        _, stop_d, vreme_d = poslednje[trip_id]
+        ruta = rute_map.get(route_id) or rute_map.get(rute.get(route_id, "")) or {}
+        ruta = {**podrazumevano, **ruta}
+        try:
+            sat_p, min_p = _vreme(vreme_p)
+            sat_d, min_d = _vreme(vreme_d)
+            voz = proveri_podatke_voza({
+                "broj_voza": broj,
+                "pocetna_stanica": str(stanice_map.get(stop_p) or stop_kodovi.get(stop_p) or stop_p).upper(),
+                "krajnja_stanica": str(stanice_map.get(stop_d) or stop_kodovi.get(stop_d) or stop_d).upper(),
+                "sat_polaska": str(sat_p), "minut_polaska": str(min_p),
+                "sat_dolaska": str(sat_d), "minut_dolaska": str(min_d),
+                "serija_vozila": str(ruta["serija"]).upper(),
+                "status": str(ruta["status"]).upper(),
+                "sekcija": str(ruta["sekcija"]).upper(),
+            })
+        except ValueError as e:
+            greske.append((trip_id, broj, str(e).replace("\n- ", " ").replace("\n", " ")))
+            continue
+        vozovi[trip_id] = voz
+    return vozovi, greske
+
+
+# --- UPIS ---
+
+def _otisak(voz):
+    return "|".join("" if v is None else str(v) for v in voz)
+
+
+def _rucni_vozovi(cursor, brojevi, velicina_dela=500):
+    """Brojevi iz `brojevi` koji postoje u tabeli vozovi."""
+    brojevi = list(brojevi)
+    postojeci = set()
+    for i in range(0, len(brojevi), velicina_dela):
+        deo = brojevi[i:i + velicina_dela]
+        cursor.execute(f"SELECT broj_voza FROM vozovi WHERE broj_voza IN ({', '.join('?' * len(deo))})", deo)
+        postojeci.update(broj for broj, in cursor)
+    return postojeci
+
+
+def primeni_feed(cursor, vozovi, greske, obrisi_uklonjene=False, prepisi_rucne=False):
+    """Upisuje samo nova i izmenjena putovanja u okviru tekuće transakcije.
+
+    Za svako putovanje pamti se otisak izvedenog reda (tabela gtfs_putovanja), pa ponovni
+    uvoz istog feed-a ne menja ništa, a novi feed menja samo vozove čiji su se podaci promenili.
+    Voz sa brojem putovanja koji nije došao iz GTFS-a (unet ručno ili uvozom fajla) se ne
+    prepisuje, već se prijavljuje u izvestaj.rucni i greškama, osim uz `prepisi_rucne`.
+    Voz putovanja kojeg više nema u feed-u ostaje GTFS voz i kada se ne obriše, pa ga isto
+    putovanje u nekom kasnijem feed-u ponovo menja.
+    """
+    prethodni = {}  # trip_id -> (broj voza, otisak) putovanja iz prethodnog feed-a
+    iz_gtfs = set()  # brojevi svih vozova iz GTFS-a, i onih čijeg putovanja više nema
+    for broj, trip_id, otisak in cursor.execute("SELECT broj_voza, trip_id, otisak FROM gtfs_putovanja"):
+        iz_gtfs.add(broj)
+        if otisak is not None:
+            prethodni[trip_id] = (broj, otisak)
+
+    izvestaj = IzvestajGtfs()
+    izvestaj.putovanja = len(vozovi) + len(greske)
+    izvestaj.greske = list(greske)
+
+    za_upis = []
+    putovanja_za_upis = []
+    brojevi = {}  # broj voza -> trip_id koji ga je prvi dao
+    promenjena = []
+    for trip_id, voz in vozovi.items():
+        broj = voz[0]
+        if broj in brojevi:
+            izvestaj.greske.append((trip_id, broj, f"Broj voza već daje putovanje {brojevi[broj]}."))
+            continue
+        brojevi[broj] = trip_id
+        otisak = _otisak(voz)
+        stari = prethodni.get(trip_id)
+        if stari == (broj, otisak):
+            izvestaj.nepromenjeni += 1
+            continue
+        promenjena.append((trip_id, voz, otisak, stari))
+
+    # Brojevi vozova iz GTFS-a smeju da se menjaju; ostali postojeći su ručni
+    rucni = set()
+    if not prepisi_rucne:
+        rucni = _rucni_vozovi(cursor, {voz[0] for _, voz, _, _ in promenjena} - iz_gtfs)
+
+    for trip_id, voz, otisak, stari in promenjena:
+        broj = voz[0]
+        if broj in rucni:
+            izvestaj.rucni.append(broj)
+            izvestaj.greske.append((trip_id, broj, f"Voz {broj} već postoji i nije iz GTFS-a; nije prepisan."))
+            continue
+        if stari is None and broj not in iz_gtfs:
+            izvestaj.novi += 1
+        else:
+            izvestaj.izmenjeni += 1
+        za_upis.append(voz)
+        putovanja_za_upis.append((trip_id, broj, otisak))
+
+    cursor.executemany(SQL_UPISA_VOZA, za_upis)
+    cursor.executemany("INSERT INTO gtfs_putovanja (trip_id, broj_voza, otisak) VALUES (?, ?, ?) "
+                       "ON CONFLICT(broj_voza) DO UPDATE SET trip_id = excluded.trip_id, otisak = excluded.otisak",
+                       putovanja_za_upis)
+
+    # Putovanja kojih više nema u feed-u (putovanja sa greškom se ne računaju kao uklonjena) i stari
+    # brojevi putovanja kojima se promenio broj voza: voz ostaje GTFS voz bez putovanja (otisak NULL),
+    # osim ako je njegov broj u ovom uvozu preuzelo drugo putovanje
+    u_feedu = set(vozovi) | {trip_id for trip_id, _, _ in greske}
+    bez_putovanja = [(prethodni[t][0], t) for t in prethodni if t not in u_feedu]
+    bez_putovanja += [(prethodni[t][0], t) for t, broj, _ in putovanja_za_upis
+                      if t in prethodni and prethodni[t][0] != broj]
+    cursor.executemany("UPDATE gtfs_putovanja SET otisak = NULL WHERE broj_voza = ? AND trip_id = ?",
+                       bez_putovanja)
+    # Vozovi koje je korisnik u međuvremenu obrisao se više ne prate
+    cursor.execute("DELETE FROM gtfs_putovanja WHERE otisak IS NULL "
+                   "AND broj_voza NOT IN (SELECT broj_voza FROM vozovi)")
+    cursor.execute("SELECT broj_voza FROM gtfs_putovanja WHERE otisak IS NULL ORDER BY broj_voza")
+    izvestaj.uklonjeni = [broj for broj, in cursor]
+    dotaknuti = set()
+    if obrisi_uklonjene:
+        dotaknuti = analiza.ukloni_vozove_iz_turnusa(cursor, izvestaj.uklonjeni)
+        izvestaj.skraceni_turnusi = len(dotaknuti)
+        cursor.executemany("DELETE FROM vozovi WHERE broj_voza = ?", [(b,) for b in izvestaj.uklonjeni])
+        cursor.execute("DELETE FROM gtfs_putovanja WHERE otisak IS NULL")
+    # Statistika turnusa čiji su se vozovi promenili
+    dotaknuti |= analiza.turnusi_vozova(cursor, [voz[0] for voz in za_upis])
+    analiza.osvezi_statistiku_turnusa(cursor, dotaknuti)
+    return izvestaj
@@ -0,0 +1,118 @@
+"""Poništavanje i ponavljanje izmena vozova i turnusa (undo/redo).
+
+Svaka izmena se pamti kao Korak: stanje samo onih redova koje je dotakla, pre i posle izmene.
+Poništavanje upisuje stanje "pre", a ponavljanje stanje "posle", u jednoj transakciji i samo
+za redove koji se razlikuju. Pre upisa se proverava da su redovi i dalje onakvi kakve ih je
+korak ostavio, pa se izmena koja je u međuvremenu stigla drugim putem (uvoz, GTFS, otvaranje
+verzije) ne prepisuje.
+"""
+from analiza import osvezi_statistiku_turnusa, turnusi_vozova
+from baza import KOLONE_VOZOVI
+
+# Najviše koraka koji se pamte za poništavanje
+MAX_KORAKA = 100
+
+
+def stanje(cursor, vozovi=(), turnusi=()):
+    """Snimak navedenih redova: {"vozovi": {broj: red}, "turnusi": {id: (naziv, sekcija, serija_vv,
+    ((broj voza, redosled), ...))}}; red koji ne postoji je None."""
+    snimak = {"vozovi": {}, "turnusi": {}}
+    for broj in vozovi:
+        snimak["vozovi"][broj] = cursor.execute(
+            f"SELECT {', '.join(KOLONE_VOZOVI)} FROM vozovi WHERE broj_voza = ?", (broj,)).fetchone()
+    for turnus_id in turnusi:
+        red = cursor.execute("SELECT naziv, sekcija, serija_vv FROM turnusi WHERE id = ?", (turnus_id,)).fetchone()
+        if red is not None:
+            red += (tuple(cursor.execute("SELECT broj_voza, redosled FROM turnus_vozovi WHERE turnus_id = ? "
+                                         "ORDER BY redosled", (turnus_id,)).fetchall()),)
+        snimak["turnusi"][turnus_id] = red
+    return snimak
+
+
+class Korak:
+    """Jedna izmena: opis i stanje dotaknutih redova pre i posle nje.
+
+    Pravi se u operaciji pisača pre izmene; pored navedenih vozova pamte se i turnusi u kojima
+    su (promena broja ili brisanje voza menja i njih). Posle izmene se poziva zavrsi().
+    """
+
+    def __init__(self, cursor, opis, vozovi=(), turnusi=()):
+        self.opis = opis
+        self.vozovi = list(dict.fromkeys(vozovi))
+        self.turnusi = sorted(set(turnusi) | turnusi_vozova(cursor, self.vozovi))
+        self.pre = stanje(cursor, self.vozovi, self.turnusi)
+        self.posle = None
+
+    def zavrsi(self, cursor, turnusi=()):
+        """Pamti stanje posle izmene; `turnusi` su novi turnusi (pre izmene nisu postojali)."""
+        for turnus_id in turnusi:
+            if turnus_id not in self.pre["turnusi"]:
+                self.turnusi.append(turnus_id)
+                self.pre["turnusi"][turnus_id] = None
+        self.posle = stanje(cursor, self.vozovi, self.turnusi)
+        return self
+
+
+def primeni(cursor, ocekivano, cilj):
+    """Vraća dotaknute redove u stanje `cilj` ako su sada u stanju `ocekivano`.
+
+    Ako se neki red u međuvremenu promenio, podiže ValueError i ništa ne menja. Vozovi se
+    upisuju pre turnusa, a brišu posle njih (strani ključ turnus_vozovi -> vozovi).
+    """
+    trenutno = stanje(cursor, cilj["vozovi"], cilj["turnusi"])
+    if trenutno != ocekivano:
+        raise ValueError("Vozovi ili turnusi iz ove izmene su u međuvremenu promenjeni drugim putem.")
+    for broj, red in cilj["vozovi"].items():
+        if red is not None and red != trenutno["vozovi"][broj]:
+            cursor.execute(
+                f"INSERT INTO vozovi ({', '.join(KOLONE_VOZOVI)}) VALUES ({', '.join('?' * len(KOLONE_VOZOVI))}) "
+                f"ON CONFLICT(broj_voza) DO UPDATE SET {', '.join(f'{k} = excluded.{k}' for k in KOLONE_VOZOVI[1:])}",
+                red)
+    for turnus_id, turnus in cilj["turnusi"].items():
+        if turnus == trenutno["turnusi"][turnus_id]:
+            continue
+        cursor.execute("DELETE FROM turnus_vozovi WHERE turnus_id = ?", (turnus_id,))
+        if turnus is None:
+            cursor.execute("DELETE FROM statistika_turnusa WHERE turnus_id = ?", (turnus_id,))
+            cursor.execute("DELETE FROM provera_turnusa WHERE turnus_id = ?", (turnus_id,))
+            cursor.execute("DELETE FROM turnusi WHERE id = ?", (turnus_id,))
+            continue
+        naziv, sekcija, serija_vv, vozovi = turnus
+        cursor.execute("""
+            INSERT INTO turnusi (id, naziv, sekcija, serija_vv) VALUES (?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET naziv = excluded.naziv, sekcija = excluded.sekcija,
+                serija_vv = excluded.serija_vv
+        """, (turnus_id, naziv, sekcija, serija_vv))
+        cursor.executemany("INSERT INTO turnus_vozovi (turnus_id, broj_voza, redosled) VALUES (?, ?, ?)",
+                           [(turnus_id, broj, redosled) for broj, redosled in vozovi])
+    cursor.executemany("DELETE FROM vozovi WHERE broj_voza = ?",
+                       [(broj,) for broj, red in cilj["vozovi"].items()
+                        if red is None and trenutno["vozovi"][broj] is not None])
+    osvezi_statistiku_turnusa(cursor, [t for t, turnus in cilj["turnusi"].items() if turnus is not None])
+
+
+class Istorija:
+    """Stekovi koraka za poništavanje i ponavljanje (poslednji korak je na kraju liste)."""
+
+    def __init__(self, max_koraka=MAX_KORAKA):
+        self.max_koraka = max_koraka
+        self.ponistivi = []
+        self.ponovljivi = []
+
+    def dodaj(self, korak):
+        """Nova izmena briše korake za ponavljanje."""
+        self.ponistivi.append(korak)
+        del self.ponistivi[:-self.max_koraka]
+        self.ponovljivi.clear()
+
+    def ponisten(self, korak):
+        self.ponistivi.remove(korak)
+        self.ponovljivi.append(korak)
+
+    def ponovljen(self, korak):
+        self.ponovljivi.remove(korak)
+        self.ponistivi.append(korak)
+
+    def obrisi(self):
+        self.ponistivi.clear()
+        self.ponovljivi.clear()
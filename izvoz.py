@@ -0,0 +1,282 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+
+from baza import otvori_vezu, napravi_tabele
+import analiza
+import kalendar
+import red_voznje
+from validacija import ucitaj_info_vozova, ucitaj_pravila_obrta, proveri_vozove_turnusa
+
+# Broj redova koji se čita iz kursora i upisuje u jednom delu
+VELICINA_DELA = 5000
+
+FORMATI = ("csv", "jsonl", "parquet")
+
+# Kolone izvoza: (naziv, tip) gde je tip 'str', 'int' ili 'lista'
+KOLONE_VOZOVA = [
+    ("broj_voza", "str"), ("pocetna_stanica", "str"), ("krajnja_stanica", "str"),
+    ("sat_polaska", "int"), ("minut_polaska", "int"), ("sat_dolaska", "int"), ("minut_dolaska", "int"),
+    ("status", "str"), ("sekcija", "str"), ("serija_vozila", "str"), ("dani", "str"),
+]
+KOLONE_TURNUSA = [
+    ("id", "int"), ("naziv", "str"), ("serija_vv", "str"), ("sekcija", "str"), ("vozovi", "lista"),
+]
+KOLONE_VALIDACIJE = [
+    ("id", "int"), ("naziv", "str"), ("serija_vv", "str"), ("sekcija", "str"),
+    ("ispravan", "int"), ("vrsta_greske", "str"), ("greske", "lista"),
+]
+KOLONE_FLOTE = [
+    ("serija_vv", "str"), ("minut", "int"), ("vreme", "str"),
+    ("vozila", "int"), ("u_voznji", "int"), ("na_cekanju", "int"),
+]
+
+
+# --- PISAČI FORMATA ---
+
+class _PisacCsv:
+    def __init__(self, putanja, kolone):
+        self.kolone = [k for k, _ in kolone]
+        self.liste = {k for k, tip in kolone if tip == "lista"}
+        self.fajl = open(putanja, "w", newline="", encoding="utf-8")
+        self.csv = csv.writer(self.fajl)
+        self.csv.writerow(self.kolone)
+
+    def upisi(self, redovi):
+        for red in redovi:
+            self.csv.writerow([", ".join(red[k]) if k in self.liste else red[k] for k in self.kolone])
+
+    def zatvori(self):
+        self.fajl.close()
+
+
+class _PisacJsonl:
+    def __init__(self, putanja, kolone):
+        self.fajl = open(putanja, "w", encoding="utf-8")
+
+    def upisi(self, redovi):
+        self.fajl.writelines(json.dumps(red, ensure_ascii=False) + "\n" for red in redovi)
+
+    def zatvori(self):
+        self.fajl.close()
+
+
+class _PisacParquet:
+    def __init__(self, putanja, kolone):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Za izvoz u Parquet potreban je paket pyarrow (pip install pyarrow).")
+        tipovi = {"str": pa.string(), "int": pa.int64(), "lista": pa.list_(pa.string())}
+        self.pa = pa
+        self.sema = pa.schema([(k, tipovi[tip]) for k, tip in kolone])
+        # Svaki deo postaje jedna grupa redova, pa se fajl piše postepeno
+        self.pisac = pq.ParquetWriter(putanja, self.sema)
+
+    def upisi(self, redovi):
+        if redovi:
+            self.pisac.write_table(self.pa.Table.from_pylist(redovi, schema=self.sema))
+
+    def zatvori(self):
+        self.pisac.close()
+
+
+def otvori_pisaca(format_izvoza, putanja, kolone):
+    pisaci = {"csv": _PisacCsv, "jsonl": _PisacJsonl, "parquet": _PisacParquet}
+    if format_izvoza not in pisaci:
+        raise ValueError(f"Nepoznat format izvoza '{format_izvoza}' (podržani: {', '.join(FORMATI)}).")
+    return pisaci[format_izvoza](putanja, kolone)
+
+
+def format_po_putanji(putanja):
+    """Format izvoza prema ekstenziji fajla (.csv, .jsonl, .parquet)."""
+    ekstenzija = os.path.splitext(putanja)[1].lower().lstrip(".")
+    return {"json": "jsonl", "ndjson": "jsonl"}.get(ekstenzija, ekstenzija)
+
+
+def _uslov_filtera(uslovi, parametri, kolona, vrednosti):
+    """Dodaje WHERE uslov za filter po sekciji/seriji (None znači bez filtera, kao 'Označi sve')."""
+    if vrednosti is not None:
+        vrednosti = list(vrednosti)
+        uslovi.append(f"COALESCE({kolona}, '') IN ({','.join('?' * len(vrednosti)) or 'NULL'})")
+        parametri.extend(vrednosti)
+
+
+def _delovi(cursor, velicina_dela):
+    while True:
+        redovi = cursor.fetchmany(velicina_dela)
+        if not redovi:
+            return
+        yield redovi
+
+
+# --- IZVOZ ---
+
+def izvezi_vozove(conn, putanja, format_izvoza=None, sekcije=None, serije=None, velicina_dela=VELICINA_DELA):
+    """Izvozi vozove (opciono samo izabrane sekcije i serije) i vraća broj izvezenih redova."""
+    uslovi, parametri = [], []
+    _uslov_filtera(uslovi, parametri, "sekcija", sekcije)
+    _uslov_filtera(uslovi, parametri, "serija_vozila", serije)
+    kolone = [k for k, _ in KOLONE_VOZOVA]
+    sql = f"SELECT {', '.join(kolone)} FROM vozovi"
+    if uslovi:
+        sql += " WHERE " + " AND ".join(uslovi)
+    cursor = conn.cursor()
+    period = kalendar.ucitaj_period(cursor)
+    cursor.execute(sql + " ORDER BY broj_voza", parametri)
+
+    pisac = otvori_pisaca(format_izvoza or format_po_putanji(putanja), putanja, KOLONE_VOZOVA)
+    ukupno = 0
+    try:
+        for redovi in _delovi(cursor, velicina_dela):
+            # Dani se izvoze kao opis (npr. "R,-25.12.2025"), isti kakav prima uvoz
+            pisac.upisi([{**dict(zip(kolone, red)),
+                          "dani": period.opis(kalendar.iz_bajtova(red[-1])) if period and red[-1] else ""}
+                         for red in redovi])
+            ukupno += len(redovi)
+    finally:
+        pisac.zatvori()
+    return ukupno
+
+
+def turnusi_sa_vozovima(conn, sekcije=None, serije_vv=None, velicina_dela=VELICINA_DELA):
+    """Prolazi kroz turnuse sa vozovima u redosledu, čitajući kursor u delovima."""
+    uslovi, parametri = [], []
+    _uslov_filtera(uslovi, parametri, "t.sekcija", sekcije)
+    _uslov_filtera(uslovi, parametri, "t.serija_vv", serije_vv)
+    sql = """
+        SELECT t.id, t.naziv, t.serija_vv, t.sekcija, tv.broj_voza
+        FROM turnusi t
+        LEFT JOIN turnus_vozovi tv ON tv.turnus_id = t.id
+    """
+    if uslovi:
+        sql += " WHERE " + " AND ".join(uslovi)
+    cursor = conn.cursor()
+    cursor.execute(sql + " ORDER BY t.naziv, t.id, tv.redosled", parametri)
+
+    turnus = None
+    for redovi in _delovi(cursor, velicina_dela):
+        for turnus_id, naziv, serija_vv, sekcija, broj_voza in redovi:
+            if turnus is None or turnus["id"] != turnus_id:
+                if turnus is not None:
+                    yield turnus
+                turnus = {"id": turnus_id, "naziv": naziv, "serija_vv": serija_vv or "",
+                          "sekcija": sekcija or "", "vozovi": []}
+            if broj_voza is not None:
+                turnus["vozovi"].append(broj_voza)
+    if turnus is not None:
+        yield turnus
+
+
+def _upisi_u_delovima(pisac, stavke, velicina_dela):
+    ukupno = 0
+    deo = []
+    for stavka in stavke:
+        deo.append(stavka)
+        if len(deo) >= velicina_dela:
+            pisac.upisi(deo)
+            ukupno += len(deo)
+            deo = []
+    pisac.upisi(deo)
+    return ukupno + len(deo)
+
+
+def izvezi_turnuse(conn, putanja, format_izvoza=None, sekcije=None, serije_vv=None, velicina_dela=VELICINA_DELA):
+    """Izvozi turnuse sa vozovima u redosledu i vraća broj izvezenih turnusa."""
+    pisac = otvori_pisaca(format_izvoza or format_po_putanji(putanja), putanja, KOLONE_TURNUSA)
+    try:
+        return _upisi_u_delovima(pisac, turnusi_sa_vozovima(conn, sekcije, serije_vv, velicina_dela),
+                                 velicina_dela)
+    finally:
+        pisac.zatvori()
+
+
+def rezultati_validacije(conn, sekcije=None, serije_vv=None, velicina_dela=VELICINA_DELA):
+    """Proverava svaki turnus istim pravilima kao dugme 'Proveri turnus'.
+
+    Sa paketom numpy turnusi se proveravaju vektorski u delovima (red_voznje), a poruke
+    o greškama se prave samo za turnuse koji nisu prošli.
+    """
+    red = red_voznje.ucitaj(conn)
+    vozovi_info = red.info_vozova() if red else ucitaj_info_vozova(conn.cursor())
+    pravila = ucitaj_pravila_obrta(conn.cursor())
+    period = kalendar.ucitaj_period(conn.cursor())
+    turnusi = turnusi_sa_vozovima(conn, sekcije, serije_vv, velicina_dela)
+    while True:
+        deo = list(itertools.islice(turnusi, velicina_dela))
+        if not deo:
+            return
+        if red:
+            ispravni = red.ispravni_turnusi([(t["vozovi"], t["serija_vv"]) for t in deo], pravila)
+        else:
+            ispravni = [False] * len(deo)
+        for turnus, ispravan in zip(deo, ispravni):
+            if not turnus["vozovi"]:
+                vrsta, greske = 'prazan', ["Turnus nema nijedan voz."]
+            elif ispravan:
+                vrsta, greske = None, []
+            else:
+                vrsta, greske = proveri_vozove_turnusa(turnus["vozovi"], vozovi_info, turnus["serija_vv"], pravila,
+                                                       period)
+            yield {"id": turnus["id"], "naziv": turnus["naziv"], "serija_vv": turnus["serija_vv"],
+                   "sekcija": turnus["sekcija"], "ispravan": int(vrsta is None),
+                   "vrsta_greske": vrsta or "", "greske": greske}
+
+
+def izvezi_validaciju(conn, putanja, format_izvoza=None, sekcije=None, serije_vv=None,
+                      velicina_dela=VELICINA_DELA):
+    """Izvozi rezultate provere svih turnusa i vraća broj izvezenih turnusa."""
+    pisac = otvori_pisaca(format_izvoza or format_po_putanji(putanja), putanja, KOLONE_VALIDACIJE)
+    try:
+        return _upisi_u_delovima(pisac, rezultati_validacije(conn, sekcije, serije_vv, velicina_dela),
+                                 velicina_dela)
+    finally:
+        pisac.zatvori()
+
+
+def izvezi_flotu(conn, putanja, format_izvoza=None, sekcije=None, serije_vv=None, velicina_dela=VELICINA_DELA,
+                 tip_dana=None):
+    """Izvozi broj vozila u vožnji i na čekanju po seriji VV za svaki minut dana (potreban numpy).
+
+    `tip_dana` (R, S ili N, kalendar.TIPOVI_DANA) ograničava izvoz na vozove koji tada saobraćaju.
+    """
+    kriva = analiza.kriva_flote(conn, red_voznje.ucitaj(conn), sekcije, serije_vv,
+                                kalendar.maska_tipa_dana(conn.cursor(), tip_dana))
+    pisac = otvori_pisaca(format_izvoza or format_po_putanji(putanja), putanja, KOLONE_FLOTE)
+    try:
+        return _upisi_u_delovima(pisac, kriva.redovi(), velicina_dela)
+    finally:
+        pisac.zatvori()
+
+
+# --- POKRETANJE IZ KOMANDNE LINIJE (npr. noćni izvoz) ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Izvoz vozova, turnusa, rezultata provere i flote iz baze.")
+    parser.add_argument("direktorijum", help="direktorijum u koji se upisuju fajlovi")
+    parser.add_argument("--format", choices=FORMATI, default="csv")
+    parser.add_argument("--baza", help="putanja do baze (podrazumevano data/baza.db)")
+    parser.add_argument("--sekcija", action="append", help="samo navedene sekcije (može više puta)")
+    parser.add_argument("--serija", action="append", help="samo navedene serije (može više puta)")
+    parser.add_argument("--dani", choices=list(kalendar.TIPOVI_DANA),
+                        help="flota samo za tip dana (R radni dan, S subota, N nedelja i praznik)")
+    args = parser.parse_args()
+
+    os.makedirs(args.direktorijum, exist_ok=True)
+    conn = otvori_vezu(args.baza)
+    try:
+        # Baza starije verzije dobija nove kolone (npr. dane saobraćanja) kao pri otvaranju aplikacije
+        napravi_tabele(conn.cursor())
+        conn.commit()
+        izvozi = [("vozovi", izvezi_vozove), ("turnusi", izvezi_turnuse), ("validacija", izvezi_validaciju)]
+        if red_voznje.np is not None:
+            izvozi.append(("flota", lambda *a: izvezi_flotu(*a, tip_dana=args.dani)))
+        for naziv, funkcija in izvozi:
+            putanja = os.path.join(args.direktorijum, f"{naziv}.{args.format}")
+            broj = funkcija(conn, putanja, args.format, args.sekcija, args.serija)
+            print(f"{putanja}: {broj}")
+    finally:
+        conn.close()
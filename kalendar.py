@@ -0,0 +1,270 @@
+"""Dani saobraćanja vozova: period reda vožnje, tipovi dana i bitmaske dana.
+
+Bit i maske je i-ti dan perioda reda vožnje (bit 0 je prvi dan). Voz bez maske (NULL u
+koloni vozovi.dani) saobraća svakog dana; maska se u bazi čuva kao BLOB (jedan bit po
+danu, little-endian), a u memoriji kao Python int, pa je presek dva skupa dana `a & b`.
+
+Dani se unose tekstom, npr. "R" (radnim danima), "S,N", "1-5", "R,-25.12.2025", "6,+1.5.2026":
+R je radni dan (ponedeljak-petak bez praznika), S subota, a N nedelja i praznik; brojevi
+su dani u nedelji (1 = ponedeljak); +datum dodaje, a -datum uklanja jedan dan.
+"""
+import datetime
+import functools
+import itertools
+import re
+
+# Tipovi dana redom kojim se prikazuju
+TIPOVI_DANA = {"R": "Radni dan", "S": "Subota", "N": "Nedelja i praznik"}
+
+# Državni praznici sa fiksnim datumom koji su neradni (dan, mesec)
+PRAZNICI = [(1, 1), (2, 1), (7, 1), (15, 2), (16, 2), (1, 5), (2, 5), (11, 11)]
+
+
+def pravoslavni_uskrs(godina):
+    """Datum pravoslavnog Uskrsa (julijanski računski postupak, pomeren na gregorijanski kalendar)."""
+    a, b, c = godina % 4, godina % 7, godina % 19
+    d = (19 * c + 15) % 30
+    e = (2 * a + 4 * b - d + 34) % 7
+    mesec, dan = divmod(d + e + 114, 31)
+    return datetime.date(godina, mesec, dan + 1) + datetime.timedelta(days=13)
+
+
+@functools.lru_cache(maxsize=None)
+def praznici(godina):
+    """Neradni praznici u godini: fiksni datumi (nedeljom se praznuje i prvi naredni dan)
+    i Uskrs od Velikog petka do Vaskršnjeg ponedeljka."""
+    dani = {datetime.date(godina, mesec, dan) for dan, mesec in PRAZNICI}
+    for datum in sorted(dani):
+        if datum.weekday() == 6:
+            sledeci = datum + datetime.timedelta(days=1)
+            while sledeci in dani:
+                sledeci += datetime.timedelta(days=1)
+            dani.add(sledeci)
+    uskrs = pravoslavni_uskrs(godina)
+    dani.update(uskrs + datetime.timedelta(days=k) for k in (-2, -1, 0, 1))
+    return dani
+
+
+def _datum(tekst):
+    """'25.12.' ili '25.12.2025' u (dan, mesec, godina ili None)."""
+    pogodak = re.fullmatch(r"(\d{1,2})\.(\d{1,2})\.(\d{4})?\.?", tekst.strip())
+    if not pogodak:
+        _neispravno(tekst)
+    dan, mesec, godina = pogodak.groups()
+    return int(dan), int(mesec), int(godina) if godina else None
+
+
+def _neispravno(tekst):
+    raise ValueError(f"Neispravni dani saobraćanja '{tekst}' (npr. R, S, N, 1-5, +25.12.2025, -1.5.2026).")
+
+
+class Period:
+    """Period reda vožnje: prvi dan i broj dana koje pokrivaju maske."""
+
+    def __init__(self, pocetak, broj_dana):
+        self.pocetak = pocetak
+        self.broj_dana = broj_dana
+        self.sve = (1 << broj_dana) - 1
+        self._tipovi = None
+        self._dani_u_nedelji = None  # maska za svaki dan u nedelji (indeks 0 = ponedeljak)
+        self._kandidati = None  # (opis, maska) za opis()
+        self._opisi = {}  # maska -> opis; vozovi često imaju iste dane
+
+    def __eq__(self, drugi):
+        return isinstance(drugi, Period) and (self.pocetak, self.broj_dana) == (drugi.pocetak, drugi.broj_dana)
+
+    def __repr__(self):
+        return f"Period({self.pocetak}, {self.broj_dana})"
+
+    @property
+    def kraj(self):
+        return self.pocetak + datetime.timedelta(days=self.broj_dana - 1)
+
+    def datumi(self):
+        return (self.pocetak + datetime.timedelta(days=i) for i in range(self.broj_dana))
+
+    def tip_dana(self, datum):
+        if datum in praznici(datum.year) or datum.weekday() == 6:
+            return "N"
+        return "S" if datum.weekday() == 5 else "R"
+
+    def maska_tipa(self, tip):
+        """Maska svih dana perioda datog tipa (R, S ili N)."""
+        if self._tipovi is None:
+            self._tipovi = dict.fromkeys(TIPOVI_DANA, 0)
+            for i, datum in enumerate(self.datumi()):
+                self._tipovi[self.tip_dana(datum)] |= 1 << i
+        return self._tipovi[tip]
+
+    def maska_dana_u_nedelji(self, dani_u_nedelji):
+        """Maska dana perioda koji padaju na navedene dane u nedelji (1 = ponedeljak ... 7 = nedelja)."""
+        if self._dani_u_nedelji is None:
+            self._dani_u_nedelji = [0] * 7
+            for i, datum in enumerate(self.datumi()):
+                self._dani_u_nedelji[datum.weekday()] |= 1 << i
+        maska = 0
+        for dan in dani_u_nedelji:
+            maska |= self._dani_u_nedelji[dan - 1]
+        return maska
+
+    def _indeks_datuma(self, dan, mesec, godina, tekst):
+        for i, datum in enumerate(self.datumi()):
+            if (datum.day, datum.month) == (dan, mesec) and godina in (None, datum.year):
+                return i
+        raise ValueError(f"Datum '{tekst}' nije u periodu reda vožnje "
+                         f"{self.pocetak:%d.%m.%Y}-{self.kraj:%d.%m.%Y}.")
+
+    def maska(self, opis):
+        """Maska iz tekstualnog opisa dana; prazan opis ili svi dani perioda daju None (svaki dan)."""
+        osnova, dodati, uklonjeni = 0, [], []
+        ima_osnovu = False
+        for deo in (opis or "").replace(";", ",").split(","):
+            deo = deo.strip().upper()
+            if not deo:
+                continue
+            if deo[0] in "+-":
+                i = self._indeks_datuma(*_datum(deo[1:]), deo[1:])
+                (dodati if deo[0] == "+" else uklonjeni).append(i)
+                continue
+            ima_osnovu = True
+            if deo in TIPOVI_DANA:
+                osnova |= self.maska_tipa(deo)
+            elif re.fullmatch(r"[1-7](-[1-7])?", deo):
+                od, _, do = deo.partition("-")
+                osnova |= self.maska_dana_u_nedelji(range(int(od), int(do or od) + 1))
+            else:
+                _neispravno(opis)
+        maska = osnova if ima_osnovu else self.sve
+        for i in dodati:
+            maska |= 1 << i
+        for i in uklonjeni:
+            maska &= ~(1 << i)
+        if not maska:
+            raise ValueError(f"Voz sa danima '{opis}' ne saobraća nijednog dana u periodu reda vožnje.")
+        return None if maska == self.sve else maska
+
+    def opis(self, maska):
+        """Najkraći opis maske: tipovi dana ili dani u nedelji uz što manje izuzetaka."""
+        if maska is None or maska == self.sve:
+            return ""
+        opis = self._opisi.get(maska)
+        if opis is not None:
+            return opis
+        if self._kandidati is None:
+            self._kandidati = []
+            tipovi = list(TIPOVI_DANA)
+            for n in range(1, len(tipovi) + 1):
+                for izbor in itertools.combinations(tipovi, n):
+                    self._kandidati.append((",".join(izbor), sum(self.maska_tipa(t) for t in izbor)))
+            for n in range(1, 7):
+                for izbor in itertools.combinations(range(1, 8), n):
+                    self._kandidati.append((_opis_dana_u_nedelji(izbor), self.maska_dana_u_nedelji(izbor)))
+            self._kandidati.append(("", self.sve))
+        osnova_opis, osnova = min(self._kandidati, key=lambda k: bin(k[1] ^ maska).count("1"))
+        delovi = [osnova_opis] if osnova_opis else []
+        razlika = maska ^ osnova
+        for i, datum in enumerate(self.datumi()):
+            if razlika >> i & 1:
+                delovi.append(f"{'+' if maska >> i & 1 else '-'}{datum.day}.{datum.month}.{datum.year}")
+        opis = self._opisi[maska] = ",".join(delovi)
+        return opis
+
+
+def _opis_dana_u_nedelji(dani):
+    delovi = []
+    for _, grupa in itertools.groupby(enumerate(dani), lambda par: par[1] - par[0]):
+        grupa = [dan for _, dan in grupa]
+        delovi.append(str(grupa[0]) if len(grupa) == 1 else f"{grupa[0]}-{grupa[-1]}")
+    return ",".join(delovi)
+
+
+# --- PERIOD REDA VOŽNJE ---
+
+def promena_reda_voznje(godina):
+    """Dan početka reda vožnje u godini: druga nedelja decembra."""
+    prvi = datetime.date(godina, 12, 1)
+    return prvi + datetime.timedelta(days=(6 - prvi.weekday()) % 7 + 7)
+
+
+def podrazumevani_period(danas=None):
+    """Period reda vožnje koji važi danas (od jedne do sledeće promene reda vožnje)."""
+    danas = danas or datetime.date.today()
+    pocetak = promena_reda_voznje(danas.year)
+    if danas < pocetak:
+        pocetak = promena_reda_voznje(danas.year - 1)
+    return Period(pocetak, (promena_reda_voznje(pocetak.year + 1) - pocetak).days)
+
+
+def period_iz_oznake(oznaka):
+    """Period iz oznake godine sa grafika, npr. "15.12.2025/26." (godinu dana od datuma) ili None."""
+    pogodak = re.match(r"\s*(\d{1,2})\.(\d{1,2})\.(\d{4})", oznaka or "")
+    if not pogodak:
+        return None
+    dan, mesec, godina = map(int, pogodak.groups())
+    try:
+        pocetak = datetime.date(godina, mesec, dan)
+        return Period(pocetak, (datetime.date(godina + 1, mesec, dan) - pocetak).days)
+    except ValueError:
+        return None
+
+
+def ucitaj_period(cursor):
+    """Period iz baze ili None ako još nijedan voz nema zadate dane."""
+    red = cursor.execute("SELECT pocetak, broj_dana FROM period_reda_voznje").fetchone()
+    return Period(datetime.date.fromisoformat(red[0]), red[1]) if red else None
+
+
+def period_za_unos(cursor, oznaka=None):
+    """Period prema kome se čitaju uneti dani: iz baze, iz oznake godine ili podrazumevani."""
+    return ucitaj_period(cursor) or period_iz_oznake(oznaka) or podrazumevani_period()
+
+
+def upisi_period(cursor, period):
+    """Upisuje period uz prvu masku dana; maske su vezane za prvi dan perioda, pa se upisan
+    period više ne menja. Ako je u bazi drugi period, podiže ValueError."""
+    postojeci = ucitaj_period(cursor)
+    if postojeci is None:
+        cursor.execute("INSERT INTO period_reda_voznje (id, pocetak, broj_dana) VALUES (1, ?, ?)",
+                       (period.pocetak.isoformat(), period.broj_dana))
+    elif postojeci != period:
+        raise ValueError(f"Dani su zadati za period od {period.pocetak:%d.%m.%Y}, a u bazi je period "
+                         f"od {postojeci.pocetak:%d.%m.%Y}.")
+
+
+# --- MASKE ---
+
+def maska_tipa_dana(cursor, tip):
+    """Maska dana tipa `tip` (R, S ili N) prema periodu iz baze; None (svi dani) ako tip nije
+    zadat ili nijedan voz nema zadate dane."""
+    period = ucitaj_period(cursor) if tip else None
+    return period.maska_tipa(tip) if period else None
+
+
+def iz_bajtova(vrednost):
+    """BLOB iz baze u masku (None ostaje None: svaki dan)."""
+    return None if vrednost is None else int.from_bytes(vrednost, "little")
+
+
+def u_bajtove(maska):
+    return None if maska is None else maska.to_bytes((maska.bit_length() + 7) // 8 or 1, "little")
+
+
+def klase_dana(maske):
+    """Deli dane na klase u kojima saobraća isti skup vozova.
+
+    `maske` su maske vozova (int); vraća listu (maska klase, indeksi vozova koji tada saobraćaju).
+    Klase se dobijaju presecima: svaki voz deli svaku postojeću klasu na dane kada saobraća i ostale.
+    """
+    unija = 0
+    for maska in maske:
+        unija |= maska
+    klase = [(unija, [])]
+    for i, maska in enumerate(maske):
+        nove = []
+        for dani, clanovi in klase:
+            if dani & maska:
+                nove.append((dani & maska, clanovi + [i]))
+            if dani & ~maska:
+                nove.append((dani & ~maska, clanovi))
+        klase = nove
+    return klase
@@ -0,0 +1,308 @@
+"""Merenje performansi učitavanja, provere i crtanja na sintetičkim podacima.
+
+Za svaki scenario pravi se nova baza (generator.py) u privremenom direktorijumu,
+aplikacija se pokreće bez prozora (Qt platforma 'offscreen') i meri se trajanje
+glavnih operacija, broj stavki na sceni grafika i vrh zauzete memorije.
+Proverava se i plan izvršavanja (EXPLAIN QUERY PLAN) ključnih upita.
+
+    python merenje.py --scenario mala srednja --izlaz rezultati.json
+    python merenje.py --osnova rezultati.json   # izlazni kod 1 ako je nešto sporije
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import qInstallMessageHandler
+from PyQt6.QtWidgets import QApplication, QMessageBox
+
+import probe
+from baza import DB_PATH
+from generator import SCENARIJI, generisi_bazu
+from izvoz import turnusi_sa_vozovima
+from validacija import ucitaj_info_vozova, ucitaj_pravila_obrta, proveri_vozove_turnusa
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Najduže čekanje da se pozadinsko učitavanje ili upis završi
+ROK_CEKANJA = 600  # sekundi
+
+# Plan ključnih upita: (naziv, upit, mora da sadrži, ne sme da sadrži) — regularni izrazi nad EXPLAIN QUERY PLAN
+PROVERE_PLANA = [
+    ("provera turnusa: vozovi po broju",
+     "SELECT broj_voza FROM vozovi WHERE broj_voza IN (?, ?, ?)",
+     [r"SEARCH vozovi USING"], [r"\bSCAN vozovi\b"]),
+    ("tabela vozova sortirana po broju",
+     "SELECT * FROM vozovi ORDER BY broj_voza ASC",
+     [], [r"TEMP B-TREE"]),
+    ("uređivanje turnusa: vozovi turnusa",
+     """SELECT v.broj_voza FROM turnus_vozovi tv JOIN vozovi v ON tv.broj_voza = v.broj_voza
+        WHERE tv.turnus_id = ? ORDER BY tv.redosled""",
+     [r"SEARCH tv USING", r"SEARCH v USING"], [r"\bSCAN (tv|v)\b"]),
+    ("grafik: vozovi izabranih turnusa",
+     """SELECT tv.turnus_id, tv.redosled, tv.broj_voza FROM turnus_vozovi tv
+        JOIN vozovi v ON tv.broj_voza = v.broj_voza
+        WHERE tv.turnus_id IN (?, ?) ORDER BY tv.turnus_id, tv.redosled""",
+     [r"SEARCH tv USING", r"SEARCH v USING"], [r"\bSCAN (tv|v)\b"]),
+    ("tabela turnusa: vozovi svih turnusa",
+     """SELECT tv.turnus_id, v.broj_voza FROM turnus_vozovi tv JOIN vozovi v ON tv.broj_voza = v.broj_voza
+        ORDER BY tv.turnus_id, tv.redosled""",
+     [r"SEARCH v USING"], [r"\bSCAN v\b"]),
+    ("pretraga: polasci iz stanice u prozoru",
+     """SELECT broj_voza FROM vozovi WHERE pocetna_stanica = ? AND polazak_min >= ? AND polazak_min < ?
+        ORDER BY polazak_min, broj_voza""",
+     [r"SEARCH vozovi USING INDEX idx_vozovi_polazak"], [r"\bSCAN vozovi\b"]),
+    ("pretraga: dolasci u stanicu u prozoru",
+     """SELECT broj_voza FROM vozovi WHERE krajnja_stanica = ? AND dolazak_min >= ? AND dolazak_min < ?
+        ORDER BY dolazak_min, broj_voza""",
+     [r"SEARCH vozovi USING INDEX idx_vozovi_dolazak"], [r"\bSCAN vozovi\b"]),
+    ("čuvanje turnusa: turnus po nazivu",
+     "SELECT id FROM turnusi WHERE naziv = ?",
+     [r"SEARCH turnusi USING"], [r"\bSCAN turnusi\b"]),
+]
+
+# Operacije koje se mere, redom
+POPUNJAVANJE_FILTERA = [
+    "populate_vozovi_filter", "populate_sekcije_filter", "populate_serije_filter",
+    "populate_nazivi_filter", "populate_sekcije_turnusi_filter", "populate_serije_vv_filter",
+    "populate_grafik_filter",
+]
+
+
+def proveri_planove(putanja):
+    """Vraća listu poruka za upite čiji plan ne odgovara očekivanom."""
+    conn = sqlite3.connect(putanja)
+    greske = []
+    try:
+        for naziv, sql, mora, ne_sme in PROVERE_PLANA:
+            plan = "\n".join(red[3] for red in conn.execute("EXPLAIN QUERY PLAN " + sql, [1] * sql.count("?")))
+            for izraz in mora:
+                if not re.search(izraz, plan):
+                    greske.append(f"{naziv}: plan ne sadrži '{izraz}'\n{plan}")
+            for izraz in ne_sme:
+                if re.search(izraz, plan):
+                    greske.append(f"{naziv}: plan sadrži '{izraz}'\n{plan}")
+    finally:
+        conn.close()
+    return greske
+
+
+def vrh_memorije_mb():
+    """Najveća zauzeta memorija procesa do sada (RSS), u MB."""
+    if resource is None:
+        return None
+    vrh = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux javlja KB, macOS bajtove
+    return round(vrh / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Merenje:
+    """Pokreće aplikaciju nad jednom bazom i meri operacije."""
+
+    def __init__(self, app, ponavljanja, prati_python_memoriju):
+        self.app = app
+        self.ponavljanja = ponavljanja
+        self.prati_python_memoriju = prati_python_memoriju
+        self.rezultati = {}
+        self.greske = []
+        self.prozor = None
+
+    def cekaj(self, uslov):
+        """Obrađuje događaje dok je `uslov()` tačan (npr. dok učitavanje traje)."""
+        rok = time.monotonic() + ROK_CEKANJA
+        while uslov():
+            if time.monotonic() > rok:
+                raise TimeoutError("Operacija nije završena na vreme.")
+            self.app.processEvents()
+            time.sleep(0.001)
+        self.app.processEvents()
+
+    def u_toku(self):
+        """Da li pozadinsko učitavanje ili upis još traje."""
+        w = self.prozor
+        return (w.pisac.na_cekanju() or w.kanal_vozova.zauzet() or w.kanal_turnusa.zauzet()
+                or w.kanal_grafika.zauzet())
+
+    def izmeri(self, naziv, operacija, ponavljanja=None):
+        """Meri operaciju zajedno sa pozadinskim poslom koji ona pokrene."""
+        trajanja = []
+        vrh_python = 0
+        for _ in range(ponavljanja or self.ponavljanja):
+            if self.prati_python_memoriju:
+                tracemalloc.start()
+            pocetak = time.perf_counter()
+            operacija()
+            self.cekaj(self.u_toku)
+            trajanja.append(time.perf_counter() - pocetak)
+            if self.prati_python_memoriju:
+                vrh_python = max(vrh_python, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+        rezultat = {
+            "sekunde_min": round(min(trajanja), 4),
+            "sekunde_medijana": round(statistics.median(trajanja), 4),
+            "rss_mb": vrh_memorije_mb(),
+        }
+        if self.prati_python_memoriju:
+            rezultat["python_vrh_mb"] = round(vrh_python / (1024 * 1024), 1)
+        self.rezultati[naziv] = rezultat
+        print(f"  {naziv:<40} {rezultat['sekunde_medijana']:>9.3f} s  (min {rezultat['sekunde_min']:.3f} s)"
+              f"  RSS {rezultat['rss_mb']} MB")
+        return rezultat
+
+    def pokreni(self):
+        def napravi_prozor():
+            self.prozor = probe.SimpleApp()
+            self.prozor.show()
+
+        self.izmeri("pokretanje (SimpleApp)", napravi_prozor, ponavljanja=1)
+        w = self.prozor
+
+        for naziv in POPUNJAVANJE_FILTERA:
+            # Stari checkbox-ovi se brišu tek obradom događaja (deleteLater)
+            self.izmeri(naziv, lambda n=naziv: (getattr(w, n)(), self.app.processEvents()))
+
+        self.izmeri("ucitaj_podatke", w.ucitaj_podatke)
+        self.rezultati["redova_vozova"] = w.tabela.rowCount()
+        self.izmeri("ucitaj_turnuse", w.ucitaj_turnuse)
+        self.rezultati["redova_turnusa"] = w.tabela_turnusa.rowCount()
+
+        # Provera najdužeg ispravnog turnusa
+        turnus = self.najduzi_ispravan_turnus()
+
+        def proveri():
+            w.odustani_od_uredjivanja_turnusa()
+            self.popuni_formu(*turnus)
+            w.proveri_turnus()
+            if "je ispravan" not in w.status_label.text():
+                self.greske.append(f"proveri_turnus: {w.status_label.text()}")
+
+        self.izmeri("proveri_turnus", proveri)
+
+        # Čuvanje novog turnusa (sa osvežavanjem filtera i tabela koje sledi posle upisa)
+        brojac = iter(range(1, 1000))
+
+        def sacuvaj():
+            w.odustani_od_uredjivanja_turnusa()
+            naziv, serija_vv, sekcija, vozovi = turnus
+            self.popuni_formu(f"MERENJE-{next(brojac)}", serija_vv, sekcija, vozovi)
+            w.sacuvaj_izmene_turnusa()
+
+        self.izmeri("sacuvaj_izmene_turnusa", sacuvaj)
+
+        self.izmeri("crtaj_grafik", w.crtaj_grafik)
+        self.rezultati["stavke_scene"] = len(w.scene.items())
+
+        w.close()
+        w.deleteLater()
+        self.app.processEvents()
+
+    def najduzi_ispravan_turnus(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            info = ucitaj_info_vozova(conn.cursor())
+            pravila = ucitaj_pravila_obrta(conn.cursor())
+            ispravni = [t for t in turnusi_sa_vozovima(conn)
+                        if t["vozovi"] and proveri_vozove_turnusa(t["vozovi"], info, t["serija_vv"], pravila)[0] is None]
+        finally:
+            conn.close()
+        t = max(ispravni, key=lambda t: len(t["vozovi"]))
+        return t["naziv"], t["serija_vv"], t["sekcija"], t["vozovi"]
+
+    def popuni_formu(self, naziv, serija_vv, sekcija, vozovi):
+        w = self.prozor
+        w.naziv_turnusa_input.setText(naziv)
+        w.serija_vv_input.setText(serija_vv)
+        w.sekcija_voza_input.setText(sekcija)
+        w.vozovi_input.setText(", ".join(vozovi))
+
+
+def meri_scenario(app, scenario, ponavljanja, prati_python_memoriju, seme):
+    broj_vozova, broj_turnusa = SCENARIJI[scenario]
+    direktorijum = tempfile.mkdtemp(prefix=f"merenje_{scenario}_")
+    stari_direktorijum = os.getcwd()
+    try:
+        # Aplikacija koristi relativnu putanju data/baza.db
+        os.chdir(direktorijum)
+        vozova, turnusa = generisi_bazu(DB_PATH, broj_vozova, broj_turnusa, seme)
+        print(f"\n== {scenario}: {vozova} vozova, {turnusa} turnusa ==")
+
+        merenje = Merenje(app, ponavljanja, prati_python_memoriju)
+        merenje.greske.extend(proveri_planove(DB_PATH))
+        merenje.pokreni()
+        return merenje.rezultati, merenje.greske
+    finally:
+        os.chdir(stari_direktorijum)
+        shutil.rmtree(direktorijum, ignore_errors=True)
+
+
+def uporedi(rezultati, osnova, tolerancija, prag):
+    """Vraća poruke za operacije koje su sporije od osnove više od dozvoljenog."""
+    regresije = []
+    for scenario, koraci in rezultati.items():
+        for naziv, vrednost in koraci.items():
+            stara = osnova.get(scenario, {}).get(naziv)
+            if not isinstance(vrednost, dict) or not isinstance(stara, dict):
+                continue
+            novo, staro = vrednost["sekunde_medijana"], stara["sekunde_medijana"]
+            if novo > staro * tolerancija and novo - staro > prag:
+                regresije.append(f"{scenario} / {naziv}: {staro:.3f} s -> {novo:.3f} s")
+    return regresije
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merenje performansi na sintetičkim podacima.")
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIJI, default=["mala"])
+    parser.add_argument("--ponavljanja", type=int, default=3)
+    parser.add_argument("--seme", type=int, default=1)
+    parser.add_argument("--izlaz", help="JSON fajl u koji se upisuju rezultati")
+    parser.add_argument("--osnova", help="JSON rezultati ranijeg merenja za poređenje")
+    parser.add_argument("--tolerancija", type=float, default=1.5, help="dozvoljen odnos novo/staro")
+    parser.add_argument("--prag", type=float, default=0.05, help="razlika u sekundama ispod koje se ne prijavljuje")
+    parser.add_argument("--python-memorija", action="store_true",
+                        help="meri i vrh Python alokacija (tracemalloc, usporava merenje)")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    # Offscreen platforma upozorava pri svakom prikazu prozora; to nije deo rezultata
+    qInstallMessageHandler(lambda vrsta, kontekst, poruka: None if "propagateSizeHints" in poruka
+                           else print(poruka, file=sys.stderr))
+    # Poruke bi u offscreen režimu blokirale merenje
+    greske_poruka = []
+    QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)
+    QMessageBox.question = staticmethod(lambda *a, **k: QMessageBox.StandardButton.Yes)
+    QMessageBox.critical = staticmethod(lambda roditelj, naslov, tekst, *a, **k: greske_poruka.append(tekst))
+
+    rezultati = {}
+    greske = []
+    for scenario in args.scenario:
+        rezultati[scenario], greske_scenarija = meri_scenario(
+            app, scenario, args.ponavljanja, args.python_memorija, args.seme)
+        greske.extend(f"{scenario}: {g}" for g in greske_scenarija + greske_poruka)
+        greske_poruka.clear()
+
+    if args.izlaz:
+        with open(args.izlaz, "w", encoding="utf-8") as f:
+            json.dump(rezultati, f, ensure_ascii=False, indent=2)
+
+    if args.osnova:
+        with open(args.osnova, encoding="utf-8") as f:
+            greske.extend(uporedi(rezultati, json.load(f), args.tolerancija, args.prag))
+
+    if greske:
+        print("\nNEUSPELO:")
+        for greska in greske:
+            print(f"- {greska}")
+        sys.exit(1)
+    print("\nSve provere su prošle.")
@@ -0,0 +1,194 @@
+"""Pretraga vozova po stanici i vremenskom prozoru.
+
+Upiti koriste izračunate kolone polazak_min/dolazak_min i indekse
+(pocetna_stanica, polazak_min) i (krajnja_stanica, dolazak_min). Prozor koji prelazi
+ponoć (npr. 22:00-02:00) deli se na dva opsega, pa oba i dalje idu preko indeksa.
+
+IndeksPolazaka drži polaske svake stanice u memoriji i traži najraniju vezu između dve
+stanice (postojećim vozovima i praznim vožnjama), npr. da premosti prekid u turnusu.
+"""
+import heapq
+from bisect import bisect_left
+
+MINUTA_U_DANU = 24 * 60
+
+# Kolone koje vraća pretraga, redom
+KOLONE_PRETRAGE = [
+    "broj_voza", "pocetna_stanica", "krajnja_stanica", "polazak_min", "dolazak_min",
+    "prelazni", "serija_vozila", "sekcija", "status",
+]
+
+
+def minuti(vreme):
+    """'hh:mm' (ili 'hh.mm', 'hh') pretvara u minute od ponoći; 24:00 je kraj dana."""
+    delovi = str(vreme).strip().replace(".", ":").split(":")
+    try:
+        sat = int(delovi[0])
+        minut = int(delovi[1]) if len(delovi) > 1 and delovi[1] else 0
+    except ValueError:
+        raise ValueError(f"Neispravno vreme '{vreme}' (očekuje se hh:mm).")
+    if not (0 <= sat <= 24 and 0 <= minut <= 59) or (sat == 24 and minut):
+        raise ValueError(f"Neispravno vreme '{vreme}' (očekuje se hh:mm).")
+    return sat * 60 + minut
+
+
+def vreme(minuti_od_ponoci):
+    """Minute od ponoći prikazuje kao hh:mm."""
+    return f"{minuti_od_ponoci // 60:02d}:{minuti_od_ponoci % 60:02d}"
+
+
+def _opsezi(od_min, do_min):
+    """Poluotvoreni opsezi [od, do) u okviru dana; prozor preko ponoći daje dva opsega."""
+    if od_min < do_min:
+        return [(od_min, do_min)]
+    if od_min == do_min:
+        return [(0, MINUTA_U_DANU)]  # ceo dan
+    return [(od_min, MINUTA_U_DANU), (0, do_min)]
+
+
+def _pretrazi(cursor, kolona_stanice, kolona_vremena, stanica, od_min, do_min, sekcije, serije):
+    rezultat = []
+    for pocetak, kraj in _opsezi(od_min, do_min):
+        uslovi = [f"{kolona_vremena} >= ?", f"{kolona_vremena} < ?"]
+        parametri = [pocetak, kraj]
+        if stanica is not None:
+            uslovi.insert(0, f"{kolona_stanice} = ?")
+            parametri.insert(0, stanica)
+        for kolona, vrednosti in (("sekcija", sekcije), ("serija_vozila", serije)):
+            if vrednosti is not None:
+                vrednosti = list(vrednosti)
+                uslovi.append(f"{kolona} IN ({','.join('?' * len(vrednosti)) or 'NULL'})")
+                parametri.extend(vrednosti)
+        cursor.execute(f"""
+            SELECT {', '.join(KOLONE_PRETRAGE)} FROM vozovi
+            WHERE {' AND '.join(uslovi)}
+            ORDER BY {kolona_vremena}, broj_voza
+        """, parametri)
+        rezultat.extend(cursor.fetchall())
+    return rezultat
+
+
+def polasci(cursor, stanica, od_min, do_min, sekcije=None, serije=None):
+    """Vozovi koji polaze iz stanice u prozoru [od, do), poređani od početka prozora.
+
+    `stanica` None znači sve stanice; `od_min` > `do_min` je prozor preko ponoći.
+    """
+    return _pretrazi(cursor, "pocetna_stanica", "polazak_min", stanica, od_min, do_min, sekcije, serije)
+
+
+def dolasci(cursor, stanica, od_min, do_min, sekcije=None, serije=None):
+    """Vozovi koji stižu u stanicu u prozoru [od, do), poređani od početka prozora."""
+    return _pretrazi(cursor, "krajnja_stanica", "dolazak_min", stanica, od_min, do_min, sekcije, serije)
+
+
+# --- VEZE IZMEĐU STANICA (PREMOŠĆAVANJE PREKIDA U TURNUSU) ---
+
+class IndeksPolazaka:
+    """Polasci iz svake stanice po seriji vozila, poređani po vremenu polaska.
+
+    Za prazne vožnje se za svaki par stanica koje povezuje bar jedan voz (bilo koje serije)
+    pamti najkraće trajanje vožnje; prazna vožnja može da krene u bilo koje vreme.
+    """
+
+    def __init__(self, vozovi):
+        """`vozovi` su torke (broj_voza, pocetna, krajnja, polazak_min, dolazak_min, serija_vozila)."""
+        polasci = {}
+        self.prazne = {}  # stanica -> {susedna stanica: najkraće trajanje u minutima}
+        for broj, pocetna, krajnja, polazak, dolazak, serija in vozovi:
+            trajanje = (dolazak - polazak) % MINUTA_U_DANU
+            polasci.setdefault((serija or "", pocetna), []).append((polazak, broj, krajnja, trajanje))
+            if pocetna != krajnja:
+                susedi = self.prazne.setdefault(pocetna, {})
+                susedi[krajnja] = min(trajanje, susedi.get(krajnja, trajanje))
+        # (serija, stanica) -> (vremena polaska, vozovi); vremena su posebna lista zbog bisect
+        self._polasci = {}
+        for kljuc, lista in polasci.items():
+            lista.sort()
+            self._polasci[kljuc] = ([p[0] for p in lista], [p[1:] for p in lista])
+
+    @classmethod
+    def iz_baze(cls, cursor):
+        cursor.execute("""
+            SELECT broj_voza, pocetna_stanica, krajnja_stanica, polazak_min, dolazak_min, serija_vozila
+            FROM vozovi
+        """)
+        return cls(cursor.fetchall())
+
+    def _polasci_posle(self, serija, stanica, od_min, do_min):
+        """(polazak, broj, krajnja, trajanje) iz stanice u [od, do]; vreme teče i preko ponoći."""
+        vremena, vozovi = self._polasci.get((serija, stanica), ((), ()))
+        if not vremena:
+            return
+        dan, u_danu = divmod(od_min, MINUTA_U_DANU)
+        i = bisect_left(vremena, u_danu)
+        for j in range(i, i + len(vremena)):
+            krug, k = divmod(j, len(vremena))
+            polazak = (dan + krug) * MINUTA_U_DANU + vremena[k]
+            if polazak > do_min:
+                return
+            yield (polazak, *vozovi[k])
+
+    def najranija_veza(self, od_stanice, od_min, do_stanice, do_min, serija="", pravila=None,
+                       prazne_voznje=True, iskljuceni=()):
+        """Najranija veza od stanice `od_stanice` (vozilo tu od `od_min`) do `do_stanice` pre `do_min`.
+
+        Vremena su minuti na jednoj vremenskoj osi (mogu preći 1440). Između dve vožnje vozilo
+        stoji najmanje minut, odnosno koliko traži pravilo obrta (`pravila`, npr. PravilaObrta).
+        Vraća listu deonica (broj_voza ili None za praznu vožnju, od, do, polazak, dolazak)
+        ili None ako veze nema. Vozovi iz `iskljuceni` se ne koriste.
+        """
+        def obrt(stanica):
+            return max(1, pravila.minimum(stanica, serija)) if pravila else 1
+
+        najranije = {od_stanice: od_min}
+        prethodni = {}
+        red = [(od_min, od_stanice)]
+        while red:
+            vreme_u_stanici, stanica = heapq.heappop(red)
+            if vreme_u_stanici > najranije[stanica]:
+                continue
+            if stanica == do_stanice:
+                break
+            polazak_od = vreme_u_stanici + obrt(stanica)
+            grane = [(polazak, broj, krajnja, polazak + trajanje)
+                     for polazak, broj, krajnja, trajanje in self._polasci_posle(serija, stanica, polazak_od, do_min)
+                     if broj not in iskljuceni]
+            if prazne_voznje:
+                grane.extend((polazak_od, None, sused, polazak_od + trajanje)
+                             for sused, trajanje in self.prazne.get(stanica, {}).items())
+            for polazak, broj, krajnja, dolazak in grane:
+                # U krajnjoj stanici vozilu treba i obrt pre polaska voza posle prekida
+                rok = do_min - obrt(krajnja) if krajnja == do_stanice else do_min - 1
+                if dolazak <= rok and dolazak < najranije.get(krajnja, dolazak + 1):
+                    najranije[krajnja] = dolazak
+                    prethodni[krajnja] = (stanica, broj, polazak, dolazak)
+                    heapq.heappush(red, (dolazak, krajnja))
+
+        if do_stanice not in prethodni:
+            return None
+        deonice = []
+        stanica = do_stanice
+        while stanica != od_stanice:
+            od, broj, polazak, dolazak = prethodni[stanica]
+            deonice.append((broj, od, stanica, polazak, dolazak))
+            stanica = od
+        return deonice[::-1]
+
+    def predlozi_veze(self, od_stanice, od_min, do_stanice, do_min, serija="", pravila=None, iskljuceni=()):
+        """Do dva predloga: samo postojećim vozovima serije i, ako je drugačiji, uz prazne vožnje."""
+        predlozi = []
+        for prazne_voznje in (False, True):
+            veza = self.najranija_veza(od_stanice, od_min, do_stanice, do_min, serija, pravila,
+                                       prazne_voznje, iskljuceni)
+            if veza and veza not in predlozi:
+                predlozi.append(veza)
+        return predlozi
+
+
+def opis_veze(deonice):
+    """Deonice veze kao tekst, npr. 'voz 4830 KV→PO 10:45-11:30, prazna vožnja PO→NS 11:35-12:05'."""
+    delovi = []
+    for broj, od, do, polazak, dolazak in deonice:
+        vrsta = f"voz {broj}" if broj is not None else "prazna vožnja"
+        delovi.append(f"{vrsta} {od}→{do} {vreme(polazak % MINUTA_U_DANU)}-{vreme(dolazak % MINUTA_U_DANU)}")
+    return ", ".join(delovi)
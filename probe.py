@@ -3,13 +3,42 @@ import sqlite3
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
     QPushButton, QCheckBox, QScrollArea, QFrame, QLabel, QLineEdit, QHeaderView,
-    QMessageBox, QTabWidget, QGraphicsView, QGraphicsScene
+    QMessageBox, QTabWidget, QGraphicsView, QGraphicsScene, QProgressBar, QFileDialog, QComboBox
 )
-from PyQt6.QtGui import QPainter, QPen, QIntValidator, QFont
+from PyQt6.QtGui import (QPainter, QPen, QIntValidator, QFont, QColor, QPainterPath, QImage, QPixmap,
+                         QShortcut, QKeySequence)
 from PyQt6.QtCore import Qt, QEvent
 
-# Definiši putanju do baze
-DB_PATH = "data/baza.db"
+import analiza
+import dijagnostika
+import dnevnik
+from baza import otvori_vezu, napravi_tabele, SukobIzmene
+from radnici import KanalUcitavanja, PisacBaze, PozadinskiPosao, PracenjeIzmena
+from red_voznje import KesRedaVoznje
+import validacija
+from validacija import (proveri_podatke_voza, ucitaj_info_vozova, ucitaj_pravila_obrta, proveri_vozove_turnusa,
+                        poruka_provere, je_prelazni)
+from uvoz import procitaj_vozove, upisi_vozove
+import gtfs
+import istorija
+import izvoz
+import kalendar
+import pretraga
+import stampa
+import verzije
+
+# Najviše turnusa koji se navode u poruci o uticaju izmene voza
+MAX_TURNUSA_U_PORUCI = 15
+
+# Redovi tabele turnusa: turnus sa statistikom obrta i poslednjom zapamćenom proverom
+SQL_TABELE_TURNUSA = """
+    SELECT t.id, t.naziv, t.serija_vv, t.sekcija,
+           s.najkraci_obrt_min, s.cekanje_min, s.najduze_cekanje_min, s.iskoriscenost,
+           p.vrsta, p.greske
+    FROM turnusi t
+    LEFT JOIN statistika_turnusa s ON s.turnus_id = t.id
+    LEFT JOIN provera_turnusa p ON p.turnus_id = t.id
+"""
 
 
 # --- POMOĆNE KLASE ---
@@ -36,9 +65,16 @@ class SimpleApp(QWidget):
         self.resize(1400, 900)
         self.init_database()
 
-        # Promenljive za režim uređivanja
+        # Sve izmene baze idu kroz jednu pozadinsku nit za pisanje
+        self.pisac = PisacBaze(self)
+        self.pisac.start()
+
+        # Promenljive za režim uređivanja; verzija reda je ona koju je korisnik video pri otvaranju
+        # forme, da čuvanje ne bi prepisalo izmenu koju je u međuvremenu upisao drugi korisnik
         self.trenutni_broj_za_izmenu = None
         self.trenutni_turnus_za_izmenu = None
+        self.verzija_voza_za_izmenu = None
+        self.verzija_turnusa_za_izmenu = None
 
         # Informacije o sortiranju
         self.vozi_sort_info = {'column': 0, 'order': Qt.SortOrder.AscendingOrder}  # Default: broj voza ASC
@@ -47,15 +83,60 @@ class SimpleApp(QWidget):
         # Informacije o grafiku
         self.godina_za_grafik = ""  # Atribut za čuvanje unete godine
         self.godina_input = None  # Atribut za referencu na QLineEdit
+        self._grafik_y = 0  # Y pozicija sledećeg turnusa koji stiže iz pozadinskog učitavanja
+        self._grafik_pocetak = None  # Početak merenja crtanja (samo kada je merenje uključeno)
+        self._grafik_crtanje_ms = 0.0
+
+        # Kolonski red vožnje (NumPy) za grafik i analize; pravi se pri prvoj upotrebi
+        self.kes_reda_voznje = KesRedaVoznje()
+        # Boravci vozila po stanicama; računa se pri prvom otvaranju taba Stanice
+        self.zauzetost_stanica = analiza.ZauzetostStanica()
+        self.bilans_depoa = analiza.BilansDepoa()
+        # Polasci po stanici za predloge premošćavanja prekida u turnusu; pravi se pri prvoj proveri
+        self.indeks_polazaka = None
+        # Poslednji rezultati provere turnusa (id -> (vrsta, greske)) i generacija primenjenog
+        # rezultata po turnusu (None: provera svih), da stariji rezultat ne prepiše noviji
+        self.provere_turnusa = {}
+        self._generacija_provere = 0
+        self._primenjena_provera = {}
+        self._stanice_ucitavanje = False  # u toku je računanje svih stanica
+        self._stanice_zastarelo = False  # izmena je stigla tokom računanja, treba ponoviti
+
+        # Pozadinsko učitavanje (svaki prikaz ima svoj kanal, noviji zahtev poništava stariji)
+        self._napredak = {}  # kanal -> [primljeno, ukupno]
+        self.kanal_vozova = KanalUcitavanja(
+            lambda n: self._javi_ukupno('vozovi', n), self._dodaj_redove_vozova,
+            lambda: self._zavrsi_napredak('vozovi'), lambda p: self._greska_ucitavanja('vozovi', p), naziv='vozovi')
+        self.kanal_turnusa = KanalUcitavanja(
+            lambda n: self._javi_ukupno('turnusi', n), self._dodaj_redove_turnusa,
+            lambda: self._zavrsi_napredak('turnusi'), lambda p: self._greska_ucitavanja('turnusi', p), naziv='turnusi')
+        self.kanal_grafika = KanalUcitavanja(
+            lambda n: self._javi_ukupno('grafik', n), self._nacrtaj_deo_grafika,
+            self._zavrsi_grafik, lambda p: self._greska_ucitavanja('grafik', p), naziv='grafik')
 
         # Inicijalizacija UI
         self.init_ui()
+        # Merenje zastoja GUI niti (samo kada je uključeno TURNUSI_PROFIL)
+        self.nadzor_petlje = dijagnostika.pokreni_nadzor_petlje(self)
+
+        # Koraci za poništavanje i ponavljanje izmena (istorija.py)
+        self.istorija = istorija.Istorija()
+        self._istorija_u_toku = False
+        self._osvezi_dugmad_istorije()
 
         # Popunjavanje filtera i učitavanje podataka
         self.populate_filters_and_load_data()
 
+        # Izmene drugih korisnika iste baze osvežavaju samo redove koje su promenili
+        self.pracenje = PracenjeIzmena(self.pisac, self)
+        self.pracenje.izmenjeno.connect(self._izmene_drugih_korisnika)
+
     def populate_filters_and_load_data(self):
         """Centralizovana funkcija za popunjavanje svih filtera i učitavanje početnih podataka."""
+        # Poziva se i posle svake izmene, pa kolonski red vožnje više nije aktuelan
+        self.kes_reda_voznje.ponisti()
+        self.indeks_polazaka = None
+
         # Tab Vozovi
         self.populate_vozovi_filter()
         self.populate_sekcije_filter()
@@ -71,51 +152,19 @@ class SimpleApp(QWidget):
         # Tab Grafik
         self.populate_grafik_filter()
 
+    def closeEvent(self, event):
+        """Pre zatvaranja upisuje sve izmene koje su još u redu za pisanje."""
+        self.pracenje.zaustavi()
+        self.pisac.zaustavi()
+        super().closeEvent(event)
+
     # --- BAZA PODATAKA ---
 
     def init_database(self):
         """Inicijalizuje bazu podataka i tabele."""
         os.makedirs("data", exist_ok=True)
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Tabela za vozove
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vozovi (
-                broj_voza TEXT PRIMARY KEY,
-                pocetna_stanica TEXT,
-                krajnja_stanica TEXT,
-                sat_polaska INTEGER,
-                minut_polaska INTEGER,
-                sat_dolaska INTEGER,
-                minut_dolaska INTEGER,
-                status TEXT,
-                sekcija TEXT,
-                serija_vozila TEXT
-            )
-        ''')
-
-        # Tabela za turnuse
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS turnusi (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                naziv TEXT UNIQUE,
-                sekcija TEXT,
-                serija_vv TEXT
-            )
-        ''')
-
-        # Tabela za veze između turnusa i voza
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS turnus_vozovi (
-                turnus_id INTEGER,
-                broj_voza TEXT,
-                redosled INTEGER,
-                PRIMARY KEY (turnus_id, broj_voza),
-                FOREIGN KEY (turnus_id) REFERENCES turnusi(id),
-                FOREIGN KEY (broj_voza) REFERENCES vozovi(broj_voza)
-            )
-        ''')
+        conn = otvori_vezu()
+        napravi_tabele(conn.cursor())
         conn.commit()
         conn.close()
 
@@ -128,13 +177,47 @@ class SimpleApp(QWidget):
     def init_ui(self):
         """Inicijalizuje korisnički interfejs sa tabovima."""
         main_layout = QVBoxLayout()
+
+        # Poništavanje i ponavljanje izmena vozova i turnusa (Ctrl+Z / Ctrl+Y)
+        istorija_layout = QHBoxLayout()
+        self.btn_ponisti = QPushButton("Poništi")
+        self.btn_ponisti.clicked.connect(self.ponisti_izmenu)
+        self.btn_ponovi = QPushButton("Ponovi")
+        self.btn_ponovi.clicked.connect(self.ponovi_izmenu)
+        istorija_layout.addWidget(self.btn_ponisti)
+        istorija_layout.addWidget(self.btn_ponovi)
+        istorija_layout.addStretch()
+        main_layout.addLayout(istorija_layout)
+        QShortcut(QKeySequence.StandardKey.Undo, self, self.ponisti_izmenu)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self.ponovi_izmenu)
+
         self.tabs = QTabWidget()
         self.tabs.addTab(self.create_tab_vozovi(), "Vozovi")
         self.tabs.addTab(self.create_tab_turnusi(), "Turnusi")
         self.tabs.addTab(self.create_tab_grafik(), "Pregled Grafika")
         # DODAVANJE NOVOG TABA
         self.tabs.addTab(self.create_tab_stampa(), "Stampa turnusa")
+        self.tabs.addTab(self.create_tab_flota(), "Flota u službi")
+        self.tab_stanice = self.create_tab_stanice()
+        self.tabs.addTab(self.tab_stanice, "Stanice")
+        self.tabs.addTab(self.create_tab_kasnjenja(), "Kašnjenja")
+        self.tabs.addTab(self.create_tab_verzije(), "Verzije")
+        self.tab_sinhronizacija = self.create_tab_sinhronizacija()
+        self.tabs.addTab(self.tab_sinhronizacija, "Sinhronizacija")
+        self.tabs.currentChanged.connect(self._promenjen_tab)
         main_layout.addWidget(self.tabs)
+
+        # Indikator napretka pozadinskog učitavanja (vidljiv samo dok učitavanje traje)
+        self.napredak_bar = QProgressBar()
+        self.napredak_bar.setMaximumHeight(14)
+        self.napredak_bar.setTextVisible(False)
+        self.napredak_bar.setVisible(False)
+        main_layout.addWidget(self.napredak_bar)
+
+        # Panel sa poslednjim merenjima (TURNUSI_PROFIL=panel)
+        self.dijagnostika_panel = dijagnostika.napravi_panel()
+        if self.dijagnostika_panel:
+            main_layout.addWidget(self.dijagnostika_panel)
         self.setLayout(main_layout)
 
     def create_tab_vozovi(self):
@@ -166,6 +249,7 @@ class SimpleApp(QWidget):
         self.serija_input = UppercaseLineEdit()
         self.status_input = UppercaseLineEdit()
         self.sekcija_input = UppercaseLineEdit()
+        self.dani_input = UppercaseLineEdit()
 
         # Validatori
         self.sat_p_input.setValidator(QIntValidator(0, 23))
@@ -199,6 +283,8 @@ class SimpleApp(QWidget):
         desno_forme.addWidget(self.status_input)
         desno_forme.addWidget(QLabel("Sekcija (npr. KV):"))
         desno_forme.addWidget(self.sekcija_input)
+        desno_forme.addWidget(QLabel("Dani saobraćanja (prazno = svaki dan; npr. R, S, N, 1-5, -25.12.2025):"))
+        desno_forme.addWidget(self.dani_input)
 
         form_inner.addLayout(levo_forme)
         form_inner.addLayout(desno_forme)
@@ -214,9 +300,18 @@ class SimpleApp(QWidget):
         self.btn_odustani = QPushButton("Odustani od uređivanja")
         self.btn_odustani.clicked.connect(self.odustani_od_uredjivanja)
         self.btn_odustani.setVisible(False)
+        self.btn_uvoz = QPushButton("Uvoz iz fajla (CSV/Excel)")
+        self.btn_uvoz.clicked.connect(self.uvezi_vozove_iz_fajla)
         btn_layout.addWidget(self.btn_dodaj)
         btn_layout.addWidget(self.btn_azuriraj)
         btn_layout.addWidget(self.btn_odustani)
+        btn_layout.addWidget(self.btn_uvoz)
+        self.btn_uvoz_gtfs = QPushButton("Uvoz GTFS feed-a")
+        self.btn_uvoz_gtfs.clicked.connect(self.uvezi_gtfs_feed)
+        btn_layout.addWidget(self.btn_uvoz_gtfs)
+        self.btn_izvoz_vozova = QPushButton("Izvoz vozova")
+        self.btn_izvoz_vozova.clicked.connect(lambda: self.izvezi('vozovi'))
+        btn_layout.addWidget(self.btn_izvoz_vozova)
         left_layout.addLayout(btn_layout)
         top_layout.addWidget(left_frame, 55)
 
@@ -289,10 +384,10 @@ class SimpleApp(QWidget):
         bottom_layout = QVBoxLayout(bottom_frame)
         bottom_layout.addWidget(QLabel("Postojeći vozovi:"))
         self.tabela = QTableWidget()
-        self.tabela.setColumnCount(10)
+        self.tabela.setColumnCount(11)
         self.tabela.setHorizontalHeaderLabels([
             "Broj voza", "Poč. st.", "Kraj. st.", "Polazak", "Dolazak",
-            "Serija", "Status", "Sekcija", "Uredi", "Obriši"
+            "Serija", "Status", "Sekcija", "Dani", "Uredi", "Obriši"
         ])
         self.tabela.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         # ONEMOGUĆI Qt SORTIRANJE
@@ -352,6 +447,17 @@ class SimpleApp(QWidget):
         self.btn_odustani_turnus.clicked.connect(self.odustani_od_uredjivanja_turnusa)
         self.btn_odustani_turnus.setVisible(False)
         left_layout.addWidget(self.btn_odustani_turnus)
+        izvoz_layout = QHBoxLayout()
+        btn_izvoz_turnusa = QPushButton("Izvoz turnusa")
+        btn_izvoz_turnusa.clicked.connect(lambda: self.izvezi('turnusi'))
+        btn_izvoz_validacije = QPushButton("Izvoz rezultata provere")
+        btn_izvoz_validacije.clicked.connect(lambda: self.izvezi('validacija'))
+        izvoz_layout.addWidget(btn_izvoz_turnusa)
+        izvoz_layout.addWidget(btn_izvoz_validacije)
+        btn_proveri_sve = QPushButton("Proveri sve turnuse")
+        btn_proveri_sve.clicked.connect(lambda: self.proveri_zavisne_turnuse(sve=True))
+        izvoz_layout.addWidget(btn_proveri_sve)
+        left_layout.addLayout(izvoz_layout)
 
         self.status_label = QLabel("")
         self.status_label.setWordWrap(True)
@@ -428,9 +534,10 @@ class SimpleApp(QWidget):
         bottom_layout = QVBoxLayout(bottom_frame)
         bottom_layout.addWidget(QLabel("Postojeći turnusi:"))
         self.tabela_turnusa = QTableWidget()
-        self.tabela_turnusa.setColumnCount(5)
+        self.tabela_turnusa.setColumnCount(10)
         self.tabela_turnusa.setHorizontalHeaderLabels([
-            "Naziv", "Serija VV", "Vozovi", "Sekcija", "Akcije"
+            "Naziv", "Serija VV", "Vozovi", "Sekcija", "Najkraći obrt", "Čekanje", "Najduže čekanje",
+            "Iskorišćenost", "Provera", "Akcije"
         ])
         self.tabela_turnusa.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         # ONEMOGUĆI Qt SORTIRANJE
@@ -555,6 +662,16 @@ class SimpleApp(QWidget):
         label_godina.setStyleSheet("font-weight: bold;")  # Podebljaj tekst
         empty_layout.addWidget(label_godina)
 
+        # Grafik samo sa vozovima koji saobraćaju izabranog tipa dana
+        dani_layout = QHBoxLayout()
+        dani_layout.addStretch()
+        dani_layout.addWidget(QLabel("Dani:"))
+        self.grafik_dani_combo = self._combo_tipa_dana()
+        self.grafik_dani_combo.currentIndexChanged.connect(self.crtaj_grafik)
+        dani_layout.addWidget(self.grafik_dani_combo)
+        dani_layout.addStretch()
+        empty_layout.addLayout(dani_layout)
+
         top_layout.addWidget(empty_frame, 25)  # ← 25%
 
         main_layout.addWidget(top_frame, 30)  # ← Gornji deo zauzima 30% visine
@@ -601,34 +718,59 @@ class SimpleApp(QWidget):
         left_top_frame = QFrame()
         left_top_frame.setFrameShape(QFrame.Shape.StyledPanel)
         left_top_layout = QVBoxLayout(left_top_frame)
-        left_top_layout.addWidget(QLabel("Kontrole za izbor turnusa (33.33% širine gornjeg dela)"))
-        # TODO: Dodati kontrole za izbor sekcije, filtriranje turnusa itd.
+        left_top_layout.addWidget(QLabel("Izdanje knjige turnusa"))
+        self.stampa_vrsta_combo = QComboBox()
+        self.stampa_vrsta_combo.addItem("Samo izmenjeni listovi od poslednjeg izdanja", True)
+        self.stampa_vrsta_combo.addItem("Cela knjiga (nova numeracija)", False)
+        self.stampa_vrsta_combo.currentIndexChanged.connect(self.pripremi_stampu)
+        left_top_layout.addWidget(self.stampa_vrsta_combo)
+        btn_pripremi = QPushButton("Pripremi")
+        btn_pripremi.clicked.connect(self.pripremi_stampu)
+        left_top_layout.addWidget(btn_pripremi)
+        self.btn_stampaj = QPushButton("Štampaj u PDF")
+        self.btn_stampaj.clicked.connect(self.stampaj_izdanje)
+        left_top_layout.addWidget(self.btn_stampaj)
+        self.stampa_label = QLabel("")
+        self.stampa_label.setWordWrap(True)
+        left_top_layout.addWidget(self.stampa_label)
+        left_top_layout.addStretch()
         top_layout.addWidget(left_top_frame)  # Qt automatski dodeljuje težinu
 
         # === Pregled selekcije (33.33%) ===
         middle_top_frame = QFrame()
         middle_top_frame.setFrameShape(QFrame.Shape.StyledPanel)
         middle_top_layout = QVBoxLayout(middle_top_frame)
-        middle_top_layout.addWidget(QLabel("Pregled selekcije (33.33% širine gornjeg dela)"))
-        # TODO: Dodati widget za prikaz izabranih turnusa
+        middle_top_layout.addWidget(QLabel("Listovi za štampu"))
+        self.tabela_listova = QTableWidget()
+        self.tabela_listova.setColumnCount(4)
+        self.tabela_listova.setHorizontalHeaderLabels(["Strana", "Turnus", "Status", "Poslednje izdanje"])
+        self.tabela_listova.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_listova.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tabela_listova.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tabela_listova.currentCellChanged.connect(lambda red, *_: self._prikazi_list(red))
+        middle_top_layout.addWidget(self.tabela_listova)
         top_layout.addWidget(middle_top_frame)  # Qt automatski dodeljuje težinu
 
         # === REZERVA (33.33%) ===
         right_top_frame = QFrame()
         right_top_frame.setFrameShape(QFrame.Shape.StyledPanel)
         right_top_layout = QVBoxLayout(right_top_frame)
-        right_top_layout.addWidget(QLabel("Rezervni prostor (33.33% širine gornjeg dela)"))
-        # TODO: Rezervni prostor za buduću funkcionalnost
+        right_top_layout.addWidget(QLabel("Dnevnik izdanja"))
+        self.tabela_izdanja = QTableWidget()
+        self.tabela_izdanja.setColumnCount(5)
+        self.tabela_izdanja.setHorizontalHeaderLabels(["Izdanje", "Datum", "Vrsta", "Listova", "Strane"])
+        self.tabela_izdanja.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_izdanja.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        right_top_layout.addWidget(self.tabela_izdanja)
         top_layout.addWidget(right_top_frame)  # Qt automatski dodeljuje težinu
 
-        main_layout.addWidget(top_frame, 20)  # 25% visine
+        main_layout.addWidget(top_frame, 35)
 
         # --- DONJI DEO (75%) ---
         bottom_frame = QFrame()
         bottom_frame.setFrameShape(QFrame.Shape.StyledPanel)
         bottom_layout = QVBoxLayout(bottom_frame)
-        bottom_layout.addWidget(QLabel("Prikaz za štampu (A4 format) - 100% širine donjeg dela"))
-        # TODO: Dodati QGraphicsView ili drugi widget za prikaz A4
+        bottom_layout.addWidget(QLabel("Prikaz za štampu (A4 format)"))
         self.stampa_scene = QGraphicsScene()
         self.stampa_view = QGraphicsView(self.stampa_scene)
         self.stampa_view.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -636,11 +778,297 @@ class SimpleApp(QWidget):
         # Primer: 1mm = 3.78 px na ekranu (96 DPI), pa je A4 ~ 794 x 1123 px
         # self.stampa_view.setFixedSize(794, 1123) # Ako želiš fiksnu veličinu
         bottom_layout.addWidget(self.stampa_view)
-        main_layout.addWidget(bottom_frame, 80)  # 75% visine
+        main_layout.addWidget(bottom_frame, 65)
+
+        # Plan sledećeg izdanja: (broj izdanja, samo izmenjeni, listovi, period dana saobraćanja)
+        self.plan_stampe = None
+        self.tab_stampa = widget
+        widget.setLayout(main_layout)
+        return widget
+
+    def create_tab_flota(self):
+        """Kreira tab sa brojem vozila u vožnji i na čekanju po seriji VV tokom dana."""
+        widget = QWidget()
+        main_layout = QVBoxLayout()
+
+        dugmad_layout = QHBoxLayout()
+        dugmad_layout.addWidget(QLabel("Dani:"))
+        self.flota_dani_combo = self._combo_tipa_dana()
+        dugmad_layout.addWidget(self.flota_dani_combo)
+        self.btn_izracunaj_flotu = QPushButton("Izračunaj")
+        self.btn_izracunaj_flotu.clicked.connect(self.izracunaj_flotu)
+        dugmad_layout.addWidget(self.btn_izracunaj_flotu)
+        btn_izvoz_flote = QPushButton("Izvoz tabele (minut po minut)")
+        btn_izvoz_flote.clicked.connect(lambda: self.izvezi('flota'))
+        dugmad_layout.addWidget(btn_izvoz_flote)
+        self.flota_label = QLabel("")
+        dugmad_layout.addWidget(self.flota_label, 1)
+        main_layout.addLayout(dugmad_layout)
+
+        # Grafikon: vozila u vožnji po minutu, jedna linija po seriji VV
+        self.flota_scene = QGraphicsScene()
+        self.flota_view = QGraphicsView(self.flota_scene)
+        self.flota_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+        main_layout.addWidget(self.flota_view, 60)
+
+        # Zbirna tabela po seriji VV
+        self.tabela_flote = QTableWidget()
+        self.tabela_flote.setColumnCount(6)
+        self.tabela_flote.setHorizontalHeaderLabels([
+            "Serija VV", "Vozila (turnusi)", "Najviše u vožnji", "Vreme vrha", "Najmanje u vožnji",
+            "Prosečno u vožnji"
+        ])
+        self.tabela_flote.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_flote.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        main_layout.addWidget(self.tabela_flote, 40)
 
         widget.setLayout(main_layout)
         return widget
 
+    def _combo_tipa_dana(self):
+        """Izbor dana za analize: svi dani ili jedan tip dana (kalendar.TIPOVI_DANA)."""
+        combo = QComboBox()
+        combo.addItem("Svi dani", None)
+        for tip, naziv in kalendar.TIPOVI_DANA.items():
+            combo.addItem(naziv, tip)
+        return combo
+
+    def create_tab_stanice(self):
+        """Kreira tab sa brojem vozila koja čekaju u stanicama i boravcima između vozova."""
+        widget = QWidget()
+        main_layout = QVBoxLayout()
+
+        dugmad_layout = QHBoxLayout()
+        btn_osvezi = QPushButton("Izračunaj ponovo")
+        btn_osvezi.clicked.connect(lambda: self.osvezi_stanice(sve=True))
+        dugmad_layout.addWidget(btn_osvezi)
+        self.stanice_label = QLabel("")
+        dugmad_layout.addWidget(self.stanice_label, 1)
+        main_layout.addLayout(dugmad_layout)
+
+        self.tabela_stanica = QTableWidget()
+        self.tabela_stanica.setColumnCount(7)
+        self.tabela_stanica.setHorizontalHeaderLabels([
+            "Stanica", "Boravaka", "Najviše vozila", "Vreme vrha", "Vozila u ponoć", "Prosečan boravak",
+            "Najduži boravak"
+        ])
+        self.tabela_stanica.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_stanica.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tabela_stanica.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tabela_stanica.itemSelectionChanged.connect(self._prikazi_boravke_stanice)
+
+        # Bilans depoa: koliko vozila serije završava dan u stanici, a koliko ih sutra odatle polazi
+        gornji_layout = QHBoxLayout()
+        gornji_layout.addWidget(self.tabela_stanica, 60)
+        bilans_layout = QVBoxLayout()
+        bilans_zaglavlje = QHBoxLayout()
+        bilans_zaglavlje.addWidget(QLabel("Bilans depoa (višak +, manjak -):"))
+        self.samo_neuravnotezene_checkbox = QCheckBox("Samo neuravnotežene")
+        self.samo_neuravnotezene_checkbox.setChecked(True)
+        self.samo_neuravnotezene_checkbox.stateChanged.connect(self._prikazi_bilans_depoa)
+        bilans_zaglavlje.addWidget(self.samo_neuravnotezene_checkbox)
+        bilans_layout.addLayout(bilans_zaglavlje)
+        self.tabela_bilansa = QTableWidget()
+        self.tabela_bilansa.setColumnCount(5)
+        self.tabela_bilansa.setHorizontalHeaderLabels([
+            "Serija VV", "Stanica", "Počinje dan", "Završava dan", "Bilans"
+        ])
+        self.tabela_bilansa.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_bilansa.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        bilans_layout.addWidget(self.tabela_bilansa)
+        self.bilans_label = QLabel("")
+        self.bilans_label.setWordWrap(True)
+        bilans_layout.addWidget(self.bilans_label)
+        gornji_layout.addLayout(bilans_layout, 40)
+        main_layout.addLayout(gornji_layout, 50)
+
+        donji_layout = QHBoxLayout()
+        boravci_layout = QVBoxLayout()
+        boravci_layout.addWidget(QLabel("Boravci u izabranoj stanici:"))
+        self.tabela_boravaka = QTableWidget()
+        self.tabela_boravaka.setColumnCount(6)
+        self.tabela_boravaka.setHorizontalHeaderLabels([
+            "Turnus", "Dolazni voz", "Dolazak", "Odlazni voz", "Polazak", "Boravak"
+        ])
+        self.tabela_boravaka.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_boravaka.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        boravci_layout.addWidget(self.tabela_boravaka)
+        donji_layout.addLayout(boravci_layout, 65)
+
+        # Pravila najkraćeg obrta koja koristi provera turnusa
+        pravila_layout = QVBoxLayout()
+        pravila_layout.addWidget(QLabel("Najkraći obrt (prazna stanica/serija = bilo koja):"))
+        self.tabela_pravila = QTableWidget()
+        self.tabela_pravila.setColumnCount(3)
+        self.tabela_pravila.setHorizontalHeaderLabels(["Stanica", "Serija", "Minimum (min)"])
+        self.tabela_pravila.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        pravila_layout.addWidget(self.tabela_pravila)
+        pravila_dugmad = QHBoxLayout()
+        btn_dodaj_pravilo = QPushButton("Dodaj")
+        btn_dodaj_pravilo.clicked.connect(lambda: self.tabela_pravila.insertRow(self.tabela_pravila.rowCount()))
+        btn_obrisi_pravilo = QPushButton("Obriši")
+        btn_obrisi_pravilo.clicked.connect(lambda: self.tabela_pravila.removeRow(self.tabela_pravila.currentRow()))
+        btn_sacuvaj_pravila = QPushButton("Sačuvaj pravila")
+        btn_sacuvaj_pravila.clicked.connect(self.sacuvaj_pravila_obrta)
+        pravila_dugmad.addWidget(btn_dodaj_pravilo)
+        pravila_dugmad.addWidget(btn_obrisi_pravilo)
+        pravila_dugmad.addWidget(btn_sacuvaj_pravila)
+        pravila_layout.addLayout(pravila_dugmad)
+        donji_layout.addLayout(pravila_layout, 35)
+        main_layout.addLayout(donji_layout, 50)
+
+        widget.setLayout(main_layout)
+        self.ucitaj_pravila_obrta()
+        return widget
+
+    def create_tab_kasnjenja(self):
+        """Kreira tab za simulaciju prenosa kašnjenja kroz turnuse."""
+        widget = QWidget()
+        main_layout = QVBoxLayout()
+
+        # Šta-ako: zadata primarna kašnjenja
+        sta_ako_layout = QHBoxLayout()
+        sta_ako_layout.addWidget(QLabel("Primarna kašnjenja (voz:minuti, ...):"))
+        self.primarna_kasnjenja_input = QLineEdit()
+        self.primarna_kasnjenja_input.setPlaceholderText("Npr. 4830:15, 2411:40")
+        sta_ako_layout.addWidget(self.primarna_kasnjenja_input, 1)
+        self.btn_sta_ako = QPushButton("Prenesi kašnjenja")
+        self.btn_sta_ako.clicked.connect(self.simuliraj_kasnjenja)
+        sta_ako_layout.addWidget(self.btn_sta_ako)
+        main_layout.addLayout(sta_ako_layout)
+
+        # Monte Karlo: slučajna kašnjenja na celoj mreži
+        mk_layout = QHBoxLayout()
+        mk_layout.addWidget(QLabel("Dana:"))
+        self.mk_uzoraka_input = QLineEdit("1000")
+        self.mk_uzoraka_input.setValidator(QIntValidator(1, 100000))
+        mk_layout.addWidget(self.mk_uzoraka_input)
+        mk_layout.addWidget(QLabel("Verovatnoća kašnjenja voza (%):"))
+        self.mk_verovatnoca_input = QLineEdit("20")
+        self.mk_verovatnoca_input.setValidator(QIntValidator(0, 100))
+        mk_layout.addWidget(self.mk_verovatnoca_input)
+        mk_layout.addWidget(QLabel("Srednje kašnjenje (min):"))
+        self.mk_srednje_input = QLineEdit("10")
+        self.mk_srednje_input.setValidator(QIntValidator(1, 600))
+        mk_layout.addWidget(self.mk_srednje_input)
+        self.btn_monte_karlo = QPushButton("Monte Karlo")
+        self.btn_monte_karlo.clicked.connect(lambda: self.simuliraj_kasnjenja(monte_karlo=True))
+        mk_layout.addWidget(self.btn_monte_karlo)
+        main_layout.addLayout(mk_layout)
+
+        self.kasnjenja_label = QLabel("")
+        main_layout.addWidget(self.kasnjenja_label)
+        self.tabela_kasnjenja = QTableWidget()
+        self.tabela_kasnjenja.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_kasnjenja.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        main_layout.addWidget(self.tabela_kasnjenja)
+
+        widget.setLayout(main_layout)
+        return widget
+
+    def create_tab_verzije(self):
+        """Kreira tab sa verzijama reda vožnje (godine i nacrti) i poređenjem dve verzije."""
+        widget = QWidget()
+        main_layout = QVBoxLayout()
+
+        nova_layout = QHBoxLayout()
+        nova_layout.addWidget(QLabel("Naziv:"))
+        self.verzija_naziv_input = QLineEdit()
+        self.verzija_naziv_input.setPlaceholderText("Npr. 2026 ili Nacrt 2026")
+        nova_layout.addWidget(self.verzija_naziv_input, 1)
+        nova_layout.addWidget(QLabel("Godina:"))
+        self.verzija_godina_input = QLineEdit()
+        self.verzija_godina_input.setPlaceholderText("Npr. 14.12.2025/26.")
+        nova_layout.addWidget(self.verzija_godina_input, 1)
+        btn_nova = QPushButton("Nova verzija od trenutne")
+        btn_nova.clicked.connect(self.nova_verzija)
+        nova_layout.addWidget(btn_nova)
+        btn_sacuvaj = QPushButton("Sačuvaj u aktivnu verziju")
+        btn_sacuvaj.clicked.connect(self.sacuvaj_verziju)
+        nova_layout.addWidget(btn_sacuvaj)
+        main_layout.addLayout(nova_layout)
+
+        self.tabela_verzija = QTableWidget()
+        self.tabela_verzija.setColumnCount(6)
+        self.tabela_verzija.setHorizontalHeaderLabels([
+            "Naziv", "Godina", "Nastala od", "Sačuvana", "Sopstvenih izmena", "Aktivna"
+        ])
+        self.tabela_verzija.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_verzija.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tabela_verzija.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        main_layout.addWidget(self.tabela_verzija, 30)
+
+        izbor_layout = QHBoxLayout()
+        btn_otvori = QPushButton("Otvori izabranu")
+        btn_otvori.clicked.connect(self.otvori_verziju)
+        izbor_layout.addWidget(btn_otvori)
+        btn_obrisi = QPushButton("Obriši izabranu")
+        btn_obrisi.clicked.connect(self.obrisi_verziju)
+        izbor_layout.addWidget(btn_obrisi)
+        izbor_layout.addStretch()
+        izbor_layout.addWidget(QLabel("Uporedi:"))
+        self.verzija_a_combo = QComboBox()
+        izbor_layout.addWidget(self.verzija_a_combo)
+        izbor_layout.addWidget(QLabel("sa:"))
+        self.verzija_b_combo = QComboBox()
+        izbor_layout.addWidget(self.verzija_b_combo)
+        self.btn_uporedi_verzije = QPushButton("Uporedi")
+        self.btn_uporedi_verzije.clicked.connect(self.uporedi_verzije)
+        izbor_layout.addWidget(self.btn_uporedi_verzije)
+        main_layout.addLayout(izbor_layout)
+
+        self.razlika_label = QLabel("")
+        main_layout.addWidget(self.razlika_label)
+        self.tabela_razlike = QTableWidget()
+        self.tabela_razlike.setColumnCount(4)
+        self.tabela_razlike.setHorizontalHeaderLabels(["Vrsta", "Oznaka", "Promena", "Detalji"])
+        self.tabela_razlike.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_razlike.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        main_layout.addWidget(self.tabela_razlike, 70)
+
+        self.ucitaj_verzije()
+        widget.setLayout(main_layout)
+        return widget
+
+    def create_tab_sinhronizacija(self):
+        """Kreira tab za razmenu dnevnika izmena sa kopijama baze u drugim depoima."""
+        widget = QWidget()
+        main_layout = QVBoxLayout()
+
+        oznaka_layout = QHBoxLayout()
+        oznaka_layout.addWidget(QLabel("Oznaka ove kopije:"))
+        self.oznaka_kopije_input = QLineEdit()
+        self.oznaka_kopije_input.setPlaceholderText("Npr. naziv depoa; svaka kopija ima svoju oznaku")
+        oznaka_layout.addWidget(self.oznaka_kopije_input, 1)
+        btn_oznaka = QPushButton("Sačuvaj oznaku")
+        btn_oznaka.clicked.connect(self.sacuvaj_oznaku_kopije)
+        oznaka_layout.addWidget(btn_oznaka)
+        main_layout.addLayout(oznaka_layout)
+
+        razmena_layout = QHBoxLayout()
+        self.btn_izvoz_dnevnika = QPushButton("Izvezi izmene")
+        self.btn_izvoz_dnevnika.clicked.connect(self.izvezi_dnevnik)
+        razmena_layout.addWidget(self.btn_izvoz_dnevnika)
+        self.btn_uvoz_dnevnika = QPushButton("Uvezi izmene druge kopije")
+        self.btn_uvoz_dnevnika.clicked.connect(self.uvezi_dnevnik)
+        razmena_layout.addWidget(self.btn_uvoz_dnevnika)
+        razmena_layout.addStretch()
+        main_layout.addLayout(razmena_layout)
+
+        self.dnevnik_label = QLabel("")
+        main_layout.addWidget(self.dnevnik_label)
+        main_layout.addWidget(QLabel("Sukobi poslednjeg uvoza (izmene koje nisu primenjene):"))
+        self.tabela_sukoba = QTableWidget()
+        self.tabela_sukoba.setColumnCount(6)
+        self.tabela_sukoba.setHorizontalHeaderLabels(["Izmena", "Vreme", "Tabela", "Radnja", "Red", "Razlog"])
+        self.tabela_sukoba.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabela_sukoba.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        main_layout.addWidget(self.tabela_sukoba)
+
+        self.ucitaj_stanje_dnevnika()
+        widget.setLayout(main_layout)
+        return widget
+
     # --- FUNKCIJE ZA FILTRIRANJE (CHECKBOX KONTROLE) ---
     def on_individual_checkbox_changed(self, state, checkbox, all_checkbox, reload_function):
         """Kada se promeni individualni checkbox, ažuriraj 'Označi sve' i osveži prikaz."""
@@ -773,7 +1201,7 @@ class SimpleApp(QWidget):
                 if widget:
                     widget.deleteLater()
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = otvori_vezu()
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT broj_voza FROM vozovi ORDER BY broj_voza")
         brojevi = [str(row[0]) for row in cursor.fetchall()]
@@ -798,7 +1226,7 @@ class SimpleApp(QWidget):
                 if widget:
                     widget.deleteLater()
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = otvori_vezu()
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT sekcija FROM vozovi WHERE sekcija IS NOT NULL ORDER BY sekcija")
         sekcije = [str(row[0]) for row in cursor.fetchall() if row[0] is not None]
@@ -822,7 +1250,7 @@ class SimpleApp(QWidget):
                 if item and item.widget():
                     item.widget().deleteLater()
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = otvori_vezu()
         cursor = conn.cursor()
         cursor.execute(
             "SELECT DISTINCT serija_vozila FROM vozovi WHERE serija_vozila IS NOT NULL ORDER BY serija_vozila")
@@ -848,7 +1276,7 @@ class SimpleApp(QWidget):
                 if widget:
                     widget.deleteLater()
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = otvori_vezu()
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT naziv FROM turnusi WHERE naziv IS NOT NULL ORDER BY naziv")
         nazivi = [str(row[0]) for row in cursor.fetchall() if row[0] is not None]
@@ -873,7 +1301,7 @@ class SimpleApp(QWidget):
                 if widget:
                     widget.deleteLater()
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = otvori_vezu()
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT sekcija FROM turnusi WHERE sekcija IS NOT NULL ORDER BY sekcija")
         sekcije = [str(row[0]) for row in cursor.fetchall() if row[0] is not None]
@@ -898,7 +1326,7 @@ class SimpleApp(QWidget):
                 if item and item.widget():
                     item.widget().deleteLater()
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = otvori_vezu()
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT serija_vv FROM turnusi WHERE serija_vv IS NOT NULL ORDER BY serija_vv")
         serije = [str(row[0]) for row in cursor.fetchall() if row[0]]
@@ -923,7 +1351,7 @@ class SimpleApp(QWidget):
                 item = self.grafik_filter_layout.takeAt(1)
                 if item and item.widget():
                     item.widget().deleteLater()
-            conn = sqlite3.connect(DB_PATH)
+            conn = otvori_vezu()
             cursor = conn.cursor()
             cursor.execute("SELECT id, naziv, sekcija, serija_vv FROM turnusi ORDER BY naziv")
             turnusi = cursor.fetchall()
@@ -947,7 +1375,7 @@ class SimpleApp(QWidget):
                 item = self.sekcije_grafik_layout.takeAt(1)
                 if item and item.widget():
                     item.widget().deleteLater()
-            conn = sqlite3.connect(DB_PATH)
+            conn = otvori_vezu()
             cursor = conn.cursor()
             cursor.execute("SELECT DISTINCT sekcija FROM turnusi WHERE sekcija IS NOT NULL ORDER BY sekcija")
             sekcije = [row[0] for row in cursor.fetchall() if row[0]]
@@ -968,7 +1396,7 @@ class SimpleApp(QWidget):
                 item = self.serije_vv_grafik_layout.takeAt(1)
                 if item and item.widget():
                     item.widget().deleteLater()
-            conn = sqlite3.connect(DB_PATH)
+            conn = otvori_vezu()
             cursor = conn.cursor()
             cursor.execute("SELECT DISTINCT serija_vv FROM turnusi WHERE serija_vv IS NOT NULL ORDER BY serija_vv")
             serije_vv = [row[0] for row in cursor.fetchall() if row[0]]
@@ -1009,6 +1437,9 @@ class SimpleApp(QWidget):
         if not hasattr(self, 'tabela') or self.tabela is None:
             return
         self.tabela.setRowCount(0)
+        # Novi zahtev poništava učitavanje koje je možda još u toku
+        self.kanal_vozova.otkazi()
+        self._zavrsi_napredak('vozovi')
         if (not hasattr(self, 'voz_filter_layout') or self.voz_filter_layout is None or
                 not hasattr(self, 'sekcije_filter_layout') or self.sekcije_filter_layout is None):
             return
@@ -1048,9 +1479,6 @@ class SimpleApp(QWidget):
         if not self.all_serije_cb.isChecked() and not selektovane_serije:
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # Pripremi ORDER BY deo SQL upita
         order_by_clause = ""
         if sort_column is not None and sort_order is not None:
@@ -1059,12 +1487,12 @@ class SimpleApp(QWidget):
                 0: "broj_voza",
                 1: "pocetna_stanica",
                 2: "krajnja_stanica",
-                3: "sat_polaska, minut_polaska",  # Polazak kao kombinacija
-                4: "sat_dolaska, minut_dolaska",  # Dolazak kao kombinacija
+                3: "polazak_min",  # Polazak u minutima od ponoći (izračunata kolona)
+                4: "dolazak_min",
                 5: "serija_vozila",
                 6: "status",
                 7: "sekcija"
-                # Kolone 8 (Uredi) i 9 (Obriši) nisu za sortiranje
+                # Kolone 8 (Dani), 9 (Uredi) i 10 (Obriši) nisu za sortiranje
             }
             db_column = column_map.get(sort_column)
             if db_column:
@@ -1079,8 +1507,8 @@ class SimpleApp(QWidget):
                 0: "broj_voza",
                 1: "pocetna_stanica",
                 2: "krajnja_stanica",
-                3: "sat_polaska, minut_polaska",
-                4: "sat_dolaska, minut_dolaska",
+                3: "polazak_min",
+                4: "dolazak_min",
                 5: "serija_vozila",
                 6: "status",
                 7: "sekcija"
@@ -1089,52 +1517,6 @@ class SimpleApp(QWidget):
             order_direction = "ASC" if default_order == Qt.SortOrder.AscendingOrder else "DESC"
             order_by_clause = f" ORDER BY {db_column} {order_direction}"
 
-        # Izvrši upit sa ORDER BY
-        sql_query = f"SELECT * FROM vozovi{order_by_clause}"
-        cursor.execute(sql_query)
-        svi_podaci = cursor.fetchall()
-        conn.close()
-
-        for red in svi_podaci:
-            if len(red) < 10:
-                continue
-            broj = str(red[0])
-            sekcija_val = str(red[8]) if red[8] is not None else ""
-            serija_val = str(red[9]) if red[9] is not None else ""
-            status_val = str(red[7]) if red[7] is not None else "R"
-
-            voz_odabran = self.all_vozovi_cb.isChecked() or (broj in selektovani_vozovi)
-            sekcija_odabrana = self.all_sekcije_cb.isChecked() or (not selektovane_sekcije) or (
-                        sekcija_val in selektovane_sekcije)
-            serija_odabrana = self.all_serije_cb.isChecked() or (not selektovane_serije) or (
-                        serija_val in selektovane_serije)
-
-            if voz_odabran and sekcija_odabrana and serija_odabrana:
-                row_position = self.tabela.rowCount()
-                self.tabela.insertRow(row_position)
-
-                sat_p = red[3] if red[3] is not None else 0
-                min_p = red[4] if red[4] is not None else 0
-                sat_d = red[5] if red[5] is not None else 0
-                min_d = red[6] if red[6] is not None else 0
-                podaci = [
-                    broj, red[1] or "", red[2] or "",
-                    f"{sat_p:02}:{min_p:02}", f"{sat_d:02}:{min_d:02}",
-                    serija_val, status_val, sekcija_val
-                ]
-                for col, vrednost in enumerate(podaci):
-                    item = QTableWidgetItem(str(vrednost))
-                    item.setFlags(item.flags() ^ Qt.ItemFlag.ItemIsEditable)
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.tabela.setItem(row_position, col, item)
-
-                btn_uredi = QPushButton("Uredi")
-                btn_uredi.clicked.connect(lambda _, r=red: self.uredi_voz(r))
-                self.tabela.setCellWidget(row_position, 8, btn_uredi)
-                btn_obrisi = QPushButton("Obriši")
-                btn_obrisi.clicked.connect(lambda _, b=broj: self.obrisi_voz(b))
-                self.tabela.setCellWidget(row_position, 9, btn_obrisi)
-
         # Uvek postavi indikator sortiranja na zaglavlju na osnovu trenutno aktivnog sortiranja
         # Koristi informacije iz self.vozi_sort_info ako nisu eksplicitno prosleđene
         if sort_column is not None and sort_order is not None:
@@ -1144,6 +1526,84 @@ class SimpleApp(QWidget):
             order = self.vozi_sort_info['order']
             self.tabela.horizontalHeader().setSortIndicator(col, order)
 
+        # Upit i pravljenje redova se izvršavaju u pozadinskoj niti, GUI dobija gotove redove u delovima
+        sql_query = f"SELECT * FROM vozovi{order_by_clause}"
+        svi_vozovi = self.all_vozovi_cb.isChecked()
+        sve_sekcije = self.all_sekcije_cb.isChecked()
+        sve_serije = self.all_serije_cb.isChecked()
+        selektovani_vozovi = set(selektovani_vozovi)
+        selektovane_sekcije = set(selektovane_sekcije)
+        selektovane_serije = set(selektovane_serije)
+
+        def izvor(conn):
+            cursor = conn.cursor()
+            period = kalendar.ucitaj_period(cursor)
+            cursor.execute(sql_query)
+            for red in cursor:
+                if len(red) < 10:
+                    continue
+                broj = str(red[0])
+                sekcija_val = str(red[8]) if red[8] is not None else ""
+                serija_val = str(red[9]) if red[9] is not None else ""
+                status_val = str(red[7]) if red[7] is not None else "R"
+
+                voz_odabran = svi_vozovi or (broj in selektovani_vozovi)
+                sekcija_odabrana = sve_sekcije or (not selektovane_sekcije) or (
+                        sekcija_val in selektovane_sekcije)
+                serija_odabrana = sve_serije or (not selektovane_serije) or (
+                        serija_val in selektovane_serije)
+                if not (voz_odabran and sekcija_odabrana and serija_odabrana):
+                    continue
+
+                yield red, self._podaci_voza(red, period)
+
+        self._pocni_napredak('vozovi')
+        self.kanal_vozova.pokreni(
+            izvor, prebroj=lambda conn: conn.execute("SELECT COUNT(*) FROM vozovi").fetchone()[0])
+
+    @staticmethod
+    def _podaci_voza(red, period):
+        """Tekst kolona tabele vozova za red iz `SELECT * FROM vozovi`."""
+        sat_p = red[3] if red[3] is not None else 0
+        min_p = red[4] if red[4] is not None else 0
+        sat_d = red[5] if red[5] is not None else 0
+        min_d = red[6] if red[6] is not None else 0
+        dani = red[13] if len(red) > 13 else None
+        return [
+            str(red[0]), red[1] or "", red[2] or "",
+            f"{sat_p:02}:{min_p:02}", f"{sat_d:02}:{min_d:02}",
+            str(red[9]) if red[9] is not None else "", str(red[7]) if red[7] is not None else "R",
+            str(red[8]) if red[8] is not None else "",
+            period.opis(kalendar.iz_bajtova(dani)) if period and dani is not None else ""
+        ]
+
+    def _dodaj_redove_vozova(self, deo):
+        """Dodaje u tabelu vozova deo redova pristiglih iz pozadinskog učitavanja."""
+        pocetak = dijagnostika.pocetak()
+        self.tabela.setUpdatesEnabled(False)
+        for red, podaci in deo:
+            row_position = self.tabela.rowCount()
+            self.tabela.insertRow(row_position)
+            self._popuni_red_voza(row_position, red, podaci)
+        self.tabela.setUpdatesEnabled(True)
+        if pocetak is not None:
+            dijagnostika.zabelezi("tabela", "vozovi", dijagnostika.proteklo_ms(pocetak), len(deo))
+        self._javi_deo('vozovi', len(deo))
+
+    def _popuni_red_voza(self, row_position, red, podaci):
+        for col, vrednost in enumerate(podaci):
+            item = QTableWidgetItem(str(vrednost))
+            item.setFlags(item.flags() ^ Qt.ItemFlag.ItemIsEditable)
+            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.tabela.setItem(row_position, col, item)
+
+        btn_uredi = QPushButton("Uredi")
+        btn_uredi.clicked.connect(lambda _, r=red, d=podaci[8]: self.uredi_voz(r, d))
+        self.tabela.setCellWidget(row_position, 9, btn_uredi)
+        btn_obrisi = QPushButton("Obriši")
+        btn_obrisi.clicked.connect(lambda _, b=podaci[0]: self.obrisi_voz(b))
+        self.tabela.setCellWidget(row_position, 10, btn_obrisi)
+
     def handle_turnusi_header_click(self, logical_index):
         """Rukuje klikom na zaglavlje kolone u tabeli turnusa."""
         # Dobij prethodno zapamćene informacije o sortiranju za turnuse
@@ -1170,6 +1630,9 @@ class SimpleApp(QWidget):
         if not hasattr(self, 'tabela_turnusa') or self.tabela_turnusa is None:
             return
         self.tabela_turnusa.setRowCount(0)
+        # Novi zahtev poništava učitavanje koje je možda još u toku
+        self.kanal_turnusa.otkazi()
+        self._zavrsi_napredak('turnusi')
         if (not hasattr(self, 'naziv_filter_layout') or self.naziv_filter_layout is None or
                 not hasattr(self, 'sekcije_turnusi_filter_layout') or self.sekcije_turnusi_filter_layout is None or
                 not hasattr(self, 'serije_vv_filter_layout') or self.serije_vv_filter_layout is None):
@@ -1209,19 +1672,21 @@ class SimpleApp(QWidget):
         if not self.all_serije_vv_cb.isChecked() and not selektovane_serije_vv:
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # Pripremi ORDER BY deo SQL upita
         order_by_clause = ""
         if sort_column is not None and sort_order is not None:
             # Mapiraj logički indeks kolone na naziv kolone u bazi
             column_map = {
-                0: "naziv",
-                1: "serija_vv",
+                0: "t.naziv",
+                1: "t.serija_vv",
                 2: "vozovi_placeholder",  # Ova kolona je složena, možda nije idealna za sortiranje preko SQL
-                3: "sekcija"
-                # Kolona 4 (Akcije) nije za sortiranje
+                3: "t.sekcija",
+                4: "s.najkraci_obrt_min",
+                5: "s.cekanje_min",
+                6: "s.najduze_cekanje_min",
+                7: "s.iskoriscenost",
+                8: "p.vrsta"
+                # Kolona 9 (Akcije) nije za sortiranje
             }
             db_column = column_map.get(sort_column)
             if db_column and db_column != "vozovi_placeholder":  # Za sada preskoči sortiranje po vozovima
@@ -1233,60 +1698,19 @@ class SimpleApp(QWidget):
             default_col = self.turnusi_sort_info['column']
             default_order = self.turnusi_sort_info['order']
             column_map = {
-                0: "naziv",
-                1: "serija_vv",
-                3: "sekcija"
+                0: "t.naziv",
+                1: "t.serija_vv",
+                3: "t.sekcija",
+                4: "s.najkraci_obrt_min",
+                5: "s.cekanje_min",
+                6: "s.najduze_cekanje_min",
+                7: "s.iskoriscenost",
+                8: "p.vrsta"
             }
-            db_column = column_map.get(default_col, "naziv")
+            db_column = column_map.get(default_col, "t.naziv")
             order_direction = "ASC" if default_order == Qt.SortOrder.AscendingOrder else "DESC"
             order_by_clause = f" ORDER BY {db_column} {order_direction}"
 
-        # Izvrši upit sa ORDER BY
-        sql_query = f"SELECT id, naziv, serija_vv, sekcija FROM turnusi{order_by_clause}"
-        cursor.execute(sql_query)
-        turnusi = cursor.fetchall()
-        conn.close()
-
-        for turnus in turnusi:
-            naziv = str(turnus[1])
-            serija_vv_val = str(turnus[2]) if turnus[2] else ""
-            sekcija_val = str(turnus[3]) if turnus[3] else ""
-
-            naziv_odabran = self.all_nazivi_cb.isChecked() or (naziv in selektovani_nazivi)
-            sekcija_odabrana = self.all_sekcije_turnusi_cb.isChecked() or (not selektovane_sekcije) or (
-                        sekcija_val in selektovane_sekcije)
-            serija_vv_odabrana = self.all_serije_vv_cb.isChecked() or (not selektovane_serije_vv) or (
-                        serija_vv_val in selektovane_serije_vv)
-
-            if naziv_odabran and sekcija_odabrana and serija_vv_odabrana:
-                conn_inner = sqlite3.connect(DB_PATH)
-                cursor_inner = conn_inner.cursor()
-                cursor_inner.execute("""SELECT v.broj_voza FROM turnus_vozovi tv JOIN vozovi v ON tv.broj_voza = v.broj_voza
-                                        WHERE tv.turnus_id = ? ORDER BY tv.redosled""", (turnus[0],))
-                vozovi_str = ", ".join([v[0] for v in cursor_inner.fetchall()])
-                conn_inner.close()
-
-                r = self.tabela_turnusa.rowCount()
-                self.tabela_turnusa.insertRow(r)
-                self.tabela_turnusa.setItem(r, 0, QTableWidgetItem(naziv))
-                self.tabela_turnusa.setItem(r, 1, QTableWidgetItem(serija_vv_val))
-                self.tabela_turnusa.setItem(r, 2, QTableWidgetItem(vozovi_str))
-                self.tabela_turnusa.setItem(r, 3, QTableWidgetItem(sekcija_val))
-
-                akcije = QWidget()
-                akcije_layout = QHBoxLayout(akcije)
-                akcije_layout.setContentsMargins(0, 0, 0, 0)
-                btn_u = QPushButton("Uredi")
-                btn_u.clicked.connect(lambda _, t=turnus: self.uredi_turnus(t))
-                btn_o = QPushButton("Obriši")
-                btn_o.clicked.connect(lambda _, t=turnus: self.obrisi_turnus(t))
-                btn_g = QPushButton("Grafik")
-                btn_g.clicked.connect(lambda _, t=turnus: self.prikazi_grafik_turnusa(t))
-                akcije_layout.addWidget(btn_u)
-                akcije_layout.addWidget(btn_o)
-                akcije_layout.addWidget(btn_g)
-                self.tabela_turnusa.setCellWidget(r, 4, akcije)
-
         # Uvek postavi indikator sortiranja na zaglavlju na osnovu trenutno aktivnog sortiranja
         # Koristi informacije iz self.turnusi_sort_info ako nisu eksplicitno prosleđene
         if sort_column is not None and sort_order is not None and column_map.get(sort_column) != "vozovi_placeholder":
@@ -1296,10 +1720,904 @@ class SimpleApp(QWidget):
             order = self.turnusi_sort_info['order']
             self.tabela_turnusa.horizontalHeader().setSortIndicator(col, order)
 
+        # Upit i pravljenje redova se izvršavaju u pozadinskoj niti, GUI dobija gotove redove u delovima
+        sql_query = SQL_TABELE_TURNUSA + order_by_clause
+        svi_nazivi = self.all_nazivi_cb.isChecked()
+        sve_sekcije = self.all_sekcije_turnusi_cb.isChecked()
+        sve_serije_vv = self.all_serije_vv_cb.isChecked()
+        selektovani_nazivi = set(selektovani_nazivi)
+        selektovane_sekcije = set(selektovane_sekcije)
+        selektovane_serije_vv = set(selektovane_serije_vv)
+
+        def izvor(conn):
+            cursor = conn.cursor()
+            # Vozovi svih turnusa jednim upitom (umesto posebnog upita za svaki turnus)
+            cursor.execute("""SELECT tv.turnus_id, v.broj_voza FROM turnus_vozovi tv
+                              JOIN vozovi v ON tv.broj_voza = v.broj_voza
+                              ORDER BY tv.turnus_id, tv.redosled""")
+            vozovi_po_turnusu = {}
+            for turnus_id, broj_voza in cursor:
+                vozovi_po_turnusu.setdefault(turnus_id, []).append(broj_voza)
+
+            cursor.execute(sql_query)
+            for red in cursor:
+                naziv = str(red[1])
+                serija_vv_val = str(red[2]) if red[2] else ""
+                sekcija_val = str(red[3]) if red[3] else ""
+
+                naziv_odabran = svi_nazivi or (naziv in selektovani_nazivi)
+                sekcija_odabrana = sve_sekcije or (not selektovane_sekcije) or (
+                        sekcija_val in selektovane_sekcije)
+                serija_vv_odabrana = sve_serije_vv or (not selektovane_serije_vv) or (
+                        serija_vv_val in selektovane_serije_vv)
+                if naziv_odabran and sekcija_odabrana and serija_vv_odabrana:
+                    yield self._podaci_turnusa(red, vozovi_po_turnusu.get(red[0], []))
+
+        self._pocni_napredak('turnusi')
+        self.kanal_turnusa.pokreni(
+            izvor, prebroj=lambda conn: conn.execute("SELECT COUNT(*) FROM turnusi").fetchone()[0])
+
+    @staticmethod
+    def _podaci_turnusa(red, vozovi):
+        """Podaci reda tabele turnusa iz reda upita SQL_TABELE_TURNUSA i vozova turnusa."""
+        *turnus, najkraci_obrt, cekanje, najduze_cekanje, iskoriscenost, vrsta, greske = red
+        turnus = tuple(turnus)
+        # Statistika obrta (turnus bez postojećih vozova je nema)
+        statistika = ["" if m is None else pretraga.vreme(m)
+                      for m in (najkraci_obrt, cekanje, najduze_cekanje)]
+        statistika.append("" if iskoriscenost is None else f"{iskoriscenost:.1f} %")
+        # Poslednja zapamćena provera (None ako turnus još nije proveren)
+        provera = None if vrsta is None else (vrsta or None, greske.split("\n") if greske else [])
+        return (turnus, str(turnus[1]), str(turnus[2]) if turnus[2] else "", ", ".join(vozovi),
+                str(turnus[3]) if turnus[3] else "", statistika, provera)
+
+    def _dodaj_redove_turnusa(self, deo):
+        """Dodaje u tabelu turnusa deo redova pristiglih iz pozadinskog učitavanja."""
+        pocetak = dijagnostika.pocetak()
+        self.tabela_turnusa.setUpdatesEnabled(False)
+        for podaci in deo:
+            r = self.tabela_turnusa.rowCount()
+            self.tabela_turnusa.insertRow(r)
+            self._popuni_red_turnusa(r, *podaci)
+        self.tabela_turnusa.setUpdatesEnabled(True)
+        if pocetak is not None:
+            dijagnostika.zabelezi("tabela", "turnusi", dijagnostika.proteklo_ms(pocetak), len(deo))
+        self._javi_deo('turnusi', len(deo))
+
+    def _popuni_red_turnusa(self, r, turnus, naziv, serija_vv_val, vozovi_str, sekcija_val, statistika, provera):
+        item_naziv = QTableWidgetItem(naziv)
+        item_naziv.setData(Qt.ItemDataRole.UserRole, turnus[0])
+        self.tabela_turnusa.setItem(r, 0, item_naziv)
+        self.tabela_turnusa.setItem(r, 1, QTableWidgetItem(serija_vv_val))
+        self.tabela_turnusa.setItem(r, 2, QTableWidgetItem(vozovi_str))
+        self.tabela_turnusa.setItem(r, 3, QTableWidgetItem(sekcija_val))
+        for kolona, vrednost in enumerate(statistika, 4):
+            self.tabela_turnusa.setItem(r, kolona, QTableWidgetItem(vrednost))
+        # Provera koja je stigla posle pokretanja učitavanja ima prednost nad zapamćenom u bazi
+        self._postavi_proveru(r, self.provere_turnusa.get(turnus[0], provera))
+
+        akcije = QWidget()
+        akcije_layout = QHBoxLayout(akcije)
+        akcije_layout.setContentsMargins(0, 0, 0, 0)
+        btn_u = QPushButton("Uredi")
+        btn_u.clicked.connect(lambda _, t=turnus: self.uredi_turnus(t))
+        btn_o = QPushButton("Obriši")
+        btn_o.clicked.connect(lambda _, t=turnus: self.obrisi_turnus(t))
+        btn_g = QPushButton("Grafik")
+        btn_g.clicked.connect(lambda _, t=turnus: self.prikazi_grafik_turnusa(t))
+        akcije_layout.addWidget(btn_u)
+        akcije_layout.addWidget(btn_o)
+        akcije_layout.addWidget(btn_g)
+        self.tabela_turnusa.setCellWidget(r, 9, akcije)
+
+    def _postavi_proveru(self, red, provera):
+        """Upisuje ishod provere u kolonu Provera; greške su u opisu ćelije."""
+        if provera is None:
+            item = QTableWidgetItem("")
+        elif provera[0] is None:
+            item = QTableWidgetItem("Ispravan")
+        else:
+            item = QTableWidgetItem(f"Greška ({provera[0]})")
+            item.setBackground(QColor(255, 200, 200))
+            item.setToolTip("\n".join(provera[1]))
+        self.tabela_turnusa.setItem(red, 8, item)
+
+    # --- PROVERA ZAVISNIH TURNUSA ---
+
+    def proveri_zavisne_turnuse(self, vozovi=(), turnusi=(), sve=False):
+        """Ponovo proverava turnuse koji sadrže navedene vozove ili su navedeni (ili sve) u pozadini.
+
+        Turnus čiji se otisak provere nije promenio dobija rezultat iz keša; novi rezultati se
+        pamte u bazi i označavaju u tabeli turnusa.
+        """
+        vozovi, turnusi = list(vozovi), list(turnusi)
+        if not (sve or vozovi or turnusi):
+            return
+        self._generacija_provere += 1
+        generacija = self._generacija_provere
+        kes = self.kes_reda_voznje
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                cursor = conn.cursor()
+                if sve:
+                    # Svi turnusi: podaci vozova iz kolonskog reda vožnje (bez numpy-ja iz baze)
+                    red_voznje = kes.dohvati(conn)
+                    return validacija.proveri_turnuse(
+                        cursor, vozovi_info=red_voznje.info_vozova() if red_voznje is not None else None)
+                return validacija.proveri_turnuse(cursor, set(turnusi) | analiza.turnusi_vozova(cursor, vozovi))
+            finally:
+                conn.close()
+
+        def po_zavrsetku(rezultati):
+            if any(not iz_kesa for *_, iz_kesa in rezultati):
+                self.pisac.posalji(lambda cursor: validacija.upisi_provere(cursor, rezultati),
+                                   None, self._greska_pisanja)
+            primenjena = self._primenjena_provera
+            novi = {}
+            for turnus_id, _, vrsta, greske, _ in rezultati:
+                if generacija >= max(primenjena.get(turnus_id, 0), primenjena.get(None, 0)):
+                    primenjena[turnus_id] = generacija
+                    novi[turnus_id] = (vrsta, greske)
+            if sve:
+                primenjena[None] = max(primenjena.get(None, 0), generacija)
+            self.provere_turnusa.update(novi)
+            for red in range(self.tabela_turnusa.rowCount()):
+                item = self.tabela_turnusa.item(red, 0)
+                turnus_id = item.data(Qt.ItemDataRole.UserRole) if item else None
+                if turnus_id in novi:
+                    self._postavi_proveru(red, novi[turnus_id])
+            neispravnih = sum(1 for vrsta, _ in novi.values() if vrsta is not None)
+            if not sve and neispravnih:
+                self.status_label.setText(f"⚠️ Posle izmene nije ispravno turnusa: {neispravnih} "
+                                          f"(označeni u koloni Provera).")
+            elif sve:
+                self.status_label.setText(f"Provereno turnusa: {len(novi)}, neispravnih: {neispravnih}.")
+
+        PozadinskiPosao.pokreni(posao, po_zavrsetku,
+                                lambda e: dijagnostika.log.warning("Greška pri proveri turnusa: %s", e))
+
+    # --- IZVOZ ---
+
+    def _izabrane_vrednosti(self, layout, all_checkbox):
+        """Vrednosti čekiranih filtera (None ako je čekirano 'Označi sve')."""
+        if all_checkbox.isChecked():
+            return None
+        izabrane = []
+        for i in range(1, layout.count()):
+            widget = layout.itemAt(i).widget()
+            if isinstance(widget, QCheckBox) and widget.isChecked():
+                izabrane.append(widget.text())
+        return izabrane
+
+    def izvezi(self, sta):
+        """Izvozi vozove, turnuse ili rezultate provere uz filtere po sekciji i seriji iz taba."""
+        putanja, _ = QFileDialog.getSaveFileName(
+            self, "Izvoz", f"{sta}.csv", "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet)")
+        if not putanja:
+            return
+        if sta == 'vozovi':
+            sekcije = self._izabrane_vrednosti(self.sekcije_filter_layout, self.all_sekcije_cb)
+            serije = self._izabrane_vrednosti(self.serije_filter_layout, self.all_serije_cb)
+            funkcija = izvoz.izvezi_vozove
+        elif sta == 'flota':
+            sekcije, serije = None, None
+            tip_dana = self.flota_dani_combo.currentData()
+
+            def funkcija(conn, putanja, format_izvoza, sekcije, serije):
+                return izvoz.izvezi_flotu(conn, putanja, format_izvoza, sekcije, serije, tip_dana=tip_dana)
+        else:
+            sekcije = self._izabrane_vrednosti(self.sekcije_turnusi_filter_layout, self.all_sekcije_turnusi_cb)
+            serije = self._izabrane_vrednosti(self.serije_vv_filter_layout, self.all_serije_vv_cb)
+            funkcija = izvoz.izvezi_turnuse if sta == 'turnusi' else izvoz.izvezi_validaciju
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                return funkcija(conn, putanja, None, sekcije, serije)
+            finally:
+                conn.close()
+
+        def po_zavrsetku(broj):
+            self._zavrsi_napredak('izvoz')
+            QMessageBox.information(self, "Izvoz", f"Izvezeno redova: {broj}\n{putanja}")
+
+        def po_gresci(greska):
+            self._zavrsi_napredak('izvoz')
+            QMessageBox.critical(self, "Greška", f"Greška pri izvozu: {greska}")
+
+        self._pocni_napredak('izvoz')
+        PozadinskiPosao.pokreni(posao, po_zavrsetku, po_gresci)
+
+    # --- ŠTAMPA TURNUSA ---
+
+    def pripremi_stampu(self):
+        """Računa listove sledećeg izdanja u pozadini i puni tabele listova i izdanja."""
+        samo_izmenjeni = self.stampa_vrsta_combo.currentData()
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                cursor = conn.cursor()
+                izdanje, listovi = stampa.plan_izdanja(cursor, samo_izmenjeni)
+                return izdanje, listovi, kalendar.ucitaj_period(cursor), stampa.lista_izdanja(cursor)
+            finally:
+                conn.close()
+
+        def po_zavrsetku(rezultat):
+            izdanje, listovi, period, izdanja = rezultat
+            self.plan_stampe = (izdanje, samo_izmenjeni, listovi, period)
+            self.tabela_listova.setRowCount(len(listovi))
+            for red, lst in enumerate(listovi):
+                for kolona, vrednost in enumerate([lst.strana, lst.naziv, lst.status, lst.izdanje or ""]):
+                    self.tabela_listova.setItem(red, kolona, QTableWidgetItem(str(vrednost)))
+            self.tabela_izdanja.setRowCount(len(izdanja))
+            for red, vrednosti in enumerate(izdanja):
+                for kolona, vrednost in enumerate(vrednosti):
+                    self.tabela_izdanja.setItem(red, kolona, QTableWidgetItem(
+                        str(vrednost or "").replace("T", " ") if kolona == 1 else str(vrednost or "")))
+            self.stampa_label.setText(f"Izdanje {izdanje}: listova za štampu {len(listovi)}.")
+            self.btn_stampaj.setEnabled(bool(listovi))
+            self._prikazi_list(0 if listovi else -1)
+
+        self.stampa_label.setText("Priprema...")
+        PozadinskiPosao.pokreni(posao, po_zavrsetku,
+                                lambda e: QMessageBox.critical(self, "Greška", f"Greška pri pripremi štampe: {e}"))
+
+    def _prikazi_list(self, red):
+        """Prikazuje izabrani list u pregledu (A4 na 96 dpi)."""
+        self.stampa_scene.clear()
+        if self.plan_stampe is None or not 0 <= red < len(self.plan_stampe[2]):
+            return
+        izdanje, _, listovi, period = self.plan_stampe
+        slika = QImage(794, 1123, QImage.Format.Format_RGB32)
+        painter = QPainter(slika)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        stampa.nacrtaj_list(painter, slika.width(), slika.height(), listovi[red], izdanje, period)
+        painter.end()
+        self.stampa_scene.addPixmap(QPixmap.fromImage(slika))
+
+    def stampaj_izdanje(self):
+        """Upisuje pripremljene listove u PDF i beleži izdanje u dnevnik."""
+        if not self.plan_stampe or not self.plan_stampe[2]:
+            return
+        izdanje, samo_izmenjeni, listovi, period = self.plan_stampe
+        putanja, _ = QFileDialog.getSaveFileName(self, "Štampa turnusa", f"turnusi_izdanje_{izdanje}.pdf", "PDF (*.pdf)")
+        if not putanja:
+            return
+
+        def posao(javi):
+            return stampa.stampaj_pdf(putanja, listovi, izdanje, period, javi)
+
+        def po_napretku(broj):
+            if 'stampa' in self._napredak:
+                self._napredak['stampa'] = [broj, len(listovi)]
+                self._osvezi_napredak()
+
+        def po_stampi(broj):
+            # Izdanje se beleži tek kada je PDF upisan
+            self.pisac.posalji(lambda cursor: stampa.upisi_izdanje(cursor, izdanje, listovi, samo_izmenjeni),
+                               lambda _: po_upisu(broj), po_gresci)
+
+        def po_upisu(broj):
+            self._zavrsi_napredak('stampa')
+            self.btn_stampaj.setEnabled(True)
+            self.pripremi_stampu()
+            QMessageBox.information(self, "Štampa", f"Izdanje {izdanje}: odštampano listova {broj}\n{putanja}")
+
+        def po_gresci(greska):
+            self._zavrsi_napredak('stampa')
+            self.btn_stampaj.setEnabled(True)
+            QMessageBox.critical(self, "Greška", f"Greška pri štampi: {greska}")
+
+        self.btn_stampaj.setEnabled(False)
+        self._pocni_napredak('stampa')
+        self._javi_ukupno('stampa', len(listovi))
+        PozadinskiPosao.pokreni(posao, po_stampi, po_gresci, po_napretku)
+
+    # --- FLOTA U SLUŽBI ---
+
+    def izracunaj_flotu(self):
+        """Računa broj vozila u vožnji po minutu u pozadini i prikazuje grafikon i tabelu."""
+        kes = self.kes_reda_voznje
+        tip_dana = self.flota_dani_combo.currentData()
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                return analiza.kriva_flote(conn, kes.dohvati(conn), dani=kalendar.maska_tipa_dana(conn.cursor(), tip_dana))
+            finally:
+                conn.close()
+
+        def po_zavrsetku(kriva):
+            self.btn_izracunaj_flotu.setEnabled(True)
+            self._prikazi_flotu(kriva)
+
+        def po_gresci(greska):
+            self.btn_izracunaj_flotu.setEnabled(True)
+            QMessageBox.critical(self, "Greška", f"Greška pri računanju flote: {greska}")
+
+        self.btn_izracunaj_flotu.setEnabled(False)
+        self.flota_label.setText("Računanje...")
+        PozadinskiPosao.pokreni(posao, po_zavrsetku, po_gresci)
+
+    def _prikazi_flotu(self, kriva):
+        """Crta stepenaste linije vozila u vožnji (0-24h) i puni zbirnu tabelu."""
+        sirina_sata = 60
+        visina = 300
+        levo, gore = 40, 20
+        self.flota_scene.clear()
+        najvise = max([kriva.vozila[s] for s in kriva.serije] + [1])
+        razmera = visina / najvise
+        dno = gore + visina
+
+        # Ose i mreža
+        self.flota_scene.addLine(levo, dno, levo + 24 * sirina_sata, dno, QPen(Qt.GlobalColor.black, 1))
+        self.flota_scene.addLine(levo, gore, levo, dno, QPen(Qt.GlobalColor.black, 1))
+        for h in range(25):
+            x = levo + h * sirina_sata
+            self.flota_scene.addLine(x, dno, x, dno + 4, QPen(Qt.GlobalColor.black, 0.8))
+            self.flota_scene.addText(str(h)).setPos(x - 8, dno + 4)
+        korak = max(1, najvise // 5)
+        for broj in range(0, najvise + 1, korak):
+            y = dno - broj * razmera
+            self.flota_scene.addLine(levo, y, levo + 24 * sirina_sata, y, QPen(Qt.GlobalColor.lightGray, 0.5))
+            self.flota_scene.addText(str(broj)).setPos(2, y - 12)
+
+        for i, serija in enumerate(kriva.serije):
+            boja = QColor.fromHsv((i * 67) % 360, 200, 180)
+            u_voznji = kriva.u_voznji[serija].tolist()
+            putanja = QPainterPath()
+            putanja.moveTo(levo, dno - u_voznji[0] * razmera)
+            for minut in range(1, len(u_voznji)):
+                if u_voznji[minut] != u_voznji[minut - 1]:
+                    x = levo + minut * sirina_sata / 60
+                    putanja.lineTo(x, dno - u_voznji[minut - 1] * razmera)
+                    putanja.lineTo(x, dno - u_voznji[minut] * razmera)
+            putanja.lineTo(levo + 24 * sirina_sata, dno - u_voznji[-1] * razmera)
+            self.flota_scene.addPath(putanja, QPen(boja, 1.5))
+            # Legenda
+            legenda = self.flota_scene.addText(f"{serija or 'bez serije'} (vozila: {kriva.vozila[serija]})")
+            legenda.setDefaultTextColor(boja)
+            legenda.setPos(levo + 24 * sirina_sata + 10, gore + i * 18)
+        self.flota_scene.setSceneRect(0, 0, levo + 24 * sirina_sata + 200, dno + 30)
+
+        redovi = kriva.sazetak()
+        self.tabela_flote.setRowCount(len(redovi))
+        for red, (serija, vozila, vrh, minut_vrha, najmanje, prosecno) in enumerate(redovi):
+            vrednosti = [serija, str(vozila), str(vrh), f"{minut_vrha // 60:02d}:{minut_vrha % 60:02d}",
+                         str(najmanje), f"{prosecno:.1f}"]
+            for kolona, vrednost in enumerate(vrednosti):
+                self.tabela_flote.setItem(red, kolona, QTableWidgetItem(vrednost))
+        ukupno_vrh = sum(vrh for _, _, vrh, _, _, _ in redovi)
+        self.flota_label.setText(f"Serija: {len(redovi)}, potrebno ispravnih vozila (zbir vrhova): {ukupno_vrh}")
+
+    # --- ZAUZETOST STANICA ---
+
+    def _promenjen_tab(self, indeks):
+        """Stanice se računaju tek kada se tab prvi put otvori; listovi za štampu pri svakom otvaranju."""
+        if self.tabs.widget(indeks) is self.tab_stanice and not self.zauzetost_stanica.ucitana():
+            self.osvezi_stanice(sve=True)
+        elif self.tabs.widget(indeks) is self.tab_stampa:
+            # Podaci su se možda menjali od prethodne pripreme
+            self.pripremi_stampu()
+
+    def osvezi_stanice(self, vozovi=(), turnusi=(), sve=False):
+        """Ponovo računa boravke turnusa koji sadrže navedene vozove ili su navedeni.
+
+        Poziva se posle upisa izmene; ako stanice još nisu računate, čeka se otvaranje taba.
+        """
+        if self._stanice_ucitavanje:
+            self._stanice_zastarelo = True
+            return
+        if not sve and not self.zauzetost_stanica.ucitana():
+            return
+        vozovi, turnusi = list(vozovi), list(turnusi)
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                cursor = conn.cursor()
+                if sve:
+                    return analiza.boravci_turnusa(cursor), analiza.krajevi_turnusa(cursor)
+                dotaknuti = set(turnusi) | analiza.turnusi_vozova(cursor, vozovi)
+                return analiza.boravci_turnusa(cursor, dotaknuti), analiza.krajevi_turnusa(cursor, dotaknuti)
+            finally:
+                conn.close()
+
+        def po_zavrsetku(rezultat):
+            boravci, krajevi = rezultat
+            if sve:
+                self._stanice_ucitavanje = False
+                self.zauzetost_stanica.postavi(boravci)
+                self.bilans_depoa.postavi(krajevi)
+            else:
+                self.zauzetost_stanica.azuriraj(boravci)
+                self.bilans_depoa.azuriraj(krajevi)
+            self._prikazi_stanice()
+            self._prikazi_bilans_depoa()
+            if self._stanice_zastarelo:
+                self._stanice_zastarelo = False
+                self.osvezi_stanice(sve=True)
+
+        def po_gresci(greska):
+            if sve:
+                self._stanice_ucitavanje = False
+            self.stanice_label.setText(f"Greška pri računanju stanica: {greska}")
+
+        if sve:
+            self._stanice_ucitavanje = True
+            self.stanice_label.setText("Računanje...")
+        PozadinskiPosao.pokreni(posao, po_zavrsetku, po_gresci)
+
+    def _prikazi_stanice(self):
+        """Puni tabelu stanica; profili se iz keša ponovo računaju samo za izmenjene stanice."""
+        izabrana = self._izabrana_stanica()
+        stanice = self.zauzetost_stanica.stanice()
+        self.tabela_stanica.blockSignals(True)
+        self.tabela_stanica.setRowCount(len(stanice))
+        for red, stanica in enumerate(stanice):
+            profil = self.zauzetost_stanica.profil(stanica)
+            vrednosti = [stanica, str(profil["boravaka"]), str(profil["vrh"]), pretraga.vreme(profil["minut_vrha"]),
+                         str(profil["u_ponoc"]), pretraga.vreme(round(profil["prosecan"])),
+                         pretraga.vreme(profil["najduzi"])]
+            for kolona, vrednost in enumerate(vrednosti):
+                self.tabela_stanica.setItem(red, kolona, QTableWidgetItem(vrednost))
+            if stanica == izabrana:
+                self.tabela_stanica.selectRow(red)
+        self.tabela_stanica.blockSignals(False)
+        self.stanice_label.setText(f"Stanica: {len(stanice)}")
+        self._prikazi_boravke_stanice()
+
+    def _izabrana_stanica(self):
+        red = self.tabela_stanica.currentRow()
+        stavka = self.tabela_stanica.item(red, 0) if red >= 0 else None
+        return stavka.text() if stavka else None
+
+    def _prikazi_boravke_stanice(self):
+        """Prikazuje boravke vozila u izabranoj stanici."""
+        stanica = self._izabrana_stanica()
+        boravci = self.zauzetost_stanica.boravci(stanica) if stanica else []
+        nazivi = self._nazivi_turnusa()
+        self.tabela_boravaka.setRowCount(len(boravci))
+        for red, (_, turnus_id, dolazni, dolazak, odlazni, polazak, trajanje) in enumerate(boravci):
+            vrednosti = [nazivi.get(turnus_id, str(turnus_id)), dolazni, pretraga.vreme(dolazak), odlazni,
+                         pretraga.vreme(polazak), pretraga.vreme(trajanje)]
+            for kolona, vrednost in enumerate(vrednosti):
+                self.tabela_boravaka.setItem(red, kolona, QTableWidgetItem(vrednost))
+
+    def _prikazi_bilans_depoa(self):
+        """Puni tabelu bilansa depoa i navodi turnuse koji se ne završavaju gde počinju."""
+        if not self.bilans_depoa.ucitana():
+            return
+        redovi = self.bilans_depoa.redovi(self.samo_neuravnotezene_checkbox.isChecked())
+        self.tabela_bilansa.setRowCount(len(redovi))
+        for red, (serija, stanica, pocinje, zavrsava, bilans) in enumerate(redovi):
+            vrednosti = [serija or "N/A", stanica, str(pocinje), str(zavrsava), f"{bilans:+d}" if bilans else "0"]
+            for kolona, vrednost in enumerate(vrednosti):
+                stavka = QTableWidgetItem(vrednost)
+                if bilans:
+                    stavka.setBackground(QColor(255, 220, 220) if bilans < 0 else QColor(255, 240, 200))
+                self.tabela_bilansa.setItem(red, kolona, stavka)
+        neuravnotezenih = sum(1 for r in self.bilans_depoa.redovi() if r[4])
+        nezatvoreni = self.bilans_depoa.nezatvoreni_turnusi()
+        tekst = f"Neuravnoteženih stanica: {neuravnotezenih}"
+        if nezatvoreni:
+            nazivi = self._nazivi_turnusa()
+            prikaz = ", ".join(nazivi.get(turnus_id, str(turnus_id)) for turnus_id in nezatvoreni[:20])
+            if len(nezatvoreni) > 20:
+                prikaz += ", ..."
+            tekst += f"; turnusi koji ne završavaju gde počinju ({len(nezatvoreni)}): {prikaz}"
+        self.bilans_label.setText(tekst)
+
+    def ucitaj_pravila_obrta(self):
+        """Puni tabelu pravila obrta iz baze."""
+        conn = otvori_vezu()
+        try:
+            pravila = conn.execute(
+                "SELECT stanica, serija, minimum_min FROM pravila_obrta ORDER BY stanica, serija").fetchall()
+        finally:
+            conn.close()
+        self.tabela_pravila.setRowCount(len(pravila))
+        for red, pravilo in enumerate(pravila):
+            for kolona, vrednost in enumerate(pravilo):
+                self.tabela_pravila.setItem(red, kolona, QTableWidgetItem(str(vrednost)))
+
+    def sacuvaj_pravila_obrta(self):
+        """Proverava i upisuje sva pravila iz tabele (postojeća pravila se zamenjuju)."""
+        pravila = {}
+        for red in range(self.tabela_pravila.rowCount()):
+            stanica, serija, minimum = [
+                (self.tabela_pravila.item(red, k).text().strip() if self.tabela_pravila.item(red, k) else "")
+                for k in range(3)]
+            if not (stanica or serija or minimum):
+                continue
+            if not minimum.isdigit():
+                QMessageBox.critical(self, "Greška", f"Red {red + 1}: minimum mora biti ceo broj minuta.")
+                return
+            stanica = stanica.upper()
+            if (stanica, serija) in pravila:
+                QMessageBox.critical(self, "Greška", f"Red {red + 1}: pravilo za {stanica or 'sve stanice'} / "
+                                                     f"{serija or 'sve serije'} je već uneto.")
+                return
+            pravila[(stanica, serija)] = int(minimum)
+
+        def operacija(cursor):
+            cursor.execute("DELETE FROM pravila_obrta")
+            cursor.executemany("INSERT INTO pravila_obrta (stanica, serija, minimum_min) VALUES (?, ?, ?)",
+                               [(stanica, serija, minimum) for (stanica, serija), minimum in pravila.items()])
+
+        def po_zavrsetku(_):
+            self.ucitaj_pravila_obrta()
+            # Pravila menjaju otisak provere svih turnusa
+            self.proveri_zavisne_turnuse(sve=True)
+            QMessageBox.information(self, "Pravila obrta", f"Sačuvano pravila: {len(pravila)}")
+
+        self.pisac.posalji(operacija, po_zavrsetku, self._greska_pisanja)
+
+    def _nazivi_turnusa(self):
+        conn = otvori_vezu()
+        try:
+            return dict(conn.execute("SELECT id, naziv FROM turnusi"))
+        finally:
+            conn.close()
+
+    # --- PRENOS KAŠNJENJA ---
+
+    def simuliraj_kasnjenja(self, monte_karlo=False):
+        """Pokreće šta-ako prenos zadatih kašnjenja ili Monte Karlo simulaciju u pozadini."""
+        if monte_karlo:
+            try:
+                uzoraka = int(self.mk_uzoraka_input.text())
+                verovatnoca = int(self.mk_verovatnoca_input.text()) / 100
+                srednje = int(self.mk_srednje_input.text())
+            except ValueError:
+                QMessageBox.critical(self, "Greška", "Unesite broj dana, verovatnoću i srednje kašnjenje.")
+                return
+        else:
+            primarna = {}
+            for deo in self.primarna_kasnjenja_input.text().split(","):
+                if not deo.strip():
+                    continue
+                broj, _, minuti = deo.partition(":")
+                if not minuti.strip().isdigit():
+                    QMessageBox.critical(self, "Greška", f"Neispravno kašnjenje '{deo.strip()}' (očekuje se voz:minuti).")
+                    return
+                primarna[broj.strip().upper()] = int(minuti)
+            if not primarna:
+                QMessageBox.critical(self, "Greška", "Unesite bar jedno kašnjenje (voz:minuti).")
+                return
+        kes = self.kes_reda_voznje
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                red_voznje = kes.dohvati(conn)
+                if red_voznje is None:
+                    raise ValueError("Za simulaciju kašnjenja potreban je paket numpy (pip install numpy).")
+                mreza = analiza.MrezaTurnusa.iz_baze(conn, red_voznje, ucitaj_pravila_obrta(conn.cursor()))
+            finally:
+                conn.close()
+            if monte_karlo:
+                return analiza.monte_karlo_kasnjenja(mreza, uzoraka, verovatnoca, srednje)
+            return analiza.prenos_kasnjenja(mreza, primarna)
+
+        def po_zavrsetku(rezultat):
+            self.btn_sta_ako.setEnabled(True)
+            self.btn_monte_karlo.setEnabled(True)
+            if monte_karlo:
+                self._prikazi_monte_karlo(rezultat, uzoraka)
+            else:
+                self._prikazi_prenos_kasnjenja(rezultat)
+
+        def po_gresci(greska):
+            self.btn_sta_ako.setEnabled(True)
+            self.btn_monte_karlo.setEnabled(True)
+            self.kasnjenja_label.setText("")
+            QMessageBox.critical(self, "Greška", f"Greška pri simulaciji: {greska}")
+
+        self.btn_sta_ako.setEnabled(False)
+        self.btn_monte_karlo.setEnabled(False)
+        self.kasnjenja_label.setText("Simulacija...")
+        PozadinskiPosao.pokreni(posao, po_zavrsetku, po_gresci)
+
+    def _popuni_tabelu_kasnjenja(self, zaglavlja, redovi):
+        self.tabela_kasnjenja.setRowCount(0)
+        self.tabela_kasnjenja.setColumnCount(len(zaglavlja))
+        self.tabela_kasnjenja.setHorizontalHeaderLabels(zaglavlja)
+        self.tabela_kasnjenja.setRowCount(len(redovi))
+        for red, vrednosti in enumerate(redovi):
+            for kolona, vrednost in enumerate(vrednosti):
+                self.tabela_kasnjenja.setItem(red, kolona, QTableWidgetItem(str(vrednost)))
+
+    def _prikazi_prenos_kasnjenja(self, rezultat):
+        """Voz po voz kroz pogođene turnuse: koliko kasni na polasku i dolasku."""
+        redovi = []
+        for turnus in rezultat:
+            for broj, primarno, polazak, dolazak in turnus["vozovi"]:
+                redovi.append((turnus["naziv"], broj, primarno, polazak, dolazak))
+        self._popuni_tabelu_kasnjenja(
+            ["Turnus", "Voz", "Primarno (min)", "Kašnjenje polaska (min)", "Kašnjenje dolaska (min)"], redovi)
+        ukupno = sum(t["preneseno"] for t in rezultat)
+        self.kasnjenja_label.setText(f"Pogođeno turnusa: {len(rezultat)}, preneto kašnjenje ukupno: {ukupno} min")
+
+    def _prikazi_monte_karlo(self, rezultat, uzoraka):
+        """Turnusi od najmanje robusnog: prosečna kašnjenja po danu i ocena robusnosti."""
+        redovi = [(r["naziv"], r["serija_vv"], r["vozova"], f"{r['primarno']:.1f}", f"{r['preneseno']:.1f}",
+                   f"{r['verovatnoca_prenosa']:.1f} %", f"{r['robusnost']:.1f}") for r in rezultat]
+        self._popuni_tabelu_kasnjenja(
+            ["Turnus", "Serija VV", "Vozova", "Primarno (min/dan)", "Preneto (min/dan)", "Dana sa prenosom",
+             "Robusnost (0-100)"], redovi)
+        self.kasnjenja_label.setText(f"Simulirano dana: {uzoraka}, turnusa: {len(rezultat)}")
+
+    # --- INDIKATOR NAPRETKA ---
+
+    def _pocni_napredak(self, kanal):
+        self._napredak[kanal] = [0, 0]
+        self._osvezi_napredak()
+
+    def _javi_ukupno(self, kanal, ukupno):
+        if kanal in self._napredak:
+            self._napredak[kanal][1] = ukupno
+            self._osvezi_napredak()
+
+    def _javi_deo(self, kanal, broj):
+        if kanal in self._napredak:
+            self._napredak[kanal][0] += broj
+            self._osvezi_napredak()
+
+    def _zavrsi_napredak(self, kanal):
+        self._napredak.pop(kanal, None)
+        self._osvezi_napredak()
+
+    def _greska_ucitavanja(self, kanal, poruka):
+        self._zavrsi_napredak(kanal)
+        QMessageBox.critical(self, "Greška", f"Greška pri učitavanju podataka: {poruka}")
+
+    def _osvezi_napredak(self):
+        """Prikazuje zbirni napredak svih aktivnih učitavanja."""
+        if not hasattr(self, 'napredak_bar'):
+            return
+        if not self._napredak:
+            self.napredak_bar.setVisible(False)
+            return
+        primljeno = sum(p[0] for p in self._napredak.values())
+        ukupno = sum(p[1] for p in self._napredak.values())
+        if ukupno:
+            self.napredak_bar.setRange(0, ukupno)
+            self.napredak_bar.setValue(min(primljeno, ukupno))
+        else:
+            self.napredak_bar.setRange(0, 0)  # Neodređen napredak dok ne stigne broj stavki
+        self.napredak_bar.setVisible(True)
+
+    # --- VERZIJE REDA VOŽNJE ---
+
+    def ucitaj_verzije(self):
+        """Puni tabelu verzija i izbor verzija za poređenje."""
+        conn = otvori_vezu()
+        try:
+            redovi = verzije.lista_verzija(conn.cursor())
+        finally:
+            conn.close()
+        self.tabela_verzija.setRowCount(len(redovi))
+        for red, (verzija_id, naziv, godina, roditelj, sacuvana, izmena, aktivna) in enumerate(redovi):
+            for kolona, vrednost in enumerate([naziv, godina, roditelj, (sacuvana or "").replace("T", " "),
+                                               izmena, "Da" if aktivna else ""]):
+                item = QTableWidgetItem("" if vrednost is None else str(vrednost))
+                item.setData(Qt.ItemDataRole.UserRole, verzija_id)
+                self.tabela_verzija.setItem(red, kolona, item)
+        for combo in (self.verzija_a_combo, self.verzija_b_combo):
+            izabrana = combo.currentData()
+            combo.clear()
+            for verzija_id, naziv, *_ in redovi:
+                combo.addItem(naziv, verzija_id)
+            if izabrana is not None and combo.findData(izabrana) >= 0:
+                combo.setCurrentIndex(combo.findData(izabrana))
+        if self.verzija_b_combo.currentData() is None or self.verzija_a_combo.currentData() is None:
+            self.verzija_b_combo.setCurrentIndex(len(redovi) - 1)
+
+    def _izabrana_verzija(self):
+        red = self.tabela_verzija.currentRow()
+        if red < 0:
+            QMessageBox.information(self, "Verzije", "Izaberite verziju u tabeli.")
+            return None
+        item = self.tabela_verzija.item(red, 0)
+        return item.data(Qt.ItemDataRole.UserRole), item.text()
+
+    def nova_verzija(self):
+        """Pravi novu verziju od trenutnih podataka; deli neizmenjene vozove i turnuse sa aktivnom verzijom."""
+        naziv = self.verzija_naziv_input.text().strip()
+        godina = self.verzija_godina_input.text().strip() or self.godina_za_grafik
+
+        def operacija(cursor):
+            verzije.nova_verzija(cursor, naziv, godina)
+
+        def po_zavrsetku(_):
+            self.verzija_naziv_input.clear()
+            self.ucitaj_verzije()
+            QMessageBox.information(self, "Verzije", f"Napravljena je verzija '{naziv}' i sada je aktivna.")
+
+        self.pisac.posalji(operacija, po_zavrsetku, self._greska_pisanja)
+
+    def sacuvaj_verziju(self):
+        """Upisuje trenutne vozove i turnuse u aktivnu verziju."""
+        def po_zavrsetku(izmenjeno):
+            self.ucitaj_verzije()
+            QMessageBox.information(self, "Verzije", f"Aktivna verzija je sačuvana (izmenjeno: {izmenjeno}).")
+
+        self.pisac.posalji(verzije.sacuvaj_verziju, po_zavrsetku, self._greska_pisanja)
+
+    def otvori_verziju(self):
+        """Zamenjuje trenutne vozove i turnuse izabranom verzijom (uz potvrdu ako ima nesačuvanih izmena)."""
+        izbor = self._izabrana_verzija()
+        if izbor is None:
+            return
+        verzija_id, naziv = izbor
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                return verzije.nesacuvane_izmene(conn.cursor())
+            finally:
+                conn.close()
+
+        def po_proveri(izmena):
+            if izmena and QMessageBox.question(
+                    self, "Verzije", f"Aktivna verzija ima {izmena} nesačuvanih izmena koje će biti odbačene. "
+                                     f"Otvoriti verziju '{naziv}'?") != QMessageBox.StandardButton.Yes:
+                return
+            self.pisac.posalji(lambda cursor: verzije.otvori_verziju(cursor, verzija_id),
+                               po_otvaranju, self._greska_pisanja)
+
+        def po_otvaranju(godina):
+            if godina:
+                if self.godina_input:
+                    self.godina_input.setText(godina)
+                    self.snimi_godinu_za_grafik()
+                else:
+                    self.godina_za_grafik = godina
+            self.ucitaj_verzije()
+            self.populate_filters_and_load_data()
+            self.osvezi_stanice(sve=self.zauzetost_stanica.ucitana())
+            self.proveri_zavisne_turnuse(sve=True)
+            QMessageBox.information(self, "Verzije", f"Otvorena je verzija '{naziv}'.")
+
+        PozadinskiPosao.pokreni(posao, po_proveri, lambda e: QMessageBox.critical(self, "Greška", str(e)))
+
+    def obrisi_verziju(self):
+        """Briše izabranu verziju; verzije nastale od nje zadržavaju svoje stanje."""
+        izbor = self._izabrana_verzija()
+        if izbor is None:
+            return
+        verzija_id, naziv = izbor
+        if QMessageBox.question(self, "Verzije", f"Obrisati verziju '{naziv}'?") != QMessageBox.StandardButton.Yes:
+            return
+        self.pisac.posalji(lambda cursor: verzije.obrisi_verziju(cursor, verzija_id),
+                           lambda _: self.ucitaj_verzije(), self._greska_pisanja)
+
+    def uporedi_verzije(self):
+        """Prikazuje dodate, uklonjene i izmenjene vozove i turnuse i turnuse pogođene izmenom vozova."""
+        a, b = self.verzija_a_combo.currentData(), self.verzija_b_combo.currentData()
+        if a is None or b is None:
+            return
+
+        def posao(_):
+            conn = otvori_vezu()
+            try:
+                return verzije.razlika(conn.cursor(), a, b)
+            finally:
+                conn.close()
+
+        def po_zavrsetku(razlika):
+            self.btn_uporedi_verzije.setEnabled(True)
+            redovi = [("Voz", broj, promena, ", ".join(kolone)) for broj, promena, kolone in razlika.vozovi]
+            redovi += [("Turnus", naziv, promena, ", ".join(kolone)) for naziv, promena, kolone in razlika.turnusi]
+            redovi += [("Pogođen turnus", naziv, "vozovi", ", ".join(vozovi))
+                       for naziv, vozovi in razlika.pogodjeni_turnusi]
+            self.tabela_razlike.setRowCount(len(redovi))
+            for red, vrednosti in enumerate(redovi):
+                for kolona, vrednost in enumerate(vrednosti):
+                    self.tabela_razlike.setItem(red, kolona, QTableWidgetItem(vrednost))
+            self.razlika_label.setText(
+                f"Vozova: {len(razlika.vozovi)}, turnusa: {len(razlika.turnusi)}, "
+                f"pogođenih turnusa: {len(razlika.pogodjeni_turnusi)}" if razlika else "Verzije su iste.")
+
+        def po_gresci(greska):
+            self.btn_uporedi_verzije.setEnabled(True)
+            QMessageBox.critical(self, "Greška", f"Greška pri poređenju verzija: {greska}")
+
+        self.btn_uporedi_verzije.setEnabled(False)
+        self.razlika_label.setText("Poređenje...")
+        PozadinskiPosao.pokreni(posao, po_zavrsetku, po_gresci)
+
+    # --- SINHRONIZACIJA KOPIJA ---
+
+    def ucitaj_stanje_dnevnika(self):
+        """Prikazuje oznaku kopije, veličinu dnevnika i dokle su primljene izmene drugih kopija."""
+        conn = otvori_vezu()
+        try:
+            cursor = conn.cursor()
+            oznaka = dnevnik.oznaka_kopije(cursor)
+            ukupno, neizvezeno, primljeno = dnevnik.stanje_dnevnika(cursor)
+        finally:
+            conn.close()
+        self.oznaka_kopije_input.setText(oznaka or "")
+        tekst = f"Izmena u dnevniku: {ukupno}, sopstvenih neizvezenih: {neizvezeno}"
+        if primljeno:
+            tekst += "\nPrimljeno: " + ", ".join(f"{kopija} do izmene {poslednji}" for kopija, poslednji in primljeno)
+        self.dnevnik_label.setText(tekst)
+
+    def sacuvaj_oznaku_kopije(self):
+        oznaka = self.oznaka_kopije_input.text()
+
+        def po_gresci(greska):
+            if isinstance(greska, ValueError):
+                QMessageBox.critical(self, "Greška", str(greska))
+            else:
+                self._greska_pisanja(greska)
+
+        self.pisac.posalji(lambda cursor: dnevnik.postavi_oznaku(cursor, oznaka),
+                           lambda _: self.ucitaj_stanje_dnevnika(), po_gresci)
+
+    def izvezi_dnevnik(self):
+        """Izvozi segment sopstvenih izmena posle poslednjeg izvoza (ili sve) u fajl."""
+        putanja, _ = QFileDialog.getSaveFileName(
+            self, "Izvoz izmena", "izmene.json.gz", "Dnevnik izmena (*.json.gz)")
+        if not putanja:
+            return
+        odgovor = QMessageBox.question(
+            self, "Izvoz izmena", "Izvesti samo izmene posle poslednjeg izvoza?\n(Ne = sve izmene ove kopije)")
+        od_pocetka = odgovor != QMessageBox.StandardButton.Yes
+        self.btn_izvoz_dnevnika.setEnabled(False)
+
+        def po_zavrsetku(broj):
+            self.btn_izvoz_dnevnika.setEnabled(True)
+            self.ucitaj_stanje_dnevnika()
+            QMessageBox.information(self, "Izvoz izmena",
+                                    f"Izvezeno izmena: {broj}\nFajl: {putanja}" if broj else "Nema novih izmena za izvoz.")
+
+        def po_gresci(greska):
+            self.btn_izvoz_dnevnika.setEnabled(True)
+            QMessageBox.critical(self, "Greška", f"Izmene nisu izvezene: {greska}")
+
+        self.pisac.posalji(lambda cursor: dnevnik.izvezi_segment(cursor, putanja, od_pocetka),
+                           po_zavrsetku, po_gresci)
+
+    def uvezi_dnevnik(self):
+        """Primenjuje segment izmena druge kopije; sukobi se prikazuju u tabeli."""
+        putanja, _ = QFileDialog.getOpenFileName(
+            self, "Uvoz izmena", "", "Dnevnik izmena (*.json.gz);;Svi fajlovi (*)")
+        if not putanja:
+            return
+        self.btn_uvoz_dnevnika.setEnabled(False)
+
+        def po_gresci(greska):
+            self.btn_uvoz_dnevnika.setEnabled(True)
+            QMessageBox.critical(self, "Greška", f"Izmene nisu uvezene: {greska}")
+
+        def po_upisu(izvestaj):
+            self.btn_uvoz_dnevnika.setEnabled(True)
+            self.populate_filters_and_load_data()
+            self.osvezi_stanice(sve=self.zauzetost_stanica.ucitana())
+            self.proveri_zavisne_turnuse(turnusi=izvestaj.turnusi)
+            self.ucitaj_stanje_dnevnika()
+            self.tabela_sukoba.setRowCount(len(izvestaj.sukobi))
+            for red, sukob in enumerate(izvestaj.sukobi):
+                for kolona, vrednost in enumerate(sukob):
+                    self.tabela_sukoba.setItem(red, kolona, QTableWidgetItem(str(vrednost)))
+            QMessageBox.information(self, "Uvoz izmena", izvestaj.sazetak())
+
+        def po_citanju(segment):
+            self.pisac.posalji(lambda cursor: dnevnik.primeni_segment(cursor, segment), po_upisu, po_gresci)
+
+        # Fajl se čita u pozadini, a izmene primenjuje pisač
+        PozadinskiPosao.pokreni(lambda _: dnevnik.ucitaj_segment(putanja), po_citanju, po_gresci)
+
     # --- OPERACIJE SA VOZOVIMA ---
 
-    def uredi_voz(self, podaci):
-        """Postavlja podatke vozova u formu za uređivanje."""
+    def uredi_voz(self, podaci, dani=""):
+        """Postavlja podatke vozova u formu za uređivanje (`dani` je opis dana saobraćanja)."""
         self.broj_voza_input.setText(str(podaci[0]))
         self.pocetna_input.setText(str(podaci[1]))
         self.krajnja_input.setText(str(podaci[2]))
@@ -1310,12 +2628,15 @@ class SimpleApp(QWidget):
         self.serija_input.setText(str(podaci[9] or ""))
         self.status_input.setText(str(podaci[7]))
         self.sekcija_input.setText(str(podaci[8] or ""))
+        self.dani_input.setText(dani)
         self.trenutni_broj_za_izmenu = str(podaci[0])
+        # Red iz `SELECT * FROM vozovi`: verzija reda je poslednja kolona
+        self.verzija_voza_za_izmenu = podaci[14] if len(podaci) > 14 else None
 
         self.btn_dodaj.setVisible(False)
         self.btn_azuriraj.setVisible(True)
         self.btn_odustani.setVisible(True)
-        print(f"REŽIM IZMENE: Uređujem voz {podaci[0]}")
+        dijagnostika.log.info("REŽIM IZMENE: Uređujem voz %s", podaci[0])
 
     def azuriraj_voz(self):
         """Pokreće proces ažuriranja vozova."""
@@ -1328,117 +2649,414 @@ class SimpleApp(QWidget):
         self.btn_azuriraj.setVisible(False)
         self.btn_odustani.setVisible(False)
         self.trenutni_broj_za_izmenu = None
+        self.verzija_voza_za_izmenu = None
 
     def dodaj_voz(self):
         """Dodaje novi voz ili ažurira postojeći."""
         try:
-            broj = self.broj_voza_input.text().strip()
-            pocetna = self.pocetna_input.text().strip()
-            krajnja = self.krajnja_input.text().strip()
-            sat_p = self.sat_p_input.text().strip()
-            min_p = self.minut_p_input.text().strip()
-            sat_d = self.sat_d_input.text().strip()
-            min_d = self.minut_d_input.text().strip()
-            serija = self.serija_input.text().strip() or None
-            status = (self.status_input.text().strip() or 'R').upper()
-            sekcija = self.sekcija_input.text().strip()
-
-            obavezna_polja = [
-                ("Broj voza", broj), ("Početna stanica", pocetna), ("Krajnja stanica", krajnja),
-                ("Sat polaska", sat_p), ("Minut polaska", min_p),
-                ("Sat dolaska", sat_d), ("Minut dolaska", min_d),
-                ("Sekcija", sekcija),
-            ]
-
-            nedostajuci = []
-            for naziv, vrednost in obavezna_polja:
-                if not vrednost:
-                    nedostajuci.append(naziv)
-            if nedostajuci:
-                QMessageBox.critical(self, "Greška u unosu",
-                                     f"Neophodno je popuniti sledeća polja:\n- " + "\n- ".join(nedostajuci))
-                return
-
-            if not broj.isalnum() or len(broj) < 3 or len(broj) > 6:
-                raise ValueError("Broj voza mora biti alfanumerički (3-6 karaktera).")
-            if not (2 <= len(pocetna) <= 3) or not pocetna.isalpha():
-                raise ValueError("Početna stanica: 2–3 slova.")
-            if not (2 <= len(krajnja) <= 3) or not krajnja.isalpha():
-                raise ValueError("Krajnja stanica: 2–3 slova.")
-            if not sat_p.isdigit() or not (0 <= int(sat_p) <= 23):
-                raise ValueError("Sat polaska mora biti broj između 0 i 23.")
-            if not min_p.isdigit() or not (0 <= int(min_p) <= 59):
-                raise ValueError("Minut polaska mora biti broj između 0 i 59.")
-            if not sat_d.isdigit() or not (0 <= int(sat_d) <= 23):
-                raise ValueError("Sat dolaska mora biti broj između 0 i 23.")
-            if not min_d.isdigit() or not (0 <= int(min_d) <= 59):
-                raise ValueError("Minut dolaska mora biti broj između 0 i 59.")
-
-            sat_p = int(sat_p);
-            min_p = int(min_p);
-            sat_d = int(sat_d);
-            min_d = int(min_d)
-
-            conn = None
+            conn = otvori_vezu()
             try:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                if self.trenutni_broj_za_izmenu is not None:
+                period = kalendar.period_za_unos(conn.cursor(), self.godina_za_grafik)
+            finally:
+                conn.close()
+            # Iste provere koristi i masovni uvoz (validacija.proveri_podatke_voza)
+            (broj, pocetna, krajnja, sat_p, min_p, sat_d, min_d,
+             serija, status, sekcija, dani) = proveri_podatke_voza({
+                "broj_voza": self.broj_voza_input.text().strip(),
+                "pocetna_stanica": self.pocetna_input.text().strip(),
+                "krajnja_stanica": self.krajnja_input.text().strip(),
+                "sat_polaska": self.sat_p_input.text().strip(),
+                "minut_polaska": self.minut_p_input.text().strip(),
+                "sat_dolaska": self.sat_d_input.text().strip(),
+                "minut_dolaska": self.minut_d_input.text().strip(),
+                "serija_vozila": self.serija_input.text().strip(),
+                "status": self.status_input.text().strip(),
+                "sekcija": self.sekcija_input.text().strip(),
+                "dani": self.dani_input.text().strip(),
+            }, period)
+
+            broj_za_izmenu = self.trenutni_broj_za_izmenu
+            verzija = self.verzija_voza_za_izmenu
+            dotaknuti = {broj, broj_za_izmenu} - {None}
+            if broj_za_izmenu is not None and broj != broj_za_izmenu:
+                uticaj = self._uticaj_na_turnuse(broj_za_izmenu)
+                if uticaj and QMessageBox.question(
+                        self, "Promena broja voza",
+                        f"{uticaj}\n\nNovi broj {broj} biće upisan i u ove turnuse. Nastaviti?"
+                ) != QMessageBox.StandardButton.Yes:
+                    return
+
+            def operacija(cursor):
+                if dani is not None:
+                    kalendar.upisi_period(cursor, period)
+                korak = istorija.Korak(cursor, f"Izmena voza {broj}" if broj_za_izmenu else f"Dodavanje voza {broj}",
+                                       vozovi=[broj_za_izmenu, broj] if broj_za_izmenu else [broj])
+                if broj_za_izmenu is not None:
                     cursor.execute('''
                         UPDATE vozovi SET 
                             broj_voza = ?, pocetna_stanica = ?, krajnja_stanica = ?,
                             sat_polaska = ?, minut_polaska = ?, sat_dolaska = ?, minut_dolaska = ?,
-                            serija_vozila = ?, status = ?, sekcija = ?
-                        WHERE broj_voza = ?
-                    ''', (broj, pocetna, krajnja, sat_p, min_p, sat_d, min_d, serija, status, sekcija,
-                          self.trenutni_broj_za_izmenu))
+                            serija_vozila = ?, status = ?, sekcija = ?, dani = ?
+                        WHERE broj_voza = ? AND (? IS NULL OR verzija_reda = ?)
+                    ''', (broj, pocetna, krajnja, sat_p, min_p, sat_d, min_d, serija, status, sekcija, dani,
+                          broj_za_izmenu, verzija, verzija))
+                    if cursor.rowcount == 0:
+                        raise SukobIzmene(f"Voz {broj_za_izmenu} je u međuvremenu izmenjen ili obrisan.")
+                    # Novi broj u turnus_vozovi upisuje strani ključ (ON UPDATE CASCADE), u istoj transakciji
                     poruka = f"Voz {broj} uspešno ažuriran!"
                 else:
-                    try:
-                        cursor.execute('''
-                            INSERT INTO vozovi (broj_voza, pocetna_stanica, krajnja_stanica,
-                                sat_polaska, minut_polaska, sat_dolaska, minut_dolaska,
-                                serija_vozila, status, sekcija)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (broj, pocetna, krajnja, sat_p, min_p, sat_d, min_d, serija, status, sekcija))
-                        poruka = f"Voz {broj} uspešno dodat!"
-                    except sqlite3.IntegrityError:
-                        QMessageBox.critical(self, "Greška", f"Voz broj {broj} već postoji!")
-                        return
-                conn.commit()
-            finally:
-                if conn:
-                    conn.close()
-
-            # OSVEŽI SVE FILTERE I TABELU
-            self.populate_filters_and_load_data()
-            QMessageBox.information(self, "Uspeh", poruka)
-            self.ocisti_formu()
-
-            self.btn_dodaj.setVisible(True)
-            self.btn_azuriraj.setVisible(False)
-            self.btn_odustani.setVisible(False)
-            self.trenutni_broj_za_izmenu = None
+                    cursor.execute('''
+                        INSERT INTO vozovi (broj_voza, pocetna_stanica, krajnja_stanica,
+                            sat_polaska, minut_polaska, sat_dolaska, minut_dolaska,
+                            serija_vozila, status, sekcija, dani)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (broj, pocetna, krajnja, sat_p, min_p, sat_d, min_d, serija, status, sekcija, dani))
+                    poruka = f"Voz {broj} uspešno dodat!"
+                analiza.osvezi_statistiku_turnusa(cursor, analiza.turnusi_vozova(cursor, dotaknuti))
+                return poruka, korak.zavrsi(cursor)
+
+            # Upis ide kroz pozadinsku nit za pisanje, rezultat stiže u _voz_sacuvan / _greska_cuvanja_voza
+            self.pisac.posalji(operacija, lambda rezultat: self._voz_sacuvan(*rezultat, vozovi=dotaknuti),
+                               lambda e: self._greska_cuvanja_voza(broj, e))
 
         except ValueError as e:
             QMessageBox.critical(self, "Greška u unosu", str(e))
         except Exception as e:
             QMessageBox.critical(self, "Greška", f"Greška pri čuvanju: {e}")
 
+    def _voz_sacuvan(self, poruka, korak, vozovi=()):
+        """Poziva se kada pisač potvrdi upis voza."""
+        self._zabelezi_korak(korak)
+        # OSVEŽI SVE FILTERE I TABELU
+        self.populate_filters_and_load_data()
+        self.osvezi_stanice(vozovi=vozovi)
+        self.proveri_zavisne_turnuse(vozovi=vozovi)
+        QMessageBox.information(self, "Uspeh", poruka)
+        self.ocisti_formu()
+
+        self.btn_dodaj.setVisible(True)
+        self.btn_azuriraj.setVisible(False)
+        self.btn_odustani.setVisible(False)
+        self.trenutni_broj_za_izmenu = None
+        self.verzija_voza_za_izmenu = None
+
+    def _greska_cuvanja_voza(self, broj, greska):
+        """Poziva se kada pisač ne uspe da upiše voz."""
+        if isinstance(greska, SukobIzmene):
+            self._sukob_izmene_voza()
+        elif isinstance(greska, sqlite3.IntegrityError) and "UNIQUE" in str(greska):
+            QMessageBox.critical(self, "Greška", f"Voz broj {broj} već postoji!")
+        else:
+            QMessageBox.critical(self, "Greška", f"Greška pri čuvanju: {greska}")
+
+    def _sukob_izmene_voza(self):
+        """Voz koji se uređuje je posle otvaranja forme izmenio drugi korisnik: korisnik bira da li
+        čuva svoje izmene preko njegovih ili učitava njegove u formu."""
+        broj = self.trenutni_broj_za_izmenu
+        self._osvezi_redove(vozovi=[broj])
+        conn = otvori_vezu()
+        try:
+            cursor = conn.cursor()
+            red = cursor.execute("SELECT * FROM vozovi WHERE broj_voza = ?", (broj,)).fetchone()
+            period = kalendar.ucitaj_period(cursor)
+        finally:
+            conn.close()
+        if red is None:
+            QMessageBox.critical(self, "Istovremena izmena", f"Voz {broj} je u međuvremenu obrisan.")
+            self.odustani_od_uredjivanja()
+            return
+        odgovor = QMessageBox.question(
+            self, "Istovremena izmena",
+            f"Voz {broj} je u međuvremenu izmenjen drugim putem (npr. drugi korisnik iste baze).\n\n"
+            "Da: sačuvaj vaše izmene preko njegovih\nNe: učitaj njegove izmene u formu")
+        if odgovor == QMessageBox.StandardButton.Yes:
+            self.verzija_voza_za_izmenu = red[14]
+            self.dodaj_voz()
+        else:
+            self.uredi_voz(red, self._podaci_voza(red, period)[8])
+
+    def _uticaj_na_turnuse(self, broj_voza):
+        """Opis turnusa u kojima je voz (analiza.uticaj_izmene_voza) ili prazan tekst."""
+        conn = otvori_vezu()
+        try:
+            turnusi = analiza.uticaj_izmene_voza(conn.cursor(), broj_voza)
+        finally:
+            conn.close()
+        if not turnusi:
+            return ""
+        nazivi = [f"{naziv} ({redosled}. voz)" for _, naziv, redosled in turnusi[:MAX_TURNUSA_U_PORUCI]]
+        if len(turnusi) > MAX_TURNUSA_U_PORUCI:
+            nazivi.append(f"... i još {len(turnusi) - MAX_TURNUSA_U_PORUCI}")
+        return f"Voz {broj_voza} je u turnusima ({len(turnusi)}):\n- " + "\n- ".join(nazivi)
+
     def obrisi_voz(self, broj_voza):
-        """Briše voz iz baze."""
-        potvrda = QMessageBox.question(self, "Potvrda", f"Obriši voz {broj_voza}?")
+        """Briše voz iz baze; voz se uklanja i iz turnusa u kojima se pojavljuje."""
+        pitanje = f"Obriši voz {broj_voza}?"
+        uticaj = self._uticaj_na_turnuse(broj_voza)
+        if uticaj:
+            pitanje += f"\n\n{uticaj}\n\nVoz će biti uklonjen i iz ovih turnusa."
+        potvrda = QMessageBox.question(self, "Potvrda", pitanje)
         if potvrda == QMessageBox.StandardButton.Yes:
-            conn = sqlite3.connect(DB_PATH)
+            def operacija(cursor):
+                korak = istorija.Korak(cursor, f"Brisanje voza {broj_voza}", vozovi=[broj_voza])
+                dotaknuti = analiza.ukloni_vozove_iz_turnusa(cursor, [broj_voza])
+                cursor.execute("DELETE FROM vozovi WHERE broj_voza = ?", (broj_voza,))
+                analiza.osvezi_statistiku_turnusa(cursor, dotaknuti)
+                return dotaknuti, korak.zavrsi(cursor)
+
+            def po_zavrsetku(rezultat):
+                dotaknuti, korak = rezultat
+                self._zabelezi_korak(korak)
+                # OSVEŽI SVE FILTERE I TABELU
+                self.populate_filters_and_load_data()
+                self.osvezi_stanice(turnusi=dotaknuti)
+                self.proveri_zavisne_turnuse(turnusi=dotaknuti)
+                self.ocisti_formu()
+                QMessageBox.information(self, "Obrađeno", f"Voz {broj_voza} obrisan.")
+
+            self.pisac.posalji(operacija, po_zavrsetku, self._greska_pisanja)
+
+    def _greska_pisanja(self, greska):
+        """Opšta obrada greške koju javi pisač."""
+        QMessageBox.critical(self, "Greška", f"Greška pri čuvanju: {greska}")
+
+    # --- PONIŠTAVANJE IZMENA ---
+
+    def _zabelezi_korak(self, korak):
+        self.istorija.dodaj(korak)
+        self._osvezi_dugmad_istorije()
+
+    def _osvezi_dugmad_istorije(self):
+        """Dugmad su aktivna kada ima koraka i nijedan se upravo ne upisuje; opis je u oblačiću."""
+        for dugme, koraci, radnja in ((self.btn_ponisti, self.istorija.ponistivi, "Poništi"),
+                                      (self.btn_ponovi, self.istorija.ponovljivi, "Ponovi")):
+            dugme.setEnabled(bool(koraci) and not self._istorija_u_toku)
+            dugme.setToolTip(f"{radnja}: {koraci[-1].opis}" if koraci else "")
+
+    def ponisti_izmenu(self):
+        """Vraća stanje pre poslednje izmene (Ctrl+Z)."""
+        if self.istorija.ponistivi and not self._istorija_u_toku:
+            self._primeni_korak(self.istorija.ponistivi[-1], ponisti=True)
+
+    def ponovi_izmenu(self):
+        """Ponovo primenjuje poslednju poništenu izmenu (Ctrl+Y)."""
+        if self.istorija.ponovljivi and not self._istorija_u_toku:
+            self._primeni_korak(self.istorija.ponovljivi[-1], ponisti=False)
+
+    def _primeni_korak(self, korak, ponisti):
+        """Upisuje stanje pre (poništavanje) ili posle (ponavljanje) koraka u jednoj transakciji
+        i menja samo njegove redove u tabelama."""
+        ocekivano, cilj = (korak.posle, korak.pre) if ponisti else (korak.pre, korak.posle)
+        self._istorija_u_toku = True
+        self._osvezi_dugmad_istorije()
+
+        def po_zavrsetku(_):
+            self._istorija_u_toku = False
+            (self.istorija.ponisten if ponisti else self.istorija.ponovljen)(korak)
+            self._osvezi_dugmad_istorije()
+            self._osvezi_redove(korak.vozovi, korak.turnusi)
+            self.osvezi_stanice(turnusi=korak.turnusi)
+            self.proveri_zavisne_turnuse(turnusi=korak.turnusi)
+
+        def po_gresci(greska):
+            self._istorija_u_toku = False
+            if isinstance(greska, ValueError):
+                # Redovi su promenjeni drugim putem, pa ni stariji koraci više nisu pouzdani
+                self.istorija.obrisi()
+                QMessageBox.critical(self, "Poništavanje", f"{korak.opis}: {greska}\nIstorija izmena je obrisana.")
+            else:
+                self._greska_pisanja(greska)
+            self._osvezi_dugmad_istorije()
+
+        self.pisac.posalji(lambda cursor: istorija.primeni(cursor, ocekivano, cilj), po_zavrsetku, po_gresci)
+
+    def _osvezi_redove(self, vozovi=(), turnusi=()):
+        """Menja u tabelama samo redove navedenih vozova i turnusa, bez ponovnog učitavanja:
+        red koga više nema se uklanja, a red koji je ponovo tu se dodaje na kraj tabele."""
+        self.kes_reda_voznje.ponisti()
+        self.indeks_polazaka = None
+        conn = otvori_vezu()
+        try:
+            cursor = conn.cursor()
+            period = kalendar.ucitaj_period(cursor)
+            redovi = {}
+            for broj in vozovi:
+                red = cursor.execute("SELECT * FROM vozovi WHERE broj_voza = ?", (broj,)).fetchone()
+                redovi[broj] = None if red is None else (red, self._podaci_voza(red, period))
+            self._zameni_redove(self.tabela, lambda item: item.text(), redovi,
+                                lambda r, podaci: self._popuni_red_voza(r, *podaci))
+
+            redovi = {}
+            for turnus_id in turnusi:
+                red = cursor.execute(SQL_TABELE_TURNUSA + " WHERE t.id = ?", (turnus_id,)).fetchone()
+                if red is None:
+                    redovi[turnus_id] = None
+                    continue
+                cursor.execute("""SELECT v.broj_voza FROM turnus_vozovi tv
+                                  JOIN vozovi v ON tv.broj_voza = v.broj_voza
+                                  WHERE tv.turnus_id = ? ORDER BY tv.redosled""", (turnus_id,))
+                redovi[turnus_id] = self._podaci_turnusa(red, [broj for broj, in cursor])
+            self._zameni_redove(self.tabela_turnusa, lambda item: item.data(Qt.ItemDataRole.UserRole), redovi,
+                                lambda r, podaci: self._popuni_red_turnusa(r, *podaci))
+        finally:
+            conn.close()
+
+    def _izmene_drugih_korisnika(self, vozovi, nazivi):
+        """Osvežava redove koje je drugi korisnik iste baze promenio (PracenjeIzmena);
+        None znači da je izmena previše, pa se učitava sve."""
+        if vozovi is None or self.kanal_vozova.zauzet() or self.kanal_turnusa.zauzet():
+            # Učitavanje u toku bi dodalo i redove zamenjene ovde, pa se i ono ponavlja
+            self.populate_filters_and_load_data()
+            self.osvezi_stanice(sve=self.zauzetost_stanica.ucitana())
+            self.proveri_zavisne_turnuse(sve=True)
+            return
+        conn = otvori_vezu()
+        try:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM vozovi WHERE broj_voza = ?", (broj_voza,))
-            conn.commit()
+            turnusi = set()
+            for naziv in nazivi:
+                red = cursor.execute("SELECT id FROM turnusi WHERE naziv = ?", (naziv,)).fetchone()
+                if red:
+                    turnusi.add(red[0])
+            turnusi |= analiza.turnusi_vozova(cursor, vozovi)
+        finally:
             conn.close()
+        # Obrisan ili preimenovan turnus se u tabeli nalazi po starom nazivu
+        for r in range(self.tabela_turnusa.rowCount()):
+            item = self.tabela_turnusa.item(r, 0)
+            if item is not None and item.text() in nazivi:
+                turnusi.add(item.data(Qt.ItemDataRole.UserRole))
+        self._osvezi_redove(vozovi, turnusi)
+        self.osvezi_stanice(vozovi=vozovi, turnusi=turnusi)
+        self.proveri_zavisne_turnuse(vozovi=vozovi, turnusi=turnusi)
+
+    @staticmethod
+    def _zameni_redove(tabela, kljuc, redovi, popuni):
+        """`redovi` je ključ -> podaci reda (None: red se uklanja); ključ reda tabele daje
+        kljuc(stavka prve kolone), a popuni(red, podaci) upisuje red."""
+        postojeci = {}
+        for r in range(tabela.rowCount()):
+            item = tabela.item(r, 0)
+            if item is not None:
+                postojeci[kljuc(item)] = r
+        uklonjeni = []
+        for k, podaci in redovi.items():
+            r = postojeci.get(k)
+            if podaci is None:
+                if r is not None:
+                    uklonjeni.append(r)
+                continue
+            if r is None:
+                r = tabela.rowCount()
+                tabela.insertRow(r)
+            popuni(r, podaci)
+        for r in sorted(uklonjeni, reverse=True):
+            tabela.removeRow(r)
+
+    def uvezi_vozove_iz_fajla(self):
+        """Masovni uvoz reda vožnje iz CSV ili Excel fajla."""
+        putanja, _ = QFileDialog.getOpenFileName(
+            self, "Uvoz vozova", "", "Red vožnje (*.csv *.xlsx);;Svi fajlovi (*)")
+        if not putanja:
+            return
+        odgovor = QMessageBox.question(
+            self, "Uvoz vozova", "Da li da se postojeći vozovi sa istim brojem ažuriraju?\n"
+                                 "(Ne = takvi redovi se prijavljuju kao greška)")
+        zameni = odgovor == QMessageBox.StandardButton.Yes
+        self.btn_uvoz.setEnabled(False)
+
+        def po_zavrsetku(izvestaj):
+            self.btn_uvoz.setEnabled(True)
+            self.populate_filters_and_load_data()
+            self.osvezi_stanice(sve=self.zauzetost_stanica.ucitana())
+            self.proveri_zavisne_turnuse(sve=True)
+            poruka = izvestaj.sazetak()
+            if izvestaj.greske:
+                try:
+                    poruka += f"\n\nIzveštaj o greškama: {izvestaj.sacuvaj_greske()}"
+                except OSError as e:
+                    poruka += f"\n\nIzveštaj o greškama nije sačuvan: {e}"
+            QMessageBox.information(self, "Uvoz vozova", poruka)
+
+        def po_gresci(greska):
+            self.btn_uvoz.setEnabled(True)
+            QMessageBox.critical(self, "Greška", f"Greška pri uvozu: {greska}")
+
+        # Fajl se čita i proverava u pozadini; nit za pisanje dobija samo upis ispravnih redova,
+        # pa baza nije zaključana za druge izmene i korisnike dok se fajl čita
+        oznaka = self.godina_za_grafik
+
+        def procitaj(_):
+            conn = otvori_vezu()
+            try:
+                return procitaj_vozove(conn.cursor(), putanja, zameni, oznaka)
+            finally:
+                conn.close()
+
+        def po_citanju(procitano):
+            self.pisac.posalji(lambda cursor: upisi_vozove(cursor, procitano), po_zavrsetku, po_gresci)
+
+        PozadinskiPosao.pokreni(procitaj, po_citanju, po_gresci)
 
-            # OSVEŽI SVE FILTERE I TABELU
+    def uvezi_gtfs_feed(self):
+        """Uvoz vozova iz GTFS feed-a (ZIP arhiva ili direktorijum sa trips.txt)."""
+        putanja, _ = QFileDialog.getOpenFileName(
+            self, "GTFS feed (ZIP ili trips.txt iz direktorijuma)", "", "GTFS (*.zip trips.txt)")
+        if not putanja:
+            return
+        if os.path.basename(putanja).lower() == "trips.txt":
+            putanja = os.path.dirname(putanja)
+        mapiranje_putanja, _ = QFileDialog.getOpenFileName(
+            self, "Fajl mapiranja serija i sekcija (opciono)", "", "JSON (*.json)")
+        try:
+            mapiranje = gtfs.ucitaj_mapiranje(mapiranje_putanja)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Greška", f"Neispravan fajl mapiranja: {e}")
+            return
+        odgovor = QMessageBox.question(
+            self, "Uvoz GTFS feed-a", "Da li da se obrišu vozovi kojih više nema u feed-u?")
+        obrisi_uklonjene = odgovor == QMessageBox.StandardButton.Yes
+        self.btn_uvoz_gtfs.setEnabled(False)
+        self._pocni_napredak('gtfs')
+
+        def po_gresci(greska):
+            self.btn_uvoz_gtfs.setEnabled(True)
+            self._zavrsi_napredak('gtfs')
+            QMessageBox.critical(self, "Greška", f"Greška pri uvozu GTFS feed-a: {greska}")
+
+        def upisi(vozovi, greske, prepisi_rucne=False):
+            self.btn_uvoz_gtfs.setEnabled(False)
+            self.pisac.posalji(
+                lambda cursor: gtfs.primeni_feed(cursor, vozovi, greske, obrisi_uklonjene, prepisi_rucne),
+                lambda izvestaj: po_upisu(izvestaj, vozovi, greske), po_gresci)
+
+        def po_upisu(izvestaj, vozovi, greske):
+            self.btn_uvoz_gtfs.setEnabled(True)
             self.populate_filters_and_load_data()
-            self.ocisti_formu()
-            QMessageBox.information(self, "Obrađeno", f"Voz {broj_voza} obrisan.")
+            self.osvezi_stanice(sve=self.zauzetost_stanica.ucitana())
+            self.proveri_zavisne_turnuse(sve=True)
+            poruka = izvestaj.sazetak()
+            if izvestaj.greske:
+                poruka += "\n\nPrve greške:\n" + "\n".join(
+                    f"{trip} ({broj}): {tekst}" for trip, broj, tekst in izvestaj.greske[:10])
+            if not izvestaj.rucni:
+                QMessageBox.information(self, "Uvoz GTFS feed-a", poruka)
+                return
+            # Ručno uneti vozovi se prepisuju samo uz izričitu potvrdu
+            odgovor = QMessageBox.question(
+                self, "Uvoz GTFS feed-a",
+                f"{poruka}\n\nVozovi {', '.join(izvestaj.rucni[:10])}{' ...' if len(izvestaj.rucni) > 10 else ''} "
+                f"nisu iz GTFS-a. Da li da se prepišu podacima iz feed-a?")
+            if odgovor == QMessageBox.StandardButton.Yes:
+                upisi(vozovi, greske, prepisi_rucne=True)
+
+        def po_citanju(rezultat):
+            # Čitanje feed-a je završeno u pozadini, upis izmena ide kroz nit za pisanje
+            self._zavrsi_napredak('gtfs')
+            upisi(*rezultat)
+
+        PozadinskiPosao.pokreni(lambda javi: gtfs.procitaj_feed(putanja, mapiranje, javi),
+                                po_citanju, po_gresci)
 
     def ocisti_formu(self):
         """Čisti sva input polja u formi za vozove."""
@@ -1452,8 +3070,30 @@ class SimpleApp(QWidget):
         self.serija_input.clear()
         self.status_input.clear()
         self.sekcija_input.clear()
+        self.dani_input.clear()
 
     # --- OPERACIJE SA TURNUSIMA ---
+    def _predlozi_premoscavanja(self, conn, vozovi, vozovi_info, serija_vv, pravila):
+        """Za uzastopne vozove čije se stanice ne nastavljaju predlaže postojeće vozove serije
+        ili prazne vožnje koje stižu na vreme (pretraga.IndeksPolazaka)."""
+        if self.indeks_polazaka is None:
+            self.indeks_polazaka = pretraga.IndeksPolazaka.iz_baze(conn.cursor())
+        predlozi = []
+        for broj_a, broj_b in zip(vozovi, vozovi[1:]):
+            voz_a, voz_b = vozovi_info[broj_a], vozovi_info[broj_b]
+            if voz_a["krajnja"] == voz_b["pocetna"]:
+                continue
+            dolazak = voz_a["dolazak"][0] * 60 + voz_a["dolazak"][1] + (24 * 60 if je_prelazni(voz_a) else 0)
+            polazak = voz_b["polazak"][0] * 60 + voz_b["polazak"][1]
+            veze = self.indeks_polazaka.predlozi_veze(voz_a["krajnja"], dolazak, voz_b["pocetna"], polazak,
+                                                      serija_vv, pravila, iskljuceni=set(vozovi))
+            naslov = f"Voz {broj_a} i {broj_b} ({voz_a['krajnja']} → {voz_b['pocetna']})"
+            if not veze:
+                predlozi.append(f"{naslov}: nema veze koja stiže na vreme.")
+            for veza in veze:
+                predlozi.append(f"{naslov}, predlog: {pretraga.opis_veze(veza)}")
+        return predlozi
+
     def proveri_turnus(self):
         """Proverava ispravnost unetih podataka za turnus."""
         self.status_label.setText("")
@@ -1502,133 +3142,24 @@ class SimpleApp(QWidget):
             self.btn_odustani_turnus.setVisible(True)
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        vozovi_info = {}
-        for broj in vozovi:
-            cursor.execute("""
-                SELECT pocetna_stanica, krajnja_stanica, sat_polaska, minut_polaska, sat_dolaska, minut_dolaska, serija_vozila
-                FROM vozovi WHERE broj_voza = ?
-            """, (broj,))
-            info = cursor.fetchone()
-            if info:
-                vozovi_info[broj] = {
-                    "pocetna": info[0],
-                    "krajnja": info[1],
-                    "polazak": (info[2], info[3]),
-                    "dolazak": (info[4], info[5]),
-                    "serija_vozila": info[6] or "N/A"
-                }
-            else:
-                self.status_label.setText(f"Greška: Voz {broj} ne postoji u bazi!")
-                self.status_label.setStyleSheet("padding: 10px; background-color: #ffcccc; border-radius: 5px;")
-                conn.close()
-                self.btn_odustani_turnus.setVisible(True)
-                return
-
-        greske_serija = []
-        for broj, info in vozovi_info.items():
-            serija_vozila = info["serija_vozila"]
-            if serija_vozila != serija_vv:
-                greske_serija.append(
-                    f"Voz {broj} pripada seriji {serija_vozila}, a turnus je za seriju {serija_vv}!"
-                )
-        if greske_serija:
-            poruka = "Greške u serijama:\n" + "\n".join(greske_serija)
-            self.status_label.setText(poruka)
-            self.status_label.setStyleSheet("padding: 10px; background-color: #ffcccc; border-radius: 5px;")
-            conn.close()
-            self.btn_odustani_turnus.setVisible(True)
-            return
+        conn = otvori_vezu()
+        vozovi_info = ucitaj_info_vozova(conn.cursor(), vozovi)
+        pravila = ucitaj_pravila_obrta(conn.cursor())
+        period = kalendar.ucitaj_period(conn.cursor())
 
-        greske = []
-        # ✅ PROVERA: Redosled i preklapanje vremena (susedni vožnje)
-        for i in range(len(vozovi) - 1):
-            broj_trenutni = vozovi[i]
-            broj_sledeci = vozovi[i + 1]
-            if broj_trenutni not in vozovi_info or broj_sledeci not in vozovi_info:
-                continue
-            voz_trenutni = vozovi_info[broj_trenutni]
-            voz_sledeci = vozovi_info[broj_sledeci]
-
-            if voz_trenutni["krajnja"] != voz_sledeci["pocetna"]:
-                greske.append(
-                    f"Voz {broj_trenutni} i {broj_sledeci}: Stanica {voz_trenutni['krajnja']} ≠ {voz_sledeci['pocetna']}")
-
-            # Proveri vreme - konvertuj u minute od ponoći za trenutni dan
-            dolazak_trenutni_m = voz_trenutni["dolazak"][0] * 60 + voz_trenutni["dolazak"][1]
-            polazak_sledeci_m = voz_sledeci["polazak"][0] * 60 + voz_sledeci["polazak"][1]
-
-            # Provera da li je trenutni voz prelazni (dolazak < polazak)
-            sat_d_trenutni, min_d_trenutni = voz_trenutni["dolazak"]
-            sat_p_trenutni, min_p_trenutni = voz_trenutni["polazak"]
-            prelazni_trenutni = (sat_d_trenutni < sat_p_trenutni) or (
-                        sat_d_trenutni == sat_p_trenutni and min_d_trenutni < min_p_trenutni)
-
-            # Konverzija dolaska trenutnog voza u minute, uzimajući u obzir prelaz
-            if prelazni_trenutni:
-                # Ako je prelazni, dolazak je u narednom danu
-                dolazak_trenutni_m_corr = dolazak_trenutni_m + 24 * 60
-            else:
-                dolazak_trenutni_m_corr = dolazak_trenutni_m
-
-            # Provera preklapanja: dolazak_trenutni (korigovan) >= polazak_sledeci
-            if dolazak_trenutni_m_corr >= polazak_sledeci_m:
-                greske.append(
-                    f"Voz {broj_trenutni} i {broj_sledeci}: Dolazak {voz_trenutni['dolazak'][0]:02d}:{voz_trenutni['dolazak'][1]:02d} ≥ Polazak {voz_sledeci['polazak'][0]:02d}:{voz_sledeci['polazak'][1]:02d} (preklapanje vremena u turnusu!)")
-
-        # ✅ PROVERA: Prelazni voz na kraju niza (SPECIFIČNA PROVERA)
-        if not greske and len(vozovi) > 1:
-            # Ako nema grešaka do sada i ima više od jednog voza, proveri specijalni slučaj
-            poslednji_voz_broj = vozovi[-1]
-            prvi_voz_broj = vozovi[0]
-
-            if poslednji_voz_broj in vozovi_info and prvi_voz_broj in vozovi_info:
-                poslednji_info = vozovi_info[poslednji_voz_broj]
-                prvi_info = vozovi_info[prvi_voz_broj]
-
-                # Proveri da li je poslednji voz prelazni
-                sat_d_poslednji, min_d_poslednji = poslednji_info["dolazak"]
-                sat_p_poslednji, min_p_poslednji = poslednji_info["polazak"]
-                prelazni_poslednji = (sat_d_poslednji < sat_p_poslednji) or (
-                            sat_d_poslednji == sat_p_poslednji and min_d_poslednji < min_p_poslednji)
-
-                if prelazni_poslednji:
-                    # --- SPECIFIČNA LOGIKA ---
-                    # Ako je poslednji voz prelazni, proveri da li se njegov dolazak preklapa sa polaskom prvog voz u turnusu.
-                    # Preklapanje: dolazak_poslednjeg < polazak_prvog (kada se gledaju kao vremena u 24h ciklusu).
-                    # Npr: 3333 (dolazak 01:20), 4444 (polazak 01:01). 01:20 NIJE < 01:01 -> Nema preklapanja po ovoj logici.
-                    # Ali ako je 3333 (dolazak 01:01), 4444 (polazak 01:20). 01:01 < 01:20 -> Preklapanje.
-                    # Dakle, ako je dolazak_poslednjeg_voza < polazak_prvog_voza, onda se preklapaju.
-                    # Ovo je suprotno od onoga što si tražio u poslednjem primeru.
-                    # ---
-                    # Ponovo pročitaj zahtev:
-                    # "...da je vreme dolaska voza (3333) <= od vremena polaska voza (4444)"
-                    # 3333 dolazak 01:20, 4444 polazak 01:01.
-                    # 01:20 <= 01:01 -> FALSE.
-                    # To znači da nema preklapanja? Ne, to znači da 3333 stigne *posle* što 4444 počne.
-                    # Ako voz 3333 stigne u 01:20, a voz 4444 (koji ide odmah nakon) polazi u 01:01,
-                    # to znači da se voz 4444 mora čekati dok 3333 ne stigne. To je preklapanje.
-                    # Dakle, preklapanje je ako: dolazak_poslednjeg_voza >= polazak_prvog_voza.
-                    # U primeru: 01:20 >= 01:01 -> TRUE. Preklapanje!
-                    # U primeru: 3333 (01:01), 4444 (01:20). 01:01 >= 01:20 -> FALSE. Nema preklapanja.
-                    # Ovo deluje tačno.
-                    # ---
-                    dolazak_poslednji_min = sat_d_poslednji * 60 + min_d_poslednji
-                    polazak_prvi_min = prvi_info["polazak"][0] * 60 + prvi_info["polazak"][1]
-
-                    if dolazak_poslednji_min >= polazak_prvi_min:
-                        # Preklapanje: Dolazak poslednjeg voz >= Polazak prvog voz
-                        greske.append(
-                            f"Prelazni voz {poslednji_voz_broj} na kraju turnusa: Dolazak {sat_d_poslednji:02d}:{min_d_poslednji:02d} ≥ Polazak {prvi_voz_broj} {prvi_info['polazak'][0]:02d}:{prvi_info['polazak'][1]:02d} (preklapanje između poslednjeg i prvog voza u turnusu!)")
-
-        # Ako ima grešaka (bilo iz susedne provere, bilo iz poslednji-prvi), prikaži ih
-        if greske:
-            poruka = "Greške u redosledu/preklapanju:\n" + "\n".join(greske)
-            self.status_label.setText(poruka)
+        # Provere postojanja, serije, redosleda/preklapanja i obrta (validacija.proveri_vozove_turnusa)
+        vrsta, greske = proveri_vozove_turnusa(vozovi, vozovi_info, serija_vv, pravila, period)
+        predlozi = []
+        if vrsta == 'redosled':
+            try:
+                predlozi = self._predlozi_premoscavanja(conn, vozovi, vozovi_info, serija_vv, pravila)
+            except sqlite3.Error:
+                pass  # predlozi su samo pomoć, greške provere se prikazuju i bez njih
+        conn.close()
+        if vrsta:
+            self.status_label.setText("\n".join([poruka_provere(vrsta, greske)] + predlozi))
             self.status_label.setStyleSheet("padding: 10px; background-color: #ffcccc; border-radius: 5px;")
             self.btn_odustani_turnus.setVisible(True)
-            conn.close()
             return
 
         # Ako nema grešaka → aktiviraj "Sačuvaj ažuriran turnus"
@@ -1641,7 +3172,6 @@ class SimpleApp(QWidget):
             pass
         self.btn_proveri.clicked.connect(self.sacuvaj_izmene_turnusa)
         self.btn_odustani_turnus.setVisible(True)
-        conn.close()
 
     def sacuvaj_izmene_turnusa(self):
         """Čuva novi turnus ili ažurira postojeći."""
@@ -1659,60 +3189,93 @@ class SimpleApp(QWidget):
             QMessageBox.critical(self, "Greška", "Morate uneti bar jedan voz!")
             return
 
-        conn = None
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            if self.trenutni_turnus_za_izmenu is not None:
-                cursor.execute("UPDATE turnusi SET naziv = ?, serija_vv = ?, sekcija = ? WHERE id = ?",
-                               (naziv, serija_vv, sekcija, self.trenutni_turnus_za_izmenu))
-                cursor.execute("DELETE FROM turnus_vozovi WHERE turnus_id = ?", (self.trenutni_turnus_za_izmenu,))
-                for redosled, broj_voza in enumerate(vozovi, 1):
-                    cursor.execute("""
-                        INSERT INTO turnus_vozovi (turnus_id, broj_voza, redosled)
-                        VALUES (?, ?, ?)
-                    """, (self.trenutni_turnus_za_izmenu, broj_voza, redosled))
+        turnus_za_izmenu = self.trenutni_turnus_za_izmenu
+        verzija = self.verzija_turnusa_za_izmenu
+
+        def operacija(cursor):
+            korak = istorija.Korak(cursor, f"Izmena turnusa '{naziv}'" if turnus_za_izmenu is not None
+                                   else f"Dodavanje turnusa '{naziv}'",
+                                   turnusi=[turnus_za_izmenu] if turnus_za_izmenu is not None else [])
+            if turnus_za_izmenu is not None:
+                cursor.execute("UPDATE turnusi SET naziv = ?, serija_vv = ?, sekcija = ? "
+                               "WHERE id = ? AND (? IS NULL OR verzija_reda = ?)",
+                               (naziv, serija_vv, sekcija, turnus_za_izmenu, verzija, verzija))
+                if cursor.rowcount == 0:
+                    raise SukobIzmene(f"Turnus '{naziv}' je u međuvremenu izmenjen ili obrisan.")
+                turnus_id = turnus_za_izmenu
+                cursor.execute("DELETE FROM turnus_vozovi WHERE turnus_id = ?", (turnus_id,))
                 poruka = f"Turnus '{naziv}' uspešno ažuriran!"
             else:
                 cursor.execute("SELECT id FROM turnusi WHERE naziv = ?", (naziv,))
                 if cursor.fetchone():
-                    QMessageBox.critical(self, "Greška", f"Turnus '{naziv}' već postoji!")
-                    return
+                    raise ValueError(f"Turnus '{naziv}' već postoji!")
                 cursor.execute("INSERT INTO turnusi (naziv, serija_vv, sekcija) VALUES (?, ?, ?)",
                                (naziv, serija_vv, sekcija))
-                cursor.execute("SELECT id FROM turnusi WHERE naziv = ?", (naziv,))
-                turnus_id = cursor.fetchone()[0]
-                for redosled, broj_voza in enumerate(vozovi, 1):
-                    cursor.execute("""
-                        INSERT INTO turnus_vozovi (turnus_id, broj_voza, redosled)
-                        VALUES (?, ?, ?)
-                    """, (turnus_id, broj_voza, redosled))
+                turnus_id = cursor.lastrowid
                 poruka = f"Turnus '{naziv}' uspešno dodat!"
-            conn.commit()
+            cursor.executemany("""
+                INSERT INTO turnus_vozovi (turnus_id, broj_voza, redosled)
+                VALUES (?, ?, ?)
+            """, [(turnus_id, broj_voza, redosled) for redosled, broj_voza in enumerate(vozovi, 1)])
+            analiza.osvezi_statistiku_turnusa(cursor, [turnus_id])
+            return poruka, turnus_id, korak.zavrsi(cursor, turnusi=[turnus_id])
+
+        def po_gresci(greska):
+            if isinstance(greska, SukobIzmene):
+                self._sukob_izmene_turnusa(turnus_za_izmenu)
+            elif isinstance(greska, ValueError):
+                QMessageBox.critical(self, "Greška", str(greska))
+            else:
+                self._greska_pisanja(greska)
 
-            # OSVEŽI SVE FILTERE I TABELU
-            self.populate_filters_and_load_data()
-            QMessageBox.information(self, "Uspeh", poruka)
-
-            self.naziv_turnusa_input.clear()
-            self.serija_vv_input.clear()
-            self.vozovi_input.clear()
-            self.sekcija_voza_input.clear()
-            self.status_label.setText("")
-            self.btn_proveri.setText("Proveri turnus")
-            try:
-                self.btn_proveri.clicked.disconnect()
-            except TypeError:
-                pass
-            self.btn_proveri.clicked.connect(self.proveri_turnus)
-            self.btn_odustani_turnus.setVisible(False)
-            self.trenutni_turnus_za_izmenu = None
+        self.pisac.posalji(operacija, self._turnus_sacuvan, po_gresci)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Greška", f"Greška pri čuvanju: {e}")
+    def _sukob_izmene_turnusa(self, turnus_id):
+        """Kao _sukob_izmene_voza, za turnus koji se uređuje."""
+        self._osvezi_redove(turnusi=[turnus_id])
+        conn = otvori_vezu()
+        try:
+            red = conn.execute("SELECT naziv, verzija_reda FROM turnusi WHERE id = ?", (turnus_id,)).fetchone()
         finally:
-            if conn:
-                conn.close()
+            conn.close()
+        if red is None:
+            QMessageBox.critical(self, "Istovremena izmena", "Turnus je u međuvremenu obrisan.")
+            self.odustani_od_uredjivanja_turnusa()
+            return
+        odgovor = QMessageBox.question(
+            self, "Istovremena izmena",
+            f"Turnus '{red[0]}' je u međuvremenu izmenjen drugim putem (npr. drugi korisnik iste baze).\n\n"
+            "Da: sačuvaj vaše izmene preko njegovih\nNe: učitaj njegove izmene u formu")
+        if odgovor == QMessageBox.StandardButton.Yes:
+            self.verzija_turnusa_za_izmenu = red[1]
+            self.sacuvaj_izmene_turnusa()
+        else:
+            self.uredi_turnus((turnus_id, red[0]))
+
+    def _turnus_sacuvan(self, rezultat):
+        """Poziva se kada pisač potvrdi upis turnusa; rezultat je (poruka, id turnusa, korak istorije)."""
+        poruka, turnus_id, korak = rezultat
+        self._zabelezi_korak(korak)
+        # OSVEŽI SVE FILTERE I TABELU
+        self.populate_filters_and_load_data()
+        self.osvezi_stanice(turnusi=[turnus_id])
+        self.proveri_zavisne_turnuse(turnusi=[turnus_id])
+        QMessageBox.information(self, "Uspeh", poruka)
+
+        self.naziv_turnusa_input.clear()
+        self.serija_vv_input.clear()
+        self.vozovi_input.clear()
+        self.sekcija_voza_input.clear()
+        self.status_label.setText("")
+        self.btn_proveri.setText("Proveri turnus")
+        try:
+            self.btn_proveri.clicked.disconnect()
+        except TypeError:
+            pass
+        self.btn_proveri.clicked.connect(self.proveri_turnus)
+        self.btn_odustani_turnus.setVisible(False)
+        self.trenutni_turnus_za_izmenu = None
+        self.verzija_turnusa_za_izmenu = None
 
     def odustani_od_uredjivanja_turnusa(self):
         """Odustaje od uređivanja turnusa i vraća formu u početno stanje."""
@@ -1731,10 +3294,11 @@ class SimpleApp(QWidget):
         self.btn_proveri.clicked.connect(self.proveri_turnus)
         self.btn_odustani_turnus.setVisible(False)
         self.trenutni_turnus_za_izmenu = None
+        self.verzija_turnusa_za_izmenu = None
 
     def uredi_turnus(self, turnus):
         """Postavlja podatke turnusa u formu za uređivanje."""
-        conn = sqlite3.connect(DB_PATH)
+        conn = otvori_vezu()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT v.broj_voza
@@ -1746,10 +3310,11 @@ class SimpleApp(QWidget):
         vozovi = [v[0] for v in cursor.fetchall()]
         vozovi_str = ", ".join(vozovi)
 
-        cursor.execute("SELECT sekcija, serija_vv FROM turnusi WHERE id = ?", (turnus[0],))
+        cursor.execute("SELECT sekcija, serija_vv, verzija_reda FROM turnusi WHERE id = ?", (turnus[0],))
         row = cursor.fetchone()
         sekcija_val = row[0] or "" if row else ""
         serija_vv_val = row[1] or "" if row else ""
+        self.verzija_turnusa_za_izmenu = row[2] if row else None
         conn.close()
 
         self.naziv_turnusa_input.setText(turnus[1])
@@ -1770,15 +3335,23 @@ class SimpleApp(QWidget):
         """Briše turnus iz baze."""
         potvrda = QMessageBox.question(self, "Potvrda", f"Obriši turnus '{turnus[1]}'?")
         if potvrda == QMessageBox.StandardButton.Yes:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM turnus_vozovi WHERE turnus_id = ?", (turnus[0],))
-            cursor.execute("DELETE FROM turnusi WHERE id = ?", (turnus[0],))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Obrađeno", f"Turnus '{turnus[1]}' obrisan.")
-            # OSVEŽI SVE FILTERE I TABELU
-            self.populate_filters_and_load_data()
+            def operacija(cursor):
+                korak = istorija.Korak(cursor, f"Brisanje turnusa '{turnus[1]}'", turnusi=[turnus[0]])
+                cursor.execute("DELETE FROM turnus_vozovi WHERE turnus_id = ?", (turnus[0],))
+                # Turnus bez vozova gubi i red statistike
+                analiza.osvezi_statistiku_turnusa(cursor, [turnus[0]])
+                cursor.execute("DELETE FROM provera_turnusa WHERE turnus_id = ?", (turnus[0],))
+                cursor.execute("DELETE FROM turnusi WHERE id = ?", (turnus[0],))
+                return korak.zavrsi(cursor)
+
+            def po_zavrsetku(korak):
+                self._zabelezi_korak(korak)
+                QMessageBox.information(self, "Obrađeno", f"Turnus '{turnus[1]}' obrisan.")
+                # OSVEŽI SVE FILTERE I TABELU
+                self.populate_filters_and_load_data()
+                self.osvezi_stanice(turnusi=[turnus[0]])
+
+            self.pisac.posalji(operacija, po_zavrsetku, self._greska_pisanja)
 
     # --- GRAFIČKI PRIKAZ (GRAFIK) ---
 
@@ -1794,7 +3367,7 @@ class SimpleApp(QWidget):
                     widget.setChecked(False)
                     widget.blockSignals(False)
         except Exception as e:
-            print(f"Greška prilikom resetovanja filtera u grafiku: {e}")
+            dijagnostika.log.warning("Greška prilikom resetovanja filtera u grafiku: %s", e)
 
         turnus_id_trazeni = turnus[0]
         try:
@@ -1807,7 +3380,7 @@ class SimpleApp(QWidget):
                         widget.blockSignals(False)
                         break
         except Exception as e:
-            print(f"Greška prilikom selektovanja turnusa u grafiku: {e}")
+            dijagnostika.log.warning("Greška prilikom selektovanja turnusa u grafiku: %s", e)
 
         self.crtaj_grafik()
 
@@ -1863,6 +3436,8 @@ class SimpleApp(QWidget):
 
     def crtaj_grafik(self):
         """Crtanje grafičkog prikaza turnusa."""
+        self._grafik_pocetak = dijagnostika.pocetak()
+        self._grafik_crtanje_ms = 0.0
         self.scene.clear()
 
         sirina_sata = 60
@@ -1886,6 +3461,11 @@ class SimpleApp(QWidget):
             text.setFont(QFont("Arial", 8))
             text.setPos(x - 10, -30)
 
+        # Novi zahtev poništava crtanje koje je možda još u toku
+        self.kanal_grafika.otkazi()
+        self._zavrsi_napredak('grafik')
+        self._grafik_y = y_pocetak
+
         selektovani_turnusi = []
         for i in range(self.grafik_filter_layout.count()):
             widget = self.grafik_filter_layout.itemAt(i).widget()
@@ -1895,53 +3475,102 @@ class SimpleApp(QWidget):
         if not selektovani_turnusi:
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
         placeholders = ','.join('?' * len(selektovani_turnusi))
-        cursor.execute(f"""
+        sql_veze = f"""
+            SELECT turnus_id, redosled, broj_voza FROM turnus_vozovi
+            WHERE turnus_id IN ({placeholders})
+            ORDER BY turnus_id, redosled
+        """
+        sql_query = f"""
             SELECT tv.turnus_id, tv.redosled, tv.broj_voza, 
                 v.pocetna_stanica, v.krajnja_stanica,
-                v.sat_polaska, v.minut_polaska, v.sat_dolaska, v.minut_dolaska, v.status
+                v.sat_polaska, v.minut_polaska, v.sat_dolaska, v.minut_dolaska, v.status, v.dani
             FROM turnus_vozovi tv
             JOIN vozovi v ON tv.broj_voza = v.broj_voza
             WHERE tv.turnus_id IN ({placeholders})
             ORDER BY tv.turnus_id, tv.redosled
-        """, selektovani_turnusi)
-        podaci = cursor.fetchall()
-        conn.close()
+        """
 
-        y_trenutni = y_pocetak
-        trenutni_turnus_id = None
-        vozovi_u_turnusu = []
-        for red in podaci:
-            turnus_id, redosled, broj_voza, pocetna, krajnja, sat_p, min_p, sat_d, min_d, status = red
-            if turnus_id != trenutni_turnus_id and vozovi_u_turnusu:
-                self._crtaj_jedan_turnus(
-                    vozovi_u_turnusu, y_trenutni, sirina_sata, visina_turnusa
-                )
-                y_trenutni += visina_turnusa
-                vozovi_u_turnusu = []
-            trenutni_turnus_id = turnus_id
-            vozovi_u_turnusu.append({
-                'broj': broj_voza,
-                'pocetna': pocetna,
-                'krajnja': krajnja,
-                'sat_p': sat_p,
-                'min_p': min_p,
-                'sat_d': sat_d,
-                'min_d': min_d,
-                'status': status
-            })
-        if vozovi_u_turnusu:
-            self._crtaj_jedan_turnus(vozovi_u_turnusu, y_trenutni, sirina_sata, visina_turnusa)
-
-        # Postavi granice scene - OVA LINIJA SE MENJA
-        # max_visina = y_trenutni + visina_turnusa + 50
-        # self.scene.setSceneRect(0, 0, ukupna_sirina, max_visina) # <-- OVA LINIJA SE MENJA
-        max_visina = y_trenutni + visina_turnusa + 50
-        self.scene.setSceneRect(0, 0, 25 * sirina_sata, max_visina)  # <-- NOVA LINIJA
+        kes = self.kes_reda_voznje
+        tip_dana = self.grafik_dani_combo.currentData()
 
-    def _crtaj_jedan_turnus(self, vozovi, y, sirina_sata, visina_turnusa):
+        def izvor(conn):
+            # Redovi se grupišu po turnusu u pozadinskoj niti; GUI nit samo crta gotove grupe
+            cursor = conn.cursor()
+            dani = kalendar.maska_tipa_dana(cursor, tip_dana)
+            cursor.execute(f"SELECT * FROM statistika_turnusa WHERE turnus_id IN ({placeholders})",
+                           selektovani_turnusi)
+            kolone = [opis[0] for opis in cursor.description]
+            statistike = {red[0]: dict(zip(kolone, red)) for red in cursor}
+            red_voznje = kes.dohvati(conn)
+            if red_voznje is not None:
+                # Vremena i stanice se uzimaju iz kolonskog reda vožnje (bez JOIN-a sa vozovima)
+                cursor.execute(sql_veze, selektovani_turnusi)
+                veze = cursor.fetchall()
+                if dani is not None:
+                    veze = [v for v in veze if v[2] in red_voznje.indeks]
+                    veze = [v for v, saobraca in zip(veze, red_voznje.saobracaju(
+                        red_voznje.indeksi([v[2] for v in veze]), dani).tolist()) if saobraca]
+                redovi = red_voznje.redovi_turnusa(veze)
+            else:
+                cursor.execute(sql_query, selektovani_turnusi)
+                redovi = (red[:-1] for red in cursor
+                          if dani is None or red[-1] is None or kalendar.iz_bajtova(red[-1]) & dani)
+            trenutni_turnus_id = None
+            vozovi_u_turnusu = []
+            for red in redovi:
+                turnus_id, redosled, broj_voza, pocetna, krajnja, sat_p, min_p, sat_d, min_d, status = red
+                if turnus_id != trenutni_turnus_id and vozovi_u_turnusu:
+                    yield vozovi_u_turnusu, statistike.get(trenutni_turnus_id)
+                    vozovi_u_turnusu = []
+                trenutni_turnus_id = turnus_id
+                vozovi_u_turnusu.append({
+                    'broj': broj_voza,
+                    'pocetna': pocetna,
+                    'krajnja': krajnja,
+                    'sat_p': sat_p,
+                    'min_p': min_p,
+                    'sat_d': sat_d,
+                    'min_d': min_d,
+                    'status': status
+                })
+            if vozovi_u_turnusu:
+                yield vozovi_u_turnusu, statistike.get(trenutni_turnus_id)
+
+        self._pocni_napredak('grafik')
+        self._javi_ukupno('grafik', len(selektovani_turnusi))
+        self.kanal_grafika.pokreni(izvor, velicina_dela=20)
+
+    def _nacrtaj_deo_grafika(self, deo):
+        """Crta turnuse pristigle iz pozadinskog učitavanja, jedan ispod drugog."""
+        sirina_sata = 60
+        visina_turnusa = 120
+        pocetak = dijagnostika.pocetak()
+        for vozovi_u_turnusu, statistika in deo:
+            self._crtaj_jedan_turnus(vozovi_u_turnusu, self._grafik_y, sirina_sata, visina_turnusa, statistika)
+            self._grafik_y += visina_turnusa
+        if pocetak is not None:
+            self._grafik_crtanje_ms += dijagnostika.proteklo_ms(pocetak)
+        self._javi_deo('grafik', len(deo))
+
+    def _zavrsi_grafik(self):
+        """Postavlja granice scene kada stignu svi turnusi."""
+        sirina_sata = 60
+        visina_turnusa = 120
+        y_pocetak = 50
+        self._zavrsi_napredak('grafik')
+        # Y poslednjeg nacrtanog turnusa (ili početak ako nije nacrtan nijedan)
+        y_trenutni = max(self._grafik_y - visina_turnusa, y_pocetak)
+        max_visina = y_trenutni + visina_turnusa + 50
+        self.scene.setSceneRect(0, 0, 25 * sirina_sata, max_visina)
+        if self._grafik_pocetak is not None:
+            # Ukupno vreme od zahteva do poslednjeg turnusa; crtanje je samo rad GUI niti na sceni
+            dijagnostika.zabelezi(
+                "grafik", f"{(self._grafik_y - y_pocetak) // visina_turnusa} turnusa, crtanje "
+                          f"{self._grafik_crtanje_ms:.0f} ms", dijagnostika.proteklo_ms(self._grafik_pocetak),
+                len(self.scene.items()))
+
+    def _crtaj_jedan_turnus(self, vozovi, y, sirina_sata, visina_turnusa, statistika=None):
         """Pomoćna funkcija za crtanje jednog turnusa u grafiku."""
         gornja_linija_y = y + 30
         donja_linija_y = gornja_linija_y + 20  # Razmak ~20px ≈ 5mm
@@ -1951,6 +3580,16 @@ class SimpleApp(QWidget):
         broj_vozila_y = gornja_linija_y - 5
         # Broj vucnog vozila (1)
         self.scene.addText("1").setPos(broj_vozila_x, broj_vozila_y)
+        # Statistika obrta ispod minuta (iz tabele statistika_turnusa)
+        if statistika:
+            tekst_statistike = self.scene.addText(
+                f"Najkraći obrt {pretraga.vreme(statistika['najkraci_obrt_min'])}   "
+                f"Čekanje {pretraga.vreme(statistika['cekanje_min'])} "
+                f"(najduže {pretraga.vreme(statistika['najduze_cekanje_min'])})   "
+                f"Iskorišćenost {statistika['iskoriscenost']:.1f} %")
+            tekst_statistike.setFont(QFont("Arial", 7))
+            tekst_statistike.setDefaultTextColor(Qt.GlobalColor.darkGray)
+            tekst_statistike.setPos(0, tekst_dole_y + 20)
         # Gornja i donja linija puta turnusa - CRTAJ DO 24h (ne do 25h)
         # self.scene.addLine(0, gornja_linija_y, 25 * sirina_sata, gornja_linija_y, QPen(Qt.GlobalColor.black, 1.2)) # <-- OVA LINIJA SE MENJA
         # self.scene.addLine(0, donja_linija_y, 25 * sirina_sata, donja_linija_y, QPen(Qt.GlobalColor.black, 1.2)) # <-- OVA LINIJA SE MENJA
@@ -2085,7 +3724,7 @@ class SimpleApp(QWidget):
             with open("data/godina_grafik.txt", "w", encoding="utf-8") as f:
                 f.write(godina)
         except Exception as e:
-            print(f"Greška pri čuvanju godine za grafik: {e}")
+            dijagnostika.log.warning("Greška pri čuvanju godine za grafik: %s", e)
 
     def ucitaj_godinu_za_grafik(self):
         """Učitava prethodno sačuvanu godinu iz fajla."""
@@ -2104,12 +3743,13 @@ class SimpleApp(QWidget):
             if hasattr(self, 'godina_input') and self.godina_input:
                 self.godina_input.setText("")
         except Exception as e:
-            print(f"Greška pri učitavanju godine za grafik: {e}")
+            dijagnostika.log.warning("Greška pri učitavanju godine za grafik: %s", e)
 
 
 # --- POKRETANJE APLIKACIJE ---
 
 if __name__ == "__main__":
+    dijagnostika.podesi_logovanje()
     app = QApplication([])
     window = SimpleApp()
     window.show()
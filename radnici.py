@@ -0,0 +1,372 @@
+import collections
+import itertools
+import queue
+import sqlite3
+import time
+
+from PyQt6.QtCore import QObject, QRunnable, QThread, QThreadPool, QTimer, pyqtSignal
+
+import dijagnostika
+import dnevnik
+from baza import otvori_vezu, baza_zauzeta
+
+# Broj stavki koje se šalju GUI niti u jednom delu
+VELICINA_DELA = 200
+
+# Pisanje: koliko dugo se skupljaju izmene za jednu transakciju i koliko ih najviše ide zajedno
+PROZOR_PAKETA = 0.05  # sekundi
+MAX_PAKET = 500
+# Ponavljanje transakcije kada je baza zaključana (SQLITE_BUSY)
+MAX_POKUSAJA = 6
+POCETNA_PAUZA = 0.05  # sekundi, udvostručava se posle svakog neuspeha
+
+# Praćenje izmena drugih korisnika iste baze: razmak provera (ms) i čekanje na zaključanu bazu (s)
+INTERVAL_PRACENJA = 2000
+CEKANJE_PRACENJA = 0.2
+
+
+# --- POZADINSKO UČITAVANJE ---
+
+class SignaliUcitavanja(QObject):
+    """Signali kojima pozadinski učitavač javlja rezultate GUI niti."""
+    ukupno = pyqtSignal(int, int)  # generacija, očekivan broj stavki
+    deo = pyqtSignal(int, list)  # generacija, deo stavki
+    gotovo = pyqtSignal(int)  # generacija
+    greska = pyqtSignal(int, str)  # generacija, poruka
+    kraj = pyqtSignal(int)  # generacija; šalje se uvek, i kad je učitavanje otkazano
+
+
+class Ucitavac(QRunnable):
+    """Izvršava upit u pozadinskoj niti i šalje materijalizovane stavke u delovima.
+
+    `izvor(conn)` je generator koji prolazi kroz kursor i vraća gotove stavke,
+    a `prebroj(conn)` (opciono) vraća očekivan broj stavki za indikator napretka.
+    Učitavač prestaje čim kanal pokrene noviju generaciju.
+    """
+
+    def __init__(self, generacija, kanal, izvor, prebroj=None, velicina_dela=VELICINA_DELA):
+        super().__init__()
+        self.generacija = generacija
+        self.kanal = kanal
+        self.izvor = izvor
+        self.prebroj = prebroj
+        self.velicina_dela = velicina_dela
+        self.signali = SignaliUcitavanja()
+
+    def otkazan(self):
+        return self.kanal.generacija != self.generacija
+
+    def run(self):
+        conn = None
+        pocetak = dijagnostika.pocetak()
+        broj = 0
+        try:
+            conn = otvori_vezu()
+            if self.prebroj is not None:
+                self.signali.ukupno.emit(self.generacija, self.prebroj(conn))
+            deo = []
+            for stavka in self.izvor(conn):
+                if self.otkazan():
+                    return
+                broj += 1
+                deo.append(stavka)
+                if len(deo) >= self.velicina_dela:
+                    self.signali.deo.emit(self.generacija, deo)
+                    deo = []
+            if self.otkazan():
+                return
+            if deo:
+                self.signali.deo.emit(self.generacija, deo)
+            self.signali.gotovo.emit(self.generacija)
+        except Exception as e:
+            # Izuzetak koji napusti QRunnable.run ruši ceo proces; i neispravan red (npr. loši dani
+            # ili prazno vreme) se zato javlja kao greška učitavanja
+            if not isinstance(e, sqlite3.Error):
+                dijagnostika.log.exception("Učitavanje '%s' nije uspelo", self.kanal.naziv)
+            self.signali.greska.emit(self.generacija, str(e))
+        finally:
+            if conn:
+                conn.close()
+            if pocetak is not None:
+                opis = self.kanal.naziv + (" (otkazano)" if self.otkazan() else "")
+                dijagnostika.zabelezi("ucitavanje", opis, dijagnostika.proteklo_ms(pocetak), broj)
+            self.signali.kraj.emit(self.generacija)
+
+
+class KanalUcitavanja:
+    """Jedan tok učitavanja (npr. tabela vozova); noviji zahtev poništava stariji."""
+
+    def __init__(self, na_ukupno, na_deo, na_gotovo, na_gresku=None, pool=None, naziv=""):
+        self.naziv = naziv
+        self.generacija = 0
+        self.na_ukupno = na_ukupno
+        self.na_deo = na_deo
+        self.na_gotovo = na_gotovo
+        self.na_gresku = na_gresku
+        self.pool = pool or QThreadPool.globalInstance()
+        # Čuvamo reference na aktivne učitavače dok ne završe (signali ne smeju da nestanu)
+        self._aktivni = {}
+
+    def pokreni(self, izvor, prebroj=None, velicina_dela=VELICINA_DELA):
+        """Pokreće novo učitavanje i vraća njegovu generaciju."""
+        self.generacija += 1
+        ucitavac = Ucitavac(self.generacija, self, izvor, prebroj, velicina_dela)
+        ucitavac.setAutoDelete(False)
+        ucitavac.signali.ukupno.connect(self._primi_ukupno)
+        ucitavac.signali.deo.connect(self._primi_deo)
+        ucitavac.signali.gotovo.connect(self._primi_gotovo)
+        ucitavac.signali.greska.connect(self._primi_gresku)
+        ucitavac.signali.kraj.connect(self._ocisti)
+        self._aktivni[self.generacija] = ucitavac
+        self.pool.start(ucitavac)
+        return self.generacija
+
+    def otkazi(self):
+        """Poništava tekuće učitavanje (rezultati koji stignu kasnije se ignorišu)."""
+        self.generacija += 1
+
+    def aktuelna(self, generacija):
+        return generacija == self.generacija
+
+    def _primi_ukupno(self, generacija, ukupno):
+        if self.aktuelna(generacija):
+            self.na_ukupno(ukupno)
+
+    def _primi_deo(self, generacija, deo):
+        if self.aktuelna(generacija):
+            self.na_deo(deo)
+
+    def _primi_gotovo(self, generacija):
+        if self.aktuelna(generacija):
+            self.na_gotovo()
+
+    def _primi_gresku(self, generacija, poruka):
+        if self.aktuelna(generacija) and self.na_gresku:
+            self.na_gresku(poruka)
+
+    def _ocisti(self, generacija):
+        self._aktivni.pop(generacija, None)
+
+    def zauzet(self):
+        """Da li neki učitavač ovog kanala još radi."""
+        return bool(self._aktivni)
+
+
+class SignaliPosla(QObject):
+    """Signali jednokratnog pozadinskog posla."""
+    napredak = pyqtSignal(object)
+    gotovo = pyqtSignal(object)
+    greska = pyqtSignal(object)
+
+
+class PozadinskiPosao(QRunnable):
+    """Izvršava `posao(javi_napredak)` u pozadinskoj niti i javlja rezultat GUI niti."""
+
+    # Poslovi koji su u toku (da Python ne obriše signale pre nego što stignu do GUI niti)
+    _aktivni = set()
+
+    def __init__(self, posao, po_zavrsetku=None, po_gresci=None, po_napretku=None):
+        super().__init__()
+        self.posao = posao
+        self.signali = SignaliPosla()
+        if po_zavrsetku:
+            self.signali.gotovo.connect(po_zavrsetku)
+        if po_gresci:
+            self.signali.greska.connect(po_gresci)
+        if po_napretku:
+            self.signali.napredak.connect(po_napretku)
+        self.signali.gotovo.connect(self._ukloni)
+        self.signali.greska.connect(self._ukloni)
+
+    @classmethod
+    def pokreni(cls, posao, po_zavrsetku=None, po_gresci=None, po_napretku=None):
+        posao = cls(posao, po_zavrsetku, po_gresci, po_napretku)
+        posao.setAutoDelete(False)
+        cls._aktivni.add(posao)
+        QThreadPool.globalInstance().start(posao)
+        return posao
+
+    def _ukloni(self, _):
+        PozadinskiPosao._aktivni.discard(self)
+
+    def run(self):
+        try:
+            rezultat = self.posao(self.signali.napredak.emit)
+        except Exception as e:
+            self.signali.greska.emit(e)
+        else:
+            self.signali.gotovo.emit(rezultat)
+
+
+# --- POZADINSKO PISANJE ---
+
+class PisacBaze(QThread):
+    """Jedina nit koja piše u bazu.
+
+    Izmene se šalju preko `posalji(operacija)`, gde je `operacija(cursor)` funkcija koja
+    izvršava upise i vraća rezultat. Izmene koje stignu zajedno izvršavaju se u jednoj
+    transakciji, svaka u svom SAVEPOINT-u, pa neuspeh jedne ne poništava ostale.
+    Rezultat se javlja GUI niti preko signala `zavrseno` / `neuspelo`.
+    Opsezi id-eva dnevnika izmena koje su upisale potvrđene transakcije ove niti se pamte u
+    `sopstvene_izmene`, da ih PracenjeIzmena ne bi smatralo izmenama drugih korisnika.
+    """
+    zavrseno = pyqtSignal(int, object)  # id izmene, rezultat operacije
+    neuspelo = pyqtSignal(int, object)  # id izmene, izuzetak
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._red = queue.Queue()
+        self._brojac = itertools.count(1)
+        self._povratni = {}  # id izmene -> (po_zavrsetku, po_gresci)
+        self.sopstvene_izmene = collections.deque()  # (od, do]: id-evi dnevnika ovih transakcija
+        self.zavrseno.connect(self._javi_zavrseno)
+        self.neuspelo.connect(self._javi_neuspeh)
+
+    def posalji(self, operacija, po_zavrsetku=None, po_gresci=None):
+        """Stavlja izmenu u red za pisanje i vraća njen id."""
+        id_izmene = next(self._brojac)
+        self._povratni[id_izmene] = (po_zavrsetku, po_gresci)
+        self._red.put((id_izmene, operacija))
+        return id_izmene
+
+    def na_cekanju(self):
+        """Broj izmena čiji rezultat još nije javljen GUI niti."""
+        return len(self._povratni)
+
+    def zaustavi(self):
+        """Završava upis svih izmena iz reda i zaustavlja nit."""
+        self._red.put(None)
+        self.wait()
+
+    def run(self):
+        conn = otvori_vezu(isolation_level=None)
+        # Kratko čekanje u samom SQLite-u, duže pauze radimo sami između pokušaja
+        conn.execute("PRAGMA busy_timeout = 100")
+        try:
+            kraj = False
+            while not kraj:
+                prva = self._red.get()
+                if prva is None:
+                    break
+                paket = [prva]
+                # Skupi izmene koje stignu u kratkom prozoru (npr. brz unos više vozova)
+                rok = time.monotonic() + PROZOR_PAKETA
+                while len(paket) < MAX_PAKET:
+                    preostalo = rok - time.monotonic()
+                    try:
+                        sledeca = self._red.get(timeout=preostalo) if preostalo > 0 else self._red.get_nowait()
+                    except queue.Empty:
+                        break
+                    if sledeca is None:
+                        kraj = True
+                        break
+                    paket.append(sledeca)
+                self._izvrsi_paket(conn, paket)
+        finally:
+            conn.close()
+
+    def _izvrsi_paket(self, conn, paket):
+        """Izvršava paket izmena u jednoj transakciji, uz ponavljanje ako je baza zauzeta."""
+        pauza = POCETNA_PAUZA
+        pocetak = dijagnostika.pocetak()
+        for pokusaj in range(MAX_POKUSAJA):
+            rezultati = []
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                pre = dnevnik.poslednja_izmena(cursor)
+                for id_izmene, operacija in paket:
+                    cursor.execute("SAVEPOINT izmena")
+                    try:
+                        rezultat = operacija(cursor)
+                    except Exception as e:
+                        if baza_zauzeta(e):
+                            raise
+                        cursor.execute("ROLLBACK TO izmena")
+                        cursor.execute("RELEASE izmena")
+                        rezultati.append((id_izmene, False, e))
+                    else:
+                        cursor.execute("RELEASE izmena")
+                        rezultati.append((id_izmene, True, rezultat))
+                posle = dnevnik.poslednja_izmena(cursor)
+                cursor.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if baza_zauzeta(e) and pokusaj < MAX_POKUSAJA - 1:
+                    time.sleep(pauza)
+                    pauza *= 2
+                    continue
+                for id_izmene, _ in paket:
+                    self.neuspelo.emit(id_izmene, e)
+                return
+            if posle > pre:
+                self.sopstvene_izmene.append((pre, posle))
+            if pocetak is not None:
+                dijagnostika.zabelezi("pisanje", f"transakcija (pokušaj {pokusaj + 1})",
+                                      dijagnostika.proteklo_ms(pocetak), len(paket))
+            for id_izmene, uspeh, vrednost in rezultati:
+                if uspeh:
+                    self.zavrseno.emit(id_izmene, vrednost)
+                else:
+                    self.neuspelo.emit(id_izmene, vrednost)
+            return
+
+    def _javi_zavrseno(self, id_izmene, rezultat):
+        po_zavrsetku, _ = self._povratni.pop(id_izmene, (None, None))
+        if po_zavrsetku:
+            po_zavrsetku(rezultat)
+
+    def _javi_neuspeh(self, id_izmene, greska):
+        _, po_gresci = self._povratni.pop(id_izmene, (None, None))
+        if po_gresci:
+            po_gresci(greska)
+
+
+# --- IZMENE DRUGIH KORISNIKA ---
+
+class PracenjeIzmena(QObject):
+    """Javlja koje su redove izmenili drugi korisnici iste baze (drugi procesi).
+
+    Na svakih INTERVAL_PRACENJA ms čita PRAGMA data_version svoje veze, koja se menja samo kada
+    transakciju potvrdi neka druga veza. Tada se iz dnevnika izmena čitaju nove izmene, bez onih
+    koje je upisao sopstveni pisač, i šalje signal `izmenjeno(vozovi, nazivi turnusa)`; None, None
+    znači da je izmena previše pa treba osvežiti sve. Radi u GUI niti: upiti su kratki, a ako je
+    baza zaključana, provera se preskače do sledećeg puta.
+    """
+    izmenjeno = pyqtSignal(object, object)
+
+    def __init__(self, pisac, parent=None, interval=INTERVAL_PRACENJA):
+        super().__init__(parent)
+        self.pisac = pisac
+        self.conn = otvori_vezu(timeout=CEKANJE_PRACENJA)
+        cursor = self.conn.cursor()
+        self.verzija_podataka = cursor.execute("PRAGMA data_version").fetchone()[0]
+        self.poslednja = dnevnik.poslednja_izmena(cursor)
+        self.tajmer = QTimer(self)
+        self.tajmer.timeout.connect(self.proveri)
+        self.tajmer.start(interval)
+
+    def proveri(self):
+        try:
+            cursor = self.conn.cursor()
+            verzija = cursor.execute("PRAGMA data_version").fetchone()[0]
+            if verzija == self.verzija_podataka:
+                return
+            sopstvene = list(self.pisac.sopstvene_izmene)
+            poslednja, vozovi, turnusi = dnevnik.izmene_posle(cursor, self.poslednja, sopstvene)
+        except sqlite3.Error as e:
+            if not baza_zauzeta(e):
+                dijagnostika.log.warning("Praćenje izmena nije uspelo: %s", e)
+            return
+        self.verzija_podataka = verzija
+        self.poslednja = poslednja
+        # Opsezi koji su obrađeni više nisu potrebni
+        while self.pisac.sopstvene_izmene and self.pisac.sopstvene_izmene[0][1] <= poslednja:
+            self.pisac.sopstvene_izmene.popleft()
+        if vozovi is None or vozovi or turnusi:
+            self.izmenjeno.emit(vozovi, turnusi)
+
+    def zaustavi(self):
+        self.tajmer.stop()
+        self.conn.close()
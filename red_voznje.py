@@ -0,0 +1,293 @@
+"""Kolonski prikaz tabele vozovi u memoriji (NumPy).
+
+Vremena su minuti od ponoći (int16), stanice, serije, sekcije i statusi su kodirani
+rečnikom (indeks u listi vrednosti), a prelazni vozovi su označeni bitmapom. Maske dana
+saobraćanja (kalendar.py) se čuvaju samo za vozove koji ne saobraćaju svakog dana.
+Pravi se jednom iz baze i koristi za proveru svih turnusa, krivu flote, prenos kašnjenja
+i crtanje grafika. Provera jednog turnusa i statistika turnusa posle izmene čitaju samo
+izmenjene vozove iz baze (SQL), jer bi za njih ponovno pravljenje prikaza bilo skuplje.
+Bez paketa numpy `KesRedaVoznje.dohvati` vraća None, pa pozivaoci rade kao ranije (SQL).
+"""
+import array
+import collections.abc
+import threading
+
+import kalendar
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MINUTA_U_DANU = 24 * 60
+
+# Broj redova koji se čita iz kursora odjednom
+VELICINA_DELA = 10000
+
+
+class _Recnik:
+    """Kodiranje vrednosti u redne brojeve (prva nova vrednost dobija 0, sledeća 1, ...)."""
+
+    def __init__(self):
+        self.vrednosti = []
+        self.kodovi = {}
+
+    def kod(self, vrednost):
+        kod = self.kodovi.get(vrednost)
+        if kod is None:
+            kod = self.kodovi[vrednost] = len(self.vrednosti)
+            self.vrednosti.append(vrednost)
+        return kod
+
+
+class RedVoznje:
+    """Svi vozovi u kolonama; i-ti element svake kolone pripada vozu `brojevi[i]`."""
+
+    def __init__(self, brojevi, kolone, recnici, dani=None, period=None):
+        self.brojevi = brojevi
+        self.indeks = {broj: i for i, broj in enumerate(brojevi)}
+        self.polazak = kolone["polazak"]
+        self.dolazak = kolone["dolazak"]
+        self.pocetna = kolone["pocetna"]
+        self.krajnja = kolone["krajnja"]
+        self.serija = kolone["serija"]
+        self.sekcija = kolone["sekcija"]
+        self.status = kolone["status"]
+        self.stanice = recnici["stanice"]
+        self.serije = recnici["serije"]
+        self.sekcije = recnici["sekcije"]
+        self.statusi = recnici["statusi"]
+        # Prelazni voz stiže posle ponoći (dolazak pre polaska); čuva se samo bitmapa (metoda prelazni)
+        prelazni = self.dolazak < self.polazak
+        self.prelazni_bitmapa = np.packbits(prelazni)
+        # Dolazak u minutima od ponoći dana polaska (prelazni: + 24h)
+        self.dolazak_korigovan = self.dolazak.astype(np.int32) + MINUTA_U_DANU * prelazni
+        # Serija za proveru turnusa: kao u validacija.ucitaj_info_vozova prazna serija je "N/A"
+        oznake = _Recnik()
+        self._oznaka_serije = np.array([oznake.kod(s or "N/A") for s in self.serije], dtype=np.int16)
+        self._kodovi_oznaka = oznake.kodovi
+        # Dani saobraćanja: indeks voza -> maska, samo za vozove koji ne saobraćaju svakog dana
+        self.dani = dani or {}
+        self.period = period
+        self.ogranicen = np.zeros(len(brojevi), dtype=bool)
+        self.ogranicen[list(self.dani)] = True
+
+    @classmethod
+    def iz_baze(cls, cursor):
+        """Čita tabelu vozovi u delovima i pravi kolone."""
+        if np is None:
+            raise ValueError("Za kolonski prikaz reda vožnje potreban je paket numpy (pip install numpy).")
+        cursor.execute("""
+            SELECT broj_voza, pocetna_stanica, krajnja_stanica, sat_polaska, minut_polaska,
+                   sat_dolaska, minut_dolaska, serija_vozila, sekcija, status, dani
+            FROM vozovi ORDER BY broj_voza
+        """)
+        recnici = {"stanice": _Recnik(), "serije": _Recnik(), "sekcije": _Recnik(), "statusi": _Recnik()}
+        stanica = recnici["stanice"].kod
+        serija = recnici["serije"].kod
+        sekcija = recnici["sekcije"].kod
+        status = recnici["statusi"].kod
+        brojevi = []
+        dani = {}
+        kolone = {naziv: array.array("h") for naziv in
+                  ("polazak", "dolazak", "pocetna", "krajnja", "serija", "sekcija", "status")}
+        while True:
+            redovi = cursor.fetchmany(VELICINA_DELA)
+            if not redovi:
+                break
+            for broj, pocetna, krajnja, sat_p, min_p, sat_d, min_d, serija_v, sekcija_v, status_v, maska in redovi:
+                if maska is not None:
+                    dani[len(brojevi)] = kalendar.iz_bajtova(maska)
+                brojevi.append(broj)
+                kolone["polazak"].append((sat_p or 0) * 60 + (min_p or 0))
+                kolone["dolazak"].append((sat_d or 0) * 60 + (min_d or 0))
+                kolone["pocetna"].append(stanica(pocetna))
+                kolone["krajnja"].append(stanica(krajnja))
+                kolone["serija"].append(serija(serija_v))
+                kolone["sekcija"].append(sekcija(sekcija_v))
+                kolone["status"].append(status(status_v))
+        kolone = {naziv: np.frombuffer(vrednosti, dtype=np.int16) if len(vrednosti) else np.zeros(0, np.int16)
+                  for naziv, vrednosti in kolone.items()}
+        return cls(brojevi, kolone, {naziv: r.vrednosti for naziv, r in recnici.items()}, dani,
+                   kalendar.ucitaj_period(cursor))
+
+    def __len__(self):
+        return len(self.brojevi)
+
+    def indeksi(self, brojevi):
+        """Indeksi vozova u kolonama (-1 za vozove kojih nema)."""
+        return np.fromiter((self.indeks.get(b, -1) for b in brojevi), dtype=np.int64, count=len(brojevi))
+
+    def prelazni(self, idx):
+        """Da li su vozovi sa indeksima `idx` prelazni; čita se iz bitmape (bit 7 bajta je prvi voz)."""
+        idx = np.asarray(idx, dtype=np.int64)
+        return ((self.prelazni_bitmapa[idx >> 3] >> (7 - (idx & 7))) & 1).astype(bool)
+
+    # --- PROVERA TURNUSA ---
+
+    def info(self, broj):
+        """Podaci voza u obliku koji vraća validacija.ucitaj_info_vozova."""
+        i = self.indeks[broj]
+        polazak, dolazak = int(self.polazak[i]), int(self.dolazak[i])
+        return {
+            "pocetna": self.stanice[self.pocetna[i]],
+            "krajnja": self.stanice[self.krajnja[i]],
+            "polazak": divmod(polazak, 60),
+            "dolazak": divmod(dolazak, 60),
+            "serija_vozila": self.serije[self.serija[i]] or "N/A",
+            "dani": self.dani.get(i, self.period.sve if self.period else None),
+        }
+
+    def info_vozova(self):
+        """Rečnik broj -> podaci voza za validacija.proveri_vozove_turnusa, bez kopiranja svih vozova."""
+        return _InfoVozova(self)
+
+    def minimumi_obrta(self, pravila, serije_vv):
+        """Tabela najkraćeg obrta [serija turnusa, stanica] za validacija.PravilaObrta.
+
+        Pravi se jednom za sve stanice i serije, pa provera turnusa ostaje linearna.
+        """
+        tabela = np.zeros((len(serije_vv), len(self.stanice)), dtype=np.int32)
+        for i, serija_vv in enumerate(serije_vv):
+            tabela[i] = [pravila.minimum(stanica, serija_vv) for stanica in self.stanice]
+        return tabela
+
+    def ispravni_turnusi(self, turnusi, pravila=None):
+        """Brza provera više turnusa odjednom; `turnusi` je lista (vozovi, serija_vv).
+
+        Vraća niz True/False sa istim ishodom kao validacija.proveri_vozove_turnusa
+        (True kada ta funkcija ne bi prijavila grešku). Poruke o greškama daje samo
+        ona, pa je dovoljno pozvati je za turnuse koji ovde nisu prošli. Turnus sa vozom
+        koji ne saobraća svakog dana ovde uvek dobija False i proverava ga ta funkcija.
+        """
+        broj_turnusa = len(turnusi)
+        duzine = np.fromiter((len(vozovi) for vozovi, _ in turnusi), dtype=np.int64, count=broj_turnusa)
+        ispravan = np.ones(broj_turnusa, dtype=bool)
+        if not duzine.sum():
+            return ispravan
+        idx = self.indeksi([broj for vozovi, _ in turnusi for broj in vozovi])
+        turnus_voza = np.repeat(np.arange(broj_turnusa), duzine)
+
+        # Vozovi kojih nema u bazi
+        nema = idx < 0
+        ispravan[turnus_voza[nema]] = False
+        idx = np.where(nema, 0, idx)
+        ispravan[turnus_voza[self.ogranicen[idx] & ~nema]] = False
+
+        # Serija vozila mora biti serija turnusa
+        oznaka_turnusa = np.array([self._kodovi_oznaka.get(serija_vv, -1) for _, serija_vv in turnusi],
+                                  dtype=np.int16)
+        druga_serija = self._oznaka_serije[self.serija[idx]] != oznaka_turnusa[turnus_voza]
+        ispravan[turnus_voza[druga_serija]] = False
+
+        # Najkraći dozvoljen obrt po turnusu i stanici dolaska (bez pravila: bar 1 minut)
+        if pravila:
+            serije_vv = list(dict.fromkeys(serija_vv for _, serija_vv in turnusi))
+            redni = {serija_vv: i for i, serija_vv in enumerate(serije_vv)}
+            serija_turnusa = np.array([redni[serija_vv] for _, serija_vv in turnusi], dtype=np.int64)
+            minimumi = np.maximum(self.minimumi_obrta(pravila, serije_vv), 1)
+
+            def potreban_obrt(turnus, voz):
+                return minimumi[serija_turnusa[turnus], self.krajnja[voz]]
+        else:
+            def potreban_obrt(turnus, voz):
+                return 1
+
+        # Susedni vozovi: stanica se nastavlja i dolazak je dovoljno pre polaska sledećeg
+        isti_turnus = turnus_voza[:-1] == turnus_voza[1:]
+        turnus, a, b = turnus_voza[:-1][isti_turnus], idx[:-1][isti_turnus], idx[1:][isti_turnus]
+        lose = ((self.krajnja[a] != self.pocetna[b]) |
+                (self.polazak[b] - self.dolazak_korigovan[a] < potreban_obrt(turnus, a)))
+        ispravan[turnus[lose]] = False
+
+        # Posle poslednjeg voza vozilo čeka prvi voz sledećeg dana; prelazni voz na kraju
+        # turnusa zato ne sme stići posle polaska prvog voza
+        vise = np.nonzero(duzine > 1)[0]
+        prvi = (np.cumsum(duzine) - duzine)[vise]
+        poslednji = prvi + duzine[vise] - 1
+        a, b = idx[poslednji], idx[prvi]
+        lose = self.polazak[b] + MINUTA_U_DANU - self.dolazak_korigovan[a] < potreban_obrt(vise, a)
+        ispravan[vise[lose]] = False
+        return ispravan
+
+    # --- PRIKAZ I STATISTIKA ---
+
+    def redovi_turnusa(self, veze):
+        """Za veze (turnus_id, redosled, broj_voza) vraća redove za grafik, kao upit sa JOIN vozovi.
+
+        Red: (turnus_id, redosled, broj, pocetna, krajnja, sat_p, min_p, sat_d, min_d, status);
+        vozovi kojih nema u bazi se preskaču.
+        """
+        veze = [v for v in veze if v[2] in self.indeks]
+        if not veze:
+            return []
+        idx = self.indeksi([v[2] for v in veze])
+        sat_p, min_p = np.divmod(self.polazak[idx], 60)
+        sat_d, min_d = np.divmod(self.dolazak[idx], 60)
+        pocetna = [self.stanice[k] for k in self.pocetna[idx].tolist()]
+        krajnja = [self.stanice[k] for k in self.krajnja[idx].tolist()]
+        status = [self.statusi[k] for k in self.status[idx].tolist()]
+        return [(t, r, b, *ostalo) for (t, r, b), *ostalo in zip(
+            veze, pocetna, krajnja, sat_p.tolist(), min_p.tolist(), sat_d.tolist(), min_d.tolist(), status)]
+
+    def saobracaju(self, idx, maska):
+        """Da li vozovi sa indeksima `idx` saobraćaju bar jednog dana iz maske (None: svi dani)."""
+        rezultat = np.ones(len(idx), dtype=bool)
+        if maska is not None:
+            for k in np.nonzero(self.ogranicen[idx])[0].tolist():
+                rezultat[k] = bool(self.dani[int(idx[k])] & maska)
+        return rezultat
+
+
+class _InfoVozova(collections.abc.Mapping):
+    def __init__(self, red_voznje):
+        self.red_voznje = red_voznje
+
+    def __getitem__(self, broj):
+        return self.red_voznje.info(broj)
+
+    def __contains__(self, broj):
+        return broj in self.red_voznje.indeks
+
+    def __iter__(self):
+        return iter(self.red_voznje.brojevi)
+
+    def __len__(self):
+        return len(self.red_voznje)
+
+
+def ucitaj(conn):
+    """Pravi RedVoznje iz baze ili vraća None ako numpy nije instaliran."""
+    if np is None:
+        return None
+    return RedVoznje.iz_baze(conn.cursor())
+
+
+class KesRedaVoznje:
+    """Jedan zajednički RedVoznje za sve niti; pravi se pri prvoj upotrebi posle poništavanja."""
+
+    def __init__(self):
+        self._brava = threading.Lock()
+        self._red_voznje = None
+        self._verzija = 0
+
+    def ponisti(self):
+        """Poziva se posle izmene vozova; sledeći `dohvati` ponovo čita bazu."""
+        with self._brava:
+            self._red_voznje = None
+            self._verzija += 1
+
+    def dohvati(self, conn):
+        """Vraća RedVoznje (pravi ga preko `conn` ako treba) ili None ako numpy nije instaliran."""
+        if np is None:
+            return None
+        with self._brava:
+            if self._red_voznje is not None:
+                return self._red_voznje
+            verzija = self._verzija
+        red_voznje = ucitaj(conn)
+        with self._brava:
+            # Ako je u međuvremenu poništen, ovaj prikaz se koristi samo za tekući zahtev
+            if verzija == self._verzija:
+                self._red_voznje = red_voznje
+        return red_voznje
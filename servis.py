@@ -0,0 +1,360 @@
+"""Lokalni HTTP servis koji drugim alatima (dispečerski pregled, skripte depoa) daje podatke iz
+baze kao JSON, bez kopiranja baze. Servis samo čita.
+
+Pokretanje: python servis.py [--baza data/baza.db] [--port 8765]
+
+    GET /vozovi?sekcija=&serija=               vozovi po broju
+    GET /vozovi/<broj>                         jedan voz i turnusi u kojima je
+    GET /turnusi?sekcija=&serija_vv=           turnusi sa vozovima u redosledu
+    GET /turnusi/<id>                          jedan turnus sa vozovima i statistikom
+    GET /validacija?sekcija=&serija_vv=        rezultat provere svakog turnusa
+    GET /grafik?sekcija=&serija_vv=            turnusi sa vremenima vozova, za crtanje grafika
+
+Spiskovi se vraćaju po stranama (?strana=1&po_strani=100) kao {"ukupno", "strana", "po_strani",
+"stavke"}; filteri se mogu navesti više puta. Upiti idu preko zajedničkog skupa veza samo za
+čitanje. Odgovor nosi ETag izveden iz stanja baze (poslednja izmena u dnevniku izmena, pravila
+obrta i period reda vožnje): klijent koji pošalje If-None-Match dobija 304 dok se baza ne
+promeni, a servis dotle isti odgovor daje iz keša, bez ponovnog upita.
+"""
+import argparse
+import collections
+import contextlib
+import hashlib
+import itertools
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import analiza
+import dijagnostika
+import kalendar
+from baza import otvori_vezu, VERZIJA_SEME
+from izvoz import KOLONE_VOZOVA, turnusi_sa_vozovima, rezultati_validacije
+
+PODRAZUMEVANI_PORT = 8765
+BROJ_VEZA = 4
+# Koliko dugo (sekundi) zahtev čeka slobodnu vezu pre nego što dobije 503
+CEKANJE_VEZE = 5.0
+PO_STRANI = 100
+MAX_PO_STRANI = 1000
+# Broj poslednjih odgovora koji se čuvaju u kešu (po putanji i upitu)
+MAX_KESA = 64
+
+
+class GreskaZahteva(Exception):
+    """Neispravan zahtev; `status` je HTTP status odgovora."""
+
+    def __init__(self, status, poruka):
+        super().__init__(poruka)
+        self.status = status
+
+
+# --- VEZE I KEŠ ---
+
+class SkupVeza:
+    """Zajednički skup veza samo za čitanje; nit uzima vezu, koristi je i vraća."""
+
+    def __init__(self, putanja=None, broj_veza=BROJ_VEZA):
+        self._slobodne = queue.Queue()
+        for _ in range(broj_veza):
+            conn = otvori_vezu(putanja, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self._slobodne.put(conn)
+        self.broj_veza = broj_veza
+
+    @contextlib.contextmanager
+    def veza(self):
+        """Veza sa otvorenom transakcijom čitanja, pa ceo odgovor vidi isto stanje baze."""
+        try:
+            conn = self._slobodne.get(timeout=CEKANJE_VEZE)
+        except queue.Empty:
+            raise GreskaZahteva(503, "Servis je zauzet, pokušajte ponovo.")
+        try:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.execute("ROLLBACK")
+        finally:
+            self._slobodne.put(conn)
+
+    def zatvori(self):
+        for _ in range(self.broj_veza):
+            self._slobodne.get().close()
+
+
+class KesOdgovora:
+    """Poslednji odgovori po ključu (putanja i upit): ključ -> (ETag, telo)."""
+
+    def __init__(self, najvise=MAX_KESA):
+        self.najvise = najvise
+        self._odgovori = collections.OrderedDict()
+        self._zakljucavanje = threading.Lock()
+
+    def dohvati(self, kljuc, etag):
+        with self._zakljucavanje:
+            odgovor = self._odgovori.get(kljuc)
+            if odgovor is None or odgovor[0] != etag:
+                return None
+            self._odgovori.move_to_end(kljuc)
+            return odgovor[1]
+
+    def sacuvaj(self, kljuc, etag, telo):
+        with self._zakljucavanje:
+            self._odgovori[kljuc] = (etag, telo)
+            self._odgovori.move_to_end(kljuc)
+            while len(self._odgovori) > self.najvise:
+                self._odgovori.popitem(last=False)
+
+
+def stanje_baze(cursor):
+    """Vrednost koja se menja sa svakom izmenom podataka koje servis vraća."""
+    return cursor.execute("""
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM dnevnik_izmena),
+               (SELECT group_concat(stanica || '|' || serija || '|' || minimum_min, ';') FROM pravila_obrta),
+               (SELECT pocetak || '|' || broj_dana FROM period_reda_voznje WHERE id = 1)
+    """).fetchone()
+
+
+# --- PARAMETRI ---
+
+def _strana(upit):
+    """(strana, po_strani) iz upita; strane se broje od 1."""
+    try:
+        strana = int(upit.get("strana", ["1"])[0])
+        po_strani = int(upit.get("po_strani", [str(PO_STRANI)])[0])
+    except ValueError:
+        raise GreskaZahteva(400, "strana i po_strani moraju biti celi brojevi.")
+    if strana < 1 or not 1 <= po_strani <= MAX_PO_STRANI:
+        raise GreskaZahteva(400, f"strana mora biti bar 1, a po_strani između 1 i {MAX_PO_STRANI}.")
+    return strana, po_strani
+
+
+def _filter(upit, naziv):
+    """Vrednosti filtera (može više puta, npr. ?sekcija=KV&sekcija=BG) ili None za sve."""
+    return upit.get(naziv) or None
+
+
+def _stranica(stavke, ukupno, strana, po_strani):
+    return {"ukupno": ukupno, "strana": strana, "po_strani": po_strani, "stavke": stavke}
+
+
+def _uslovi(filteri):
+    """WHERE deo i parametri za [(kolona, vrednosti ili None)]."""
+    uslovi, parametri = [], []
+    for kolona, vrednosti in filteri:
+        if vrednosti is not None:
+            uslovi.append(f"COALESCE({kolona}, '') IN ({', '.join('?' * len(vrednosti))})")
+            parametri.extend(vrednosti)
+    return (" WHERE " + " AND ".join(uslovi) if uslovi else ""), parametri
+
+
+# --- ODGOVORI ---
+
+def _voz(red, period):
+    voz = dict(zip((k for k, _ in KOLONE_VOZOVA), red))
+    voz["dani"] = period.opis(kalendar.iz_bajtova(red[-1])) if period and red[-1] else ""
+    return voz
+
+
+def vozovi(conn, upit):
+    strana, po_strani = _strana(upit)
+    where, parametri = _uslovi([("sekcija", _filter(upit, "sekcija")),
+                                ("serija_vozila", _filter(upit, "serija"))])
+    cursor = conn.cursor()
+    period = kalendar.ucitaj_period(cursor)
+    ukupno = cursor.execute("SELECT COUNT(*) FROM vozovi" + where, parametri).fetchone()[0]
+    cursor.execute(f"SELECT {', '.join(k for k, _ in KOLONE_VOZOVA)} FROM vozovi{where} "
+                   "ORDER BY broj_voza LIMIT ? OFFSET ?", parametri + [po_strani, (strana - 1) * po_strani])
+    return _stranica([_voz(red, period) for red in cursor], ukupno, strana, po_strani)
+
+
+def voz(conn, broj):
+    cursor = conn.cursor()
+    red = cursor.execute(f"SELECT {', '.join(k for k, _ in KOLONE_VOZOVA)} FROM vozovi WHERE broj_voza = ?",
+                         (broj,)).fetchone()
+    if red is None:
+        raise GreskaZahteva(404, f"Voz {broj} ne postoji.")
+    rezultat = _voz(red, kalendar.ucitaj_period(cursor))
+    rezultat["turnusi"] = [{"id": turnus_id, "naziv": naziv, "redosled": redosled}
+                           for turnus_id, naziv, redosled in analiza.uticaj_izmene_voza(cursor, broj)]
+    return rezultat
+
+
+def _broj_turnusa(conn, upit):
+    where, parametri = _uslovi([("sekcija", _filter(upit, "sekcija")), ("serija_vv", _filter(upit, "serija_vv"))])
+    return conn.execute("SELECT COUNT(*) FROM turnusi" + where, parametri).fetchone()[0]
+
+
+def _strana_turnusa(conn, upit, stavke):
+    """Jedna strana iz generatora turnusa (izvoz.turnusi_sa_vozovima / rezultati_validacije),
+    koji ih daje po nazivu; turnusi posle tražene strane se ne čitaju."""
+    strana, po_strani = _strana(upit)
+    deo = list(itertools.islice(stavke, (strana - 1) * po_strani, strana * po_strani))
+    return _stranica(deo, _broj_turnusa(conn, upit), strana, po_strani)
+
+
+def turnusi(conn, upit):
+    return _strana_turnusa(conn, upit, turnusi_sa_vozovima(conn, _filter(upit, "sekcija"),
+                                                           _filter(upit, "serija_vv")))
+
+
+def validacija(conn, upit):
+    return _strana_turnusa(conn, upit, rezultati_validacije(conn, _filter(upit, "sekcija"),
+                                                            _filter(upit, "serija_vv")))
+
+
+def _statistika(cursor, turnus_id):
+    cursor.execute("SELECT * FROM statistika_turnusa WHERE turnus_id = ?", (turnus_id,))
+    red = cursor.fetchone()
+    if red is None:
+        return None
+    return {opis[0]: vrednost for opis, vrednost in zip(cursor.description, red) if opis[0] != "turnus_id"}
+
+
+def turnus(conn, turnus_id):
+    try:
+        turnus_id = int(turnus_id)
+    except ValueError:
+        raise GreskaZahteva(400, "Turnus se traži po id-u (ceo broj).")
+    cursor = conn.cursor()
+    red = cursor.execute("SELECT id, naziv, serija_vv, sekcija FROM turnusi WHERE id = ?", (turnus_id,)).fetchone()
+    if red is None:
+        raise GreskaZahteva(404, f"Turnus {turnus_id} ne postoji.")
+    cursor.execute("SELECT broj_voza FROM turnus_vozovi WHERE turnus_id = ? ORDER BY redosled", (turnus_id,))
+    return {"id": red[0], "naziv": red[1], "serija_vv": red[2] or "", "sekcija": red[3] or "",
+            "vozovi": [broj for broj, in cursor], "statistika": _statistika(cursor, turnus_id)}
+
+
+def grafik(conn, upit):
+    """Turnusi jedne strane sa vremenima svojih vozova, kao na tabu Grafik."""
+    strana, po_strani = _strana(upit)
+    where, parametri = _uslovi([("sekcija", _filter(upit, "sekcija")), ("serija_vv", _filter(upit, "serija_vv"))])
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id, naziv, serija_vv, sekcija FROM turnusi{where} ORDER BY naziv, id LIMIT ? OFFSET ?",
+                   parametri + [po_strani, (strana - 1) * po_strani])
+    stavke = [{"id": t[0], "naziv": t[1], "serija_vv": t[2] or "", "sekcija": t[3] or "", "vozovi": []}
+              for t in cursor.fetchall()]
+    po_id = {t["id"]: t for t in stavke}
+    if po_id:
+        cursor.execute(f"""
+            SELECT tv.turnus_id, v.broj_voza, v.pocetna_stanica, v.krajnja_stanica,
+                   v.polazak_min, v.dolazak_min, v.prelazni, v.status
+            FROM turnus_vozovi tv
+            JOIN vozovi v ON v.broj_voza = tv.broj_voza
+            WHERE tv.turnus_id IN ({', '.join('?' * len(po_id))})
+            ORDER BY tv.turnus_id, tv.redosled
+        """, list(po_id))
+        for turnus_id, broj, pocetna, krajnja, polazak, dolazak, prelazni, status in cursor.fetchall():
+            po_id[turnus_id]["vozovi"].append({
+                "broj_voza": broj, "pocetna_stanica": pocetna, "krajnja_stanica": krajnja,
+                "polazak_min": polazak, "dolazak_min": dolazak, "prelazni": bool(prelazni), "status": status or "R"})
+        for t in stavke:
+            t["statistika"] = _statistika(cursor, t["id"])
+    return _stranica(stavke, _broj_turnusa(conn, upit), strana, po_strani)
+
+
+# Putanja -> (odgovor za spisak, odgovor za jednu stavku /putanja/<kljuc> ili None)
+PUTANJE = {
+    "vozovi": (vozovi, voz),
+    "turnusi": (turnusi, turnus),
+    "validacija": (validacija, None),
+    "grafik": (grafik, None),
+}
+
+
+# --- HTTP ---
+
+class ObradaZahteva(BaseHTTPRequestHandler):
+    """Odgovara na GET zahteve; druge metode server odbija (501), jer servis samo čita."""
+    server_version = "TurnusiServis/1"
+
+    def do_GET(self):
+        adresa = urlsplit(self.path)
+        delovi = [unquote(d) for d in adresa.path.strip("/").split("/") if d]
+        try:
+            if not delovi or delovi[0] not in PUTANJE or len(delovi) > 2 or (
+                    len(delovi) == 2 and PUTANJE[delovi[0]][1] is None):
+                raise GreskaZahteva(404, f"Nepoznata putanja {adresa.path}; postoje: "
+                                         + ", ".join("/" + p for p in PUTANJE))
+            spisak, stavka = PUTANJE[delovi[0]]
+            upit = parse_qs(adresa.query)
+            kljuc = (adresa.path, adresa.query)
+            with self.server.veze.veza() as conn:
+                stanje = stanje_baze(conn.cursor())
+                etag = '"' + hashlib.sha1(repr((kljuc, stanje)).encode()).hexdigest()[:20] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._posalji(304, etag=etag)
+                    return
+                telo = self.server.kes.dohvati(kljuc, etag)
+                if telo is None:
+                    rezultat = stavka(conn, delovi[1]) if len(delovi) == 2 else spisak(conn, upit)
+                    telo = json.dumps(rezultat, ensure_ascii=False).encode("utf-8")
+                    self.server.kes.sacuvaj(kljuc, etag, telo)
+            self._posalji(200, telo, etag)
+        except GreskaZahteva as e:
+            self._posalji(e.status, json.dumps({"greska": str(e)}, ensure_ascii=False).encode("utf-8"))
+        except Exception as e:
+            dijagnostika.log.exception("Greška servisa za %s", self.path)
+            self._posalji(500, json.dumps({"greska": str(e)}, ensure_ascii=False).encode("utf-8"))
+
+    def _posalji(self, status, telo=b"", etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            # Klijent sme da koristi sačuvan odgovor samo posle provere (If-None-Match)
+            self.send_header("Cache-Control", "no-cache")
+        if telo:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(telo)))
+        self.end_headers()
+        if telo:
+            self.wfile.write(telo)
+
+    def log_message(self, format, *args):
+        dijagnostika.log.info("servis %s: %s", self.address_string(), format % args)
+
+
+class Servis(ThreadingHTTPServer):
+    """HTTP server sa skupom veza i kešom odgovora; svaki zahtev se obrađuje u svojoj niti."""
+    daemon_threads = True
+
+    def __init__(self, adresa, putanja=None, broj_veza=BROJ_VEZA):
+        self.veze = SkupVeza(putanja, broj_veza)
+        self.kes = KesOdgovora()
+        try:
+            with self.veze.veza() as conn:
+                verzija = conn.execute("PRAGMA user_version").fetchone()[0]
+            if verzija < VERZIJA_SEME:
+                raise ValueError("Baza je starije verzije; otvorite je jednom u aplikaciji pre pokretanja servisa.")
+            super().__init__(adresa, ObradaZahteva)
+        except BaseException:
+            self.veze.zatvori()
+            raise
+
+    def server_close(self):
+        super().server_close()
+        self.veze.zatvori()
+
+
+# --- POKRETANJE IZ KOMANDNE LINIJE ---
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalni HTTP servis koji daje podatke iz baze kao JSON (samo čitanje).")
+    parser.add_argument("--baza", help="putanja do baze (podrazumevano data/baza.db)")
+    parser.add_argument("--adresa", default="127.0.0.1",
+                        help="adresa na kojoj servis sluša (podrazumevano samo ovaj računar)")
+    parser.add_argument("--port", type=int, default=PODRAZUMEVANI_PORT)
+    parser.add_argument("--veza", type=int, default=BROJ_VEZA, help="broj veza ka bazi za istovremene zahteve")
+    args = parser.parse_args()
+
+    servis = Servis((args.adresa, args.port), args.baza, args.veza)
+    print(f"Servis radi na http://{args.adresa}:{servis.server_address[1]}/ (Ctrl+C za kraj)")
+    try:
+        servis.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servis.server_close()
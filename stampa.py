@@ -0,0 +1,218 @@
+"""Knjiga turnusa za štampu: jedan A4 list po turnusu, izdanja i ponovna štampa samo izmenjenih listova.
+
+Svaki list ima stalan broj strane. Otisak lista je otisak sadržaja turnusa (naziv, sekcija,
+serija VV i redom svi vozovi sa stanicama, vremenima i danima saobraćanja), pa se list
+menja samo kada se promeni nešto što je na njemu odštampano. Dnevnik izdanja
+(izdanja_stampe, stranice_izdanja) pamti koji je list odštampan u kom izdanju i sa kojim
+otiskom. "Samo izmenjeni" štampa nove, izmenjene i povučene listove i zadržava brojeve strana.
+"""
+import datetime
+
+from PyQt6.QtCore import QPointF, QRectF, Qt
+from PyQt6.QtGui import QFont, QPageSize, QPainter, QPdfWriter, QPen
+
+import kalendar
+import pretraga
+from verzije import otisak
+
+# Status lista u odnosu na poslednje izdanje
+NOV, IZMENJEN, NEIZMENJEN, POVUCEN = "nov", "izmenjen", "neizmenjen", "povučen"
+
+
+class List:
+    """Jedan list knjige: turnus na strani `strana`; `vozovi` su None za povučen list."""
+
+    def __init__(self, strana, naziv, status, otisak_lista, izdanje, sekcija="", serija_vv="", vozovi=None):
+        self.strana = strana
+        self.naziv = naziv
+        self.status = status
+        self.otisak = otisak_lista  # None za povučen list
+        self.izdanje = izdanje  # poslednje izdanje u kome je list odštampan (None za nov)
+        self.sekcija = sekcija
+        self.serija_vv = serija_vv
+        self.vozovi = vozovi  # [(broj, pocetna, krajnja, polazak_min, dolazak_min, dani)]
+
+
+def sadrzaj_turnusa(cursor):
+    """Sadržaj lista za svaki turnus: {naziv: (sekcija, serija_vv, vozovi)}, vozovi redom iz turnusa.
+
+    Voz iz turnusa kog nema u tabeli vozovi ostaje na listu samo sa brojem.
+    """
+    sadrzaj = {}
+    cursor.execute("""
+        SELECT t.naziv, t.sekcija, t.serija_vv, tv.broj_voza, v.pocetna_stanica, v.krajnja_stanica,
+            v.polazak_min, v.dolazak_min, v.dani
+        FROM turnusi t
+        LEFT JOIN turnus_vozovi tv ON tv.turnus_id = t.id
+        LEFT JOIN vozovi v ON v.broj_voza = tv.broj_voza
+        ORDER BY t.id, tv.redosled
+    """)
+    for naziv, sekcija, serija_vv, broj, *voz in cursor:
+        vozovi = sadrzaj.setdefault(naziv, (sekcija or "", serija_vv or "", []))[2]
+        if broj is not None:
+            vozovi.append((broj, *voz))
+    return sadrzaj
+
+
+def _poslednja_knjiga(cursor):
+    """Listovi knjige od poslednjeg celog izdanja: {naziv: (strana, otisak, izdanje)}."""
+    cursor.execute("SELECT coalesce(max(id), 0) FROM izdanja_stampe WHERE vrsta = 'sve'")
+    od_izdanja = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT turnus, strana, otisak, max(izdanje_id) FROM stranice_izdanja
+        WHERE izdanje_id >= ? GROUP BY turnus
+    """, (od_izdanja,))
+    return {turnus: (strana, otisak_lista, izdanje) for turnus, strana, otisak_lista, izdanje in cursor}
+
+
+def plan_izdanja(cursor, samo_izmenjeni=True):
+    """Listovi sledećeg izdanja i njegov broj: (broj izdanja, [List]).
+
+    Celo izdanje numeriše sve turnuse iznova (po sekciji i nazivu). Izdanje samo izmenjenih
+    zadržava brojeve strana iz knjige; novi turnusi dobijaju strane posle poslednje, a
+    turnus koga više nema daje povučen list na svojoj strani.
+    """
+    sadrzaj = sadrzaj_turnusa(cursor)
+    otisci = {naziv: otisak((naziv, *turnus[:2], tuple(turnus[2]))) for naziv, turnus in sadrzaj.items()}
+    knjiga = _poslednja_knjiga(cursor)
+    izdanje = cursor.execute("SELECT coalesce(max(id), 0) + 1 FROM izdanja_stampe").fetchone()[0]
+
+    def status(naziv):
+        if naziv not in knjiga or knjiga[naziv][1] is None:
+            return NOV
+        return NEIZMENJEN if knjiga[naziv][1] == otisci[naziv] else IZMENJEN
+
+    poredak = sorted(sadrzaj, key=lambda naziv: (sadrzaj[naziv][0], str(naziv)))
+    listovi = []
+    if not samo_izmenjeni or not knjiga:
+        for strana, naziv in enumerate(poredak, 1):
+            listovi.append(List(strana, naziv, status(naziv), otisci[naziv], knjiga.get(naziv, (0, 0, None))[2],
+                                *sadrzaj[naziv]))
+        return izdanje, listovi
+
+    sledeca = max(strana for strana, _, _ in knjiga.values()) + 1
+    for naziv in poredak:
+        stanje = status(naziv)
+        if naziv in knjiga:
+            strana, _, poslednje = knjiga[naziv]
+        else:
+            strana, poslednje = sledeca, None
+            sledeca += 1
+        if stanje != NEIZMENJEN:
+            listovi.append(List(strana, naziv, stanje, otisci[naziv], poslednje, *sadrzaj[naziv]))
+    for naziv, (strana, otisak_lista, poslednje) in knjiga.items():
+        if naziv not in sadrzaj and otisak_lista is not None:
+            listovi.append(List(strana, naziv, POVUCEN, None, poslednje))
+    listovi.sort(key=lambda lst: lst.strana)
+    return izdanje, listovi
+
+
+def upisi_izdanje(cursor, izdanje, listovi, samo_izmenjeni):
+    """Beleži izdanje i njegove listove u dnevnik; podiže ValueError ako je izdanje u međuvremenu zauzeto."""
+    if cursor.execute("SELECT 1 FROM izdanja_stampe WHERE id = ?", (izdanje,)).fetchone():
+        raise ValueError(f"Izdanje {izdanje} je već zabeleženo; pripremite štampu ponovo.")
+    if not cursor.execute("SELECT 1 FROM stranice_izdanja LIMIT 1").fetchone():
+        samo_izmenjeni = False  # prvo izdanje je uvek cela knjiga
+    cursor.execute("INSERT INTO izdanja_stampe (id, datum, vrsta, broj_strana) VALUES (?, ?, ?, ?)",
+                   (izdanje, datetime.datetime.now().isoformat(timespec="seconds"),
+                    "izmene" if samo_izmenjeni else "sve", len(listovi)))
+    cursor.executemany("INSERT INTO stranice_izdanja (izdanje_id, strana, turnus, otisak) VALUES (?, ?, ?, ?)",
+                       [(izdanje, lst.strana, lst.naziv, lst.otisak) for lst in listovi])
+
+
+def lista_izdanja(cursor):
+    """Redovi dnevnika, od najnovijeg: (izdanje, datum, vrsta, broj strana, strane kao "1-3, 7")."""
+    strane = {}
+    for izdanje, strana in cursor.execute("SELECT izdanje_id, strana FROM stranice_izdanja ORDER BY izdanje_id, strana"):
+        opsezi = strane.setdefault(izdanje, [])
+        if opsezi and opsezi[-1][1] == strana - 1:
+            opsezi[-1][1] = strana
+        else:
+            opsezi.append([strana, strana])
+    cursor.execute("SELECT id, datum, vrsta, broj_strana FROM izdanja_stampe ORDER BY id DESC")
+    return [(*red, ", ".join(str(od) if od == do else f"{od}-{do}" for od, do in strane.get(red[0], [])))
+            for red in cursor.fetchall()]
+
+
+# --- CRTANJE LISTA ---
+
+def nacrtaj_list(painter, sirina, visina, lst, izdanje, period=None):
+    """Crta list turnusa na površinu `sirina` x `visina` (A4 uspravno, u jedinicama uređaja)."""
+    mm = sirina / 210
+    levo, desno, gore, dole = 15 * mm, sirina - 15 * mm, 15 * mm, visina - 15 * mm
+    painter.save()
+    painter.fillRect(QRectF(0, 0, sirina, visina), Qt.GlobalColor.white)
+    painter.setPen(QPen(Qt.GlobalColor.black, 0.3 * mm))
+
+    def font(velicina, podebljan=False):
+        f = QFont("Arial")
+        f.setPixelSize(max(1, round(velicina * mm)))
+        f.setBold(podebljan)
+        return f
+
+    # Zaglavlje: turnus levo, strana i izdanje desno
+    painter.setFont(font(7, True))
+    painter.drawText(QRectF(levo, gore, desno - levo, 10 * mm), Qt.AlignmentFlag.AlignLeft, f"Turnus {lst.naziv}")
+    painter.drawText(QRectF(levo, gore, desno - levo, 10 * mm), Qt.AlignmentFlag.AlignRight, f"Strana {lst.strana}")
+    painter.setFont(font(4))
+    painter.drawText(QRectF(levo, gore + 10 * mm, desno - levo, 6 * mm), Qt.AlignmentFlag.AlignLeft,
+                     f"Sekcija: {lst.sekcija or '-'}    Serija VV: {lst.serija_vv or '-'}")
+    painter.drawText(QRectF(levo, gore + 10 * mm, desno - levo, 6 * mm), Qt.AlignmentFlag.AlignRight,
+                     f"Izdanje {izdanje}")
+    y = gore + 18 * mm
+    painter.drawLine(QPointF(levo, y), QPointF(desno, y))
+
+    if lst.vozovi is None:
+        painter.setFont(font(6, True))
+        painter.drawText(QRectF(levo, y, desno - levo, 40 * mm), Qt.AlignmentFlag.AlignCenter,
+                         f"List povučen: turnus {lst.naziv} više ne postoji.")
+    else:
+        # Tabela vozova; red se smanjuje ako turnus ima mnogo vozova, da bi ceo stao na list
+        kolone = [("#", 10), ("Voz", 25), ("Od", 35), ("Polazak", 20), ("Do", 35), ("Dolazak", 20), ("Dani", 35)]
+        visina_reda = min(7 * mm, (dole - 12 * mm - y) / (len(lst.vozovi) + 1))
+        razmera = (desno - levo) / sum(s for _, s in kolone)
+
+        def red(vrednosti, podebljan=False):
+            nonlocal y
+            painter.setFont(font(visina_reda / mm * 0.55, podebljan))
+            x = levo
+            for (_, sirina_kolone), vrednost in zip(kolone, vrednosti):
+                painter.drawText(QRectF(x + mm, y, sirina_kolone * razmera - 2 * mm, visina_reda),
+                                 Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, vrednost)
+                x += sirina_kolone * razmera
+            y += visina_reda
+
+        red([naslov for naslov, _ in kolone], True)
+        for i, (broj, pocetna, krajnja, polazak, dolazak, dani) in enumerate(lst.vozovi, 1):
+            opis_dana = period.opis(kalendar.iz_bajtova(dani)) if period and dani is not None else ""
+            red([str(i), str(broj), pocetna or "", "" if polazak is None else pretraga.vreme(polazak),
+                 krajnja or "", "" if dolazak is None else pretraga.vreme(dolazak), opis_dana])
+
+    # Podnožje: strana, izdanje i kratak otisak, da bi se u registratoru videlo koji je list važeći
+    painter.setFont(font(3))
+    painter.drawLine(QPointF(levo, dole - 6 * mm), QPointF(desno, dole - 6 * mm))
+    painter.drawText(QRectF(levo, dole - 5 * mm, desno - levo, 5 * mm), Qt.AlignmentFlag.AlignLeft,
+                     f"Strana {lst.strana} - izdanje {izdanje}")
+    if lst.otisak:
+        painter.drawText(QRectF(levo, dole - 5 * mm, desno - levo, 5 * mm), Qt.AlignmentFlag.AlignRight,
+                         lst.otisak[:8])
+    painter.restore()
+
+
+def stampaj_pdf(putanja, listovi, izdanje, period=None, javi=None):
+    """Upisuje listove u PDF (A4, 300 dpi); `javi(n)` se poziva posle svakog lista."""
+    pisac = QPdfWriter(putanja)
+    pisac.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    pisac.setResolution(300)
+    pisac.setTitle(f"Turnusi - izdanje {izdanje}")
+    painter = QPainter(pisac)
+    try:
+        for i, lst in enumerate(listovi):
+            if i:
+                pisac.newPage()
+            nacrtaj_list(painter, pisac.width(), pisac.height(), lst, izdanje, period)
+            if javi:
+                javi(i + 1)
+    finally:
+        painter.end()
+    return len(listovi)
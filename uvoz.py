@@ -0,0 +1,230 @@
+import csv
+import datetime
+import os
+
+import analiza
+import kalendar
+from validacija import proveri_podatke_voza
+
+# Kolone tabele vozovi redom kojim se upisuju
+KOLONE_VOZA = [
+    "broj_voza", "pocetna_stanica", "krajnja_stanica",
+    "sat_polaska", "minut_polaska", "sat_dolaska", "minut_dolaska",
+    "serija_vozila", "status", "sekcija", "dani",
+]
+
+# Nazivi kolona koji se prihvataju u ulaznim fajlovima (mala slova, bez razmaka na krajevima)
+ALIASI_KOLONA = {
+    "broj voza": "broj_voza", "br.voz": "broj_voza", "broj": "broj_voza",
+    "poč. st.": "pocetna_stanica", "pocetna": "pocetna_stanica", "poc.st": "pocetna_stanica",
+    "kraj. st.": "krajnja_stanica", "krajnja": "krajnja_stanica", "krajst": "krajnja_stanica",
+    "serija": "serija_vozila",
+    "dani saobraćanja": "dani", "saobraća": "dani",
+    # Polazak/dolazak u obliku hh:mm
+    "polazak": "polazak", "dolazak": "dolazak",
+}
+
+# Broj redova koji se upisuju jednim executemany pozivom
+VELICINA_PAKETA = 1000
+
+
+def _sql_upisa_voza(izmenjene_kolone):
+    return (f"INSERT INTO vozovi ({', '.join(KOLONE_VOZA)}) VALUES ({', '.join('?' * len(KOLONE_VOZA))}) "
+            f"ON CONFLICT(broj_voza) DO UPDATE SET {', '.join(f'{k} = excluded.{k}' for k in izmenjene_kolone)}")
+
+
+# Upis voza; postojeći voz sa istim brojem se ažurira
+SQL_UPISA_VOZA = _sql_upisa_voza(KOLONE_VOZA[1:])
+# Upis iz fajla bez kolone dani: postojećem vozu ostaju njegovi dani saobraćanja
+SQL_UPISA_VOZA_BEZ_DANA = _sql_upisa_voza([k for k in KOLONE_VOZA[1:] if k != "dani"])
+
+
+class IzvestajUvoza:
+    """Rezultat masovnog uvoza: broj uvezenih redova i greške po redovima fajla."""
+
+    def __init__(self, putanja):
+        self.putanja = putanja
+        self.ukupno = 0
+        self.uvezeno = 0
+        self.greske = []  # (broj reda u fajlu, broj voza, poruka)
+
+    def sazetak(self):
+        return (f"Pročitano redova: {self.ukupno}\n"
+                f"Uvezeno/ažurirano vozova: {self.uvezeno}\n"
+                f"Redova sa greškom: {len(self.greske)}")
+
+    def sacuvaj_greske(self, putanja=None):
+        """Upisuje izveštaj o greškama u CSV fajl i vraća njegovu putanju."""
+        if putanja is None:
+            koren, _ = os.path.splitext(self.putanja)
+            putanja = f"{koren}_greske.csv"
+        with open(putanja, "w", newline="", encoding="utf-8-sig") as f:
+            pisac = csv.writer(f, delimiter=";")
+            pisac.writerow(["red", "broj_voza", "greska"])
+            pisac.writerows(self.greske)
+        return putanja
+
+
+# --- ČITANJE FAJLOVA ---
+
+def _tekst(vrednost):
+    """Pretvara vrednost ćelije u tekst kakav bi korisnik uneo u formu."""
+    if vrednost is None:
+        return ""
+    if isinstance(vrednost, float) and vrednost.is_integer():
+        vrednost = int(vrednost)
+    if isinstance(vrednost, datetime.datetime):
+        vrednost = vrednost.time()
+    if isinstance(vrednost, datetime.time):
+        return f"{vrednost.hour:02}:{vrednost.minute:02}"
+    return str(vrednost).strip().upper()
+
+
+def _naziv_kolone(zaglavlje):
+    naziv = str(zaglavlje or "").strip().lower()
+    return ALIASI_KOLONA.get(naziv, naziv.replace(" ", "_"))
+
+
+def normalizuj_red(zaglavlja, vrednosti):
+    """Pravi rečnik polja voza od jednog reda fajla (podržava i kolone polazak/dolazak hh:mm)."""
+    podaci = {}
+    for kolona, vrednost in zip(zaglavlja, vrednosti):
+        if kolona:
+            podaci[kolona] = _tekst(vrednost)
+    for kolona, sat, minut in (("polazak", "sat_polaska", "minut_polaska"),
+                               ("dolazak", "sat_dolaska", "minut_dolaska")):
+        vreme = podaci.pop(kolona, "")
+        if vreme and not podaci.get(sat):
+            delovi = vreme.replace(".", ":").split(":")
+            if len(delovi) == 2:
+                podaci[sat], podaci[minut] = delovi[0].strip(), delovi[1].strip()
+    return podaci
+
+
+def citaj_csv(putanja):
+    """Čita CSV red po red i vraća (broj reda, podaci); ceo fajl se nikad ne drži u memoriji."""
+    with open(putanja, newline="", encoding="utf-8-sig") as f:
+        uzorak = f.read(4096)
+        f.seek(0)
+        try:
+            dijalekt = csv.Sniffer().sniff(uzorak, delimiters=",;\t")
+        except csv.Error:
+            dijalekt = csv.excel
+        citac = csv.reader(f, dijalekt)
+        zaglavlja = [_naziv_kolone(z) for z in next(citac, [])]
+        for red in citac:
+            if not any(v.strip() for v in red):
+                continue
+            yield citac.line_num, normalizuj_red(zaglavlja, red)
+
+
+def citaj_xlsx(putanja):
+    """Čita prvi list Excel fajla u režimu samo za čitanje (red po red)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Za uvoz Excel fajlova potreban je paket openpyxl (pip install openpyxl).")
+    knjiga = load_workbook(putanja, read_only=True, data_only=True)
+    try:
+        redovi = knjiga.worksheets[0].iter_rows(values_only=True)
+        zaglavlja = [_naziv_kolone(z) for z in next(redovi, [])]
+        for broj_reda, red in enumerate(redovi, 2):
+            if not any(v not in (None, "") for v in red):
+                continue
+            yield broj_reda, normalizuj_red(zaglavlja, red)
+    finally:
+        knjiga.close()
+
+
+def citaj_redove(putanja):
+    """Bira čitač prema ekstenziji fajla."""
+    if os.path.splitext(putanja)[1].lower() in (".xlsx", ".xlsm"):
+        return citaj_xlsx(putanja)
+    return citaj_csv(putanja)
+
+
+# --- PROVERA I UPIS ---
+
+class ProcitaniVozovi:
+    """Ispravni vozovi iz fajla spremni za upis (procitaj_vozove) i izveštaj o greškama."""
+
+    def __init__(self, izvestaj, zameni_postojece):
+        self.izvestaj = izvestaj
+        self.zameni_postojece = zameni_postojece
+        self.vozovi = []  # torke u redosledu KOLONE_VOZA
+        self.redovi = {}  # broj voza -> red u fajlu
+        self.period = None  # period koji se upisuje uz dane saobraćanja (None: nijedan voz nema dane)
+        self.sa_danima = True  # fajl ima kolonu dani
+
+
+def procitaj_vozove(cursor, putanja, zameni_postojece=False, oznaka_perioda=None):
+    """Čita i proverava ceo CSV/XLSX fajl bez upisa u bazu.
+
+    Svaki red prolazi iste provere kao forma za unos voza; neispravni završavaju u izveštaju
+    sa brojem reda. Kursor služi samo za čitanje (period i postojeći vozovi), pa ovo radi u
+    pozadinskoj niti sa sopstvenom vezom, a nit za pisanje dobija samo upisi_vozove.
+    Kolona "dani" se čita prema periodu iz baze (ili iz oznake godine, kalendar.period_za_unos).
+    """
+    procitano = ProcitaniVozovi(IzvestajUvoza(putanja), zameni_postojece)
+    izvestaj = procitano.izvestaj
+    period = kalendar.period_za_unos(cursor, oznaka_perioda)
+    cursor.execute("SELECT broj_voza FROM vozovi")
+    postojeci = {red[0] for red in cursor}
+
+    for broj_reda, podaci in citaj_redove(putanja):
+        izvestaj.ukupno += 1
+        broj = podaci.get("broj_voza", "")
+        try:
+            voz = proveri_podatke_voza(podaci, period)
+        except ValueError as e:
+            izvestaj.greske.append((broj_reda, broj, str(e).replace("\n- ", " ").replace("\n", " ")))
+            continue
+        if broj in procitano.redovi:
+            izvestaj.greske.append(
+                (broj_reda, broj, f"Voz se ponavlja u fajlu (prvi put u redu {procitano.redovi[broj]})."))
+            continue
+        if broj in postojeci and not zameni_postojece:
+            izvestaj.greske.append((broj_reda, broj, f"Voz broj {broj} već postoji!"))
+            continue
+        procitano.redovi[broj] = broj_reda
+        procitano.sa_danima = procitano.sa_danima and "dani" in podaci
+        if voz[-1] is not None:
+            procitano.period = period
+        procitano.vozovi.append(voz)
+    return procitano
+
+
+def upisi_vozove(cursor, procitano):
+    """Upisuje vozove iz procitaj_vozove u okviru tekuće transakcije; vraća IzvestajUvoza.
+
+    Ispravni redovi se upisuju sa executemany u paketima. Postojeći vozovi se ažuriraju samo
+    ako je uključeno `zameni_postojece`; voz koji je neko drugi dodao posle čitanja fajla se
+    zato prijavljuje kao greška. Ako fajl nema kolonu dani, postojeći vozovi zadržavaju svoje
+    dane saobraćanja.
+    """
+    izvestaj = procitano.izvestaj
+    vozovi = procitano.vozovi
+    if not procitano.zameni_postojece:
+        brojevi = [voz[0] for voz in vozovi]
+        dodati = set()
+        for i in range(0, len(brojevi), analiza.VELICINA_IN_LISTE):
+            deo = brojevi[i:i + analiza.VELICINA_IN_LISTE]
+            cursor.execute(f"SELECT broj_voza FROM vozovi WHERE broj_voza IN ({','.join('?' * len(deo))})", deo)
+            dodati.update(broj for broj, in cursor)
+        if dodati:
+            izvestaj.greske.extend((procitano.redovi[broj], broj, f"Voz broj {broj} već postoji!") for broj in dodati)
+            izvestaj.greske.sort(key=lambda greska: greska[0])
+            vozovi = [voz for voz in vozovi if voz[0] not in dodati]
+
+    sql = SQL_UPISA_VOZA if procitano.sa_danima else SQL_UPISA_VOZA_BEZ_DANA
+    for i in range(0, len(vozovi), VELICINA_PAKETA):
+        paket = vozovi[i:i + VELICINA_PAKETA]
+        cursor.executemany(sql, paket)
+        izvestaj.uvezeno += len(paket)
+    if procitano.period is not None:
+        # Podiže ValueError ako je period u bazi u međuvremenu postavljen na drugi
+        kalendar.upisi_period(cursor, procitano.period)
+    # Statistika turnusa čiji su se vozovi promenili
+    analiza.osvezi_statistiku_turnusa(cursor, analiza.turnusi_vozova(cursor, [voz[0] for voz in vozovi]))
+    return izvestaj
+
@@ -0,0 +1,378 @@
+import hashlib
+
+from analiza import VELICINA_IN_LISTE
+import kalendar
+
+# --- PROVERA PODATAKA VOZA ---
+
+# Obavezna polja voza: (naziv za poruku, ključ)
+OBAVEZNA_POLJA_VOZA = [
+    ("Broj voza", "broj_voza"), ("Početna stanica", "pocetna_stanica"), ("Krajnja stanica", "krajnja_stanica"),
+    ("Sat polaska", "sat_polaska"), ("Minut polaska", "minut_polaska"),
+    ("Sat dolaska", "sat_dolaska"), ("Minut dolaska", "minut_dolaska"),
+    ("Sekcija", "sekcija"),
+]
+
+
+def nedostajuca_polja_voza(podaci):
+    """Vraća nazive obaveznih polja koja nisu popunjena."""
+    return [naziv for naziv, kljuc in OBAVEZNA_POLJA_VOZA if not podaci.get(kljuc)]
+
+
+def proveri_podatke_voza(podaci, period=None):
+    """Proverava podatke jednog voza (tekstualne vrednosti) i vraća red spreman za upis.
+
+    Pravila su ista kao u formi za unos voza; za neispravne podatke podiže ValueError.
+    Vraća torku (broj_voza, pocetna, krajnja, sat_p, min_p, sat_d, min_d, serija, status, sekcija, dani);
+    dani su maska u bajtovima prema periodu reda vožnje `period` (None: svaki dan).
+    """
+    broj = podaci.get("broj_voza", "")
+    pocetna = podaci.get("pocetna_stanica", "")
+    krajnja = podaci.get("krajnja_stanica", "")
+    sat_p = podaci.get("sat_polaska", "")
+    min_p = podaci.get("minut_polaska", "")
+    sat_d = podaci.get("sat_dolaska", "")
+    min_d = podaci.get("minut_dolaska", "")
+    serija = podaci.get("serija_vozila") or None
+    status = (podaci.get("status") or 'R').upper()
+    sekcija = podaci.get("sekcija", "")
+    dani = podaci.get("dani", "")
+
+    nedostajuci = nedostajuca_polja_voza(podaci)
+    if nedostajuci:
+        raise ValueError("Neophodno je popuniti sledeća polja:\n- " + "\n- ".join(nedostajuci))
+
+    if not broj.isalnum() or len(broj) < 3 or len(broj) > 6:
+        raise ValueError("Broj voza mora biti alfanumerički (3-6 karaktera).")
+    if not (2 <= len(pocetna) <= 3) or not pocetna.isalpha():
+        raise ValueError("Početna stanica: 2–3 slova.")
+    if not (2 <= len(krajnja) <= 3) or not krajnja.isalpha():
+        raise ValueError("Krajnja stanica: 2–3 slova.")
+    if not sat_p.isdigit() or not (0 <= int(sat_p) <= 23):
+        raise ValueError("Sat polaska mora biti broj između 0 i 23.")
+    if not min_p.isdigit() or not (0 <= int(min_p) <= 59):
+        raise ValueError("Minut polaska mora biti broj između 0 i 59.")
+    if not sat_d.isdigit() or not (0 <= int(sat_d) <= 23):
+        raise ValueError("Sat dolaska mora biti broj između 0 i 23.")
+    if not min_d.isdigit() or not (0 <= int(min_d) <= 59):
+        raise ValueError("Minut dolaska mora biti broj između 0 i 59.")
+    if dani and period is None:
+        raise ValueError("Dani saobraćanja se ne mogu zadati bez perioda reda vožnje.")
+    maska = period.maska(dani) if dani else None
+
+    return (broj, pocetna, krajnja, int(sat_p), int(min_p), int(sat_d), int(min_d), serija, status, sekcija,
+            kalendar.u_bajtove(maska))
+
+
+# --- PROVERA TURNUSA ---
+
+def ucitaj_info_vozova(cursor, brojevi=None):
+    """Učitava podatke vozova potrebne za proveru turnusa (svih vozova ili samo navedenih).
+
+    "dani" je maska dana saobraćanja; voz koji saobraća svakog dana dobija masku celog
+    perioda, a bez perioda u bazi (nijedan voz nema zadate dane) svi dobijaju None.
+    """
+    period = kalendar.ucitaj_period(cursor)
+    svi_dani = period.sve if period else None
+    sql = """
+        SELECT broj_voza, pocetna_stanica, krajnja_stanica, sat_polaska, minut_polaska,
+               sat_dolaska, minut_dolaska, serija_vozila, dani
+        FROM vozovi
+    """
+    if brojevi is None:
+        cursor.execute(sql)
+    else:
+        brojevi = list(dict.fromkeys(brojevi))
+        if not brojevi:
+            return {}
+        cursor.execute(f"{sql} WHERE broj_voza IN ({','.join('?' * len(brojevi))})", brojevi)
+    vozovi_info = {}
+    for red in cursor:
+        vozovi_info[red[0]] = {
+            "pocetna": red[1],
+            "krajnja": red[2],
+            "polazak": (red[3], red[4]),
+            "dolazak": (red[5], red[6]),
+            "serija_vozila": red[7] or "N/A",
+            "dani": svi_dani if red[8] is None else kalendar.iz_bajtova(red[8]),
+        }
+    return vozovi_info
+
+
+class PravilaObrta:
+    """Najkraće dozvoljeno vreme obrta (od dolaska do polaska sledećeg voza) po stanici i seriji.
+
+    Pravila iz tabele pravila_obrta su unapred složena u rečnike, pa je svako traženje O(1).
+    Prazna stanica ili serija u pravilu znači "bilo koja"; redosled prvenstva je
+    stanica+serija, stanica, serija, podrazumevano. Bez ijednog pravila minimum je 0,
+    tj. važi samo postojeća provera da dolazak mora biti pre polaska.
+    """
+
+    def __init__(self, pravila=()):
+        self.tacna = {}  # (stanica, serija) -> minimum
+        self.po_stanici = {}
+        self.po_seriji = {}
+        self.podrazumevano = 0
+        for stanica, serija, minimum in pravila:
+            stanica, serija = stanica or "", serija or ""
+            if stanica and serija:
+                self.tacna[(stanica, serija)] = minimum
+            elif stanica:
+                self.po_stanici[stanica] = minimum
+            elif serija:
+                self.po_seriji[serija] = minimum
+            else:
+                self.podrazumevano = minimum
+
+    def __bool__(self):
+        return bool(self.tacna or self.po_stanici or self.po_seriji or self.podrazumevano)
+
+    def minimum(self, stanica, serija):
+        minimum = self.tacna.get((stanica, serija))
+        if minimum is None:
+            minimum = self.po_stanici.get(stanica)
+        if minimum is None:
+            minimum = self.po_seriji.get(serija, self.podrazumevano)
+        return minimum
+
+
+def ucitaj_pravila_obrta(cursor):
+    """Čita tabelu pravila_obrta i vraća složena PravilaObrta."""
+    cursor.execute("SELECT stanica, serija, minimum_min FROM pravila_obrta")
+    return PravilaObrta(cursor.fetchall())
+
+
+def je_prelazni(info):
+    """Prelazni voz stiže posle ponoći (dolazak je pre polaska)."""
+    sat_d, min_d = info["dolazak"]
+    sat_p, min_p = info["polazak"]
+    return (sat_d < sat_p) or (sat_d == sat_p and min_d < min_p)
+
+
+def proveri_vozove_turnusa(vozovi, vozovi_info, serija_vv, pravila=None, period=None):
+    """Proverava niz vozova jednog turnusa.
+
+    Vraća (vrsta, greske): vrsta je None ako je turnus ispravan, inače 'nepostojeci',
+    'serija' ili 'redosled'; provere se rade tim redom i staje se na prvoj grupi grešaka.
+    Sa `pravila` (PravilaObrta) prekratak obrt u stanici prijavljuje se uz greške redosleda.
+    Ako vozovi ne saobraćaju istih dana, redosled se proverava za svaki skup dana posebno,
+    a greška navodi dane (opis prema periodu reda vožnje `period`).
+    """
+    for broj in vozovi:
+        if broj not in vozovi_info:
+            return 'nepostojeci', [f"Voz {broj} ne postoji u bazi!"]
+
+    greske_serija = []
+    for broj in dict.fromkeys(vozovi):
+        serija_vozila = vozovi_info[broj]["serija_vozila"]
+        if serija_vozila != serija_vv:
+            greske_serija.append(
+                f"Voz {broj} pripada seriji {serija_vozila}, a turnus je za seriju {serija_vv}!"
+            )
+    if greske_serija:
+        return 'serija', greske_serija
+
+    maske = [vozovi_info[broj].get("dani") for broj in vozovi]
+    if len(set(maske)) <= 1:
+        greske = _greske_redosleda(vozovi, vozovi_info, serija_vv, pravila)
+    else:
+        # Dani se dele na klase u kojima saobraća isti skup vozova (preseci bitmaski); ista
+        # greška iz više klasa prijavljuje se jednom, uz sve dane na koje se odnosi
+        dani_greske = {}
+        for dani, clanovi in kalendar.klase_dana(maske):
+            for greska in _greske_redosleda([vozovi[i] for i in clanovi], vozovi_info, serija_vv, pravila):
+                dani_greske[greska] = dani_greske.get(greska, 0) | dani
+        greske = [f"[{_opis_dana(dani, period)}] {greska}" for greska, dani in dani_greske.items()]
+
+    if greske:
+        return 'redosled', greske
+    return None, []
+
+
+def _opis_dana(dani, period):
+    if period is None:
+        return "deo dana"
+    return period.opis(dani) or "svaki dan"
+
+
+def _greske_redosleda(vozovi, vozovi_info, serija_vv, pravila):
+    """Greške u nastavljanju stanica, preklapanju vremena i obrtu za niz vozova."""
+    greske = []
+    # ✅ PROVERA: Redosled i preklapanje vremena (susedni vožnje)
+    for i in range(len(vozovi) - 1):
+        broj_trenutni = vozovi[i]
+        broj_sledeci = vozovi[i + 1]
+        voz_trenutni = vozovi_info[broj_trenutni]
+        voz_sledeci = vozovi_info[broj_sledeci]
+
+        if voz_trenutni["krajnja"] != voz_sledeci["pocetna"]:
+            greske.append(
+                f"Voz {broj_trenutni} i {broj_sledeci}: Stanica {voz_trenutni['krajnja']} ≠ {voz_sledeci['pocetna']}")
+
+        # Proveri vreme - konvertuj u minute od ponoći za trenutni dan
+        dolazak_trenutni_m = voz_trenutni["dolazak"][0] * 60 + voz_trenutni["dolazak"][1]
+        polazak_sledeci_m = voz_sledeci["polazak"][0] * 60 + voz_sledeci["polazak"][1]
+
+        # Ako je trenutni voz prelazni, dolazak je u narednom danu
+        if je_prelazni(voz_trenutni):
+            dolazak_trenutni_m_corr = dolazak_trenutni_m + 24 * 60
+        else:
+            dolazak_trenutni_m_corr = dolazak_trenutni_m
+
+        # Provera preklapanja: dolazak_trenutni (korigovan) >= polazak_sledeci
+        if dolazak_trenutni_m_corr >= polazak_sledeci_m:
+            greske.append(
+                f"Voz {broj_trenutni} i {broj_sledeci}: Dolazak {voz_trenutni['dolazak'][0]:02d}:{voz_trenutni['dolazak'][1]:02d} ≥ Polazak {voz_sledeci['polazak'][0]:02d}:{voz_sledeci['polazak'][1]:02d} (preklapanje vremena u turnusu!)")
+        elif pravila:
+            greska = _proveri_obrt(pravila, voz_trenutni["krajnja"], serija_vv, broj_trenutni, broj_sledeci,
+                                   polazak_sledeci_m - dolazak_trenutni_m_corr)
+            if greska:
+                greske.append(greska)
+
+    # ✅ PROVERA: Prelazni voz na kraju niza (SPECIFIČNA PROVERA)
+    if not greske and len(vozovi) > 1:
+        poslednji_voz_broj = vozovi[-1]
+        prvi_voz_broj = vozovi[0]
+        poslednji_info = vozovi_info[poslednji_voz_broj]
+        prvi_info = vozovi_info[prvi_voz_broj]
+
+        if je_prelazni(poslednji_info):
+            # Ako je poslednji voz prelazni, njegov dolazak (sutradan) ne sme biti posle polaska
+            # prvog voza u turnusu: preklapanje je ako dolazak_poslednjeg >= polazak_prvog.
+            # Npr. 3333 (dolazak 01:20), 4444 (polazak 01:01): 01:20 >= 01:01 -> preklapanje.
+            sat_d_poslednji, min_d_poslednji = poslednji_info["dolazak"]
+            dolazak_poslednji_min = sat_d_poslednji * 60 + min_d_poslednji
+            polazak_prvi_min = prvi_info["polazak"][0] * 60 + prvi_info["polazak"][1]
+
+            if dolazak_poslednji_min >= polazak_prvi_min:
+                greske.append(
+                    f"Prelazni voz {poslednji_voz_broj} na kraju turnusa: Dolazak {sat_d_poslednji:02d}:{min_d_poslednji:02d} ≥ Polazak {prvi_voz_broj} {prvi_info['polazak'][0]:02d}:{prvi_info['polazak'][1]:02d} (preklapanje između poslednjeg i prvog voza u turnusu!)")
+
+        if not greske and pravila:
+            # Obrt posle poslednjeg voza do prvog voza sledećeg dana
+            dolazak_poslednji_min = poslednji_info["dolazak"][0] * 60 + poslednji_info["dolazak"][1]
+            polazak_prvi_min = prvi_info["polazak"][0] * 60 + prvi_info["polazak"][1]
+            obrt = polazak_prvi_min - dolazak_poslednji_min
+            if not je_prelazni(poslednji_info):
+                obrt += 24 * 60
+            greska = _proveri_obrt(pravila, poslednji_info["krajnja"], serija_vv, poslednji_voz_broj, prvi_voz_broj,
+                                   obrt)
+            if greska:
+                greske.append(greska)
+    return greske
+
+
+def _proveri_obrt(pravila, stanica, serija_vv, broj_dolaznog, broj_odlaznog, obrt):
+    """Poruka o prekratkom obrtu u stanici ili None ako je obrt dovoljan."""
+    minimum = pravila.minimum(stanica, serija_vv)
+    if obrt < minimum:
+        return (f"Voz {broj_dolaznog} i {broj_odlaznog}: Obrt u stanici {stanica} je {obrt} min, "
+                f"a najmanje je {minimum} min (pravilo obrta za seriju {serija_vv or 'N/A'})")
+    return None
+
+
+def poruka_provere(vrsta, greske):
+    """Tekst poruke o grešci onakav kakav se prikazuje u tabu Turnusi."""
+    if vrsta == 'nepostojeci':
+        return f"Greška: {greske[0]}"
+    if vrsta == 'serija':
+        return "Greške u serijama:\n" + "\n".join(greske)
+    if vrsta == 'redosled':
+        return "Greške u redosledu/preklapanju:\n" + "\n".join(greske)
+    return ""
+
+
+# --- KEŠ PROVERE TURNUSA ---
+
+
+def _kljuc_pravila(pravila):
+    if not pravila:
+        return None
+    return (sorted(pravila.tacna.items()), sorted(pravila.po_stanici.items()),
+            sorted(pravila.po_seriji.items()), pravila.podrazumevano)
+
+
+def otisak_provere(vozovi, vozovi_info, serija_vv, osnova=None):
+    """Otisak svega od čega zavisi rezultat provere turnusa: serija VV, vozovi redom sa podacima
+    iz `vozovi_info` (None za voz koga nema) i `osnova` (pravila obrta i period, isti za sve turnuse)."""
+    sadrzaj = (osnova, serija_vv, [
+        (broj, (info["pocetna"], info["krajnja"], info["polazak"], info["dolazak"], info["serija_vozila"],
+                info["dani"]) if info else None)
+        for broj, info in ((broj, vozovi_info.get(broj)) for broj in vozovi)])
+    return hashlib.blake2b(repr(sadrzaj).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _vozovi_turnusa(cursor, turnus_ids):
+    """{turnus_id: (serija_vv, [vozovi redom])} za navedene turnuse (None: sve)."""
+    sql = """
+        SELECT t.id, t.serija_vv, tv.broj_voza FROM turnusi t
+        LEFT JOIN turnus_vozovi tv ON tv.turnus_id = t.id
+    """
+    if turnus_ids is None:
+        delovi = [(sql + " ORDER BY t.id, tv.redosled", [])]
+    else:
+        turnus_ids = list(turnus_ids)
+        delovi = [(sql + f" WHERE t.id IN ({','.join('?' * len(deo))}) ORDER BY t.id, tv.redosled", deo)
+                  for deo in (turnus_ids[i:i + VELICINA_IN_LISTE]
+                              for i in range(0, len(turnus_ids), VELICINA_IN_LISTE))]
+    turnusi = {}
+    for upit, parametri in delovi:
+        for turnus_id, serija_vv, broj in cursor.execute(upit, parametri):
+            vozovi = turnusi.setdefault(turnus_id, (serija_vv or "", []))[1]
+            if broj is not None:
+                vozovi.append(broj)
+    return turnusi
+
+
+def proveri_turnuse(cursor, turnus_ids=None, vozovi_info=None):
+    """Proverava turnuse (None: sve) uz keš rezultata iz tabele provera_turnusa.
+
+    Turnus čiji se otisak provere nije promenio od prethodne provere dobija zapamćeni
+    rezultat bez ponovne provere. Vraća listu (turnus_id, otisak, vrsta, greske, iz_kesa);
+    vrsta je None za ispravan turnus, kao u proveri_vozove_turnusa. Ne piše u bazu
+    (rezultate upisuje upisi_provere), pa može da radi u bilo kojoj niti. Podaci vozova se
+    čitaju iz baze ako nije zadat `vozovi_info` (npr. red_voznje.RedVoznje.info_vozova()).
+    """
+    turnusi = _vozovi_turnusa(cursor, turnus_ids)
+    if not turnusi:
+        return []
+    if vozovi_info is None:
+        brojevi = None if turnus_ids is None else [b for _, vozovi in turnusi.values() for b in vozovi]
+        vozovi_info = ucitaj_info_vozova(cursor, brojevi) \
+            if brojevi is None or len(set(brojevi)) <= VELICINA_IN_LISTE else ucitaj_info_vozova(cursor)
+    pravila = ucitaj_pravila_obrta(cursor)
+    period = kalendar.ucitaj_period(cursor)
+    osnova = (_kljuc_pravila(pravila), period and (period.pocetak, period.broj_dana))
+
+    kes = {}
+    ids = list(turnusi)
+    for i in range(0, len(ids), VELICINA_IN_LISTE):
+        deo = ids[i:i + VELICINA_IN_LISTE]
+        cursor.execute(f"SELECT turnus_id, otisak, vrsta, greske FROM provera_turnusa "
+                       f"WHERE turnus_id IN ({','.join('?' * len(deo))})", deo)
+        kes.update((red[0], red[1:]) for red in cursor)
+
+    rezultati = []
+    for turnus_id, (serija_vv, vozovi) in turnusi.items():
+        otisak = otisak_provere(vozovi, vozovi_info, serija_vv, osnova)
+        zapamceno = kes.get(turnus_id)
+        if zapamceno and zapamceno[0] == otisak:
+            vrsta, greske = zapamceno[1] or None, zapamceno[2].split("\n") if zapamceno[2] else []
+            rezultati.append((turnus_id, otisak, vrsta, greske, True))
+            continue
+        if not vozovi:
+            vrsta, greske = 'prazan', ["Turnus nema nijedan voz."]
+        else:
+            vrsta, greske = proveri_vozove_turnusa(vozovi, vozovi_info, serija_vv, pravila, period)
+        rezultati.append((turnus_id, otisak, vrsta, greske, False))
+    return rezultati
+
+
+def upisi_provere(cursor, rezultati):
+    """Pamti nove rezultate provere u keš (rezultati iz proveri_turnuse); turnusi koji su u
+    međuvremenu obrisani se preskaču."""
+    cursor.executemany("""
+        INSERT OR REPLACE INTO provera_turnusa (turnus_id, otisak, vrsta, greske)
+        SELECT id, ?, ?, ? FROM turnusi WHERE id = ?
+    """, [(otisak, vrsta or "", "\n".join(greske), turnus_id)
+          for turnus_id, otisak, vrsta, greske, iz_kesa in rezultati if not iz_kesa])
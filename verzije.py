@@ -0,0 +1,404 @@
+"""Verzije reda vožnje (godine i nacrti) u istoj bazi, kao copy-on-write grane.
+
+Tabele vozovi, turnusi i turnus_vozovi su radna kopija aktivne verzije: aplikacija ih menja
+kao i do sada, a "Sačuvaj" upisuje njihovo stanje u verziju. Verzija čuva samo razlike u
+odnosu na roditelja (verzije_vozova, verzije_turnusa: ključ -> otisak sadržaja, NULL znači
+uklonjen), pa nova godina napravljena od prethodne ne kopira nijedan red dok se ne izmeni.
+Sadržaj reda (sadrzaj_voza, sadrzaj_turnusa) se čuva jednom po otisku i deli između verzija.
+
+Stanje verzije je roditeljevo stanje sa primenjenim sopstvenim razlikama. Kada se menja
+verzija koja ima naslednike, stara vrednost izmenjenog ključa se prvo upisuje u razlike
+naslednika koji ga nisu menjali (copy-on-write), pa naslednici ne vide izmenu.
+"""
+import datetime
+import hashlib
+import json
+
+from analiza import VELICINA_IN_LISTE, osvezi_statistiku_turnusa, turnusi_vozova
+from baza import KOLONE_VOZOVI
+import kalendar
+
+# Kolone sadržaja turnusa; vozovi su JSON lista brojeva redom
+KOLONE_TURNUSA = ["naziv", "sekcija", "serija_vv", "vozovi"]
+
+# Tabela razlika i tabela sadržaja za vozove i turnuse
+_VRSTE = {
+    "vozovi": ("verzije_vozova", "sadrzaj_voza", KOLONE_VOZOVI),
+    "turnusi": ("verzije_turnusa", "sadrzaj_turnusa", KOLONE_TURNUSA),
+}
+
+
+def otisak(red):
+    """Otisak sadržaja reda (torka vrednosti kolona); isti red uvek daje isti otisak."""
+    return hashlib.blake2b(repr(tuple(red)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+# --- STANJE RADNE KOPIJE ---
+
+def _stanje_vozova(cursor):
+    """Vozovi iz radne kopije: {broj_voza: (otisak, red)}."""
+    cursor.execute(f"SELECT {', '.join(KOLONE_VOZOVI)} FROM vozovi")
+    return {red[0]: (otisak(red), red) for red in cursor}
+
+
+def _stanje_turnusa(cursor):
+    """Turnusi iz radne kopije po nazivu: {naziv: (otisak, red)}; red je u obliku KOLONE_TURNUSA."""
+    vozovi = {}
+    cursor.execute("SELECT turnus_id, broj_voza FROM turnus_vozovi ORDER BY turnus_id, redosled")
+    for turnus_id, broj in cursor:
+        vozovi.setdefault(turnus_id, []).append(broj)
+    stanje = {}
+    for turnus_id, naziv, sekcija, serija_vv in cursor.execute(
+            "SELECT id, naziv, sekcija, serija_vv FROM turnusi").fetchall():
+        red = (naziv, sekcija, serija_vv, json.dumps(vozovi.get(turnus_id, []), ensure_ascii=False))
+        stanje[naziv] = (otisak(red), red)
+    return stanje
+
+
+def _stanje_radne_kopije(cursor):
+    return {"vozovi": _stanje_vozova(cursor), "turnusi": _stanje_turnusa(cursor)}
+
+
+# --- RAZREŠAVANJE STANJA VERZIJE ---
+
+def _lanac(cursor, verzija_id):
+    """Verzija i njeni preci, od verzije ka korenu."""
+    lanac = []
+    while verzija_id is not None:
+        lanac.append(verzija_id)
+        red = cursor.execute("SELECT roditelj_id FROM verzije WHERE id = ?", (verzija_id,)).fetchone()
+        if red is None:
+            raise ValueError(f"Verzija {verzija_id} ne postoji.")
+        verzija_id = red[0]
+    return lanac
+
+
+def _razlike(cursor, tabela, verzija_id, kljucevi=None):
+    """Sopstvene razlike verzije {ključ: otisak ili None}, samo za navedene ključeve ako su zadati."""
+    if kljucevi is None:
+        cursor.execute(f"SELECT kljuc, otisak FROM {tabela} WHERE verzija_id = ?", (verzija_id,))
+        return dict(cursor.fetchall())
+    razlike = {}
+    kljucevi = list(kljucevi)
+    for i in range(0, len(kljucevi), VELICINA_IN_LISTE):
+        deo = kljucevi[i:i + VELICINA_IN_LISTE]
+        cursor.execute(f"SELECT kljuc, otisak FROM {tabela} WHERE verzija_id = ? AND kljuc IN "
+                       f"({','.join('?' * len(deo))})", [verzija_id, *deo])
+        razlike.update(cursor)
+    return razlike
+
+
+def _razresi(cursor, tabela, lanac, kljucevi=None):
+    """Stanje verzije {ključ: otisak}: za svaki ključ važi najbliža razlika u lancu.
+
+    Ako su zadati ključevi, razrešavaju se samo oni (ključ koga nema u verziji se izostavlja).
+    """
+    stanje = {}
+    preostali = None if kljucevi is None else set(kljucevi)
+    for verzija_id in lanac:
+        if preostali is not None and not preostali:
+            break
+        for kljuc, vrednost in _razlike(cursor, tabela, verzija_id, preostali).items():
+            stanje.setdefault(kljuc, vrednost)
+        if preostali is not None:
+            preostali.difference_update(stanje)
+    return {kljuc: vrednost for kljuc, vrednost in stanje.items() if vrednost is not None}
+
+
+def _redovi_sadrzaja(cursor, vrsta, otisci):
+    """{otisak: red} za navedene otiske iz tabele sadržaja."""
+    _, tabela, kolone = _VRSTE[vrsta]
+    otisci = list(otisci)
+    redovi = {}
+    for i in range(0, len(otisci), VELICINA_IN_LISTE):
+        deo = otisci[i:i + VELICINA_IN_LISTE]
+        cursor.execute(f"SELECT otisak, {', '.join(kolone)} FROM {tabela} WHERE otisak IN "
+                       f"({','.join('?' * len(deo))})", deo)
+        redovi.update((red[0], red[1:]) for red in cursor)
+    return redovi
+
+
+# --- VERZIJE ---
+
+def aktivna_verzija(cursor):
+    """Id verzije čija je radna kopija u tabelama ili None ako baza još nema verzije."""
+    red = cursor.execute("SELECT verzija_id FROM aktivna_verzija").fetchone()
+    return red[0] if red else None
+
+
+def lista_verzija(cursor):
+    """Redovi za prikaz: (id, naziv, godina, roditelj, sačuvana, sopstvenih izmena, aktivna)."""
+    aktivna = aktivna_verzija(cursor)
+    cursor.execute("""
+        SELECT v.id, v.naziv, v.godina, r.naziv, v.sacuvana,
+            (SELECT count(*) FROM verzije_vozova WHERE verzija_id = v.id)
+            + (SELECT count(*) FROM verzije_turnusa WHERE verzija_id = v.id)
+        FROM verzije v LEFT JOIN verzije r ON r.id = v.roditelj_id
+        ORDER BY v.id
+    """)
+    return [(*red, red[0] == aktivna) for red in cursor.fetchall()]
+
+
+def _postavi_aktivnu(cursor, verzija_id):
+    cursor.execute("INSERT OR REPLACE INTO aktivna_verzija (id, verzija_id) VALUES (1, ?)", (verzija_id,))
+
+
+def sacuvaj_verziju(cursor, verzija_id=None):
+    """Upisuje radnu kopiju u verziju (podrazumevano aktivnu); vraća broj izmenjenih ključeva.
+
+    Verzija pamti samo razlike prema roditelju. Naslednici koji izmenjeni ključ nisu menjali
+    dobijaju staru vrednost u sopstvene razlike, pa se njihovo stanje ne menja.
+    """
+    if verzija_id is None:
+        verzija_id = aktivna_verzija(cursor)
+    if verzija_id is None:
+        raise ValueError("Nema aktivne verzije; napravite novu verziju.")
+    lanac = _lanac(cursor, verzija_id)
+    naslednici = [red[0] for red in cursor.execute("SELECT id FROM verzije WHERE roditelj_id = ?", (verzija_id,))]
+    radna = _stanje_radne_kopije(cursor)
+    izmenjeno = 0
+    for vrsta, (tabela_razlika, tabela_sadrzaja, kolone) in _VRSTE.items():
+        stanje = radna[vrsta]
+        roditelj = _razresi(cursor, tabela_razlika, lanac[1:])
+        stare_razlike = _razlike(cursor, tabela_razlika, verzija_id)
+        nove_razlike = {k: o for k, (o, _) in stanje.items() if roditelj.get(k) != o}
+        nove_razlike.update((k, None) for k in roditelj if k not in stanje)
+
+        # Ključevi čija se vrednost u ovoj verziji menja (staro stanje: roditelj + stare razlike)
+        promenjeni = {}
+        for k in set(stare_razlike) | set(nove_razlike):
+            stara = stare_razlike[k] if k in stare_razlike else roditelj.get(k)
+            nova = stanje[k][0] if k in stanje else None
+            if stara != nova:
+                promenjeni[k] = stara
+        izmenjeno += len(promenjeni)
+
+        for naslednik in naslednici:
+            svoje = _razlike(cursor, tabela_razlika, naslednik, promenjeni)
+            cursor.executemany(f"INSERT INTO {tabela_razlika} (verzija_id, kljuc, otisak) VALUES (?, ?, ?)",
+                               [(naslednik, k, stara) for k, stara in promenjeni.items() if k not in svoje])
+
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {tabela_sadrzaja} (otisak, {', '.join(kolone)}) "
+            f"VALUES ({', '.join('?' * (len(kolone) + 1))})",
+            [(stanje[k][0], *stanje[k][1]) for k, o in nove_razlike.items() if o is not None])
+        if vrsta == "turnusi":
+            cursor.executemany(
+                "INSERT OR IGNORE INTO vozovi_sadrzaja_turnusa (broj_voza, otisak) VALUES (?, ?)",
+                [(broj, o) for k, o in nove_razlike.items() if o is not None
+                 for broj in json.loads(stanje[k][1][3])])
+        cursor.execute(f"DELETE FROM {tabela_razlika} WHERE verzija_id = ?", (verzija_id,))
+        cursor.executemany(f"INSERT INTO {tabela_razlika} (verzija_id, kljuc, otisak) VALUES (?, ?, ?)",
+                           [(verzija_id, k, o) for k, o in nove_razlike.items()])
+
+    period = kalendar.ucitaj_period(cursor)
+    cursor.execute("UPDATE verzije SET sacuvana = ?, period_pocetak = ?, period_broj_dana = ? WHERE id = ?",
+                   (datetime.datetime.now().isoformat(timespec="seconds"),
+                    period.pocetak.isoformat() if period else None, period.broj_dana if period else None,
+                    verzija_id))
+    _obrisi_nekorisceni_sadrzaj(cursor)
+    return izmenjeno
+
+
+def nova_verzija(cursor, naziv, godina=""):
+    """Pravi verziju od aktivne (ili prvu verziju baze) sa trenutnom radnom kopijom i aktivira je.
+
+    Nova verzija deli sve neizmenjene vozove i turnuse sa roditeljem; aktivna verzija ostaje
+    onakva kakva je poslednji put sačuvana.
+    """
+    naziv = (naziv or "").strip()
+    if not naziv:
+        raise ValueError("Unesite naziv verzije.")
+    if cursor.execute("SELECT 1 FROM verzije WHERE naziv = ?", (naziv,)).fetchone():
+        raise ValueError(f"Verzija '{naziv}' već postoji.")
+    roditelj = aktivna_verzija(cursor)
+    cursor.execute("INSERT INTO verzije (naziv, godina, roditelj_id, napravljena) VALUES (?, ?, ?, ?)",
+                   (naziv, godina, roditelj, datetime.datetime.now().isoformat(timespec="seconds")))
+    verzija_id = cursor.lastrowid
+    _postavi_aktivnu(cursor, verzija_id)
+    sacuvaj_verziju(cursor, verzija_id)
+    return verzija_id
+
+
+def nesacuvane_izmene(cursor):
+    """Broj vozova i turnusa u radnoj kopiji koji se razlikuju od sačuvane aktivne verzije."""
+    verzija_id = aktivna_verzija(cursor)
+    if verzija_id is None:
+        return 0
+    lanac = _lanac(cursor, verzija_id)
+    radna = _stanje_radne_kopije(cursor)
+    izmena = 0
+    for vrsta, (tabela_razlika, _, _) in _VRSTE.items():
+        sacuvano = _razresi(cursor, tabela_razlika, lanac)
+        stanje = {k: o for k, (o, _) in radna[vrsta].items()}
+        izmena += sum(1 for k in set(sacuvano) | set(stanje) if sacuvano.get(k) != stanje.get(k))
+    return izmena
+
+
+def otvori_verziju(cursor, verzija_id):
+    """Zamenjuje radnu kopiju sačuvanim stanjem verzije i aktivira je; vraća oznaku godine verzije.
+
+    Menjaju se samo vozovi i turnusi koji se razlikuju; neizmenjeni turnusi zadržavaju id.
+    Nesačuvane izmene radne kopije se odbacuju.
+    """
+    red = cursor.execute("SELECT godina, period_pocetak, period_broj_dana FROM verzije WHERE id = ?",
+                         (verzija_id,)).fetchone()
+    if red is None:
+        raise ValueError(f"Verzija {verzija_id} ne postoji.")
+    godina, period_pocetak, period_broj_dana = red
+    lanac = _lanac(cursor, verzija_id)
+    radna = _stanje_radne_kopije(cursor)
+
+    # Vozovi
+    cilj = _razresi(cursor, "verzije_vozova", lanac)
+    stanje = radna["vozovi"]
+    uklonjeni = [k for k in stanje if k not in cilj]
+    upis = [o for k, o in cilj.items() if k not in stanje or stanje[k][0] != o]
+    redovi = _redovi_sadrzaja(cursor, "vozovi", upis)
+    # Upsert umesto INSERT OR REPLACE: zamena reda bi u dnevniku izmena izgledala kao novi red
+    cursor.executemany(
+        f"INSERT INTO vozovi ({', '.join(KOLONE_VOZOVI)}) VALUES ({', '.join('?' * len(KOLONE_VOZOVI))}) "
+        f"ON CONFLICT(broj_voza) DO UPDATE SET {', '.join(f'{k} = excluded.{k}' for k in KOLONE_VOZOVI[1:])}",
+        [redovi[o] for o in upis])
+    dotaknuti = turnusi_vozova(cursor, uklonjeni + [redovi[o][0] for o in upis])
+
+    # Turnusi (po nazivu)
+    cilj = _razresi(cursor, "verzije_turnusa", lanac)
+    stanje = radna["turnusi"]
+    ids = dict(cursor.execute("SELECT naziv, id FROM turnusi").fetchall())
+    for naziv in stanje:
+        if naziv not in cilj:
+            cursor.execute("DELETE FROM turnus_vozovi WHERE turnus_id = ?", (ids[naziv],))
+            cursor.execute("DELETE FROM statistika_turnusa WHERE turnus_id = ?", (ids[naziv],))
+            cursor.execute("DELETE FROM provera_turnusa WHERE turnus_id = ?", (ids[naziv],))
+            cursor.execute("DELETE FROM turnusi WHERE id = ?", (ids[naziv],))
+            dotaknuti.discard(ids[naziv])
+    upis = [o for k, o in cilj.items() if k not in stanje or stanje[k][0] != o]
+    for naziv, sekcija, serija_vv, vozovi in _redovi_sadrzaja(cursor, "turnusi", upis).values():
+        if naziv in ids:
+            turnus_id = ids[naziv]
+            cursor.execute("UPDATE turnusi SET sekcija = ?, serija_vv = ? WHERE id = ?", (sekcija, serija_vv, turnus_id))
+            cursor.execute("DELETE FROM turnus_vozovi WHERE turnus_id = ?", (turnus_id,))
+        else:
+            cursor.execute("INSERT INTO turnusi (naziv, sekcija, serija_vv) VALUES (?, ?, ?)",
+                           (naziv, sekcija, serija_vv))
+            turnus_id = cursor.lastrowid
+        cursor.executemany("INSERT INTO turnus_vozovi (turnus_id, broj_voza, redosled) VALUES (?, ?, ?)",
+                           [(turnus_id, broj, redosled) for redosled, broj in enumerate(json.loads(vozovi), 1)])
+        dotaknuti.add(turnus_id)
+    # Vozovi se brišu tek kada ih turnusi verzije više ne sadrže (strani ključ)
+    cursor.executemany("DELETE FROM vozovi WHERE broj_voza = ?", [(k,) for k in uklonjeni])
+    osvezi_statistiku_turnusa(cursor, dotaknuti)
+
+    # Period dana saobraćanja pripada verziji
+    cursor.execute("DELETE FROM period_reda_voznje")
+    if period_pocetak:
+        cursor.execute("INSERT INTO period_reda_voznje (id, pocetak, broj_dana) VALUES (1, ?, ?)",
+                       (period_pocetak, period_broj_dana))
+    _postavi_aktivnu(cursor, verzija_id)
+    return godina or ""
+
+
+def obrisi_verziju(cursor, verzija_id):
+    """Briše verziju koja nije aktivna; njene razlike prelaze na naslednike, koji dobijaju njenog roditelja."""
+    if verzija_id == aktivna_verzija(cursor):
+        raise ValueError("Aktivna verzija ne može da se obriše; prvo otvorite drugu verziju.")
+    red = cursor.execute("SELECT roditelj_id FROM verzije WHERE id = ?", (verzija_id,)).fetchone()
+    if red is None:
+        raise ValueError(f"Verzija {verzija_id} ne postoji.")
+    naslednici = [r[0] for r in cursor.execute("SELECT id FROM verzije WHERE roditelj_id = ?", (verzija_id,))]
+    for tabela_razlika, _, _ in _VRSTE.values():
+        razlike = _razlike(cursor, tabela_razlika, verzija_id)
+        for naslednik in naslednici:
+            svoje = _razlike(cursor, tabela_razlika, naslednik, razlike)
+            cursor.executemany(f"INSERT INTO {tabela_razlika} (verzija_id, kljuc, otisak) VALUES (?, ?, ?)",
+                               [(naslednik, k, o) for k, o in razlike.items() if k not in svoje])
+        cursor.execute(f"DELETE FROM {tabela_razlika} WHERE verzija_id = ?", (verzija_id,))
+    cursor.execute("UPDATE verzije SET roditelj_id = ? WHERE roditelj_id = ?", (red[0], verzija_id))
+    cursor.execute("DELETE FROM verzije WHERE id = ?", (verzija_id,))
+    _obrisi_nekorisceni_sadrzaj(cursor)
+
+
+def _obrisi_nekorisceni_sadrzaj(cursor):
+    for tabela_razlika, tabela_sadrzaja, _ in _VRSTE.values():
+        cursor.execute(f"DELETE FROM {tabela_sadrzaja} WHERE otisak NOT IN "
+                       f"(SELECT otisak FROM {tabela_razlika} WHERE otisak IS NOT NULL)")
+    cursor.execute("DELETE FROM vozovi_sadrzaja_turnusa WHERE otisak NOT IN (SELECT otisak FROM sadrzaj_turnusa)")
+
+
+# --- RAZLIKA IZMEĐU VERZIJA ---
+
+class Razlika:
+    """Razlika verzije `b` u odnosu na verziju `a`."""
+
+    def __init__(self):
+        self.vozovi = []  # (broj, promena, izmenjene kolone); promena: dodat, uklonjen, izmenjen
+        self.turnusi = []  # (naziv, promena, izmenjene kolone)
+        self.pogodjeni_turnusi = []  # (naziv, vozovi iz turnusa koji su dodati, uklonjeni ili izmenjeni)
+
+    def __bool__(self):
+        return bool(self.vozovi or self.turnusi)
+
+
+def _uporedi(cursor, vrsta, lanac_a, lanac_b, kljucevi):
+    """Promene ključeva između dve verzije: [(ključ, promena, izmenjene kolone)]."""
+    tabela_razlika, _, kolone = _VRSTE[vrsta]
+    stanje_a = _razresi(cursor, tabela_razlika, lanac_a, kljucevi)
+    stanje_b = _razresi(cursor, tabela_razlika, lanac_b, kljucevi)
+    izmenjeni = [(k, stanje_a[k], stanje_b[k]) for k in stanje_a if k in stanje_b and stanje_a[k] != stanje_b[k]]
+    redovi = _redovi_sadrzaja(cursor, vrsta, [o for _, a, b in izmenjeni for o in (a, b)])
+    promene = [(k, "dodat", []) for k in stanje_b if k not in stanje_a]
+    promene += [(k, "uklonjen", []) for k in stanje_a if k not in stanje_b]
+    promene += [(k, "izmenjen", [kolona for kolona, x, y in zip(kolone, redovi[a], redovi[b]) if x != y])
+                for k, a, b in izmenjeni]
+    return sorted(promene)
+
+
+def _sadrzaji_sa_vozovima(cursor, brojevi):
+    """{otisak: naziv turnusa} sačuvanih sadržaja turnusa koji sadrže neki od navedenih vozova."""
+    brojevi = list(brojevi)
+    sadrzaji = {}
+    for i in range(0, len(brojevi), VELICINA_IN_LISTE):
+        deo = brojevi[i:i + VELICINA_IN_LISTE]
+        cursor.execute("SELECT v.otisak, s.naziv FROM vozovi_sadrzaja_turnusa v "
+                       "JOIN sadrzaj_turnusa s ON s.otisak = v.otisak "
+                       f"WHERE v.broj_voza IN ({','.join('?' * len(deo))})", deo)
+        sadrzaji.update(cursor)
+    return sadrzaji
+
+
+def razlika(cursor, verzija_a, verzija_b):
+    """Dodati, uklonjeni i izmenjeni vozovi i turnusi verzije b prema verziji a.
+
+    Porede se samo ključevi koje je neka verzija na putu od zajedničkog pretka do a ili b
+    menjala, pa razlika dve godine sa malo izmena ne čita ceo red vožnje.
+    """
+    lanac_a, lanac_b = _lanac(cursor, verzija_a), _lanac(cursor, verzija_b)
+    zajednicki = set(lanac_a) & set(lanac_b)
+    put = [v for v in lanac_a + lanac_b if v not in zajednicki]
+    rezultat = Razlika()
+    for vrsta, (tabela_razlika, _, _) in _VRSTE.items():
+        kljucevi = set()
+        for verzija_id in put:
+            kljucevi.update(_razlike(cursor, tabela_razlika, verzija_id))
+        promene = _uporedi(cursor, vrsta, lanac_a, lanac_b, kljucevi)
+        if vrsta == "vozovi":
+            rezultat.vozovi = promene
+        else:
+            rezultat.turnusi = promene
+
+    # Turnusi verzije b (i uklonjeni iz a) koji voze dodat, uklonjen ili izmenjen voz. Kandidati su
+    # samo sačuvani sadržaji turnusa sa nekim od tih vozova (indeks po broju voza), pa se ne
+    # razrešavaju svi turnusi obe verzije.
+    if rezultat.vozovi:
+        promenjeni_vozovi = {broj for broj, _, _ in rezultat.vozovi}
+        kandidati = _sadrzaji_sa_vozovima(cursor, promenjeni_vozovi)
+        pogodjeni = {}
+        for lanac in (lanac_b, lanac_a):
+            stanje = _razresi(cursor, "verzije_turnusa", lanac, set(kandidati.values()))
+            otisci = [o for o in stanje.values() if o in kandidati]
+            for naziv, _, _, vozovi in _redovi_sadrzaja(cursor, "turnusi", otisci).values():
+                if naziv not in pogodjeni:
+                    pogodjeni[naziv] = [b for b in json.loads(vozovi) if b in promenjeni_vozovi]
+        rezultat.pogodjeni_turnusi = sorted(pogodjeni.items())
+    return rezultat